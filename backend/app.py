@@ -1,29 +1,48 @@
 """
 CYBER KILL CHAIN ANALYZER - FLASK APP 
 Applicazione Flask sicura con rate limiting, validazione input e gestione errori
+
+Le route sono nel blueprint api; create_app() costruisce l'applicazione.
+In sviluppo: python app.py. In produzione: gunicorn -c gunicorn.conf.py wsgi:app
 """
 
 # Importazioni per il framework Flask e utilità
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, current_app, jsonify, request, Response
 from flask_cors import CORS
+import hmac
 import logging
 from datetime import datetime
 import os
+import time
 from dotenv import load_dotenv
 
 # # Importazione moduli personalizzati
-from services.game_service import GameService
+from services.game_service import GameService, get_broadcaster
+from services.live_updates import KEEPALIVE, encode_event, encode_retry
 from utils.helpers import (
     validate_session_data,
     format_api_response,
+    encode_api_parts,
+    encode_api_response,
     handle_api_error,
-    get_current_timestamp
+    get_current_timestamp,
+    validate_cohort_id
 )
-from utils.rate_limiter import create_limiter, get_user_key
+from utils.rate_limiter import create_limiter, get_user_key, limiter, storage_backend
+from utils.response_cache import ResponseCache, make_cached_response
+from utils.compression import compress_response, make_parts_response
+from utils.analytics import get_event_pipeline
+from models.corpus import get_log_corpus
+from models.game_data import CYBER_KILL_CHAIN_PHASES, SEVERITY_LEVELS
+from utils.metrics import MetricsRegistry, resident_memory_bytes
 from utils.validators import (
     SessionDataSchema, 
     PhaseValidationSchema, 
     MitigationValidationSchema,
+    RankLookupSchema,
+    RoundSchema,
+    AnalyzeSchema,
+    ANALYZE_MAX_BYTES,
     validate_json_input
 )
 
@@ -33,32 +52,19 @@ from utils.validators import (
 
 # Carica le variabili d'ambiente dal file .env
 load_dotenv()
-app = Flask(__name__)
-
-# Configurazione CORS
-# Permette solo alle origini specificate di fare richieste al backend
-allowed_origins = [
-    "http://localhost:5173",    # Server di sviluppo Vite
-    "http://127.0.0.1:5173",    # Versione alternativa di localhost
-    "http://localhost:3000",    # Create React App (backup)
-]
-
-# In produzione, usa l'URL del frontend dalle variabili d'ambiente
-if os.getenv('FLASK_ENV') == 'production':
-    frontend_url = os.getenv('FRONTEND_URL')
-    if frontend_url:
-        allowed_origins = [frontend_url]
-
-# Configurazione CORS sicura - permette solo metodi e headers necessari
-CORS(app, 
-     origins=allowed_origins,           # Solo origini autorizzate
-     methods=['GET', 'POST'],           # Solo metodi HTTP necessari
-     allow_headers=['Content-Type'],    # Solo headers necessari
-     supports_credentials=False         # Nessun cookie
-)
 
-# Rate Limiter
-limiter = create_limiter(app)
+# Tutte le route dell'applicazione
+api = Blueprint('api', __name__)
+
+# Cache delle risposte già codificate per gli endpoint di sola lettura
+response_cache = ResponseCache()
+
+# Durata massima di uno stream SSE: poi EventSource si riconnette e riceve lo stato completo
+LIVE_STREAM_SECONDS = float(os.getenv('LIVE_STREAM_SECONDS', 300))
+# Intervallo dei commenti keepalive sugli stream senza eventi
+LIVE_KEEPALIVE_SECONDS = 15
+# Attesa (ms) prima della riconnessione automatica di EventSource
+LIVE_RETRY_MS = 3000
 
 # Configurazione logging migliorata
 logging.basicConfig(
@@ -67,11 +73,113 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def get_allowed_origins():
+    """
+    Origini autorizzate dal CORS
+
+    Returns:
+        list: URL delle origini che possono chiamare il backend
+    """
+    # In produzione, usa l'URL del frontend dalle variabili d'ambiente
+    if os.getenv('FLASK_ENV') == 'production' and os.getenv('FRONTEND_URL'):
+        return [os.getenv('FRONTEND_URL')]
+    return [
+        "http://localhost:5173",    # Server di sviluppo Vite
+        "http://127.0.0.1:5173",    # Versione alternativa di localhost
+        "http://localhost:3000",    # Create React App (backup)
+    ]
+
+def register_gauges(app, metrics):
+    """Gauge letti solo quando le metriche vengono esposte"""
+    def log_synthesis():
+        return GameService.get_log_synthesis_metrics() or {}
+
+    metrics.gauge('active_sessions', 'Sessions in the session store', GameService.get_session_count)
+    metrics.gauge('rate_limiter_backend', 'Storage backend in use by the rate limiter (lru-memory during a Redis fallback)',
+                  lambda: [({'backend': storage_backend(app)}, 1)])
+    # Pre-controllo locale assente con RATELIMIT_LOCAL_RATE=0
+    local_bucket = app.extensions.get('local_rate_limit')
+    if local_bucket is not None:
+        metrics.gauge('rate_limit_local_rejected_total', 'Requests rejected by the local token bucket pre-check',
+                      lambda: local_bucket.rejected, metric_type='counter')
+    metrics.gauge('session_expiry_backlog_seconds', 'How long the oldest expired session has been waiting',
+                  lambda: GameService.get_expiry_metrics()['backlog_lag_seconds'])
+    metrics.gauge('log_synthesis_pool_size', 'Synthetic logs ready to be served, per phase',
+                  lambda: [({'phase': phase}, size) for phase, size in log_synthesis().get('pool_sizes', {}).items()])
+    metrics.gauge('log_synthesis_pool_misses_total', 'Logs served from the base corpus because a pool was empty',
+                  lambda: log_synthesis().get('pool_misses', 0), metric_type='counter')
+    metrics.gauge('live_subscribers', 'Open Server-Sent Events streams',
+                  lambda: GameService.get_live_update_metrics()['subscribers'])
+    metrics.gauge('live_clients_dropped_total', 'Live streams closed because the client fell behind',
+                  lambda: GameService.get_live_update_metrics()['dropped_total'], metric_type='counter')
+    metrics.gauge('analytics_queue_depth', 'Analytics events waiting to be written',
+                  lambda: get_event_pipeline().metrics()['queue_depth'])
+    metrics.gauge('analytics_events_dropped_total', 'Analytics events dropped because the queue was full',
+                  lambda: get_event_pipeline().dropped, metric_type='counter')
+    metrics.gauge('process_resident_memory_bytes', 'Resident memory size in bytes', resident_memory_bytes)
+    metrics.gauge('process_start_time_seconds', 'Start time of the process since unix epoch in seconds',
+                  lambda: metrics.started_at)
+
+def create_app():
+    """
+    Crea e configura l'applicazione Flask
+
+    Non apre connessioni né avvia thread: session store, Redis e analytics
+    vengono inizializzati alla prima richiesta di ogni worker, quindi l'app
+    può essere creata nel master di gunicorn prima del fork (--preload)
+
+    Returns:
+        Flask: Applicazione pronta per il server WSGI
+    """
+    app = Flask(__name__)
+
+    # Configurazione CORS sicura - permette solo metodi e headers necessari
+    CORS(app, 
+         origins=get_allowed_origins(),     # Solo origini autorizzate
+         methods=['GET', 'POST'],           # Solo metodi HTTP necessari
+         allow_headers=['Content-Type'],    # Solo headers necessari
+         supports_credentials=False         # Nessun cookie
+    )
+
+    # Metriche delle richieste (registrate prima del rate limiter per misurare anche i 429)
+    metrics = MetricsRegistry()
+    metrics.init_app(app)
+    app.extensions['metrics'] = metrics
+
+    # Rate Limiter
+    create_limiter(app)
+
+    # Compressione gzip/brotli delle risposte non già compresse dalle view
+    app.after_request(compress_response)
+
+    register_gauges(app, metrics)
+    app.register_blueprint(api)
+    return app
+
+def preload_static_data():
+    """
+    Costruisce dati statici e cache derivate prima del fork dei worker,
+    così restano condivisi copy-on-write invece di essere ricreati in ognuno
+    """
+    corpus = get_log_corpus()
+    logger.info(f"Log corpus ready: {len(corpus)} logs")
+    phases_response().precompress()
+    GameService.get_log_analyzer_info()  # Addestra il classificatore di /api/analyze
+    GameService.get_log_search_metrics()  # Costruisce l'indice di /api/scenarios/search
+
+def phases_response():
+    """Risposta (in cache) con tutte le fasi della Kill Chain"""
+    return response_cache.get(
+        'phases', 0,
+        lambda: encode_api_response({'phases': GameService.get_all_phases()}),
+        static=True
+    )
+
 # ============================================================================
 # MIDDLEWARE E GESTORI DI ERRORE
 # ============================================================================
 
-@app.before_request
+@api.before_app_request
 def before_request():
     """
     Middleware eseguito PRIMA di ogni richiesta
@@ -80,7 +188,7 @@ def before_request():
     """
     logger.info(f"{request.method} {request.path} from {request.remote_addr}")
 
-@app.after_request
+@api.after_app_request
 def after_request(response):
     """
     Middleware eseguito DOPO ogni richiesta
@@ -94,17 +202,17 @@ def after_request(response):
     return response
 
 # Gestori di errori HTTP personalizzati
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     """Gestisce errori 404 - Endpoint non trovato"""
     return jsonify(format_api_response(False, error="Endpoint not found")), 404
 
-@app.errorhandler(405)
+@api.app_errorhandler(405)
 def method_not_allowed(error):
     """Gestisce errori 405 - Metodo HTTP non permesso"""
     return jsonify(format_api_response(False, error="Method not allowed")), 405
 
-@app.errorhandler(429)
+@api.app_errorhandler(429)
 def ratelimit_handler(e):
     """Gestisce errori 429 - Rate limit superato"""
     logger.warning(f"Rate limit exceeded for {request.remote_addr}")
@@ -113,7 +221,7 @@ def ratelimit_handler(e):
         error="Rate limit exceeded. Troppi tentativi, riprova più tardi."
     )), 429
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     """Gestisce errori 500 - Errori interni del server"""
     logger.error(f"Internal server error: {error}")
@@ -123,7 +231,7 @@ def internal_error(error):
 # ENDPOINT DI MONITORAGGIO
 # ============================================================================
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 @limiter.limit("30 per minute")  # Limite specifico per questo endpoint
 def health_check():
     """
@@ -149,21 +257,21 @@ def health_check():
 # ENDPOINT PER DATI DEL GIOCO
 # ============================================================================
 
-@app.route('/api/get-phases', methods=['GET'])
+@api.route('/api/get-phases', methods=['GET'])
 @limiter.limit("60 per minute") # Limite più alto perché è solo lettura
 def get_phases():
     """
     Restituisce tutte le fasi della Cyber Kill Chain
     Usato dal frontend per mostrare le opzioni disponibili
+    Le fasi sono statiche: la risposta viene codificata e compressa una sola volta
     """
     try:
-        phases = GameService.get_all_phases()
-        return jsonify(format_api_response(True, {'phases': phases}))
+        return make_cached_response(phases_response())
         
     except Exception as e:
         return jsonify(handle_api_error(e, "get_phases")), 500
 
-@app.route('/api/leaderboard', methods=['GET'])
+@api.route('/api/leaderboard', methods=['GET'])
 @limiter.limit("30 per minute")
 def get_leaderboard():
     """
@@ -174,17 +282,116 @@ def get_leaderboard():
         limit = request.args.get('limit', 10, type=int)
         limit = min(max(1, limit), 50)  # Limita tra 1 e 50
         
-        leaderboard = GameService.get_global_leaderboard(limit)
-        return jsonify(format_api_response(True, {'leaderboard': leaderboard}))
+        # La risposta viene ricodificata solo quando cambia la classifica
+        entry = response_cache.get(
+            ('leaderboard', limit), GameService.get_leaderboard_version(),
+            lambda: encode_api_response({'leaderboard': GameService.get_global_leaderboard(limit)})
+        )
+        return make_cached_response(entry)
         
     except Exception as e:
         return jsonify(handle_api_error(e, "get_leaderboard")), 500
 
+def leaderboard_event():
+    """Evento SSE (in cache) con la classifica completa, ricodificato solo quando cambia"""
+    return response_cache.get(
+        ('live', 'leaderboard'), GameService.get_leaderboard_version(),
+        lambda: encode_event('leaderboard', {'leaderboard': GameService.get_global_leaderboard(50)})
+    )
+
+def live_stream(broadcaster, subscription, snapshots):
+    """
+    Generatore dello stream SSE: stato iniziale, poi gli eventi del broadcaster
+    (keepalive se non ce ne sono) fino alla durata massima dello stream
+    """
+    try:
+        yield from snapshots
+        deadline = time.monotonic() + LIVE_STREAM_SECONDS
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            frame = subscription.next(min(LIVE_KEEPALIVE_SECONDS, remaining))
+            yield KEEPALIVE if frame is None else frame
+    finally:
+        # Anche quando il client chiude la connessione
+        broadcaster.unsubscribe(subscription)
+
+@api.route('/api/live', methods=['GET'])
+@limiter.limit("60 per minute")
+def live_updates():
+    """
+    Stream Server-Sent Events con la classifica e, opzionalmente, le statistiche di una classe
+    Sostituisce il polling di /api/leaderboard e della dashboard: una connessione
+    per client e al massimo LIVE_MAX_RATE eventi al secondo per tipo
+    
+    Parametri:
+    - cohort: ID della classe da seguire (opzionale)
+    
+    Eventi:
+    - leaderboard: {"leaderboard": [...]} all'apertura (come /api/leaderboard?limit=50),
+      poi {"changes": [{name, score, mastery, rank}]} con i giocatori che hanno
+      cambiato posizione, in ordine di posizione
+    - cohort: {"stats": {...}} come /api/cohorts/<id>/stats (null finché la classe è vuota)
+    """
+    subscription = None
+    try:
+        cohort_id = request.args.get('cohort')
+        if cohort_id is not None and not validate_cohort_id(cohort_id):
+            return jsonify(format_api_response(False, error="Invalid cohort ID format")), 400
+        
+        broadcaster = get_broadcaster()
+        subscription = broadcaster.subscribe(['leaderboard'] + (['cohort:' + cohort_id] if cohort_id else []))
+        if subscription is None:
+            return jsonify(format_api_response(False, error="Too many live connections")), 503
+        
+        # Stato completo letto dopo l'iscrizione: nessuna modifica va persa nel mezzo
+        snapshots = [encode_retry(LIVE_RETRY_MS), leaderboard_event().body]
+        if cohort_id:
+            snapshots.append(encode_event('cohort', {'stats': GameService.get_cohort_statistics(cohort_id)}))
+        
+        return Response(
+            live_stream(broadcaster, subscription, snapshots),
+            mimetype='text/event-stream',
+            # X-Accel-Buffering: nginx non deve trattenere gli eventi nel buffer
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        if subscription is not None:
+            get_broadcaster().unsubscribe(subscription)
+        return jsonify(handle_api_error(e, "live_updates")), 500
+
+@api.route('/api/leaderboard/rank', methods=['POST'])
+@limiter.limit("30 per minute", key_func=get_user_key)
+@validate_json_input(RankLookupSchema)
+def get_leaderboard_rank(validated_data):
+    """
+    Restituisce la posizione in classifica del giocatore della sessione
+    
+    Input richiesto:
+    - session_id: ID della sessione
+    
+    Output:
+    - rank, name, score, mastery: Posizione e dati del giocatore
+    - total_players: Numero di giocatori in classifica
+    """
+    try:
+        rank = GameService.get_player_rank(validated_data['session_id'])
+        
+        if rank is None:
+            return jsonify(format_api_response(False, error="Session not ranked")), 404
+        
+        return jsonify(format_api_response(True, rank))
+        
+    except Exception as e:
+        return jsonify(handle_api_error(e, "get_leaderboard_rank")), 500
+
 # ============================================================================
 # ENDPOINT PRINCIPALI DEL GIOCO - CON SICUREZZA E VALIDAZIONE
 # ============================================================================
 
-@app.route('/api/get-log', methods=['POST'])
+@api.route('/api/get-log', methods=['POST'])
 @limiter.limit("20 per minute", key_func=get_user_key)  # 20 log per minuto per utente
 @validate_json_input(SessionDataSchema)                 # Validazione automatica dell'input
 def get_log(validated_data):
@@ -195,6 +402,7 @@ def get_log(validated_data):
     - session_id: ID univoco della sessione utente
     - difficulty: Livello di difficoltà (beginner/intermediate/expert)
     - stats: Statistiche attuali del giocatore
+    - cohort_id: Classe dello studente (opzionale)
     
     Output:
     - log: Dati del log da analizzare
@@ -211,9 +419,11 @@ def get_log(validated_data):
         logger.info(f"Generating log for session {session_id[:8]}... difficulty {difficulty}")
         
         # Genera il nuovo log tramite il service
-        result = GameService.generate_log(session_id, difficulty, stats)
+        result = GameService.generate_log(session_id, difficulty, stats, validated_data['cohort_id'])
         
-        return jsonify(format_api_response(True, result))
+        # Il log è già codificato e compresso nell'indice: non viene né ricodificato né ricompresso
+        log_payload = GameService.get_client_log_payload(result['log']['id'])
+        return make_parts_response(encode_api_parts(result, raw_fields={'log': log_payload}))
         
     except ValueError as e:
         # Errori di validazione dei dati
@@ -223,7 +433,7 @@ def get_log(validated_data):
         # Altri errori imprevisti
         return jsonify(handle_api_error(e, "get_log")), 500
 
-@app.route('/api/validate-phase', methods=['POST'])
+@api.route('/api/validate-phase', methods=['POST'])
 @limiter.limit("30 per minute", key_func=get_user_key)  # 30 validazioni per minuto
 @validate_json_input(PhaseValidationSchema)  # Validazione automatica
 def validate_phase(validated_data):
@@ -249,7 +459,15 @@ def validate_phase(validated_data):
         # Valida la risposta tramite il service
         result = GameService.validate_phase_selection(session_id, selected_phase)
         
-        return jsonify(format_api_response(True, result))
+        # Le strategie della fase indovinata sono già codificate e compresse
+        mitigation_payload = (
+            GameService.get_mitigation_payload(selected_phase) if result.get('is_correct') else None
+        )
+        if mitigation_payload is None:
+            return jsonify(format_api_response(True, result))
+        
+        parts = encode_api_parts(result, raw_fields={'mitigation_strategies': mitigation_payload})
+        return make_parts_response(parts)
         
     except ValueError as e:
         logger.warning(f"ValueError in validate_phase: {e}")
@@ -257,7 +475,7 @@ def validate_phase(validated_data):
     except Exception as e:
         return jsonify(handle_api_error(e, "validate_phase")), 500
 
-@app.route('/api/validate-mitigation', methods=['POST'])
+@api.route('/api/validate-mitigation', methods=['POST'])
 @limiter.limit("30 per minute", key_func=get_user_key)  # 30 validazioni per minuto
 @validate_json_input(MitigationValidationSchema)  # Validazione automatica
 def validate_mitigation(validated_data):
@@ -304,11 +522,130 @@ def validate_mitigation(validated_data):
     except Exception as e:
         return jsonify(handle_api_error(e, "validate_mitigation")), 500
 
+@api.route('/api/round', methods=['POST'])
+@limiter.limit("30 per minute", key_func=get_user_key)  # 30 round per minuto
+@validate_json_input(RoundSchema)  # Validazione automatica
+def play_round(validated_data):
+    """
+    Round completo in una sola richiesta: valida fase e mitigazione,
+    aggiorna le statistiche e restituisce il log successivo
+    Gli endpoint separati restano disponibili per compatibilità
+    
+    Input richiesto:
+    - session_id: ID della sessione
+    - selected_phase: Fase selezionata dall'utente
+    - selected_mitigation: Mitigazione selezionata (opzionale, solo se la fase è corretta)
+    - time_remaining: Tempo rimanente quando ha risposto
+    - difficulty: Livello di difficoltà del round (per il punteggio)
+    - stats: Ignorato, la difficoltà del log successivo dipende dalle statistiche
+      della sessione dopo il round
+    
+    Output:
+    - phase_result: Risultato della validazione della fase
+    - mitigation_result: Risultato della mitigazione (null se non valutata)
+    - stats: Statistiche aggiornate (se il round è chiuso)
+    - log, time_limit, difficulty: Log successivo (se il round è chiuso)
+    """
+    try:
+        session_id = validated_data['session_id']
+        
+        logger.info(f"Playing round for session {session_id[:8]}...")
+        
+        result = GameService.play_round(
+            session_id,
+            validated_data['selected_phase'],
+            validated_data['selected_mitigation'],
+            validated_data['time_remaining'],
+            validated_data['difficulty']
+        )
+        
+        # Round ancora aperto: nessun log successivo
+        if 'log' not in result:
+            return jsonify(format_api_response(True, result))
+        
+        log_payload = GameService.get_client_log_payload(result['log']['id'])
+        return make_parts_response(encode_api_parts(result, raw_fields={'log': log_payload}))
+        
+    except ValueError as e:
+        logger.warning(f"ValueError in play_round: {e}")
+        return jsonify(format_api_response(False, error=str(e))), 400
+    except Exception as e:
+        return jsonify(handle_api_error(e, "play_round")), 500
+
+@api.route('/api/analyze', methods=['POST'])
+@limiter.limit("30 per minute")
+@validate_json_input(AnalyzeSchema, max_bytes=ANALYZE_MAX_BYTES)
+def analyze_logs(validated_data):
+    """
+    Stima la fase della Kill Chain di un batch di righe di log
+    Serve agli insegnanti per controllare uno scenario prima di aggiungerlo al corpus
+    
+    Input richiesto:
+    - lines: Righe di log (da 1 a 10000, al massimo 1024 caratteri ciascuna
+      e 3.000.000 in tutto; corpo fino a 8 MB)
+    - top: Fasi da restituire per riga (default 3)
+    
+    Output:
+    - results: Per ogni riga, nello stesso ordine: fase stimata, confidenza
+      e classifica delle fasi più probabili
+    """
+    try:
+        results = GameService.analyze_logs(validated_data['lines'], validated_data['top'])
+        if results is None:
+            return jsonify(format_api_response(False, error="Log analysis unavailable")), 503
+        
+        return jsonify(format_api_response(True, {'results': results}))
+        
+    except Exception as e:
+        return jsonify(handle_api_error(e, "analyze_logs")), 500
+
+@api.route('/api/scenarios/search', methods=['GET'])
+@limiter.limit("60 per minute")
+def search_scenarios():
+    """
+    Cerca gli scenari del corpus per parola chiave, per gli insegnanti
+    
+    Parametri:
+    - q: Parole chiave, IP, hash, percorsi o URL (anche disinnescati), tutte richieste
+    - phase: Solo gli scenari di questa fase (opzionale)
+    - severity: Solo gli scenari con questa gravità (opzionale)
+    - limit: Risultati per pagina (default 20, max 100)
+    - cursor: Cursore restituito dalla pagina precedente (opzionale)
+    
+    Output:
+    - total: Scenari trovati
+    - results: Scenari della pagina, dal più rilevante, con punteggio
+    - next_cursor: Cursore della pagina successiva (null all'ultima pagina)
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query or len(query) > 200:
+            return jsonify(format_api_response(False, error="Query must be 1-200 characters")), 400
+        
+        phase = request.args.get('phase') or None
+        if phase is not None and phase not in CYBER_KILL_CHAIN_PHASES:
+            return jsonify(format_api_response(False, error="Invalid phase")), 400
+        
+        severity = request.args.get('severity') or None
+        if severity is not None and severity not in SEVERITY_LEVELS:
+            return jsonify(format_api_response(False, error="Invalid severity")), 400
+        
+        limit = request.args.get('limit', 20, type=int)
+        limit = min(max(1, limit), 100)  # Limita tra 1 e 100
+        
+        result = GameService.search_logs(query, phase, severity, limit, request.args.get('cursor') or None)
+        return jsonify(format_api_response(True, result))
+        
+    except ValueError as e:
+        return jsonify(format_api_response(False, error=str(e))), 400
+    except Exception as e:
+        return jsonify(handle_api_error(e, "search_scenarios")), 500
+
 # ============================================================================
 # ENDPOINT PER STATISTICHE
 # ============================================================================
 
-@app.route('/api/statistics', methods=['POST'])
+@api.route('/api/statistics', methods=['POST'])
 @limiter.limit("60 per minute", key_func=get_user_key)
 def get_statistics():
     """
@@ -324,7 +661,39 @@ def get_statistics():
     except Exception as e:
         return jsonify(handle_api_error(e, "get_statistics")), 500
 
-@app.route('/api/reset-session', methods=['POST'])
+@api.route('/api/cohorts/<cohort_id>/stats', methods=['GET'])
+@limiter.limit("60 per minute")
+def get_cohort_statistics(cohort_id):
+    """
+    Restituisce gli aggregati di una classe per la dashboard dell'insegnante
+    Legge i totali aggiornati a ogni round: costo costante anche con molte classi in gioco
+    
+    Parametri:
+    - slowest: Numero di studenti più lenti da mostrare (default 5, max 40)
+    
+    Output:
+    - students, active_students, rounds: Studenti iscritti, con almeno un round, round giocati
+    - accuracy, average_accuracy: Accuratezza della classe e media degli studenti
+    - phase_errors: Tentativi, errori e tasso di errore per ogni fase
+    - slowest_students: Studenti con il tempo medio di risposta più alto
+    """
+    try:
+        if not validate_cohort_id(cohort_id):
+            return jsonify(format_api_response(False, error="Invalid cohort ID format")), 400
+        
+        slowest = request.args.get('slowest', 5, type=int)
+        slowest = min(max(1, slowest), 40)  # Limita tra 1 e 40
+        
+        stats = GameService.get_cohort_statistics(cohort_id, slowest)
+        if stats is None:
+            return jsonify(format_api_response(False, error="Cohort not found")), 404
+        
+        return jsonify(format_api_response(True, stats))
+        
+    except Exception as e:
+        return jsonify(handle_api_error(e, "get_cohort_statistics")), 500
+
+@api.route('/api/reset-session', methods=['POST'])
 @limiter.limit("10 per minute", key_func=get_user_key)  # Limite basso per i reset
 def reset_session():
     """
@@ -351,7 +720,7 @@ def reset_session():
 # ENDPOINT DI AMMINISTRAZIONE - CON RATE LIMITING STRINGENTE
 # ============================================================================
 
-@app.route('/api/admin/cleanup-sessions', methods=['POST'])
+@api.route('/api/admin/cleanup-sessions', methods=['POST'])
 @limiter.limit("5 per hour")  # Limite molto basso per operazioni admin
 def cleanup_sessions():
     """
@@ -375,16 +744,47 @@ def cleanup_sessions():
     except Exception as e:
         return jsonify(handle_api_error(e, "cleanup_sessions")), 500
 
-@app.route('/api/admin/stats', methods=['GET'])
+def count_endpoints():
+    """Numero di endpoint registrati (esclusi i file statici)"""
+    return sum(1 for rule in current_app.url_map.iter_rules() if rule.endpoint != 'static')
+
+@api.route('/api/admin/metrics', methods=['GET'])
+@limiter.limit("60 per minute")  # Sufficiente per lo scraping ogni 15 secondi
+def admin_metrics():
+    """
+    Metriche del processo in formato testuale Prometheus - solo per admin
+    Richiede l'header Authorization: Bearer <METRICS_TOKEN>; senza METRICS_TOKEN
+    l'endpoint è disattivato
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        return jsonify(format_api_response(False, error="Endpoint not found")), 404
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        response = jsonify(format_api_response(False, error="Invalid metrics token"))
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    return Response(current_app.extensions['metrics'].render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/admin/stats', methods=['GET'])
 @limiter.limit("10 per hour")  # Limite basso per admin stats
 def admin_stats():
     """Ottiene statistiche globali del sistema - solo per admin"""
     try:
         # TODO: In produzione, aggiungere autenticazione admin
+        metrics = current_app.extensions['metrics']
         stats = {
             'active_sessions': GameService.get_session_count(),
-            'server_uptime': get_current_timestamp(),
-            'total_endpoints': 11,  # Aggiornato
+            'session_expiry': GameService.get_expiry_metrics(),
+            'session_persistence': GameService.get_persistence_metrics(),
+            'log_synthesis': GameService.get_log_synthesis_metrics(),
+            'live_updates': GameService.get_live_update_metrics(),
+            'log_analyzer': GameService.get_log_analyzer_info(),
+            'log_search': GameService.get_log_search_metrics(),
+            'analytics': get_event_pipeline().metrics(),
+            'server_started_at': datetime.fromtimestamp(metrics.started_at).isoformat(),
+            'server_uptime': round(metrics.uptime()),  # Secondi dall'avvio del processo
+            'total_endpoints': count_endpoints(),
             'health_status': 'healthy',
             'security_features': [
                 'CORS Protection',
@@ -419,7 +819,7 @@ def initialize_app():
         logger.info("🔧 Development mode")
     
     # Log delle configurazioni di sicurezza
-    logger.info(f"✅ CORS allowed origins: {allowed_origins}")
+    logger.info(f"✅ CORS allowed origins: {get_allowed_origins()}")
     logger.info("✅ Rate limiting enabled")
     logger.info("✅ Input validation enabled")
     logger.info("✅ Security headers enabled")
@@ -432,6 +832,7 @@ def initialize_app():
 
 if __name__ == '__main__':
     # Inizializza l'app e le sue configurazioni
+    app = create_app()
     initialize_app()
     
     # Configurazione sicura per l'ambiente di sviluppo
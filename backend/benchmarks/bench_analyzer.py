@@ -0,0 +1,81 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL CLASSIFICATORE DELLE FASI
+
+Misura il classificatore di /api/analyze (services/phase_classifier.py):
+- addestramento all'avvio
+- classificazione di batch da 1 a 10000 righe (solo raw, come nelle richieste)
+- accuratezza su log sintetici generati con un seme diverso da quello
+  dell'addestramento e confidenza media delle risposte giuste e sbagliate
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_analyzer
+    python -m benchmarks.bench_analyzer --batches 100 10000 --output analyzer.json
+"""
+
+import argparse
+import os
+import sys
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.corpus import get_log_corpus
+from models.log_synthesis import LogSynthesizer
+from services.phase_classifier import create_phase_classifier
+from benchmarks.harness import BenchmarkSuite
+
+def evaluation_logs(per_phase, seed):
+    """Log sintetici non visti in addestramento (seme diverso)"""
+    synthesizer = LogSynthesizer(seed=seed)
+    return [log for phase in synthesizer.phases() for log in synthesizer.generate(phase, per_phase)]
+
+def evaluate(classifier, logs):
+    """
+    Returns:
+        tuple: (accuratezza, confidenza media se giusta, confidenza media se sbagliata)
+    """
+    right, wrong = [], []
+    for log, ranking in zip(logs, classifier.rank([log['raw'] for log in logs], 1)):
+        phase, confidence = ranking[0]
+        (right if phase == log['phase'] else wrong).append(confidence)
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+    return len(right) / len(logs), mean(right), mean(wrong)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Kill chain phase classifier benchmark')
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 100, 1000, 10_000])
+    parser.add_argument('--per-phase', type=int, default=1000, help='evaluation logs per phase')
+    parser.add_argument('--seed', type=int, default=2024, help='seed of the evaluation logs')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    corpus = get_log_corpus()
+    suite = BenchmarkSuite(min_time=args.min_time)
+    suite.run('train', lambda: create_phase_classifier(corpus), group='analyzer', rounds=3)
+    classifier = create_phase_classifier(corpus)
+    if classifier is None:
+        print('numpy not installed: nothing to measure')
+        return 1
+
+    logs = evaluation_logs(args.per_phase, args.seed)
+    lines = [log['raw'] for log in logs]
+    for batch in args.batches:
+        texts = (lines * (batch // len(lines) + 1))[:batch]
+        suite.run('rank', lambda: classifier.rank(texts, 3), group='analyzer', params={'lines': batch})
+
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    info = classifier.info()
+    accuracy, right, wrong = evaluate(classifier, logs)
+    print(f"\nmodel: {info['documents']} documents, {info['vocabulary']} terms, "
+          f"trained in {info['training_seconds']:.2f}s")
+    print(f"unseen synthetic logs: {len(logs)}, accuracy {accuracy:.3f}, "
+          f"mean confidence {right:.3f} (right) / {wrong:.3f} (wrong)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
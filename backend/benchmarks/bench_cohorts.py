@@ -0,0 +1,112 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEGLI AGGREGATI PER CLASSE
+
+Simula 50 classi da 40 studenti che giocano insieme, più altre sessioni
+senza classe nello stesso store, e misura:
+- il costo aggiunto a un round dall'aggiornamento degli aggregati
+- la lettura delle statistiche di una classe (dashboard dell'insegnante),
+  confrontata con il calcolo per scansione di tutte le sessioni
+- l'aggiornamento di tutte le dashboard (una lettura per classe)
+
+Session store e aggregati sono in memoria (come in bench_service).
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_cohorts
+    python -m benchmarks.bench_cohorts --sessions 10000 100000 --output cohorts.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+os.environ['SESSION_STORE'] = 'memory'
+
+import services.game_service as game_service
+from services.game_service import GameService
+from services.cohorts import student_vector, ROUNDS, CORRECT, ANSWERS, ANSWER_SECONDS, VECTOR_SIZE
+from models.game_data import MITIGATION_STRATEGIES
+from benchmarks.harness import BenchmarkSuite
+from benchmarks.bench_service import populate_sessions
+
+def play(session_id, correct_ratio=0.7):
+    """Un round completo con fase giusta nel correct_ratio dei casi"""
+    phase = GameService.get_or_create_session(session_id)['correct_phase']
+    if random.random() >= correct_ratio:
+        phase = random.choice([other for other in MITIGATION_STRATEGIES if other != phase])
+    return GameService.play_round(
+        session_id, phase, random.choice(MITIGATION_STRATEGIES[phase])['id'], 20, 'expert'
+    )
+
+def populate_cohorts(session_ids, cohorts, students, rounds=3):
+    """
+    Iscrive cohorts * students sessioni a classi cohort-0..cohort-(cohorts-1),
+    ognuna con qualche round già giocato
+
+    Returns:
+        list: ID delle classi
+    """
+    cohort_ids = [f'cohort-{n}' for n in range(cohorts)]
+    for position, session_id in enumerate(session_ids[:cohorts * students]):
+        GameService.generate_log(session_id, 'expert', cohort_id=cohort_ids[position % cohorts])
+        for _ in range(rounds):
+            play(session_id)
+    return cohort_ids
+
+def scan_cohort(cohort_id):
+    """Statistiche di una classe senza aggregati: scansione di tutte le sessioni"""
+    store = game_service.get_session_store()
+    totals = [0] * VECTOR_SIZE
+    students = 0
+    for _, session in store.items():
+        if session.get('cohort') == cohort_id:
+            students += 1
+            totals = [a + b for a, b in zip(totals, student_vector(session))]
+    return students, totals[CORRECT] / max(1, totals[ROUNDS]), totals[ANSWER_SECONDS] / max(1, totals[ANSWERS])
+
+def bench_cohorts(suite, sessions, cohorts, students):
+    started = time.perf_counter()
+    session_ids = populate_sessions(sessions)
+    cohort_ids = populate_cohorts(session_ids, cohorts, students)
+    print(f"populated {sessions} sessions, {cohorts}x{students} students in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    enrolled = session_ids[:cohorts * students]
+    solo = session_ids[cohorts * students:] or enrolled
+    for session_id in solo[:1000]:
+        GameService.generate_log(session_id, 'expert')
+    params = {'sessions': sessions}
+
+    suite.run('round_solo', play, setup=lambda: (random.choice(solo[:1000]),),
+              group='cohorts', params=params)
+    suite.run('round_in_cohort', play, setup=lambda: (random.choice(enrolled),),
+              group='cohorts', params=params)
+    suite.run('cohort_stats', GameService.get_cohort_statistics,
+              setup=lambda: (random.choice(cohort_ids),), group='cohorts', params=params)
+    suite.run('cohort_stats_full_scan', scan_cohort,
+              setup=lambda: (random.choice(cohort_ids),), group='cohorts', params=params,
+              rounds=min(50, max(5, 2_000_000 // sessions)))
+    suite.run('all_dashboards', lambda: [GameService.get_cohort_statistics(c) for c in cohort_ids],
+              group='cohorts', params=params)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cohort aggregates benchmark')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--cohorts', type=int, default=50)
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    for sessions in args.sessions:
+        bench_cohorts(suite, max(sessions, args.cohorts * args.students), args.cohorts, args.students)
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
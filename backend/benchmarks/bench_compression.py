@@ -0,0 +1,158 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DELLA COMPRESSIONE DELLE RISPOSTE
+
+Misura:
+- i byte trasmessi per ogni endpoint di gioco con Accept-Encoding diversi
+  (in chiaro, gzip, brotli, l'header tipico di un browser) e il tempo di
+  trasferimento stimato su un collegamento lento
+- il costo per richiesta del corpo di get-log: in chiaro, compresso per
+  intero a ogni richiesta, o con il log precompresso inserito nello stream gzip,
+  anche con frammenti statici più grandi (più viste client in un elenco)
+- il costo di servire il catalogo delle fasi già compresso rispetto a
+  comprimerlo a ogni richiesta
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --kbps 500 --output compression.json
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+os.environ['SESSION_STORE'] = 'memory'
+# Senza Redis il rate limiter usa lo storage in memoria
+os.environ['REDIS_URL'] = ''
+
+from app import create_app, phases_response, preload_static_data
+from models.corpus import get_log_corpus
+from models.log_index import encode_json
+from services.game_service import GameService
+from utils.compression import PrecompressedPayload, brotli, compress, gzip_parts, join_parts
+from utils.helpers import encode_api_parts
+from benchmarks.harness import BenchmarkSuite
+
+ACCEPT_ENCODINGS = [
+    ('identity', 'identity'),
+    ('gzip', 'gzip'),
+    ('br', 'br'),
+    ('browser', 'gzip, deflate, br'),
+]
+
+_addresses = itertools.count(1)
+
+def request(client, method, path, body=None, accept='identity'):
+    """Richiesta da un indirizzo IP sempre diverso, per non esaurire i limiti per client"""
+    n = next(_addresses)
+    return client.open(
+        path, method=method, json=body, headers={'Accept-Encoding': accept},
+        environ_base={'REMOTE_ADDR': f'10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}'}
+    )
+
+def wire_bytes(client, rounds):
+    """
+    Byte trasmessi in media per endpoint e codifica
+
+    Returns:
+        list: Righe (endpoint, {codifica: (byte medi, codifiche usate)})
+    """
+    endpoints = {}
+
+    def record(name, label, response):
+        sizes = endpoints.setdefault(name, {}).setdefault(label, [[], set()])
+        sizes[0].append(len(response.data))
+        sizes[1].add(response.headers.get('Content-Encoding', '-'))
+
+    for label, accept in ACCEPT_ENCODINGS:
+        for number in range(rounds):
+            session_id = f'bench_compression_{label}_{number}'
+            record('get-phases', label, request(client, 'GET', '/api/get-phases', accept=accept))
+            response = request(client, 'POST', '/api/get-log', {
+                'session_id': session_id, 'difficulty': 'expert', 'stats': {}
+            }, accept)
+            record('get-log', label, response)
+
+            phase = GameService.get_or_create_session(session_id)['correct_phase']
+            record('validate-phase', label, request(client, 'POST', '/api/validate-phase', {
+                'session_id': session_id, 'selected_phase': phase
+            }, accept))
+            record('round', label, request(client, 'POST', '/api/round', {
+                'session_id': session_id, 'selected_phase': phase,
+                'selected_mitigation': GameService.get_or_create_session(session_id)['correct_mitigation'],
+                'time_remaining': 10, 'difficulty': 'expert', 'stats': {}
+            }, accept))
+            record('leaderboard', label, request(client, 'GET', '/api/leaderboard?limit=50', accept=accept))
+
+    return [
+        (name, {label: (sum(sizes) / len(sizes), '/'.join(sorted(used)))
+                for label, (sizes, used) in by_label.items()})
+        for name, by_label in endpoints.items()
+    ]
+
+def bench_calls(suite):
+    """Costo per richiesta della codifica e della compressione"""
+    corpus = get_log_corpus()
+    log_ids = [corpus.pick('expert')['id'] for _ in range(256)]
+
+    def get_log_parts():
+        log_id = random.choice(log_ids)
+        result = {'log': {'id': log_id}, 'time_limit': 60, 'difficulty': 'expert'}
+        return (encode_api_parts(result, raw_fields={'log': corpus.client_payload(log_id)}),)
+
+    suite.run('plain', join_parts, setup=get_log_parts, group='get-log')
+    suite.run('gzip_whole_body', lambda parts: compress(join_parts(parts), 'gzip'),
+              setup=get_log_parts, group='get-log')
+    suite.run('gzip_precompressed_log', gzip_parts, setup=get_log_parts, group='get-log')
+    if brotli is not None:
+        suite.run('brotli_whole_body', lambda parts: compress(join_parts(parts), 'br'),
+                  setup=get_log_parts, group='get-log')
+
+    # Frammenti statici di dimensione crescente: il costo dell'inserimento resta costante
+    for views in (1, 4, 16):
+        fragment = PrecompressedPayload(encode_json([dict(corpus.client_view(log_id)) for log_id in log_ids[:views]]))
+        parts = encode_api_parts({'time_limit': 60}, raw_fields={'logs': fragment})
+        size = {'bytes': len(join_parts(parts))}
+        suite.run('gzip_whole_body', lambda: compress(join_parts(parts), 'gzip'), group='splice', params=size)
+        suite.run('gzip_precompressed_fragment', lambda: gzip_parts(parts), group='splice', params=size)
+
+    entry = phases_response()
+    for encoding in ('gzip', 'br') if brotli is not None else ('gzip',):
+        suite.run(f'compress_per_request_{encoding}', lambda: compress(entry.body, encoding, static=True),
+                  group='get-phases')
+        suite.run(f'precompressed_{encoding}', lambda: entry.encoded(encoding), group='get-phases')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Response compression benchmark')
+    parser.add_argument('--rounds', type=int, default=200, help='requests per endpoint and encoding')
+    parser.add_argument('--kbps', type=int, default=1000, help='link speed for the transfer time estimate')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write per-call results to this JSON file')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    preload_static_data()
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    bench_calls(suite)
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    labels = [label for label, _ in ACCEPT_ENCODINGS]
+    print(f"\n{'bytes on the wire':<16}" + ''.join(f'{label:>18}' for label in labels)
+          + f"{'saved':>8}{'ms @ ' + str(args.kbps) + ' kbps':>18}")
+    for name, sizes in wire_bytes(app.test_client(), args.rounds):
+        plain = sizes['identity'][0]
+        browser = sizes['browser'][0]
+        print(f'{name:<16}' + ''.join(f'{sizes[label][0]:>10.0f} {sizes[label][1]:>7}' for label in labels)
+              + f'{1 - browser / plain:>8.0%}'
+              + f'{plain * 8 / args.kbps:>9.1f} ->{browser * 8 / args.kbps:>5.1f}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
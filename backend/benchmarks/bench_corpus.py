@@ -0,0 +1,182 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL CARICAMENTO DEL CORPUS
+
+Confronta, per corpus sintetici di 10k, 100k e 1M log:
+- memory: tutto il corpus letto e indicizzato in memoria all'avvio (LogIndex),
+  come accade con LOGS_DATABASE
+- sqlite: corpus su disco aperto con SQLiteCorpus (LOG_CORPUS_PATH)
+
+Ogni misura gira in un processo separato, come un worker appena avviato:
+tempo di import + apertura del corpus, latenza media di pick(), RSS finale
+e memoria anonima (heap: la parte che non può essere condivisa tra i worker).
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_corpus
+    python -m benchmarks.bench_corpus --sizes 10000 100000 --workdir /tmp/corpus-bench
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def current_rss_mb():
+    """
+    Returns:
+        float: Memoria residente del processo corrente in MB
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss è il picco (KB su Linux, byte su macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def anonymous_mb():
+    """
+    Returns:
+        float: Memoria anonima (heap) del processo in MB, o None se non disponibile
+            Esclude le pagine di file mappati in memoria, come il corpus SQLite,
+            che restano nella page cache condivisa tra i worker
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Anonymous:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+# ============================================================================
+# WORKER (processo misurato)
+# ============================================================================
+
+def run_worker(loader, path, picks):
+    """
+    Carica il corpus come farebbe un worker e misura tempi e memoria
+
+    Returns:
+        dict: load_ms, pick_us, rss_mb, logs
+    """
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+
+    if loader == 'memory':
+        from models.game_data import DIFFICULTY_CONFIG
+        from models.log_index import LogIndex
+        logs_database = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                log = json.loads(line)
+                logs_database.setdefault(log['phase'], []).append(log)
+        corpus = LogIndex(logs_database, DIFFICULTY_CONFIG)
+    else:
+        from models.game_data import DIFFICULTY_CONFIG
+        from models.corpus import SQLiteCorpus
+        corpus = SQLiteCorpus(path, DIFFICULTY_CONFIG)
+
+    load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(picks):
+        log = corpus.pick('expert')
+        corpus.client_payload(log['id'])
+    pick_us = (time.perf_counter() - started) * 1e6 / picks
+
+    return {
+        'load_ms': round(load_ms, 1),
+        'pick_us': round(pick_us, 2),
+        'rss_mb': round(current_rss_mb(), 1),
+        'rss_delta_mb': round(current_rss_mb() - rss_before, 1),
+        'heap_mb': anonymous_mb(),
+        'logs': len(corpus)
+    }
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def prepare_inputs(size, workdir):
+    """
+    Crea (una sola volta) il file JSONL e il corpus SQLite della dimensione indicata
+
+    Returns:
+        tuple: (percorso JSONL, percorso SQLite)
+    """
+    from tools.build_corpus import synthetic_logs, build_corpus, iter_jsonl
+
+    jsonl_path = os.path.join(workdir, f'corpus_{size}.jsonl')
+    db_path = os.path.join(workdir, f'corpus_{size}.db')
+
+    if not os.path.exists(jsonl_path):
+        with open(jsonl_path + '.tmp', 'w', encoding='utf-8') as f:
+            for log in synthetic_logs(size, seed=size):
+                f.write(json.dumps(log, ensure_ascii=False) + '\n')
+        os.replace(jsonl_path + '.tmp', jsonl_path)
+
+    if not os.path.exists(db_path):
+        build_corpus(db_path + '.tmp', iter_jsonl([jsonl_path]))
+        os.replace(db_path + '.tmp', db_path)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(db_path + '.tmp' + suffix):
+                os.remove(db_path + '.tmp' + suffix)
+
+    return jsonl_path, db_path
+
+def measure(loader, path, picks):
+    """Esegue un worker in un processo nuovo e ne restituisce le misure"""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_corpus',
+         '--worker', loader, '--path', path, '--picks', str(picks)],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Log corpus loader benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--picks', type=int, default=2000, help='pick() calls per worker')
+    parser.add_argument('--memory-max', type=int, default=1_000_000,
+                        help='largest corpus measured with the in-memory loader')
+    parser.add_argument('--workdir', help='directory for the generated corpora (default: temporary)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--worker', choices=['memory', 'sqlite'], help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.path, args.picks)))
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ckc-corpus-bench-')
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    for size in args.sizes:
+        jsonl_path, db_path = prepare_inputs(size, workdir)
+        if size <= args.memory_max:
+            results.append({'size': size, 'loader': 'memory', **measure('memory', jsonl_path, args.picks)})
+        results.append({'size': size, 'loader': 'sqlite', **measure('sqlite', db_path, args.picks)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'logs':>9} {'loader':>7} {'load ms':>10} {'pick us':>9} "
+              f"{'RSS MB':>8} {'+RSS MB':>8} {'heap MB':>8}")
+        for r in results:
+            print(f"{r['size']:>9} {r['loader']:>7} {r['load_ms']:>10} {r['pick_us']:>9} "
+                  f"{r['rss_mb']:>8} {r['rss_delta_mb']:>8} {r['heap_mb']!s:>8}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEGLI ENDPOINT
+
+Esegue ogni route di app.py con il test client di Flask, con il rate limiter
+attivo su storage in memoria. Ogni richiesta arriva da un indirizzo IP
+diverso, così i limiti vengono conteggiati ma non scattano.
+
+Gli stream SSE di /api/live si chiudono dopo lo stato iniziale: si misura
+l'apertura di uno stream (vedi benchmarks/bench_live_updates.py per l'invio).
+
+Ogni route registrata deve avere uno scenario in EndpointBench.scenarios(): il benchmark
+fallisce se ne viene aggiunta una senza scenario.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --sessions 10000 --output endpoints.json
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+os.environ['SESSION_STORE'] = 'memory'
+# Senza Redis il rate limiter usa lo storage in memoria
+os.environ['REDIS_URL'] = ''
+os.environ['LIVE_STREAM_SECONDS'] = '0'
+os.environ['METRICS_TOKEN'] = 'bench-metrics-token'
+
+from app import create_app
+from services.game_service import GameService
+from models.corpus import get_log_corpus
+from models.game_data import CYBER_KILL_CHAIN_PHASES, MITIGATION_STRATEGIES
+from benchmarks.harness import BenchmarkSuite
+from benchmarks.bench_service import populate_sessions
+from benchmarks.bench_cohorts import populate_cohorts
+
+_addresses = itertools.count(1)
+
+def next_address():
+    """Indirizzo IP sempre diverso (10.x.y.z) per non esaurire i limiti per client"""
+    n = next(_addresses)
+    return f'10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}'
+
+class EndpointBench:
+    """
+    Scenari di richiesta per ogni route dell'applicazione
+    """
+
+    def __init__(self, client, session_ids, cohort_ids):
+        self.client = client
+        self.session_ids = session_ids
+        self.cohort_ids = cohort_ids
+        self.statuses = {}
+
+    def request(self, name, method, path, body=None, headers=None):
+        response = self.client.open(
+            path, method=method, json=body, headers=headers,
+            environ_base={'REMOTE_ADDR': next_address()}
+        )
+        self.statuses.setdefault(name, set()).add(response.status_code)
+        return response
+
+    # Preparazione non misurata --------------------------------------------
+
+    def current_etag(self):
+        response = self.client.get('/api/get-phases', environ_base={'REMOTE_ADDR': next_address()})
+        return (response.headers['ETag'],)
+
+    def any_session(self):
+        return (random.choice(self.session_ids),)
+
+    def any_cohort(self):
+        return (random.choice(self.cohort_ids),)
+
+    def session_with_log(self):
+        session_id = random.choice(self.session_ids)
+        GameService.generate_log(session_id, 'expert')
+        phase = GameService.get_or_create_session(session_id)['correct_phase']
+        return session_id, phase
+
+    def session_with_phase(self):
+        session_id, phase = self.session_with_log()
+        return session_id, phase, random.choice(MITIGATION_STRATEGIES[phase])['id']
+
+    def log_lines(self):
+        corpus = get_log_corpus()
+        lines = []
+        for phase in random.choices(list(CYBER_KILL_CHAIN_PHASES), k=100):
+            lines.append(corpus.phase_log_at(phase, random.randrange(corpus.phase_size(phase)))['raw'])
+        return (lines,)
+
+    def search_query(self):
+        return (random.choice(['powershell', 'dns', 'amsi', 'beaconing', 'cmd.exe', 'scansione porte']),)
+
+    # Scenari (nome, route, metodo, funzione, setup) -------------------------
+
+    def scenarios(self):
+        return [
+            ('health', '/api/health', 'GET',
+             lambda: self.request('health', 'GET', '/api/health'), None),
+            ('get_phases', '/api/get-phases', 'GET',
+             lambda: self.request('get_phases', 'GET', '/api/get-phases'), None),
+            ('get_phases_304', '/api/get-phases', 'GET',
+             lambda etag: self.request('get_phases_304', 'GET', '/api/get-phases',
+                                       headers={'If-None-Match': etag}),
+             self.current_etag),
+            ('leaderboard', '/api/leaderboard', 'GET',
+             lambda: self.request('leaderboard', 'GET', '/api/leaderboard'), None),
+            ('leaderboard_rank', '/api/leaderboard/rank', 'POST',
+             lambda session_id: self.request('leaderboard_rank', 'POST', '/api/leaderboard/rank',
+                                             {'session_id': session_id}),
+             self.any_session),
+            ('get_log', '/api/get-log', 'POST',
+             lambda session_id: self.request('get_log', 'POST', '/api/get-log', {
+                 'session_id': session_id, 'difficulty': 'expert',
+                 'stats': {'score': 100, 'streak': 2, 'accuracy': 80}
+             }),
+             self.any_session),
+            ('validate_phase', '/api/validate-phase', 'POST',
+             lambda session_id, phase: self.request('validate_phase', 'POST', '/api/validate-phase', {
+                 'session_id': session_id, 'selected_phase': phase
+             }),
+             self.session_with_log),
+            ('validate_mitigation', '/api/validate-mitigation', 'POST',
+             lambda session_id, phase, mitigation: self.request(
+                 'validate_mitigation', 'POST', '/api/validate-mitigation', {
+                     'session_id': session_id, 'selected_mitigation': mitigation,
+                     'time_remaining': 20, 'difficulty': 'expert'
+                 }),
+             self.session_with_phase),
+            ('round', '/api/round', 'POST',
+             lambda session_id, phase, mitigation: self.request('round', 'POST', '/api/round', {
+                 'session_id': session_id, 'selected_phase': phase,
+                 'selected_mitigation': mitigation, 'time_remaining': 20, 'difficulty': 'expert'
+             }),
+             self.session_with_phase),
+            ('analyze', '/api/analyze', 'POST',
+             lambda lines: self.request('analyze', 'POST', '/api/analyze', {'lines': lines}),
+             self.log_lines),
+            ('search_scenarios', '/api/scenarios/search', 'GET',
+             lambda query: self.request('search_scenarios', 'GET', f'/api/scenarios/search?q={query}&limit=10'),
+             self.search_query),
+            ('statistics', '/api/statistics', 'POST',
+             lambda session_id: self.request('statistics', 'POST', '/api/statistics',
+                                             {'session_id': session_id}),
+             self.any_session),
+            ('cohort_stats', '/api/cohorts/<cohort_id>/stats', 'GET',
+             lambda cohort_id: self.request('cohort_stats', 'GET', f'/api/cohorts/{cohort_id}/stats'),
+             self.any_cohort),
+            # Lettura completa dello stream: chiude la sottoscrizione
+            ('live', '/api/live', 'GET',
+             lambda cohort_id: self.request('live', 'GET', f'/api/live?cohort={cohort_id}').get_data(),
+             self.any_cohort),
+            ('reset_session', '/api/reset-session', 'POST',
+             lambda session_id: self.request('reset_session', 'POST', '/api/reset-session',
+                                             {'session_id': session_id}),
+             self.any_session),
+            ('admin_cleanup_sessions', '/api/admin/cleanup-sessions', 'POST',
+             lambda: self.request('admin_cleanup_sessions', 'POST', '/api/admin/cleanup-sessions',
+                                  {'max_age_hours': 24}),
+             None),
+            ('admin_metrics', '/api/admin/metrics', 'GET',
+             lambda: self.request('admin_metrics', 'GET', '/api/admin/metrics',
+                                  headers={'Authorization': 'Bearer ' + os.environ['METRICS_TOKEN']}), None),
+            ('admin_stats', '/api/admin/stats', 'GET',
+             lambda: self.request('admin_stats', 'GET', '/api/admin/stats'), None),
+        ]
+
+def check_coverage(app, scenarios):
+    """
+    Verifica che ogni route dell'app abbia almeno uno scenario
+
+    Returns:
+        list: Route (regola, metodo) senza scenario
+    """
+    covered = {(rule, method) for _, rule, method, _, _ in scenarios}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.rule, method) not in covered:
+                missing.append((rule.rule, method))
+    return missing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Flask endpoint benchmarks')
+    parser.add_argument('--sessions', type=int, default=10_000, help='sessions in the store')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per endpoint')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-logging', action='store_true',
+                        help='keep per-request INFO logging (disabled by default)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    if not args.keep_logging:
+        logging.disable(logging.INFO)
+    random.seed(args.seed)
+
+    app = create_app()
+    session_ids = populate_sessions(args.sessions)
+    # 50 classi da 40 studenti (o meno, se le sessioni non bastano)
+    bench = EndpointBench(app.test_client(), session_ids,
+                          populate_cohorts(session_ids, 50, min(40, args.sessions // 50), rounds=1))
+    scenarios = bench.scenarios()
+    missing = check_coverage(app, scenarios)
+    if missing:
+        print(f"routes without a benchmark scenario: {missing}", file=sys.stderr)
+        return 1
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    for name, rule, method, func, setup in scenarios:
+        result = suite.run(name, func, setup=setup, group='endpoint',
+                           params={'sessions': args.sessions})
+        result['route'] = f'{method} {rule}'
+        result['status_codes'] = sorted(bench.statuses.get(name, ()))
+
+    suite.report()
+    for result in suite.results:
+        if any(status >= 500 or status == 429 for status in result['status_codes']):
+            print(f"warning: {result['name']} returned {result['status_codes']}", file=sys.stderr)
+    if args.output:
+        suite.save(args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
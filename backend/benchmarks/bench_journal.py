@@ -0,0 +1,101 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL JOURNAL DELLE SESSIONI
+
+Misura:
+- il costo di save() per richiesta, con e senza journal (group commit in background)
+- il ripristino all'avvio: sessioni al secondo ricaricate dal solo journal
+  e da snapshot compattato, per 100k e 1M sessioni
+- il tempo di scrittura di uno snapshot
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_journal
+    python -m benchmarks.bench_journal --sessions 100000 --output journal.json
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.session_record import SessionRecord
+from services.session_store import MemorySessionStore
+from services.session_journal import JournaledSessionStore, SessionJournal
+from benchmarks.harness import BenchmarkSuite
+
+def fill(store, count):
+    """Salva count sessioni con un round già giocato"""
+    for n in range(count):
+        session = SessionRecord()
+        session['current_log'] = 'delivery_1'
+        session['correct_phase'] = 'delivery'
+        session['score'] = n % 5000
+        session['total_attempts'] = 1
+        store.save(f'journal_bench_{n:08d}', session)
+
+def bench_save(suite, workdir):
+    """Costo di save() nel percorso delle richieste"""
+    session = SessionRecord()
+    plain = MemorySessionStore()
+    suite.run('save_memory', lambda: plain.save('journal_bench_session', session), group='journal')
+
+    journal = SessionJournal(os.path.join(workdir, 'save'))
+    journaled = JournaledSessionStore(journal)
+    suite.run('save_journaled', lambda: journaled.save('journal_bench_session', session), group='journal')
+    journal.close()
+
+def bench_restore(count, workdir):
+    """
+    Ripristino di count sessioni dal journal e dallo snapshot
+
+    Returns:
+        list: Righe (fonte, sessioni, ms, sessioni/s)
+    """
+    directory = os.path.join(workdir, f'restore_{count}')
+    journal = SessionJournal(directory)
+    fill(JournaledSessionStore(journal), count)
+    journal.close()
+
+    rows = []
+    for source in ('journal', 'snapshot'):
+        journal = SessionJournal(directory)
+        started = time.perf_counter()
+        store = JournaledSessionStore(journal)
+        elapsed = time.perf_counter() - started
+        rows.append((source, store.count(), round(elapsed * 1000), round(store.count() / elapsed)))
+        if source == 'journal':
+            journal.compact()
+            rows.append(('write snapshot', store.count(), round(journal.last_snapshot_ms), None))
+        journal.close()
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Session journal benchmark')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--workdir', help='directory for the journals (default: temporary)')
+    parser.add_argument('--output', help='write save() results to this JSON file')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ckc-journal-bench-')
+    try:
+        suite = BenchmarkSuite(min_time=args.min_time)
+        bench_save(suite, workdir)
+        suite.report()
+        if args.output:
+            suite.save(args.output)
+
+        print(f"\n{'restore from':>15} {'sessions':>9} {'ms':>8} {'sessions/s':>11}")
+        for count in args.sessions:
+            for source, restored, ms, rate in bench_restore(count, workdir):
+                print(f"{source:>15} {restored:>9} {ms:>8} {rate if rate else '':>11}")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
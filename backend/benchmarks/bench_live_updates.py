@@ -0,0 +1,152 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEGLI AGGIORNAMENTI IN TEMPO REALE
+
+Con session store e broadcaster in memoria misura:
+- il costo aggiunto a un round che cambia la classifica dalla pubblicazione
+  del delta, senza stream aperti e con molti stream aperti
+- l'invio di un intervallo a N stream: un evento codificato una volta e
+  accodato a tutti, rispetto alla codifica dello stesso evento per ogni client
+- eventi e byte ricevuti da un client con i round di una classe (ritmo fisso)
+  e con una raffica di round senza pause (fusione delle modifiche), rispetto
+  al polling di /api/leaderboard
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_live_updates
+    python -m benchmarks.bench_live_updates --subscribers 100 1000 --output live.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+os.environ['SESSION_STORE'] = 'memory'
+
+import services.game_service as game_service
+from services.game_service import GameService
+from services.live_updates import encode_event
+from utils.helpers import encode_api_response
+from benchmarks.harness import BenchmarkSuite
+from benchmarks.bench_service import populate_sessions
+from benchmarks.bench_cohorts import play
+
+def top_players(count):
+    """I primi count giocatori, con un log già assegnato: i loro round cambiano la classifica"""
+    session_ids = [session_id for _, session_id, _, _ in game_service.get_leaderboard().top(count)]
+    for session_id in session_ids:
+        GameService.generate_log(session_id, 'expert')
+    return session_ids
+
+def drain(subscriptions):
+    """Svuota le code degli stream (come farebbero i client)"""
+    for subscription in subscriptions:
+        while subscription.next(0) is not None:
+            pass
+
+def bench_publish(suite, players, broadcaster, subscribers):
+    """Round che cambiano la classifica, con subscribers stream aperti"""
+    subscriptions = [broadcaster.subscribe(['leaderboard']) for _ in range(subscribers)]
+    # Invio manuale: il thread del broadcaster non deve riempire le code durante la misura
+    broadcaster.stop()
+    suite.run('round_rank_change', play, setup=lambda: (random.choice(players),),
+              group='publish', params={'streams': subscribers})
+    for subscription in subscriptions:
+        broadcaster.unsubscribe(subscription)
+
+def bench_fanout(suite, players, broadcaster, subscribers):
+    """Un intervallo con una modifica della classifica, inviato a subscribers stream"""
+    subscriptions = [broadcaster.subscribe(['leaderboard']) for _ in range(subscribers)]
+    broadcaster.stop()
+    params = {'streams': subscribers}
+
+    def change():
+        drain(subscriptions)
+        broadcaster.publish('leaderboard', random.choice(players))
+        return ()
+
+    suite.run('flush_encode_once', broadcaster.flush, setup=change, group='fanout', params=params)
+
+    data = game_service._render_leaderboard_changes(None, {players[0]: None})
+    suite.run('encode_per_client', lambda: [encode_event('leaderboard', data) for _ in subscriptions],
+              group='fanout', params=params)
+    for subscription in subscriptions:
+        broadcaster.unsubscribe(subscription)
+
+def storm(players, broadcaster, seconds, rate=None):
+    """
+    Round dei primi giocatori per seconds secondi, con un client che legge lo stream
+
+    Args:
+        rate (float): Round al secondo (None: senza pause)
+
+    Returns:
+        tuple: (round al secondo, eventi al secondo, byte al secondo ricevuti dal client)
+    """
+    broadcaster.start()
+    subscription = broadcaster.subscribe(['leaderboard'])
+    received = [0, 0]
+    done = threading.Event()
+
+    def client():
+        while not done.is_set():
+            frame = subscription.next(0.1)
+            if frame is not None:
+                received[0] += 1
+                received[1] += len(frame)
+
+    reader = threading.Thread(target=client)
+    reader.start()
+    rounds = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        play(random.choice(players))
+        rounds += 1
+        if rate:
+            time.sleep(max(0.0, started + rounds / rate - time.perf_counter()))
+    elapsed = time.perf_counter() - started
+    # Ultimo intervallo ancora da inviare
+    time.sleep(broadcaster.interval * 2)
+    done.set()
+    reader.join()
+    broadcaster.unsubscribe(subscription)
+    return rounds / elapsed, received[0] / elapsed, received[1] / elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Live updates (SSE) benchmark')
+    parser.add_argument('--sessions', type=int, default=10_000)
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--storm-seconds', type=float, default=3.0, help='duration of each round storm')
+    parser.add_argument('--class-rate', type=float, default=20.0, help='rounds/s of the paced classroom run')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    populate_sessions(args.sessions)
+    players = top_players(50)
+    broadcaster = game_service.get_broadcaster()
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    bench_publish(suite, players, broadcaster, 0)
+    for subscribers in args.subscribers:
+        bench_publish(suite, players, broadcaster, subscribers)
+        bench_fanout(suite, players, broadcaster, subscribers)
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    print(f"\nmax rate {1 / broadcaster.interval:.0f} events/s per client")
+    print(f"{'client':<34} {'rounds/s':>9} {'events/s':>9} {'bytes/s':>9}")
+    for label, rate in (('sse stream, classroom', args.class_rate), ('sse stream, storm', None)):
+        rounds, events, stream_bytes = storm(players, broadcaster, args.storm_seconds, rate)
+        print(f"{label:<34} {rounds:>9.0f} {events:>9.1f} {stream_bytes:>9.0f}")
+    # Polling al limite dell'endpoint (30 al minuto) e una volta al secondo
+    leaderboard = len(encode_api_response({'leaderboard': GameService.get_global_leaderboard(50)}))
+    for label, per_second in (('poll /api/leaderboard 0.5/s', 0.5), ('poll /api/leaderboard 1/s', 1.0)):
+        print(f"{label:<34} {'-':>9} {per_second:>9.1f} {leaderboard * per_second:>9.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL MAZZO DEI LOG
+
+Confronta la scelta casuale (pick) con il mazzo per sessione (deal) su
+corpus in memoria di diverse dimensioni:
+- costo di una scelta, compresi decodifica e codifica del mazzo della sessione
+- ripetizioni nei primi N log distribuiti a un giocatore (N = dimensione del pool)
+- spazio occupato dal mazzo nella sessione
+
+Verifica inoltre che un corpus che cresce durante la partita non produca
+ripetizioni prima di aver esaurito tutti i log.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_log_deck
+    python -m benchmarks.bench_log_deck --sizes 1000 100000 --output deck.json
+"""
+
+import argparse
+import os
+import sys
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.game_data import DIFFICULTY_CONFIG
+from models.log_deck import LogDeck
+from models.log_index import LogIndex
+from tools.build_corpus import synthetic_logs
+from benchmarks.harness import BenchmarkSuite
+
+def build_index(size):
+    """Indice in memoria con size log sintetici, divisi tra le fasi"""
+    logs_database = {}
+    for log in synthetic_logs(size, seed=size):
+        logs_database.setdefault(log['phase'], []).append(log)
+    return LogIndex(logs_database, DIFFICULTY_CONFIG)
+
+def repeats(draw, count):
+    """Numero di log già visti tra i primi count distribuiti"""
+    seen = set()
+    repeated = 0
+    for _ in range(count):
+        log_id = draw()['id']
+        repeated += log_id in seen
+        seen.add(log_id)
+    return repeated
+
+def deal_with_session(corpus, session):
+    """Come generate_log: mazzo letto dalla sessione, aggiornato e salvato"""
+    deck = LogDeck(session.get('log_deck'))
+    log = corpus.deal('expert', deck)
+    session['log_deck'] = deck.encode()
+    return log
+
+def check_growth(initial, added):
+    """
+    Distribuisce metà del corpus, lo fa crescere e distribuisce il resto
+
+    Returns:
+        int: Ripetizioni prima di aver visto tutti i log (atteso 0)
+    """
+    logs = list(synthetic_logs(initial + added, seed=7))
+    logs_database = {}
+    for log in logs[:initial]:
+        logs_database.setdefault(log['phase'], []).append(log)
+    corpus = LogIndex(logs_database, DIFFICULTY_CONFIG)
+    session = {}
+    seen = [deal_with_session(corpus, session)['id'] for _ in range(initial // 2)]
+
+    for log in logs[initial:]:
+        logs_database.setdefault(log['phase'], []).append(log)
+    corpus = LogIndex(logs_database, DIFFICULTY_CONFIG)
+    seen += [deal_with_session(corpus, session)['id'] for _ in range(initial - initial // 2 + added)]
+    return len(seen) - len(set(seen))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-session log deck benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000])
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write per-call results to this JSON file')
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    rows = []
+    for size in args.sizes:
+        corpus = build_index(size)
+        session = {}
+        suite.run('pick', lambda: corpus.pick('expert'), group='deck', params={'logs': size})
+        suite.run('deal', lambda: deal_with_session(corpus, session), group='deck', params={'logs': size})
+        player = {}
+        rows.append((
+            size,
+            repeats(lambda: corpus.pick('expert'), size),
+            repeats(lambda: deal_with_session(corpus, player), size),
+            len(player['log_deck'])
+        ))
+
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    print(f"\n{'logs':>8} {'pick repeats':>13} {'deal repeats':>13} {'deck bytes':>11}   (first <logs> draws)")
+    for size, pick_repeats, deal_repeats, deck_bytes in rows:
+        print(f"{size:>8} {pick_repeats:>13} {deal_repeats:>13} {deck_bytes:>11}")
+
+    print(f"\ncorpus growth 1000 -> 1500 logs mid-deck: {check_growth(1000, 500)} repeats")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
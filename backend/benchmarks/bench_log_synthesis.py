@@ -0,0 +1,152 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL GENERATORE DI LOG
+
+Misura:
+- il costo di generare un log da un template e di rigenerarlo dal suo ID
+- il prelievo di un log (più la vista client in JSON) dal pool sintetico,
+  confrontato con l'indice dei log statici
+- la generazione in blocco (log al secondo, con e senza vista client e JSON)
+- il carico sostenuto: prelievi a ritmo costante con il thread di rabbocco
+  attivo, e quanti log sono stati serviti dal corpus di base a pool vuoto
+- la memoria occupata dai pool con la configurazione di default
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_log_synthesis
+    python -m benchmarks.bench_log_synthesis --rates 1000 5000 --output synthesis.json
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.game_data import DIFFICULTY_CONFIG
+from models.log_index import LOG_INDEX
+from models.log_synthesis import LogSynthesizer, SyntheticCorpus, _make_entry
+from benchmarks.harness import BenchmarkSuite
+
+def filled_corpus(pool_size, **options):
+    """Corpus sintetico con i pool già pieni"""
+    corpus = SyntheticCorpus(LOG_INDEX, DIFFICULTY_CONFIG, pool_size=pool_size,
+                             batch_size=pool_size, **options)
+    corpus.refill()
+    return corpus
+
+def bench_calls(suite):
+    """Costo delle singole operazioni"""
+    synthesizer = LogSynthesizer(seed=1)
+    template = synthesizer._by_phase['command_control'][0]
+    suite.run('render_log', template.render, setup=lambda: (random.getrandbits(64),), group='synthesis')
+
+    ids = [log['id'] for log in synthesizer.generate('delivery', 1000)]
+    uncached = SyntheticCorpus(LOG_INDEX, DIFFICULTY_CONFIG, cache_size=0)
+    suite.run('rebuild_from_id', lambda log_id: uncached.client_payload(log_id),
+              setup=lambda: (random.choice(ids),), group='synthesis')
+
+    suite.run('pick_static_index', lambda: LOG_INDEX.client_payload(LOG_INDEX.pick('expert')['id']),
+              group='synthesis')
+    corpus = filled_corpus(1024)
+    corpus.start()
+    suite.run('pick_synthetic_pool', lambda: corpus.client_payload(corpus.pick('expert')['id']),
+              group='synthesis', rounds=5000)
+    corpus.stop()
+
+def bench_bulk(count):
+    """
+    Returns:
+        list: Righe (operazione, log, log/s)
+    """
+    synthesizer = LogSynthesizer(seed=2)
+    phases = synthesizer.phases()
+    rows = []
+
+    started = time.perf_counter()
+    for phase in phases:
+        synthesizer.generate(phase, count)
+    rows.append(('generate', count * len(phases), round(count * len(phases) / (time.perf_counter() - started))))
+
+    started = time.perf_counter()
+    for phase in phases:
+        [_make_entry(log) for log in synthesizer.generate(phase, count)]
+    rows.append(('generate+encode', count * len(phases), round(count * len(phases) / (time.perf_counter() - started))))
+    return rows
+
+def bench_sustained(rate, seconds):
+    """
+    Prelievi a ritmo costante da un corpus appena creato (pool vuoti all'avvio)
+
+    Returns:
+        tuple: (log serviti, di cui dal corpus di base, pool minimo durante la prova)
+    """
+    corpus = SyntheticCorpus(LOG_INDEX, DIFFICULTY_CONFIG)
+    corpus.start()
+    # Il primo riempimento avviene all'avvio del worker, prima del traffico
+    while min(len(pool) for pool in corpus._pools.values()) < corpus.pool_size:
+        time.sleep(0.01)
+
+    served = 0
+    lowest = corpus.pool_size
+    started = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            break
+        # Recupera il ritardo accumulato, poi attende il prossimo prelievo
+        while served < elapsed * rate:
+            corpus.client_payload(corpus.pick('expert')['id'])
+            served += 1
+        lowest = min(lowest, min(len(pool) for pool in corpus._pools.values()))
+        time.sleep(1 / rate)
+    corpus.stop()
+    return served, corpus.pool_misses, lowest
+
+def bench_memory():
+    """
+    Returns:
+        tuple: (log nei pool, MB occupati, byte per log)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    corpus = filled_corpus(256)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    logs = sum(len(pool) for pool in corpus._pools.values())
+    return logs, round(used / 1024 / 1024, 1), round(used / logs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Procedural log synthesis benchmark')
+    parser.add_argument('--bulk', type=int, default=5000, help='logs generated per phase in bulk')
+    parser.add_argument('--rates', type=int, nargs='+', default=[500, 2000, 5000],
+                        help='picks per second for the sustained load test')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of each sustained run')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write per-call results to this JSON file')
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    bench_calls(suite)
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+
+    print(f"\n{'bulk':>16} {'logs':>8} {'logs/s':>9}")
+    for operation, logs, rate in bench_bulk(args.bulk):
+        print(f"{operation:>16} {logs:>8} {rate:>9}")
+
+    print(f"\n{'picks/s':>8} {'served':>8} {'from base':>10} {'min pool':>9}")
+    for rate in args.rates:
+        served, misses, lowest = bench_sustained(rate, args.seconds)
+        print(f"{rate:>8} {served:>8} {misses:>10} {lowest:>9}")
+
+    logs, mb, per_log = bench_memory()
+    print(f"\npool memory: {logs} logs, {mb} MB ({per_log} B/log)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
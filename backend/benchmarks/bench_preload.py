@@ -0,0 +1,185 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL PRELOAD DEI WORKER
+
+Simula un master gunicorn che avvia N worker con fork, in tre modalità:
+- lazy: ogni worker importa e crea l'app dopo il fork (gunicorn senza --preload)
+- preload: app e dati statici creati nel master prima del fork
+- preload_freeze: come preload, più gc.freeze() prima del fork (come wsgi.py)
+
+Per ogni worker misura il cold start (dal fork alla prima risposta) e, dopo
+un carico di richieste con tutti i worker ancora vivi, RSS, PSS (memoria
+condivisa ripartita tra i processi) e memoria privata (USS, non condivisa).
+
+Ogni modalità gira in un processo nuovo, così il master lazy non ha niente
+di già importato.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_preload
+    python -m benchmarks.bench_preload --workers 8 --requests 2000
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+MODES = ('lazy', 'preload', 'preload_freeze')
+
+def memory_rollup():
+    """
+    Returns:
+        dict: rss_mb, pss_mb e private_mb del processo corrente (da smaps_rollup)
+    """
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return {
+        'rss_mb': round(values.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(values.get('Pss', 0) / 1024, 1),
+        'private_mb': round(private / 1024, 1),
+    }
+
+def load_app(freeze):
+    """Crea l'app come wsgi.py, con o senza gc.freeze()"""
+    from app import create_app, preload_static_data
+    app = create_app()
+    preload_static_data()
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return app
+
+# ============================================================================
+# WORKER (processo figlio)
+# ============================================================================
+
+def serve(app, requests):
+    """
+    Esegue richieste di gioco con il test client
+
+    Returns:
+        float: Millisecondi per la prima richiesta (dati ancora freddi)
+    """
+    client = app.test_client()
+    started = time.perf_counter()
+    first_ms = None
+    for n in range(requests):
+        environ = {'REMOTE_ADDR': f'10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}'}
+        session_id = f'preload_bench_{n % 50:04d}'
+        if n % 3 == 0:
+            client.get('/api/get-phases', environ_base=environ)
+        elif n % 3 == 1:
+            client.post('/api/get-log', json={'session_id': session_id, 'difficulty': 'expert'},
+                        environ_base=environ)
+        else:
+            client.post('/api/round', json={'session_id': session_id, 'selected_phase': 'delivery'},
+                        environ_base=environ)
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+    return first_ms
+
+def run_worker(app, forked_at, requests, report_fd, release_fd):
+    """Corpo di un worker: serve le richieste, riporta le misure e attende"""
+    if app is None:
+        app = load_app(freeze=False)
+    first_ms = serve(app, 1)
+    cold_start_ms = (time.perf_counter() - forked_at) * 1000
+    serve(app, requests)
+    result = {'cold_start_ms': round(cold_start_ms, 1), 'first_request_ms': round(first_ms, 1)}
+    result.update(memory_rollup())
+    os.write(report_fd, (json.dumps(result) + '\n').encode())
+    # Resta vivo finché il master non ha raccolto tutte le misure (PSS corretto)
+    os.read(release_fd, 1)
+
+def run_mode(mode, workers, requests):
+    """
+    Avvia i worker nella modalità indicata
+
+    Returns:
+        dict: Tempo di preparazione del master, misure del master e dei worker
+    """
+    started = time.perf_counter()
+    app = None if mode == 'lazy' else load_app(freeze=mode == 'preload_freeze')
+    master = {'ready_ms': round((time.perf_counter() - started) * 1000, 1)}
+    master.update(memory_rollup())
+
+    report_r, report_w = os.pipe()
+    release_r, release_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, forked_at, requests, report_w, release_r)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    results = []
+    with os.fdopen(report_r) as reports:
+        for _ in range(workers):
+            results.append(json.loads(reports.readline()))
+        os.write(release_w, b'x' * workers)
+        for pid in pids:
+            os.waitpid(pid, 0)
+    return {'mode': mode, 'master': master, 'workers': results}
+
+# ============================================================================
+# CONFRONTO DELLE MODALITÀ
+# ============================================================================
+
+def measure(mode, workers, requests):
+    """Esegue una modalità in un processo nuovo e ne restituisce le misure"""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_preload', '--mode', mode,
+         '--workers', str(workers), '--requests', str(requests)],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def mean(values):
+    return round(sum(values) / len(values), 1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Worker preload benchmark')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000, help='requests served by each worker')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        os.environ.setdefault('ANALYTICS_SINK', 'off')
+        os.environ['SESSION_STORE'] = 'memory'
+        os.environ['REDIS_URL'] = ''
+        os.environ['RATELIMIT_LOCAL_RATE'] = '0'
+        logging.disable(logging.WARNING)
+        print(json.dumps(run_mode(args.mode, args.workers, args.requests)))
+        return 0
+
+    results = [measure(mode, args.workers, args.requests) for mode in MODES]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'mode':>15} {'master ms':>10} {'cold start ms':>14} {'RSS MB':>8} "
+              f"{'PSS MB':>8} {'private MB':>11}   (mean per worker, {args.workers} workers)")
+        for r in results:
+            w = r['workers']
+            print(f"{r['mode']:>15} {r['master']['ready_ms']:>10} "
+                  f"{mean([x['cold_start_ms'] for x in w]):>14} {mean([x['rss_mb'] for x in w]):>8} "
+                  f"{mean([x['pss_mb'] for x in w]):>8} {mean([x['private_mb'] for x in w]):>11}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL RATE LIMITER
+
+Costo di un controllo del limite (hit) con i diversi storage e strategie,
+con molte chiavi distinte (es. molti IP durante un flood), e del token
+bucket locale che fa da pre-controllo.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_rate_limiter
+    python -m benchmarks.bench_rate_limiter --keys 100000 --output limiter.json
+"""
+
+import argparse
+import itertools
+import sys
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from utils.rate_limiter import LocalTokenBucket
+from benchmarks.harness import BenchmarkSuite
+
+CONFIGURATIONS = [
+    ('memory_fixed_window', 'memory://', FixedWindowRateLimiter),
+    ('memory_sliding_window_counter', 'memory://', SlidingWindowCounterRateLimiter),
+    ('lru_memory_sliding_window_counter', 'lru-memory://', SlidingWindowCounterRateLimiter),
+]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rate limiter benchmarks')
+    parser.add_argument('--keys', type=int, default=20000, help='distinct client keys')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(min_time=args.min_time)
+    item = parse('100 per minute')
+    params = {'keys': args.keys}
+
+    for name, uri, strategy in CONFIGURATIONS:
+        storage = storage_from_string(uri)
+        limiter = strategy(storage)
+        keys = itertools.cycle([f'10.0.{n}' for n in range(args.keys)])
+        suite.run(name, lambda: limiter.hit(item, next(keys)), group='rate_limiter', params=params)
+
+    bucket = LocalTokenBucket(rate=10, burst=50)
+    keys = itertools.cycle([f'10.0.{n}' for n in range(args.keys)])
+    suite.run('local_token_bucket', lambda: bucket.allow(next(keys)), group='rate_limiter', params=params)
+
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DEL GAME SERVICE
+
+Misura i percorsi più usati del GameService con il session store in memoria
+già popolato da 10k, 100k e 1M sessioni, più le funzioni di utilità
+chiamate a ogni richiesta (sanitize_log_data, format_api_response).
+
+Gli eventi di analytics sono disattivati (ANALYTICS_SINK=off) per misurare
+solo la logica di gioco.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_service
+    python -m benchmarks.bench_service --sessions 10000 100000 --output service.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+os.environ['SESSION_STORE'] = 'memory'
+
+import services.game_service as game_service
+from services.game_service import GameService
+from models.game_data import LOGS_DATABASE, MITIGATION_STRATEGIES
+from utils.helpers import sanitize_log_data, format_api_response
+from benchmarks.harness import BenchmarkSuite
+
+def reset_game_state():
+    """
+    Sostituisce session store, classifica, aggregati per classe, broadcaster e sweeper
+    con istanze nuove e vuote
+
+    Returns:
+        SessionStore: Nuovo session store in memoria
+    """
+    if game_service._session_sweeper is not None:
+        game_service._session_sweeper.stop()
+    if game_service._broadcaster is not None:
+        game_service._broadcaster.stop()
+    game_service._session_store = None
+    game_service._session_sweeper = None
+    game_service._leaderboard = None
+    game_service._cohort_stats = None
+    game_service._broadcaster = None
+    return game_service.get_session_store()
+
+def populate_sessions(count):
+    """
+    Crea count sessioni con un punteggio casuale, già inserite in classifica
+
+    Returns:
+        list: ID delle sessioni create
+    """
+    store = reset_game_state()
+    leaderboard = game_service.get_leaderboard()
+    session_ids = [f'bench_session_{n:07d}' for n in range(count)]
+    for session_id in session_ids:
+        session = GameService.get_or_create_session(session_id)
+        session['score'] = random.randint(0, 5000)
+        store.save(session_id, session)
+        leaderboard.update(session_id, session['score'], 0)
+    return session_ids
+
+def bench_helpers(suite):
+    """Funzioni di utilità chiamate a ogni richiesta"""
+    log = LOGS_DATABASE['delivery'][0]
+    suite.run('sanitize_log_data', lambda: sanitize_log_data(log), group='helpers')
+
+    payload = {'log': sanitize_log_data(log), 'time_limit': 60, 'difficulty': 'beginner'}
+    suite.run('format_api_response', lambda: format_api_response(True, payload), group='helpers')
+    suite.run('format_api_response_error',
+              lambda: format_api_response(False, error='Session not found'), group='helpers')
+
+def bench_sessions(suite, count):
+    """Operazioni del GameService con count sessioni in memoria"""
+    started = time.perf_counter()
+    session_ids = populate_sessions(count)
+    print(f"populated {count} sessions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    params = {'sessions': count}
+    store = game_service.get_session_store()
+
+    def random_session():
+        return (random.choice(session_ids),)
+
+    def session_with_log():
+        session_id = random.choice(session_ids)
+        GameService.generate_log(session_id, 'expert')
+        return session_id, store.get(session_id)['correct_phase']
+
+    def session_with_phase():
+        session_id, phase = session_with_log()
+        return session_id, random.choice(MITIGATION_STRATEGIES[phase])['id']
+
+    suite.run('generate_log',
+              lambda session_id: GameService.generate_log(session_id, 'expert'),
+              setup=random_session, group='service', params=params)
+    suite.run('validate_phase_selection',
+              GameService.validate_phase_selection,
+              setup=session_with_log, group='service', params=params)
+    suite.run('validate_mitigation_selection',
+              lambda session_id, mitigation: GameService.validate_mitigation_selection(
+                  session_id, mitigation, 20, 'expert'),
+              setup=session_with_phase, group='service', params=params)
+    suite.run('update_session_stats',
+              lambda session_id: GameService.update_session_stats(session_id, 25, True),
+              setup=random_session, group='service', params=params)
+
+    # Caso comune: nessuna sessione da rimuovere
+    suite.run('cleanup_old_sessions_noop',
+              lambda: GameService.cleanup_old_sessions(24),
+              group='service', params=params)
+    # Rimozione di tutte le sessioni: una sola misura, distrugge lo stato
+    suite.run('cleanup_old_sessions_all',
+              lambda: GameService.cleanup_old_sessions(0),
+              group='service', params=params, rounds=1)
+
+    reset_game_state()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GameService benchmarks')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds measured per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    suite = BenchmarkSuite(min_time=args.min_time)
+    bench_helpers(suite)
+    for count in args.sessions:
+        bench_sessions(suite, count)
+
+    suite.report()
+    if args.output:
+        suite.save(args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DELLA MEMORIA PER SESSIONE
+
+Confronta la memoria occupata da 1M sessioni (dopo il primo log assegnato):
+- dict: il dizionario con dieci chiavi usato in precedenza, con created_at
+  come stringa ISO e mastered_phases come lista
+- record: SessionRecord (__slots__, bitmask delle fasi, timestamp float)
+
+Per ciascuna rappresentazione misura solo gli oggetti sessione (objects) e
+le sessioni salvate nel MemorySessionStore con le sue strutture di scadenza
+(store), in un processo separato: memoria anonima (heap) prima e dopo.
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_session_memory
+    python -m benchmarks.bench_session_memory --sessions 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.bench_corpus import anonymous_mb
+
+LAYOUTS = ('dict', 'record')
+SCOPES = ('objects', 'store')
+
+def legacy_session():
+    """Sessione nel formato a dizionario precedente a SessionRecord"""
+    return {
+        'score': 0,
+        'streak': 0,
+        'total_attempts': 0,
+        'correct_attempts': 0,
+        'current_log': None,
+        'correct_phase': None,
+        'correct_mitigation': None,
+        'mastered_phases': [],
+        'created_at': datetime.now().isoformat(),
+        'version': 0
+    }
+
+def run_worker(layout, scope, count):
+    """
+    Crea count sessioni e misura la memoria anonima aggiunta
+
+    Returns:
+        dict: build_s, heap_mb, bytes_per_session
+    """
+    from models.log_index import LOG_INDEX
+    from models.session_record import SessionRecord
+    from services.session_store import MemorySessionStore
+
+    logs = [LOG_INDEX.log_at('expert', n) for n in range(LOG_INDEX.pool_size('expert'))]
+    factory = legacy_session if layout == 'dict' else SessionRecord
+    store = MemorySessionStore()
+    sessions = []
+
+    gc.collect()
+    before = anonymous_mb()
+    started = time.perf_counter()
+    for n in range(count):
+        session = factory()
+        log = logs[n % len(logs)]
+        # Stato dopo generate_log: log e fase in gioco
+        session['current_log'] = log['id']
+        session['correct_phase'] = log['phase']
+        if scope == 'store':
+            store.save(f'{n:08x}-session-{n:020d}', session)
+        else:
+            sessions.append(session)
+    build_s = time.perf_counter() - started
+    gc.collect()
+    heap_mb = anonymous_mb() - before
+    return {
+        'build_s': round(build_s, 2),
+        'heap_mb': round(heap_mb, 1),
+        'bytes_per_session': round(heap_mb * 1024 * 1024 / count),
+    }
+
+def measure(layout, scope, count):
+    """Esegue un worker in un processo nuovo e ne restituisce le misure"""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_session_memory',
+         '--worker', layout, '--scope', scope, '--sessions', str(count)],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-session memory benchmark')
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--worker', choices=LAYOUTS, help=argparse.SUPPRESS)
+    parser.add_argument('--scope', choices=SCOPES, default='objects', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.scope, args.sessions)))
+        return 0
+
+    results = [
+        {'layout': layout, 'scope': scope, **measure(layout, scope, args.sessions)}
+        for scope in SCOPES for layout in LAYOUTS
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scope':>8} {'layout':>7} {'build s':>8} {'heap MB':>8} {'B/session':>10}"
+              f"   ({args.sessions} sessions)")
+        for r in results:
+            print(f"{r['scope']:>8} {r['layout']:>7} {r['build_s']:>8} {r['heap_mb']:>8} "
+                  f"{r['bytes_per_session']:>10}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+CYBER KILL CHAIN ANALYZER - BENCHMARK DELLA VALIDAZIONE DELL'INPUT
+
+Confronta, per gli schemi degli endpoint più chiamati, tre modi di validare
+lo stesso payload:
+- new_schema: nuova istanza dello schema a ogni richiesta (comportamento precedente)
+- cached_schema: istanza dello schema creata una sola volta
+- fast: funzione compilata da compile_schema (con ricaduta su Marshmallow)
+
+Uso (dalla directory backend):
+    python -m benchmarks.bench_validation
+    python -m benchmarks.bench_validation --number 50000 --json
+"""
+
+import argparse
+import json
+import sys
+import timeit
+
+from marshmallow import ValidationError
+
+from utils.validators import (
+    SessionDataSchema,
+    PhaseValidationSchema,
+    MitigationValidationSchema,
+    compile_schema
+)
+
+# Payload tipici degli endpoint get-log, validate-phase e validate-mitigation
+CASES = [
+    ('get-log', SessionDataSchema, {
+        'session_id': 'session_1718000000000_abc123',
+        'difficulty': 'intermediate',
+        'stats': {'score': 120, 'streak': 3, 'accuracy': 75}
+    }),
+    ('validate-phase', PhaseValidationSchema, {
+        'session_id': 'session_1718000000000_abc123',
+        'selected_phase': 'delivery'
+    }),
+    ('validate-mitigation', MitigationValidationSchema, {
+        'session_id': 'session_1718000000000_abc123',
+        'selected_mitigation': 'email_filtering',
+        'time_remaining': 42,
+        'difficulty': 'beginner'
+    }),
+    # Input non valido: la funzione compilata ricade su Marshmallow
+    ('validate-phase (invalid)', PhaseValidationSchema, {
+        'session_id': 'bad id!',
+        'selected_phase': 'delivery'
+    }),
+]
+
+def _loader(load):
+    """Adatta una funzione di validazione al confronto (errori inclusi)"""
+    def run(data):
+        try:
+            return load(data)
+        except ValidationError:
+            return None
+    return run
+
+def run_case(schema_class, data, number):
+    """
+    Misura i tre percorsi di validazione per un payload
+
+    Returns:
+        dict: Microsecondi per chiamata di ciascun percorso
+    """
+    schema = schema_class()
+    fast_load = compile_schema(schema_class)
+
+    def fast(payload):
+        return fast_load(payload) or schema.load(payload)
+
+    paths = {
+        'new_schema': _loader(lambda payload: schema_class().load(payload)),
+        'cached_schema': _loader(schema.load),
+        'fast': _loader(fast)
+    }
+    results = {}
+    for name, load in paths.items():
+        seconds = min(timeit.repeat(lambda: load(data), number=number, repeat=3))
+        results[name] = round(seconds * 1e6 / number, 2)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Request validation micro-benchmark')
+    parser.add_argument('--number', type=int, default=20000, help='calls per measurement')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for endpoint, schema_class, data in CASES:
+        timings = run_case(schema_class, data, args.number)
+        timings['speedup'] = round(timings['new_schema'] / timings['fast'], 1)
+        results.append({'endpoint': endpoint, **timings})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'endpoint':<26} {'new_schema us':>14} {'cached us':>10} {'fast us':>8} {'speedup':>8}")
+        for r in results:
+            print(f"{r['endpoint']:<26} {r['new_schema']:>14} {r['cached_schema']:>10} "
+                  f"{r['fast']:>8} {r['speedup']:>7}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+CYBER KILL CHAIN ANALYZER - STRUMENTI COMUNI DEI BENCHMARK
+
+Misura la latenza di ogni singola chiamata (perf_counter_ns) e riassume i
+campioni con le statistiche usate da pytest-benchmark (min, max, mean,
+stddev, median, ops) più i percentili p90/p99.
+
+I risultati vengono salvati in JSON con le informazioni sulla macchina e
+sul commit, per confrontare le prestazioni tra una release e l'altra.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+def percentile(sorted_samples, fraction):
+    """
+    Percentile con interpolazione lineare su campioni già ordinati
+
+    Args:
+        sorted_samples (list): Campioni in ordine crescente
+        fraction (float): Percentile richiesto (0..1)
+
+    Returns:
+        float: Valore del percentile
+    """
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    position = (len(sorted_samples) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (position - low)
+
+def summarize(samples_ns):
+    """
+    Riassume le latenze misurate
+
+    Args:
+        samples_ns (list): Durate delle chiamate in nanosecondi
+
+    Returns:
+        dict: Statistiche in secondi (come pytest-benchmark) e operazioni al secondo
+    """
+    samples = sorted(ns / 1e9 for ns in samples_ns)
+    mean = statistics.fmean(samples)
+    return {
+        'rounds': len(samples),
+        'min': samples[0],
+        'max': samples[-1],
+        'mean': mean,
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'median': percentile(samples, 0.5),
+        'p90': percentile(samples, 0.9),
+        'p99': percentile(samples, 0.99),
+        'ops': 1 / mean if mean else 0.0
+    }
+
+class BenchmarkSuite:
+    """
+    Raccoglie i risultati di più benchmark e li salva in JSON
+    """
+
+    def __init__(self, min_time=0.5, max_rounds=100000, warmup_rounds=10):
+        """
+        Args:
+            min_time (float): Secondi minimi di misura per ogni benchmark
+            max_rounds (int): Numero massimo di chiamate misurate
+            warmup_rounds (int): Chiamate iniziali non misurate
+        """
+        self.min_time = min_time
+        self.max_rounds = max_rounds
+        self.warmup_rounds = warmup_rounds
+        self.results = []
+
+    def run(self, name, func, setup=None, group=None, params=None, rounds=None):
+        """
+        Misura func() chiamata ripetutamente
+
+        Args:
+            name (str): Nome del benchmark
+            func (callable): Funzione misurata; riceve gli argomenti restituiti da setup
+            setup (callable): Preparazione non misurata prima di ogni chiamata,
+                restituisce una tupla di argomenti (opzionale)
+            group (str): Gruppo del benchmark (es. service, endpoint)
+            params (dict): Parametri del caso (es. numero di sessioni)
+            rounds (int): Numero esatto di chiamate (default: fino a min_time)
+
+        Returns:
+            dict: Risultato registrato
+        """
+        for _ in range(0 if rounds else self.warmup_rounds):
+            func(*(setup() if setup else ()))
+
+        samples = []
+        clock = time.perf_counter_ns
+        deadline = time.perf_counter() + self.min_time
+        limit = rounds or self.max_rounds
+        while len(samples) < limit and (rounds or time.perf_counter() < deadline):
+            args = setup() if setup else ()
+            started = clock()
+            func(*args)
+            samples.append(clock() - started)
+
+        result = {
+            'name': name,
+            'group': group,
+            'params': params or {},
+            'stats': summarize(samples)
+        }
+        self.results.append(result)
+        return result
+
+    def report(self, stream=sys.stdout):
+        """Stampa una tabella riassuntiva (tempi in microsecondi)"""
+        stream.write(f"{'benchmark':<52} {'rounds':>7} {'p50 us':>10} {'p99 us':>10} {'ops/s':>11}\n")
+        for result in self.results:
+            stats = result['stats']
+            label = result['name']
+            if result['params']:
+                label += '[' + ','.join(f'{k}={v}' for k, v in result['params'].items()) + ']'
+            stream.write(
+                f"{label:<52} {stats['rounds']:>7} {stats['median'] * 1e6:>10.1f} "
+                f"{stats['p99'] * 1e6:>10.1f} {stats['ops']:>11.0f}\n"
+            )
+
+    def save(self, path):
+        """
+        Salva i risultati in JSON (formato compatibile con pytest-benchmark
+        per i campi machine_info, commit_info, benchmarks)
+        """
+        document = {
+            'datetime': datetime.now(timezone.utc).isoformat(),
+            'machine_info': machine_info(),
+            'commit_info': commit_info(),
+            'benchmarks': self.results
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+def machine_info():
+    """
+    Returns:
+        dict: Informazioni sulla macchina e sull'interprete
+    """
+    return {
+        'node': platform.node(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'release': platform.release(),
+        'cpu_count': os.cpu_count(),
+        'python_implementation': platform.python_implementation(),
+        'python_version': platform.python_version()
+    }
+
+def commit_info():
+    """
+    Returns:
+        dict: Commit corrente e stato del working tree (vuoto fuori da git)
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+        return {'id': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {}
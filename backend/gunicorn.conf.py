@@ -0,0 +1,54 @@
+"""
+CYBER KILL CHAIN ANALYZER - CONFIGURAZIONE GUNICORN
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Configurazione (variabili d'ambiente, anche da .env):
+- GUNICORN_BIND: indirizzo di ascolto (default 127.0.0.1:5000)
+- GUNICORN_WORKERS: numero di worker (default 2 * CPU + 1; 1 con SESSION_STORE=memory)
+- GUNICORN_THREADS: thread per worker (default 64; con più thread la classe è gthread)
+- GUNICORN_WORKER_CLASS: sync, gthread o gevent (default gthread)
+
+Ogni stream SSE aperto (/api/live) occupa un thread del worker per tutta la
+sua durata: LIVE_MAX_SUBSCRIBERS, se non impostato, lascia liberi 8 thread per
+le altre richieste. Con worker sync gli stream sono disattivati (503, i client
+tornano al polling); con gevent ogni stream è una greenlet e il limite resta 1000.
+"""
+
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5000')
+
+# Le sessioni in memoria non sono condivise tra processi: un solo worker
+if os.getenv('SESSION_STORE', 'memory').lower() == 'memory':
+    workers = 1
+else:
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+threads = int(os.getenv('GUNICORN_THREADS', 64))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+# Stream SSE per worker: letto dal broadcaster dei worker (ereditano l'ambiente)
+if worker_class == 'sync':
+    os.environ.setdefault('LIVE_MAX_SUBSCRIBERS', '0')
+elif worker_class == 'gthread':
+    os.environ.setdefault('LIVE_MAX_SUBSCRIBERS', str(max(0, threads - 8)))
+
+# L'app viene creata nel master (dati statici condivisi tra i worker, vedi wsgi.py);
+# connessioni, thread in background e session store nascono in ogni worker dopo il fork
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+accesslog = '-'
+
+def post_fork(server, worker):
+    """Avvia subito nel worker il rabbocco dei log sintetici, prima delle richieste"""
+    from models.corpus import get_log_corpus
+    start = getattr(get_log_corpus(), 'start', None)
+    if start is not None:
+        start()
@@ -0,0 +1,246 @@
+"""
+CYBER KILL CHAIN ANALYZER - CORPUS DEI LOG SU DISCO
+
+Corpus esterno per decine/centinaia di migliaia di log, che non viene mai
+caricato interamente in memoria:
+- i log sono righe di un database SQLite (un JSON per riga)
+- l'indice (phase, ordinal) permette di estrarre il log n-esimo di una fase
+  con una sola ricerca, senza scansioni né OFFSET
+- il numero di log per fase è salvato in una tabella a parte e letto all'apertura
+- il file è letto tramite mmap: le pagine sono condivise tra i worker
+  attraverso la page cache del sistema operativo
+- solo i log usati di recente restano in memoria (cache LRU per worker)
+
+Il corpus si costruisce da file JSONL con tools/build_corpus.py.
+
+Configurazione (variabili d'ambiente):
+- LOG_CORPUS_PATH: percorso del database del corpus; se assente si usano
+  i log statici di models/game_data.py
+- LOG_CORPUS_CACHE_SIZE: log mantenuti nella cache LRU (default 4096)
+- LOG_CORPUS_MMAP_MB: dimensione massima della mappatura in memoria (default 256)
+
+Salvo LOG_SYNTHESIS=off il corpus viene affiancato dal generatore procedurale
+(models/log_synthesis.py), che distribuisce varianti sintetiche dei log e usa
+questo corpus come ripiego.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+
+from models.game_data import DIFFICULTY_CONFIG
+from models.log_index import LogCorpus, LOG_INDEX, encode_json
+from models.log_synthesis import create_synthetic_corpus
+from utils.compression import PrecompressedPayload
+from utils.helpers import sanitize_log_data
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCorpus(LogCorpus):
+    """
+    Corpus di log in un database SQLite, letto su richiesta
+    """
+
+    def __init__(self, path, difficulty_config, cache_size=4096, mmap_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            path (str): Percorso del database (creato se non esiste)
+            difficulty_config (dict): Configurazione dei livelli (come DIFFICULTY_CONFIG)
+            cache_size (int): Numero di log mantenuti nella cache LRU
+            mmap_bytes (int): Dimensione massima della mappatura in memoria del file
+        """
+        super().__init__(difficulty_config)
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        # Cache per istanza: il log completo e la vista client (oggetto + JSON)
+        self._load = lru_cache(maxsize=cache_size)(self._load_uncached)
+        self._client = lru_cache(maxsize=cache_size)(self._client_uncached)
+
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS logs ('
+                ' id TEXT PRIMARY KEY,'
+                ' phase TEXT NOT NULL,'
+                ' ordinal INTEGER NOT NULL,'
+                ' data TEXT NOT NULL'
+                ')'
+            )
+            # Indice di copertura: (fase, posizione) -> id senza leggere la riga
+            conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_logs_phase_ordinal'
+                ' ON logs (phase, ordinal, id)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS corpus_phases ('
+                ' phase TEXT PRIMARY KEY,'
+                ' size INTEGER NOT NULL'
+                ')'
+            )
+        self.refresh()
+
+    def connection(self):
+        """
+        Restituisce la connessione del thread corrente (una per thread e per processo)
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_bytes)}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def refresh(self):
+        """Rilegge il numero di log per fase (dopo modifiche di altri processi)"""
+        rows = self.connection().execute('SELECT phase, size FROM corpus_phases').fetchall()
+        self._phase_sizes = dict(rows)
+
+    def phase_size(self, phase):
+        return self._phase_sizes.get(phase, 0)
+
+    def phase_log_at(self, phase, position):
+        row = self.connection().execute(
+            'SELECT id FROM logs WHERE phase = ? AND ordinal = ?', (phase, position)
+        ).fetchone()
+        if row is None:
+            raise IndexError(position)
+        return self._load(row[0])
+
+    def iter_phase_logs(self, phase, start=0):
+        # Una sola query ordinata per ordinal, senza passare dalla cache LRU dei log di gioco
+        rows = self.connection().execute(
+            'SELECT data FROM logs WHERE phase = ? AND ordinal >= ? AND ordinal < ? ORDER BY ordinal',
+            (phase, start, self.phase_size(phase))
+        )
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def _load_uncached(self, log_id):
+        row = self.connection().execute(
+            'SELECT data FROM logs WHERE id = ?', (log_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return MappingProxyType(json.loads(row[0]))
+
+    def _client_uncached(self, log_id):
+        log = self._load(log_id)
+        if log is None:
+            return None
+        client_view = sanitize_log_data(dict(log))
+        return MappingProxyType(client_view), PrecompressedPayload(encode_json(client_view))
+
+    def get(self, log_id):
+        if log_id is None:
+            return None
+        return self._load(log_id)
+
+    def client_view(self, log_id):
+        client = self._client(log_id)
+        return client[0] if client else None
+
+    def client_payload(self, log_id):
+        client = self._client(log_id)
+        return client[1] if client else None
+
+    def add_logs(self, logs):
+        """
+        Aggiunge log al corpus in coda alle rispettive fasi
+        I log con un ID già presente vengono ignorati
+
+        Args:
+            logs (iterable): Log completi (dict con almeno 'id' e 'phase')
+
+        Returns:
+            int: Numero di log aggiunti
+        """
+        added = 0
+        with self._write_lock:
+            conn = self.connection()
+            with conn:
+                sizes = dict(conn.execute('SELECT phase, size FROM corpus_phases').fetchall())
+                for log in logs:
+                    phase = log['phase']
+                    ordinal = sizes.get(phase, 0)
+                    cursor = conn.execute(
+                        'INSERT OR IGNORE INTO logs (id, phase, ordinal, data) VALUES (?, ?, ?, ?)',
+                        (log['id'], phase, ordinal, json.dumps(log, ensure_ascii=False))
+                    )
+                    if cursor.rowcount:
+                        sizes[phase] = ordinal + 1
+                        added += 1
+                conn.executemany(
+                    'INSERT OR REPLACE INTO corpus_phases (phase, size) VALUES (?, ?)',
+                    sizes.items()
+                )
+            self._phase_sizes = sizes
+        return added
+
+    def __len__(self):
+        return sum(self._phase_sizes.values())
+
+# ============================================================================
+# CORPUS GLOBALE
+# ============================================================================
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+def create_log_corpus():
+    """
+    Crea il corpus indicato dalle variabili d'ambiente
+
+    Returns:
+        LogCorpus: Corpus sintetico sopra quello di base, o solo il corpus di base se LOG_SYNTHESIS=off
+    """
+    base = create_base_corpus()
+    if os.getenv('LOG_SYNTHESIS', 'on').lower() == 'off':
+        return base
+    return create_synthetic_corpus(base, DIFFICULTY_CONFIG)
+
+def create_base_corpus():
+    """
+    Crea il corpus dei log reali indicato dalle variabili d'ambiente
+
+    Returns:
+        LogCorpus: Corpus su disco, o l'indice dei log statici se LOG_CORPUS_PATH non è impostato
+    """
+    path = os.getenv('LOG_CORPUS_PATH')
+    if not path:
+        return LOG_INDEX
+
+    if not os.path.exists(path):
+        logger.warning(f"Log corpus '{path}' not found, falling back to built-in logs")
+        return LOG_INDEX
+
+    corpus = SQLiteCorpus(
+        path,
+        DIFFICULTY_CONFIG,
+        cache_size=int(os.getenv('LOG_CORPUS_CACHE_SIZE', 4096)),
+        mmap_bytes=int(os.getenv('LOG_CORPUS_MMAP_MB', 256)) * 1024 * 1024
+    )
+    logger.info(f"Loaded log corpus '{path}' with {len(corpus)} logs")
+    return corpus
+
+def get_log_corpus():
+    """
+    Restituisce il corpus globale, aprendolo al primo utilizzo
+
+    Returns:
+        LogCorpus: Sorgente dei log di gioco
+    """
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = create_log_corpus()
+    return _corpus
@@ -60,6 +60,9 @@ CYBER_KILL_CHAIN_PHASES = {
 # Organizzato per fase della kill chain con log realistici per l'educazione
 # ============================================================================
 
+# Livelli di gravità dei log (campo severity), dal più basso
+SEVERITY_LEVELS = ['Bassa', 'Media', 'Alta', 'Critica']
+
 LOGS_DATABASE = {
     # --- FASE 1: RECONNAISSANCE ---
     # Log che mostrano attività di ricognizione e raccolta informazioni
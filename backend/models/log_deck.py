@@ -0,0 +1,133 @@
+"""
+CYBER KILL CHAIN ANALYZER - MAZZO DEI LOG PER SESSIONE
+
+Un giocatore non rivede un log finché non ha visto tutti gli altri della
+difficoltà (vedi LogCorpus.deal). Per ogni fase il mazzo è una permutazione pseudo-casuale delle posizioni dei
+log (0..size-1), definita da un seme: non serve memorizzare né la permutazione
+né l'elenco dei log già visti, bastano quattro interi per fase:
+- size: log della fase quando il mazzo è stato mescolato
+- seed: seme della permutazione
+- cursor: carte già distribuite dalla permutazione
+- grown: prossima posizione aggiunta al corpus dopo il mescolamento
+
+L'elemento n-esimo della permutazione si calcola in O(1) con una rete di
+Feistel su un dominio potenza di 4 (cycle walking per restare sotto size).
+I log aggiunti al corpus durante la partita (posizioni >= size, i corpus
+crescono solo in coda) vengono mescolati con le carte rimaste; il mazzo si
+rimescola solo quando è esaurito.
+
+Lo stato di tutte le fasi occupa 16 byte per fase (112 byte), salvati nella
+sessione in base64.
+"""
+
+import base64
+import random
+import struct
+
+from models.game_data import CYBER_KILL_CHAIN_PHASES
+
+# Posizione dello stato di ogni fase nel mazzo
+_PHASE_SLOTS = {phase: position for position, phase in enumerate(CYBER_KILL_CHAIN_PHASES)}
+_FIELDS = 4
+_STATE = struct.Struct(f'<{_FIELDS * len(_PHASE_SLOTS)}I')
+
+_FEISTEL_ROUNDS = 4
+_MULTIPLIER = 0x9E3779B97F4A7C15
+
+def permuted_position(index, size, seed):
+    """
+    Elemento index-esimo della permutazione di range(size) definita da seed
+
+    Args:
+        index (int): Posizione nella permutazione (0 <= index < size)
+        size (int): Numero di elementi
+        seed (int): Seme a 32 bit
+
+    Returns:
+        int: Elemento permutato (0 <= risultato < size)
+    """
+    half = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half) - 1
+    value = index
+    while True:
+        left, right = value >> half, value & mask
+        for round_number in range(_FEISTEL_ROUNDS):
+            mixed = ((right ^ seed ^ (round_number << 29)) * _MULTIPLIER) >> 32
+            left, right = right, left ^ (mixed & mask)
+        value = (left << half) | right
+        # Il dominio è al massimo 4 volte size: in media meno di 4 giri
+        if value < size:
+            return value
+
+class LogDeck:
+    """
+    Stato dei mazzi di tutte le fasi di una sessione
+    """
+
+    __slots__ = ('_state',)
+
+    def __init__(self, encoded=None):
+        """
+        Args:
+            encoded (str): Stato salvato nella sessione (base64), None per un mazzo nuovo
+        """
+        if encoded:
+            self._state = list(_STATE.unpack(base64.b64decode(encoded)))
+        else:
+            self._state = [0] * (_FIELDS * len(_PHASE_SLOTS))
+
+    def encode(self):
+        """
+        Returns:
+            str: Stato in base64 da salvare nella sessione
+        """
+        return base64.b64encode(_STATE.pack(*self._state)).decode('ascii')
+
+    def draw(self, phase, size, rng=random):
+        """
+        Estrae la prossima posizione non ancora vista della fase
+
+        Args:
+            phase (str): Fase della Kill Chain
+            size (int): Numero attuale di log della fase
+            rng: Generatore casuale (default: modulo random)
+
+        Returns:
+            int: Posizione del log (0 <= posizione < size)
+        """
+        offset = _PHASE_SLOTS[phase] * _FIELDS
+        deck_size, seed, cursor, grown = self._state[offset:offset + _FIELDS]
+        remaining = deck_size - cursor
+        added = size - grown
+        # Mazzo nuovo, esaurito o di un corpus diverso (più piccolo): rimescola
+        if deck_size == 0 or added < 0 or remaining + added <= 0:
+            deck_size, seed, cursor, grown = size, rng.getrandbits(32), 0, size
+            remaining, added = size, 0
+
+        # Le carte rimaste e i log aggiunti dopo il mescolamento hanno la stessa probabilità
+        if added and rng.randrange(remaining + added) >= remaining:
+            position = grown
+            grown += 1
+        else:
+            position = permuted_position(cursor, deck_size, seed)
+            cursor += 1
+
+        self._state[offset:offset + _FIELDS] = (deck_size, seed, cursor, grown)
+        return position
+
+    def shuffle(self, phase, size, rng=random):
+        """Rimescola il mazzo della fase: tutti i size log tornano disponibili"""
+        offset = _PHASE_SLOTS[phase] * _FIELDS
+        self._state[offset:offset + _FIELDS] = (size, rng.getrandbits(32), 0, size)
+
+    def remaining(self, phase, size):
+        """
+        Returns:
+            int: Log della fase non ancora visti nel giro corrente
+                (tutti se il mazzo è nuovo o di un corpus diverso, più piccolo)
+        """
+        offset = _PHASE_SLOTS[phase] * _FIELDS
+        deck_size, _, cursor, grown = self._state[offset:offset + _FIELDS]
+        if deck_size == 0 or size < grown:
+            return size
+        return deck_size - cursor + size - grown
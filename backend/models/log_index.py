@@ -0,0 +1,269 @@
+"""
+CYBER KILL CHAIN ANALYZER - INDICE DEI LOG
+
+Indice immutabile costruito una sola volta al caricamento del modulo:
+- un pool (tuple) di log per ogni livello di difficoltà
+- la vista sanitizzata di ogni log, quella che viene inviata al client
+- la stessa vista già codificata in JSON e compressa (PrecompressedPayload),
+  pronta per la risposta
+
+Scegliere un log diventa un singolo accesso casuale a un array già pronto,
+indipendente dalla dimensione del database dei log. Con deal() e il mazzo
+della sessione (models/log_deck.py) i log non si ripetono finché la fase
+non è esaurita.
+
+LogCorpus è l'interfaccia comune anche ai corpus esterni su disco
+(vedi models/corpus.py), che non vengono mai caricati interamente in memoria.
+"""
+
+import json
+import random
+from types import MappingProxyType
+
+from models.game_data import LOGS_DATABASE, DIFFICULTY_CONFIG
+from utils.compression import PrecompressedPayload
+from utils.helpers import sanitize_log_data
+
+def encode_json(data):
+    """
+    Codifica un oggetto in JSON compatto UTF-8
+
+    Args:
+        data: Oggetto serializzabile in JSON
+
+    Returns:
+        bytes: JSON codificato
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class LogCorpus:
+    """
+    Interfaccia comune delle sorgenti di log di sicurezza
+    I log di ogni fase sono indirizzabili per posizione (0..phase_size-1);
+    il pool di una difficoltà è la concatenazione delle sue fasi
+    """
+
+    def __init__(self, difficulty_config):
+        """
+        Args:
+            difficulty_config (dict): Configurazione dei livelli (come DIFFICULTY_CONFIG)
+        """
+        self._difficulty_phases = {
+            difficulty: tuple(config['phases'])
+            for difficulty, config in difficulty_config.items()
+        }
+
+    def pick(self, difficulty, rng=random):
+        """
+        Sceglie casualmente un log dal pool della difficoltà indicata
+
+        Args:
+            difficulty (str): Livello di difficoltà (già validato)
+            rng: Generatore casuale (default: modulo random)
+
+        Returns:
+            Mapping: Log completo in sola lettura, o None se il pool è vuoto
+        """
+        size = self.pool_size(difficulty)
+        if not size:
+            return None
+        return self.log_at(difficulty, rng.randrange(size))
+
+    def pick_phase(self, phase, rng=random):
+        """
+        Sceglie casualmente un log della fase indicata
+
+        Returns:
+            Mapping: Log completo in sola lettura, o None se la fase non ha log
+        """
+        size = self.phase_size(phase)
+        if not size:
+            return None
+        return self.phase_log_at(phase, rng.randrange(size))
+
+    def deal(self, difficulty, deck, rng=random):
+        """
+        Come pick(), ma senza ripetere i log già distribuiti con lo stesso mazzo:
+        la fase è scelta in proporzione ai log non ancora visti e la posizione
+        dal mazzo della fase; esaurito il pool, tutte le fasi si rimescolano
+
+        Args:
+            difficulty (str): Livello di difficoltà (già validato)
+            deck (LogDeck): Mazzo della sessione (viene aggiornato)
+            rng: Generatore casuale (default: modulo random)
+
+        Returns:
+            Mapping: Log completo in sola lettura, o None se il pool è vuoto
+        """
+        phases = self._difficulty_phases.get(difficulty, ())
+        sizes = [self.phase_size(phase) for phase in phases]
+        weights = [deck.remaining(phase, size) for phase, size in zip(phases, sizes)]
+        if not sum(weights):
+            # Pool esaurito: nuovo giro per tutte le fasi della difficoltà insieme
+            for phase, size in zip(phases, sizes):
+                deck.shuffle(phase, size, rng)
+            weights = sizes
+        total = sum(weights)
+        if not total:
+            return None
+        choice = rng.randrange(total)
+        for phase, size, weight in zip(phases, sizes, weights):
+            if choice < weight:
+                return self.phase_log_at(phase, deck.draw(phase, size, rng))
+            choice -= weight
+
+    def pool_size(self, difficulty):
+        """
+        Returns:
+            int: Numero di log disponibili per la difficoltà indicata
+        """
+        return sum(self.phase_size(phase) for phase in self._difficulty_phases.get(difficulty, ()))
+
+    def log_at(self, difficulty, position):
+        """
+        Returns:
+            Mapping: Log in posizione position nel pool della difficoltà
+        """
+        for phase in self._difficulty_phases[difficulty]:
+            size = self.phase_size(phase)
+            if position < size:
+                return self.phase_log_at(phase, position)
+            position -= size
+        raise IndexError(position)
+
+    def phase_size(self, phase):
+        """
+        Returns:
+            int: Numero di log della fase indicata
+        """
+        raise NotImplementedError
+
+    def phase_log_at(self, phase, position):
+        """
+        Returns:
+            Mapping: Log in posizione position tra quelli della fase
+        """
+        raise NotImplementedError
+
+    def iter_phase_logs(self, phase, start=0):
+        """
+        Scorre i log di una fase a partire da una posizione
+
+        Yields:
+            Mapping: Log della fase, dalla posizione start in poi
+        """
+        for position in range(start, self.phase_size(phase)):
+            yield self.phase_log_at(phase, position)
+
+    def refresh(self):
+        """Rilegge i log aggiunti da altri processi (nessuna operazione per i corpus in memoria)"""
+
+    def get(self, log_id):
+        """
+        Returns:
+            Mapping: Log completo in sola lettura, o None se l'ID non esiste
+        """
+        raise NotImplementedError
+
+    def client_view(self, log_id):
+        """
+        Returns:
+            Mapping: Log senza i campi che rivelano la risposta
+        """
+        raise NotImplementedError
+
+    def client_payload(self, log_id):
+        """
+        Returns:
+            PrecompressedPayload: Vista client del log già codificata in JSON e compressa
+        """
+        raise NotImplementedError
+
+class LogIndex(LogCorpus):
+    """
+    Indice in sola lettura dei log di sicurezza, organizzato per difficoltà
+    """
+
+    def __init__(self, logs_database, difficulty_config):
+        """
+        Args:
+            logs_database (dict): Log raggruppati per fase (come LOGS_DATABASE)
+            difficulty_config (dict): Configurazione dei livelli (come DIFFICULTY_CONFIG)
+        """
+        super().__init__(difficulty_config)
+        by_id = {}
+        by_phase = {}
+        client_views = {}
+        client_payloads = {}
+
+        for phase, logs in logs_database.items():
+            phase_logs = []
+            for log in logs:
+                log_view = MappingProxyType(dict(log))
+                client_view = sanitize_log_data(log)
+
+                by_id[log['id']] = log_view
+                client_views[log['id']] = MappingProxyType(client_view)
+                client_payloads[log['id']] = PrecompressedPayload(encode_json(client_view))
+                phase_logs.append(log_view)
+            by_phase[phase] = tuple(phase_logs)
+
+        # Un pool per difficoltà, nell'ordine delle fasi della configurazione
+        pools = {}
+        for difficulty, config in difficulty_config.items():
+            pools[difficulty] = tuple(
+                log for phase in config['phases'] for log in by_phase.get(phase, ())
+            )
+
+        self._by_id = MappingProxyType(by_id)
+        self._by_phase = MappingProxyType(by_phase)
+        self._client_views = MappingProxyType(client_views)
+        self._client_payloads = MappingProxyType(client_payloads)
+        self._pools = MappingProxyType(pools)
+
+    def pick(self, difficulty, rng=random):
+        pool = self._pools.get(difficulty, ())
+        if not pool:
+            return None
+        return pool[rng.randrange(len(pool))]
+
+    def pool_size(self, difficulty):
+        return len(self._pools.get(difficulty, ()))
+
+    def log_at(self, difficulty, position):
+        return self._pools[difficulty][position]
+
+    def phase_size(self, phase):
+        return len(self._by_phase.get(phase, ()))
+
+    def phase_log_at(self, phase, position):
+        return self._by_phase[phase][position]
+
+    def get(self, log_id):
+        return self._by_id.get(log_id)
+
+    def client_view(self, log_id):
+        return self._client_views.get(log_id)
+
+    def client_payload(self, log_id):
+        return self._client_payloads.get(log_id)
+
+    def pool(self, difficulty):
+        """
+        Returns:
+            tuple: Tutti i log disponibili per la difficoltà indicata
+        """
+        return self._pools.get(difficulty, ())
+
+    def phase_logs(self, phase):
+        """
+        Returns:
+            tuple: Tutti i log della fase indicata
+        """
+        return self._by_phase.get(phase, ())
+
+    def __len__(self):
+        return len(self._by_id)
+
+# Indice costruito una sola volta all'avvio dai dati statici del gioco
+LOG_INDEX = LogIndex(LOGS_DATABASE, DIFFICULTY_CONFIG)
@@ -0,0 +1,546 @@
+"""
+CYBER KILL CHAIN ANALYZER - IMPORTAZIONE DI LOG REALI
+
+Trasforma telemetria reale in log del corpus (stesso schema di LOGS_DATABASE):
+- syslog: righe RFC 3164 (anche con timestamp ISO di rsyslog) e RFC 5424
+- sysmon: eventi Sysmon esportati da EVTX in XML (wevtutil qe /f:xml,
+  Get-WinEvent ... ToXml()), uno dopo l'altro o dentro <Events>
+- zeek: log TSV di Zeek con intestazione (#separator, #fields, #path, ...)
+
+I record che corrispondono a una regola di models/log_rules.py diventano
+log con fase, fonte, gravità, spiegazione e indicatori della regola; gli
+altri vengono contati e scartati.
+
+Memoria limitata con file di qualsiasi dimensione:
+1. ogni file è diviso in blocchi di chunk_bytes che finiscono alla fine di
+   un record (a capo, o </Event> per Sysmon), senza leggerlo tutto
+2. i blocchi vengono analizzati da un pool di processi; al massimo
+   2 * workers blocchi sono in lavorazione o in attesa di essere consumati
+3. i log escono da un generatore nell'ordine dei file, qualunque sia il
+   numero di processi (stesse posizioni nel corpus a ogni importazione)
+
+Gli ID dei log derivano dal contenuto del record: importare due volte lo
+stesso file non crea duplicati nel corpus.
+
+Il corpus si costruisce con tools/build_corpus.py (--syslog, --sysmon, --zeek).
+"""
+
+import hashlib
+import html
+import multiprocessing
+import os
+import re
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from models.log_rules import LOG_RULES
+
+FORMATS = ('syslog', 'sysmon', 'zeek')
+
+# Dimensione predefinita dei blocchi analizzati da ogni processo
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Separatore dei record: i blocchi terminano subito dopo
+_DELIMITERS = {'syslog': b'\n', 'sysmon': b'</Event>', 'zeek': b'\n'}
+
+# ============================================================================
+# REGOLE
+# ============================================================================
+
+class _Placeholders(dict):
+    """Metadata per i segnaposto di spiegazioni e indicatori ('?' se mancano)"""
+
+    def __missing__(self, key):
+        return '?'
+
+class LogRule:
+    """
+    Regola di models/log_rules.py compilata
+    """
+
+    __slots__ = ('key', 'format', 'event', 'match', 'minimum',
+                 'phase', 'source', 'severity', 'explanation', 'indicators')
+
+    def __init__(self, rule):
+        self.key = rule['key']
+        self.format = rule['format']
+        self.event = rule.get('event')
+        self.match = [(field, re.compile(pattern)) for field, pattern in rule['match'].items()]
+        self.minimum = list(rule.get('min', {}).items())
+        self.phase = rule['phase']
+        self.source = rule['source']
+        self.severity = rule['severity']
+        self.explanation = rule['explanation']
+        self.indicators = rule['indicators']
+
+    def apply(self, fields):
+        """
+        Args:
+            fields (dict): Campi del record (stringhe)
+
+        Returns:
+            dict: Gruppi con nome catturati dalle espressioni, o None se la regola non corrisponde
+        """
+        captured = {}
+        for field, pattern in self.match:
+            value = fields.get(field)
+            if value is None:
+                return None
+            found = pattern.search(value)
+            if found is None:
+                return None
+            captured.update(found.groupdict())
+        for field, minimum in self.minimum:
+            try:
+                if float(fields.get(field)) < minimum:
+                    return None
+            except (TypeError, ValueError):
+                return None
+        return captured
+
+    def make_log(self, record_format, raw, timestamp, metadata):
+        """
+        Returns:
+            dict: Log del corpus con ID derivato dal contenuto del record
+        """
+        digest = hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+        return {
+            'id': f'{record_format}-{digest}',
+            'raw': raw,
+            'source': self.source,
+            'severity': self.severity,
+            'timestamp': timestamp,
+            'metadata': metadata,
+            'explanation': self.explanation.format_map(_Placeholders(metadata)),
+            'phase': self.phase,
+            'indicators': list(self.indicators)
+        }
+
+def _compile_rules(rules):
+    """
+    Returns:
+        dict: formato -> {evento -> regole}, con None per le regole senza evento
+    """
+    compiled = {record_format: {} for record_format in FORMATS}
+    for rule in rules:
+        rule = LogRule(rule)
+        compiled[rule.format].setdefault(rule.event, []).append(rule)
+    return compiled
+
+_RULES = _compile_rules(LOG_RULES)
+
+@lru_cache(maxsize=None)
+def rules_for(record_format, event=None):
+    """
+    Returns:
+        tuple: Regole dell'evento seguite da quelle valide per tutti gli eventi del formato
+    """
+    by_event = _RULES[record_format]
+    return tuple(by_event.get(event, ()) if event is not None else ()) + tuple(by_event.get(None, ()))
+
+def classify(rules, fields):
+    """
+    Applica la prima regola che corrisponde al record
+
+    Args:
+        rules (tuple): Regole candidate (rules_for, syslog_rules)
+        fields (dict): Campi del record
+
+    Returns:
+        tuple: (regola, metadata con i gruppi catturati), o None se nessuna regola corrisponde
+    """
+    for rule in rules:
+        captured = rule.apply(fields)
+        if captured is not None:
+            metadata = dict(fields)
+            metadata.update((name, value) for name, value in captured.items() if value is not None)
+            return rule, metadata
+    return None
+
+# Valori interi nei metadata di syslog e Sysmon (Zeek usa #types)
+_INTEGER_FIELDS = ('_port', '_id', 'pid', 'uid')
+
+def _typed(metadata):
+    for name, value in metadata.items():
+        if name.endswith(_INTEGER_FIELDS) and isinstance(value, str) and value.isdigit():
+            metadata[name] = int(value)
+    return metadata
+
+# ============================================================================
+# SYSLOG
+# ============================================================================
+
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1
+)}
+
+# <PRI>1 TIMESTAMP HOST APP PROCID MSGID [SD] MSG
+_SYSLOG_5424 = re.compile(
+    r'<\d{1,3}>1 (\S+) (\S+) (\S+) (\S+) \S+ (?:-|(?:\[(?:[^\]\\]|\\.)*\])+) ?(.*)'
+)
+# [<PRI>]Mmm dd hh:mm:ss (o ISO 8601) HOST PROGRAM[PID]: MSG
+_SYSLOG_3164 = re.compile(
+    r'(?:<\d{1,3}>)?([A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d|\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\S*) '
+    r'(\S+) ([^\s:\[]+)(?:\[(\d+)\])?: ?(.*)'
+)
+
+@lru_cache(maxsize=4096)
+def syslog_rules(program):
+    """
+    Returns:
+        tuple: Regole syslog il cui campo program accetta il programma
+            (le righe degli altri programmi vengono scartate senza analizzarle)
+    """
+    return tuple(
+        rule for rule in rules_for('syslog')
+        if all(pattern.search(program) for field, pattern in rule.match if field == 'program')
+    )
+
+def _syslog_timestamp(value, year):
+    if value[4] == '-':
+        return f'{value[:10]} {value[11:19]}'
+    return f'{year:04d}-{_MONTHS.get(value[:3], 1):02d}-{int(value[4:6]):02d} {value[7:15]}'
+
+def _split_syslog_line(line):
+    """
+    Returns:
+        tuple: (timestamp, host, program, pid, message), o None se la riga non è syslog
+    """
+    found = _SYSLOG_3164.match(line)
+    if found is None:
+        found = _SYSLOG_5424.match(line)
+        if found is None:
+            return None
+    parts = found.groups()
+    return parts if parts[3] != '-' else parts[:3] + (None, parts[4])
+
+def _syslog_fields(host, program, pid, message):
+    fields = {'host': host, 'program': program, 'message': message}
+    if pid:
+        fields['pid'] = pid
+    return fields
+
+def parse_syslog_line(line, year):
+    """
+    Args:
+        line (str): Riga syslog
+        year (int): Anno dei timestamp RFC 3164, che non lo indicano
+
+    Returns:
+        tuple: (timestamp, campi host/program/pid/message), o None se la riga non è syslog
+    """
+    parts = _split_syslog_line(line) if line else None
+    if parts is None:
+        return None
+    return _syslog_timestamp(parts[0], year), _syslog_fields(*parts[1:])
+
+def _parse_syslog_chunk(text, year):
+    logs = []
+    records = 0
+    for line in text.splitlines():
+        if not line:
+            continue
+        records += 1
+        parts = _split_syslog_line(line)
+        if parts is None:
+            continue
+        rules = syslog_rules(parts[2])
+        if not rules:
+            continue
+        classified = classify(rules, _syslog_fields(*parts[1:]))
+        if classified is None:
+            continue
+        rule, metadata = classified
+        # Il messaggio è già nel testo del log
+        del metadata['message']
+        timestamp = _syslog_timestamp(parts[0], year)
+        logs.append(rule.make_log('syslog', line.strip(), timestamp, _typed(metadata)))
+    return logs, records
+
+# ============================================================================
+# SYSMON (XML ESPORTATO DA EVTX)
+# ============================================================================
+
+_SYSMON_PROVIDER = 'Microsoft-Windows-Sysmon'
+_SYSMON_EVENT_ID = re.compile(r'<EventID(?:\s[^>]*)?>(\d+)</EventID>')
+_SYSMON_TIME = re.compile(r'<TimeCreated\s+SystemTime=["\']([^"\']+)')
+_SYSMON_COMPUTER = re.compile(r'<Computer>([^<]*)</Computer>')
+_SYSMON_DATA = re.compile(r'<Data\s+Name=["\']([^"\']+)["\']\s*(?:/>|>([^<]*)</Data>)')
+
+_SYSMON_EVENT_NAMES = {
+    1: 'Process Create', 3: 'Network connection', 7: 'Image loaded', 8: 'CreateRemoteThread',
+    10: 'Process accessed', 11: 'File created', 12: 'Registry object added or deleted',
+    13: 'Registry value set', 15: 'File stream created', 22: 'Dns query', 23: 'File Delete archived'
+}
+
+# Campi di servizio che non aiutano l'analisi
+_SYSMON_SKIPPED = frozenset((
+    'RuleName', 'UtcTime', 'ProcessGuid', 'ParentProcessGuid', 'SourceProcessGUID',
+    'TargetProcessGUID', 'SourceProcessGuid', 'TargetProcessGuid', 'LogonGuid', 'LogonId',
+    'TerminalSessionId', 'CallTrace'
+))
+
+@lru_cache(maxsize=1024)
+def _snake_case(name):
+    """CommandLine -> command_line, DestinationIp -> destination_ip"""
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name).lower()
+
+def parse_sysmon_event(event_xml):
+    """
+    Args:
+        event_xml (str): Un elemento <Event> Sysmon (anche senza il tag di chiusura)
+
+    Returns:
+        tuple: (EventID, timestamp, campi in snake_case), o None se non è un evento Sysmon
+    """
+    if _SYSMON_PROVIDER not in event_xml:
+        return None
+    found = _SYSMON_EVENT_ID.search(event_xml)
+    if found is None:
+        return None
+    event_id = int(found.group(1))
+    found = _SYSMON_TIME.search(event_xml)
+    timestamp = f'{found.group(1)[:10]} {found.group(1)[11:19]}' if found else ''
+    fields = {}
+    found = _SYSMON_COMPUTER.search(event_xml)
+    if found:
+        fields['computer'] = found.group(1)
+    for name, value in _SYSMON_DATA.findall(event_xml):
+        if value and name not in _SYSMON_SKIPPED:
+            fields[_snake_case(name)] = html.unescape(value) if '&' in value else value
+    return event_id, timestamp, fields
+
+def _parse_sysmon_chunk(text, _):
+    logs = []
+    records = 0
+    # L'ultimo pezzo segue l'ultimo </Event> (</Events> o spazi)
+    for event_xml in text.split('</Event>')[:-1]:
+        records += 1
+        found = _SYSMON_EVENT_ID.search(event_xml)
+        # Solo gli eventi per cui esistono regole vengono analizzati per intero
+        if found is None or not rules_for('sysmon', int(found.group(1))):
+            continue
+        parsed = parse_sysmon_event(event_xml)
+        if parsed is None:
+            continue
+        event_id, timestamp, fields = parsed
+        classified = classify(rules_for('sysmon', event_id), fields)
+        if classified is None:
+            continue
+        rule, metadata = classified
+        metadata['event_id'] = event_id
+        summary = ' '.join(f'{name}={value}' for name, value in fields.items())
+        raw = f'{timestamp} [Sysmon] Event {event_id} ({_SYSMON_EVENT_NAMES.get(event_id, "Sysmon")}): {summary}'
+        logs.append(rule.make_log('sysmon', raw, timestamp, _typed(metadata)))
+    return logs, records
+
+# ============================================================================
+# ZEEK (TSV)
+# ============================================================================
+
+# Nomi dei campi delle connessioni come nei metadata di LOGS_DATABASE
+_ZEEK_NAMES = {
+    'id.orig_h': 'source_ip', 'id.orig_p': 'source_port',
+    'id.resp_h': 'destination_ip', 'id.resp_p': 'destination_port'
+}
+_ZEEK_INTEGER_TYPES = frozenset(('count', 'int', 'port'))
+
+def _zeek_header_line(header, line):
+    """Aggiorna l'intestazione con una riga #chiave valore"""
+    key, _, value = line[1:].partition(' ' if line.startswith('#separator') else header['separator'])
+    if key == 'separator':
+        header['separator'] = value.encode('latin-1').decode('unicode_escape')
+    elif key == 'fields':
+        header['fields'] = [_ZEEK_NAMES.get(name, name.replace('.', '_')) for name in value.split(header['separator'])]
+    elif key == 'types':
+        header['types'] = value.split(header['separator'])
+    elif key in ('path', 'unset_field', 'empty_field'):
+        header[key] = value
+
+def read_zeek_header(path):
+    """
+    Legge l'intestazione di un log Zeek (le righe # iniziali)
+
+    Returns:
+        dict: separator, fields, types, path, unset_field, empty_field
+    """
+    header = {'separator': '\t', 'fields': [], 'types': [], 'path': '', 'unset_field': '-', 'empty_field': '(empty)'}
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            _zeek_header_line(header, line.rstrip('\n'))
+    return header
+
+def _zeek_rule_fields(rules, names):
+    """
+    Returns:
+        list: (nome, posizione) dei campi letti dalle regole, presenti nell'intestazione
+    """
+    used = {field for rule in rules for field, _ in rule.match}
+    used.update(field for rule in rules for field, _ in rule.minimum)
+    return [(name, position) for position, name in enumerate(names) if name in used]
+
+def _parse_zeek_chunk(text, header):
+    logs = []
+    records = 0
+    header = dict(header)
+    rules = rules_for('zeek', header['path'])
+    used = _zeek_rule_fields(rules, header['fields'])
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith('#'):
+            # Intestazione ripetuta (log concatenati)
+            _zeek_header_line(header, line)
+            rules = rules_for('zeek', header['path'])
+            used = _zeek_rule_fields(rules, header['fields'])
+            continue
+        records += 1
+        if not rules:
+            continue
+        values = line.split(header['separator'])
+        if len(values) != len(header['fields']):
+            continue
+        unset, empty = header['unset_field'], header['empty_field']
+        # Prima solo i campi delle regole: il record completo serve solo se una regola corrisponde
+        if classify(rules, {name: values[position] for name, position in used
+                            if values[position] != unset and values[position] != empty}) is None:
+            continue
+        fields = {name: value for name, value in zip(header['fields'], values)
+                  if value != unset and value != empty}
+        rule, metadata = classify(rules, fields)
+        ts = metadata.pop('ts', None)
+        try:
+            timestamp = datetime.fromtimestamp(float(ts), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            timestamp = ''
+        for name, field_type in zip(header['fields'], header['types']):
+            if field_type in _ZEEK_INTEGER_TYPES and name in metadata and metadata[name].isdigit():
+                metadata[name] = int(metadata[name])
+        summary = ' '.join(f'{name}={value}' for name, value in fields.items() if name != 'ts')
+        raw = f'{timestamp} [Zeek {header["path"]}] {summary}'
+        logs.append(rule.make_log('zeek', raw, timestamp, metadata))
+    return logs, records
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+_CHUNK_PARSERS = {
+    'syslog': _parse_syslog_chunk,
+    'sysmon': _parse_sysmon_chunk,
+    'zeek': _parse_zeek_chunk
+}
+
+def _record_boundary(f, offset, delimiter, size):
+    """
+    Returns:
+        int: Posizione subito dopo il primo separatore da offset in poi (o fine del file)
+    """
+    if offset >= size:
+        return size
+    f.seek(offset)
+    tail = b''
+    while True:
+        block = f.read(64 * 1024)
+        if not block:
+            return size
+        window = tail + block
+        found = window.find(delimiter)
+        if found >= 0:
+            return offset - len(tail) + found + len(delimiter)
+        offset += len(block)
+        tail = window[len(window) - len(delimiter) + 1:]
+
+def chunk_ranges(path, chunk_bytes, delimiter):
+    """
+    Divide il file in blocchi di circa chunk_bytes che finiscono alla fine di un record
+
+    Yields:
+        tuple: (inizio, fine) in byte
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            end = _record_boundary(f, start + chunk_bytes, delimiter, size)
+            yield start, end
+            start = end
+
+def parse_chunk(task):
+    """
+    Analizza un blocco di un file (eseguita nei processi del pool)
+
+    Args:
+        task (tuple): (formato, percorso, inizio, fine, contesto del formato)
+
+    Returns:
+        tuple: (log, record letti, byte letti)
+    """
+    record_format, path, start, end, context = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    logs, records = _CHUNK_PARSERS[record_format](data.decode('utf-8', 'replace'), context)
+    return logs, records, len(data)
+
+def _chunk_tasks(record_format, paths, chunk_bytes, year):
+    for path in paths:
+        context = read_zeek_header(path) if record_format == 'zeek' else year
+        for start, end in chunk_ranges(path, chunk_bytes, _DELIMITERS[record_format]):
+            yield record_format, path, start, end, context
+
+def _bounded_map(function, tasks, workers):
+    """
+    Come Pool.imap, ma con al massimo 2 * workers risultati in lavorazione o
+    in attesa: un consumatore lento non fa accumulare blocchi in memoria
+
+    Yields:
+        Risultati nell'ordine dei task
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(function, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def parse_files(record_format, paths, workers=1, chunk_bytes=DEFAULT_CHUNK_BYTES, year=None, stats=None):
+    """
+    Analizza i file in blocchi paralleli e restituisce i log classificati
+
+    Args:
+        record_format (str): 'syslog', 'sysmon' o 'zeek'
+        paths (list): File da importare
+        workers (int): Processi che analizzano i blocchi (1: nel processo corrente)
+        chunk_bytes (int): Dimensione dei blocchi
+        year (int): Anno dei timestamp syslog RFC 3164 (default: anno corrente)
+        stats (dict): Se indicato, riceve byte, record letti e log prodotti
+
+    Yields:
+        dict: Log nello schema di LOGS_DATABASE, nell'ordine dei file
+
+    Raises:
+        ValueError: Se il formato non è supportato
+    """
+    if record_format not in FORMATS:
+        raise ValueError(f"Unsupported log format: {record_format}")
+    year = year or datetime.now(timezone.utc).year
+    stats = stats if stats is not None else {}
+    for key in ('bytes', 'records', 'logs'):
+        stats.setdefault(key, 0)
+
+    tasks = _chunk_tasks(record_format, paths, max(1, chunk_bytes), year)
+    for logs, records, size in _bounded_map(parse_chunk, tasks, workers):
+        stats['bytes'] += size
+        stats['records'] += records
+        stats['logs'] += len(logs)
+        yield from logs
@@ -0,0 +1,431 @@
+"""
+CYBER KILL CHAIN ANALYZER - REGOLE DI CLASSIFICAZIONE DEI LOG REALI
+
+Regole con cui models/log_parsers.py trasforma i record di syslog, Sysmon
+(XML esportato da EVTX) e Zeek (TSV) in log del corpus. Ogni regola contiene:
+- key: identificatore stabile della regola
+- format: 'syslog', 'sysmon' o 'zeek'
+- event: EventID Sysmon o nome del log Zeek (#path) a cui si applica (facoltativo)
+- match: campo -> espressione regolare cercata nel valore (tutte devono
+  trovare corrispondenza); i gruppi con nome finiscono nei metadata
+- min: campo -> valore numerico minimo (facoltativo)
+- phase, source, severity: come nei log di LOGS_DATABASE
+- explanation e indicators: come nei log di LOGS_DATABASE, con segnaposto
+  {campo} riempiti dai metadata del record
+
+I nomi dei campi sono quelli dei metadata: snake_case per Sysmon
+(CommandLine -> command_line), source_ip/source_port/destination_ip/
+destination_port per gli indirizzi delle connessioni Zeek, host/program/pid/
+message per syslog. Vale la prima regola che corrisponde; i record che non
+corrispondono a nessuna regola non diventano scenari.
+
+La fase di weaponization avviene sui sistemi dell'attaccante e non lascia
+tracce in questa telemetria: i suoi log restano quelli scritti a mano e
+quelli sintetici.
+"""
+
+# Indirizzi esterni: né privati né di loopback
+EXTERNAL_IP = r'^(?!10\.|192\.168\.|172\.(?:1[6-9]|2\d|3[01])\.|127\.|::1$|fe80:)[\da-fA-F.:]+$'
+
+# Etichette DNS lunghe, tipiche dei dati codificati nei tunnel DNS
+ENCODED_DNS_LABEL = r'^[A-Za-z0-9_-]{40,}\.'
+
+LOG_RULES = [
+    # --- SYSLOG ---
+    {
+        'key': 'syslog-firewall-block',
+        'format': 'syslog',
+        'match': {
+            'program': r'^kernel$',
+            'message': r'(?:UFW BLOCK|DROP|REJECT).*?\bSRC=(?P<source_ip>\S+) DST=(?P<destination_ip>\S+)'
+                       r'.*?\bPROTO=(?P<protocol>\w+).*?\bDPT=(?P<destination_port>\d+)',
+        },
+        'phase': 'reconnaissance',
+        'source': 'Log Firewall',
+        'severity': 'Bassa',
+        'explanation': 'Connessioni bloccate da {source_ip} verso porte come la {destination_port} servono '
+                       'all\'attaccante per scoprire quali servizi sono esposti: è la fase di ricognizione.',
+        'indicators': ['Connessione bloccata dal firewall', 'Sondaggio delle porte', 'Sorgente esterna'],
+    },
+    {
+        'key': 'syslog-mail-infected',
+        'format': 'syslog',
+        'match': {
+            'program': r'^(?:amavis|amavisd|clamsmtpd|postfix/\w+)$',
+            'message': r'Blocked (?:INFECTED|BANNED) \((?P<signature>[^)]+)\).*?<(?P<sender>[^>]*)> -> <(?P<recipient>[^>]*)>',
+        },
+        'phase': 'delivery',
+        'source': 'Gateway di Sicurezza Email',
+        'severity': 'Alta',
+        'explanation': 'Un allegato dannoso ({signature}) inviato da {sender} a {recipient} è il tentativo '
+                       'di consegnare il carico alla vittima.',
+        'indicators': ['Allegato infetto', 'Email in ingresso bloccata', 'Firma antivirus'],
+    },
+    {
+        'key': 'syslog-download-exec',
+        'format': 'syslog',
+        'match': {
+            'program': r'^sudo$',
+            'message': r'COMMAND=(?P<command>.*\b(?:curl|wget)\s.*(?:\|\s*(?:ba|z)?sh\b|chmod \+x).*)$',
+        },
+        'phase': 'delivery',
+        'source': 'Syslog',
+        'severity': 'Alta',
+        'explanation': 'Un comando che scarica uno script e lo esegue subito ({command}) porta il codice '
+                       'dell\'attaccante sul sistema: è la fase di consegna.',
+        'indicators': ['Download con curl/wget', 'Esecuzione diretta dello script', 'Privilegi di root'],
+    },
+    {
+        'key': 'syslog-ssh-bruteforce',
+        'format': 'syslog',
+        'match': {
+            'program': r'^sshd$',
+            'message': r'Failed password for (?:invalid user )?(?P<user>\S+) from (?P<source_ip>\S+) port (?P<source_port>\d+)',
+        },
+        'phase': 'exploitation',
+        'source': 'Syslog',
+        'severity': 'Media',
+        'explanation': 'Tentativi di accesso SSH come {user} da {source_ip} cercano di sfruttare password '
+                       'deboli per entrare nel sistema.',
+        'indicators': ['Accesso SSH fallito', 'Attacco a forza bruta', 'Sorgente esterna'],
+    },
+    {
+        'key': 'syslog-web-attack',
+        'format': 'syslog',
+        'match': {
+            'program': r'^(?:nginx|httpd|apache2?)$',
+            'message': r'(?i)^(?P<source_ip>\S+) .*?"(?:GET|POST|PUT|HEAD) (?P<uri>\S*(?:\.\./|%2e%2e%2f|'
+                       r'union(?:\s|%20|\+)+select|\$\{jndi:|/etc/passwd)\S*)',
+        },
+        'phase': 'exploitation',
+        'source': 'Log Server Web',
+        'severity': 'Alta',
+        'explanation': 'La richiesta {uri} da {source_ip} contiene un payload di attacco (path traversal, '
+                       'SQL injection o JNDI injection) contro l\'applicazione web.',
+        'indicators': ['Payload di exploit nell\'URL', 'Richiesta HTTP anomala', 'Applicazione web esposta'],
+    },
+    {
+        'key': 'syslog-user-added',
+        'format': 'syslog',
+        'match': {
+            'program': r'^useradd$',
+            'message': r'new user: name=(?P<user>[^,]+), UID=(?P<uid>\d+)',
+        },
+        'phase': 'installation',
+        'source': 'Syslog',
+        'severity': 'Alta',
+        'explanation': 'Un nuovo account ({user}, UID {uid}) creato fuori dalle procedure consente '
+                       'all\'attaccante di tornare sul sistema: è un meccanismo di persistenza.',
+        'indicators': ['Creazione di account', 'Persistenza', 'Modifica delle identità locali'],
+    },
+    {
+        'key': 'syslog-cron-edit',
+        'format': 'syslog',
+        'match': {
+            'program': r'^crontab$',
+            'message': r'^\((?P<user>[^)]+)\) (?:REPLACE|BEGIN EDIT) \((?P<target_user>[^)]+)\)',
+        },
+        'phase': 'installation',
+        'source': 'Syslog',
+        'severity': 'Media',
+        'explanation': 'La crontab di {target_user} modificata da {user} può eseguire periodicamente '
+                       'il codice dell\'attaccante: è un meccanismo di persistenza.',
+        'indicators': ['Modifica della crontab', 'Esecuzione pianificata', 'Persistenza'],
+    },
+
+    # --- SYSMON ---
+    {
+        'key': 'sysmon-mark-of-the-web',
+        'format': 'sysmon',
+        'event': 15,
+        'match': {
+            'target_filename': r'(?i)\.(?:exe|dll|scr|js|vbs|hta|iso|img|lnk|docm|xlsm|zip):Zone\.Identifier$',
+            'contents': r'ZoneId=3',
+        },
+        'phase': 'delivery',
+        'source': 'Sysmon',
+        'severity': 'Media',
+        'explanation': 'Il file {target_filename} è appena arrivato da Internet (Zone.Identifier con ZoneId=3) '
+                       'ed è di un tipo eseguibile: è la consegna del carico sull\'host {computer}.',
+        'indicators': ['File scaricato da Internet', 'Tipo di file eseguibile', 'Mark of the Web'],
+    },
+    {
+        'key': 'sysmon-download-executable',
+        'format': 'sysmon',
+        'event': 11,
+        'match': {
+            'image': r'(?i)\\(?:chrome|msedge|firefox|iexplore|outlook)\.exe$',
+            'target_filename': r'(?i)\.(?:exe|dll|scr|js|vbs|hta|iso|img|lnk|docm|xlsm)$',
+        },
+        'phase': 'delivery',
+        'source': 'Sysmon',
+        'severity': 'Media',
+        'explanation': 'Browser o client di posta hanno salvato {target_filename}, un file eseguibile: '
+                       'è il modo in cui il carico raggiunge l\'utente.',
+        'indicators': ['File eseguibile scaricato', 'Browser o client di posta', 'Consegna del carico'],
+    },
+    {
+        'key': 'sysmon-office-child',
+        'format': 'sysmon',
+        'event': 1,
+        'match': {
+            'parent_image': r'(?i)\\(?:winword|excel|powerpnt|outlook|mspub)\.exe$',
+            'image': r'(?i)\\(?:cmd|powershell|pwsh|wscript|cscript|mshta|rundll32|regsvr32)\.exe$',
+        },
+        'phase': 'exploitation',
+        'source': 'Sysmon',
+        'severity': 'Critica',
+        'explanation': 'Un\'applicazione Office ({parent_image}) che avvia {image} indica l\'esecuzione di '
+                       'una macro o di un exploit nel documento aperto dall\'utente.',
+        'indicators': ['Processo figlio di Office', 'Interprete di comandi', 'Esecuzione di codice'],
+    },
+    {
+        'key': 'sysmon-shadow-copy-delete',
+        'format': 'sysmon',
+        'event': 1,
+        'match': {
+            'command_line': r'(?i)vssadmin(?:\.exe)?\s+delete\s+shadows|shadowcopy\s+delete|'
+                            r'bcdedit.*recoveryenabled\s+no|wbadmin(?:\.exe)?\s+delete',
+        },
+        'phase': 'actions_objectives',
+        'source': 'Sysmon',
+        'severity': 'Critica',
+        'explanation': 'La cancellazione delle copie shadow e dei backup ({command_line}) precede la cifratura '
+                       'dei dati da parte di un ransomware: l\'attaccante sta raggiungendo il suo obiettivo.',
+        'indicators': ['Cancellazione delle copie shadow', 'Backup disattivati', 'Preparazione del ransomware'],
+    },
+    {
+        'key': 'sysmon-persistence-command',
+        'format': 'sysmon',
+        'event': 1,
+        'match': {
+            'command_line': r'(?i)schtasks(?:\.exe)?\s+/create|\bsc(?:\.exe)?\s+create\s|'
+                            r'reg(?:\.exe)?\s+add\s+\S*\\CurrentVersion\\Run',
+        },
+        'phase': 'installation',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': 'Il comando {command_line} crea un\'attività pianificata, un servizio o una chiave Run '
+                       'per sopravvivere al riavvio: è la fase di installazione.',
+        'indicators': ['Attività pianificata o servizio', 'Meccanismo di persistenza', 'Comando da riga di comando'],
+    },
+    {
+        'key': 'sysmon-encoded-powershell',
+        'format': 'sysmon',
+        'event': 1,
+        'match': {
+            'image': r'(?i)\\(?:powershell|pwsh)\.exe$',
+            'command_line': r'(?i)\s-(?:e|ec|enc|encodedcommand)\s|downloadstring|downloadfile|\biex\b',
+        },
+        'phase': 'exploitation',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': 'PowerShell con comando codificato o download in memoria ({command_line}) esegue '
+                       'codice dell\'attaccante eludendo i controlli sui file.',
+        'indicators': ['PowerShell offuscato', 'Download in memoria', 'Esecuzione di codice'],
+    },
+    {
+        'key': 'sysmon-lsass-access',
+        'format': 'sysmon',
+        'event': 10,
+        'match': {
+            'target_image': r'(?i)\\lsass\.exe$',
+            'granted_access': r'(?i)^0x(?:1010|1410|143a|1fffff)$',
+        },
+        'phase': 'actions_objectives',
+        'source': 'Sysmon',
+        'severity': 'Critica',
+        'explanation': '{source_image} legge la memoria di lsass.exe per estrarre le credenziali degli utenti '
+                       'collegati: l\'attaccante sta raccogliendo credenziali per i suoi obiettivi.',
+        'indicators': ['Accesso alla memoria di LSASS', 'Furto di credenziali', 'Diritti di lettura del processo'],
+    },
+    {
+        'key': 'sysmon-startup-folder',
+        'format': 'sysmon',
+        'event': 11,
+        'match': {
+            'target_filename': r'(?i)\\Start Menu\\Programs\\Startup\\',
+        },
+        'phase': 'installation',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': 'Un file scritto in Esecuzione automatica ({target_filename}) parte a ogni accesso '
+                       'dell\'utente: è un meccanismo di persistenza.',
+        'indicators': ['Cartella di esecuzione automatica', 'Persistenza', 'File scritto da un processo utente'],
+    },
+    {
+        'key': 'sysmon-run-key',
+        'format': 'sysmon',
+        'event': 13,
+        'match': {
+            'target_object': r'(?i)\\CurrentVersion\\Run(?:Once)?\\|\\Winlogon\\(?:Userinit|Shell)$',
+        },
+        'phase': 'installation',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': 'La chiave {target_object} fa partire {details} a ogni avvio o accesso: '
+                       'è un meccanismo di persistenza nel registro.',
+        'indicators': ['Chiave Run del registro', 'Persistenza', 'Esecuzione all\'avvio'],
+    },
+    {
+        'key': 'sysmon-script-host-connection',
+        'format': 'sysmon',
+        'event': 3,
+        'match': {
+            'image': r'(?i)\\(?:powershell|pwsh|rundll32|regsvr32|mshta|wscript|cscript)\.exe$',
+            'initiated': r'(?i)^true$',
+            'destination_ip': EXTERNAL_IP,
+        },
+        'phase': 'command_control',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': '{image} che apre una connessione verso {destination_ip}:{destination_port} è tipico di '
+                       'un impianto che contatta il server di comando e controllo.',
+        'indicators': ['Connessione da un interprete di script', 'Destinazione esterna', 'Canale di comando'],
+    },
+    {
+        'key': 'sysmon-dns-encoded',
+        'format': 'sysmon',
+        'event': 22,
+        'match': {
+            'query_name': ENCODED_DNS_LABEL,
+        },
+        'phase': 'command_control',
+        'source': 'Sysmon',
+        'severity': 'Alta',
+        'explanation': 'La query DNS {query_name} di {image} contiene un\'etichetta lunga e codificata: '
+                       'i dati viaggiano nel DNS, un canale di comando e controllo nascosto.',
+        'indicators': ['Etichetta DNS codificata', 'Tunnel DNS', 'Canale di comando nascosto'],
+    },
+
+    # --- ZEEK ---
+    {
+        'key': 'zeek-scan-notice',
+        'format': 'zeek',
+        'event': 'notice',
+        'match': {
+            'note': r'^Scan::',
+        },
+        'phase': 'reconnaissance',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Media',
+        'explanation': 'Zeek ha rilevato una scansione ({note}): {msg}. L\'attaccante sta mappando '
+                       'host e servizi raggiungibili.',
+        'indicators': ['Scansione di rete', 'Enumerazione di host e porte', 'Notice di Zeek'],
+    },
+    {
+        'key': 'zeek-scanner-user-agent',
+        'format': 'zeek',
+        'event': 'http',
+        'match': {
+            'user_agent': r'(?i)nmap|nikto|sqlmap|masscan|zgrab|gobuster|dirbuster|wpscan|nuclei',
+        },
+        'phase': 'reconnaissance',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Bassa',
+        'explanation': 'Le richieste di {source_ip} con User-Agent "{user_agent}" vengono da uno scanner '
+                       'automatico che esplora {host}.',
+        'indicators': ['User-Agent di uno scanner', 'Enumerazione web', 'Sorgente esterna'],
+    },
+    {
+        'key': 'zeek-mail-attachment',
+        'format': 'zeek',
+        'event': 'files',
+        'match': {
+            'source': r'^SMTP$',
+            'mime_type': r'^application/(?:x-dosexec|vnd\.ms-|msword|x-iso9660-image|x-msdownload)',
+        },
+        'phase': 'delivery',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Alta',
+        'explanation': 'Un allegato email di tipo {mime_type} ({filename}) è il veicolo con cui il carico '
+                       'raggiunge la vittima.',
+        'indicators': ['Allegato eseguibile o Office', 'Trasferimento SMTP', 'Consegna via email'],
+    },
+    {
+        'key': 'zeek-executable-download',
+        'format': 'zeek',
+        'event': 'http',
+        'match': {
+            'resp_mime_types': r'application/(?:x-dosexec|x-msdownload|x-iso9660-image|vnd\.ms-office)',
+        },
+        'phase': 'delivery',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Media',
+        'explanation': 'L\'host {source_ip} ha scaricato {uri} da {host}, un file di tipo {resp_mime_types}: '
+                       'è la consegna del carico via web.',
+        'indicators': ['Download di un eseguibile', 'Traffico HTTP', 'Consegna via web'],
+    },
+    {
+        'key': 'zeek-ssh-password-guessing',
+        'format': 'zeek',
+        'event': 'notice',
+        'match': {
+            'note': r'^SSH::Password_Guessing$',
+        },
+        'phase': 'exploitation',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Media',
+        'explanation': '{msg}: tentativi ripetuti di indovinare le password SSH cercano di sfruttare '
+                       'credenziali deboli.',
+        'indicators': ['Password guessing SSH', 'Attacco a forza bruta', 'Notice di Zeek'],
+    },
+    {
+        'key': 'zeek-web-exploit',
+        'format': 'zeek',
+        'event': 'http',
+        'match': {
+            'uri': r'(?i)\.\./|%2e%2e%2f|union(?:\s|%20|\+)+select|\$\{jndi:|/etc/passwd|cmd\.exe',
+        },
+        'phase': 'exploitation',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Alta',
+        'explanation': 'La richiesta {method} {uri} da {source_ip} contiene un payload di attacco contro '
+                       'l\'applicazione web su {host}.',
+        'indicators': ['Payload di exploit nell\'URL', 'Richiesta HTTP anomala', 'Applicazione web esposta'],
+    },
+    {
+        'key': 'zeek-dns-encoded',
+        'format': 'zeek',
+        'event': 'dns',
+        'match': {
+            'query': ENCODED_DNS_LABEL,
+        },
+        'phase': 'command_control',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Alta',
+        'explanation': 'La query {query} di {source_ip} contiene un\'etichetta lunga e codificata: '
+                       'i dati viaggiano nel DNS, un canale di comando e controllo nascosto.',
+        'indicators': ['Etichetta DNS codificata', 'Tunnel DNS', 'Canale di comando nascosto'],
+    },
+    {
+        'key': 'zeek-self-signed-tls',
+        'format': 'zeek',
+        'event': 'ssl',
+        'match': {
+            'validation_status': r'self signed certificate',
+            'destination_ip': EXTERNAL_IP,
+        },
+        'phase': 'command_control',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Media',
+        'explanation': 'Una sessione TLS da {source_ip} verso {destination_ip}:{destination_port} con certificato '
+                       'autofirmato è tipica dei server di comando e controllo.',
+        'indicators': ['Certificato autofirmato', 'Destinazione esterna', 'Canale cifrato'],
+    },
+    {
+        'key': 'zeek-large-upload',
+        'format': 'zeek',
+        'event': 'conn',
+        'match': {
+            'destination_ip': EXTERNAL_IP,
+        },
+        'min': {'orig_bytes': 50_000_000},
+        'phase': 'actions_objectives',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': 'Critica',
+        'explanation': '{source_ip} ha inviato {orig_bytes} byte a {destination_ip}:{destination_port} in una '
+                       'sola connessione: è un possibile trasferimento all\'esterno dei dati rubati.',
+        'indicators': ['Grande volume in uscita', 'Destinazione esterna', 'Esfiltrazione dei dati'],
+    },
+]
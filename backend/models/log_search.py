@@ -0,0 +1,475 @@
+"""
+CYBER KILL CHAIN ANALYZER - RICERCA NEGLI SCENARI
+
+Indice invertito per cercare i log del corpus di base per parola chiave
+(/api/scenarios/search): "AMSI", "beaconing", un IP, un hash, un percorso.
+Serve agli insegnanti per trovare gli scenari senza scandire tutto il corpus.
+
+Testo indicizzato di ogni log: raw, valori dei metadata, indicators (peso 2)
+ed explanation. Tokenizzazione:
+- gli URL e i domini "disinnescati" vengono ripristinati (hxxp, [.], [dot], [:])
+- il testo viene diviso su spazi e separatori strutturali (/ \\ : @ ? & # = , ;
+  virgolette e parentesi): ogni parte è un termine, quindi IP, hash, nomi di
+  file (cmd.exe) e domini restano interi
+- le parti composte aggiungono anche le parole interne (cmd, exe) e, per i
+  domini, i domini superiori (mail.evil.com -> evil.com); gli IPv4 no
+Una query cerca i log che contengono tutte le sue parti, ordinati per BM25.
+
+Aggiornamento incrementale: i log di ogni fase hanno una posizione che non
+cambia e i nuovi log vengono aggiunti in coda (LogCorpus), quindi l'indice
+ricorda quante posizioni ha indicizzato per fase e a ogni ricerca indicizza
+solo quelle nuove. I corpus su disco vengono riletti (refresh) al massimo ogni
+LOG_SEARCH_REFRESH_SECONDS secondi (default 10), per vedere i log aggiunti da
+tools/build_corpus.py mentre il server è attivo.
+
+Memoria: ogni lista di documenti è un array di interi (documento << 4 | tf) e
+i termini presenti in un solo log, come IP e hash, occupano un intero e basta.
+Le ricerche non prendono lock: leggono solo i documenti già pubblicati.
+
+La paginazione usa un cursore opaco con l'ultimo risultato restituito
+(punteggio, fase, posizione) e il numero di log per fase alla prima pagina:
+i log aggiunti nel frattempo non entrano nelle pagine successive e non
+cambiano i punteggi, anche se la pagina successiva arriva a un altro worker.
+"""
+
+import base64
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+
+from models.corpus import get_log_corpus
+from models.game_data import CYBER_KILL_CHAIN_PHASES
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# TOKENIZZAZIONE
+# ============================================================================
+
+# Forme "disinnescate" di URL e domini nei report di threat intelligence
+_DEFANGED = re.compile(r'\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)|\[:\]|\[://\]|hxxp', re.IGNORECASE)
+_REFANGED = {
+    '[.]': '.', '(.)': '.', '{.}': '.', '[dot]': '.', '(dot)': '.',
+    '[:]': ':', '[://]': '://', 'hxxp': 'http'
+}
+
+# Parti del testo: tutto ciò che non è spazio o separatore strutturale
+_PART = re.compile(r'[^\s/\\:@?&#=,;|"\'`()\[\]{}<>]+')
+# Caratteri tolti all'inizio e alla fine di una parte (punteggiatura, opzioni -enc)
+_TRIM = '.-_*!+~%$'
+# Separatori interni delle parti composte
+_WORD_SEPARATORS = re.compile(r'[._\-+~%$]+')
+_IPV4 = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}$')
+_LETTER = re.compile(r'[^\W\d_]')
+
+# Peso dei campi nella frequenza dei termini (al massimo TF_MAX per log)
+INDICATORS_WEIGHT = 2
+TF_BITS = 4
+TF_MAX = (1 << TF_BITS) - 1
+
+# Parametri di BM25
+K1 = 1.2
+B = 0.75
+
+MAX_QUERY_TERMS = 16
+
+def refang(text):
+    """
+    Returns:
+        str: Testo con URL e domini disinnescati ripristinati (hxxp[:]//evil[.]com -> http://evil.com)
+    """
+    return _DEFANGED.sub(lambda match: _REFANGED[match.group().lower()], text)
+
+def _parts(text):
+    for part in _PART.findall(refang(text).lower()):
+        part = part.strip(_TRIM)
+        if len(part) > 1:
+            yield part
+
+def tokenize(text):
+    """
+    Args:
+        text (str): Testo da indicizzare
+
+    Returns:
+        list: Termini del testo (con ripetizioni): parti, parole interne e domini superiori
+    """
+    terms = []
+    for part in _PART.findall(refang(text).lower()):
+        part = part.strip(_TRIM)
+        if len(part) < 2:
+            continue
+        terms.append(part)
+        # Parole semplici (il caso più comune) e IPv4 non si scompongono
+        if part.isalnum() or _IPV4.match(part):
+            continue
+        words = _WORD_SEPARATORS.split(part)
+        if len(words) > 1:
+            terms.extend(word for word in words if len(word) > 1)
+            labels = part.split('.')
+            if len(labels) > 2 and _LETTER.search(part):
+                terms.extend('.'.join(labels[start:]) for start in range(1, len(labels) - 1))
+    return terms
+
+def query_terms(query):
+    """
+    Returns:
+        list: Parti distinte della query (al massimo MAX_QUERY_TERMS), tutte richieste nei risultati
+    """
+    return list(dict.fromkeys(_parts(query)))[:MAX_QUERY_TERMS]
+
+def _metadata_values(value):
+    if isinstance(value, Mapping):
+        for item in value.values():
+            yield from _metadata_values(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _metadata_values(item)
+    elif value is not None:
+        yield str(value)
+
+def log_terms(log):
+    """
+    Args:
+        log (Mapping): Log del corpus
+
+    Returns:
+        dict: Termine -> frequenza pesata nei campi indicizzati
+    """
+    counts = Counter(tokenize('\n'.join((
+        log.get('raw', ''),
+        ' '.join(_metadata_values(log.get('metadata'))),
+        log.get('explanation', '')
+    ))))
+    for term in tokenize(' '.join(log.get('indicators', ()))):
+        counts[term] += INDICATORS_WEIGHT
+    return counts
+
+# ============================================================================
+# CURSORI DI PAGINAZIONE
+# ============================================================================
+
+def encode_cursor(sizes, score, phase, position):
+    """
+    Returns:
+        str: Cursore opaco (base64 URL-safe) dopo il risultato indicato
+    """
+    data = json.dumps([sizes, score, phase, position], separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor, phases):
+    """
+    Args:
+        cursor (str): Cursore restituito da una ricerca
+        phases (int): Numero di fasi dell'indice
+
+    Returns:
+        tuple: (log per fase alla prima pagina, punteggio, fase, posizione dell'ultimo risultato)
+
+    Raises:
+        ValueError: Se il cursore non è valido
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sizes, score, phase, position = json.loads(data)
+        if (len(sizes) != phases or not all(type(size) is int for size in sizes)
+                or type(score) not in (int, float) or type(phase) is not int or type(position) is not int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    return sizes, float(score), phase, position
+
+# ============================================================================
+# INDICE INVERTITO
+# ============================================================================
+
+def _contains(postings, doc, end):
+    """Se il documento è tra i primi end della lista"""
+    i = bisect_left(postings, doc << TF_BITS, 0, end)
+    return i < end and postings[i] >> TF_BITS == doc
+
+class LogSearchIndex:
+    """
+    Indice invertito dei log di un corpus, aggiornato in coda
+    """
+
+    def __init__(self, corpus, phases=None, refresh_seconds=10.0):
+        """
+        Args:
+            corpus (LogCorpus): Corpus da indicizzare
+            phases (list): Fasi indicizzate (default tutte quelle della Kill Chain)
+            refresh_seconds (float): Intervallo minimo tra due riletture del corpus (refresh)
+        """
+        self.corpus = corpus
+        self.phases = list(phases or CYBER_KILL_CHAIN_PHASES)
+        self.refresh_seconds = refresh_seconds
+        self._phase_codes = {phase: code for code, phase in enumerate(self.phases)}
+        self._severities = []
+        self._severity_codes = {}
+
+        # Termine -> documento << TF_BITS | tf (un solo log) o array di questi interi
+        self._postings = {}
+        # Per documento: fase, posizione nella fase, gravità, lunghezza
+        self._doc_phases = array('B')
+        self._doc_positions = array('I')
+        self._doc_severities = array('B')
+        self._doc_lengths = array('I')
+        self._total_length = 0
+        # Per fase: documento di ogni posizione
+        self._phase_docs = [array('I') for _ in self.phases]
+        # Documenti pubblicati: le ricerche leggono solo questi
+        self._count = 0
+        self._indexed = [0] * len(self.phases)
+
+        self._lock = threading.Lock()
+        self._refreshed_at = time.monotonic()
+        self.build_seconds = 0.0
+        self.added_total = 0
+
+    def __len__(self):
+        return self._count
+
+    def sync(self):
+        """
+        Indicizza i log aggiunti al corpus dall'ultima chiamata
+
+        Returns:
+            int: Log indicizzati
+        """
+        now = time.monotonic()
+        if now - self._refreshed_at >= self.refresh_seconds:
+            self._refreshed_at = now
+            self.corpus.refresh()
+        corpus = self.corpus
+        if all(corpus.phase_size(phase) <= done for phase, done in zip(self.phases, self._indexed)):
+            return 0
+
+        with self._lock:
+            started = time.perf_counter()
+            added = 0
+            for code, phase in enumerate(self.phases):
+                position = self._indexed[code]
+                for log in corpus.iter_phase_logs(phase, position):
+                    self._add(code, position, log)
+                    position += 1
+                    added += 1
+                self._indexed[code] = position
+            self.build_seconds += time.perf_counter() - started
+            self.added_total += added
+        return added
+
+    def _add(self, code, position, log):
+        """Aggiunge un log in coda e lo pubblica"""
+        doc = self._count
+        severity = log.get('severity') or ''
+        severity_code = self._severity_codes.get(severity)
+        if severity_code is None:
+            severity_code = self._severity_codes[severity] = len(self._severities)
+            self._severities.append(severity)
+
+        postings = self._postings
+        length = 0
+        for term, tf in log_terms(log).items():
+            length += tf
+            value = doc << TF_BITS | min(tf, TF_MAX)
+            current = postings.get(term)
+            if current is None:
+                postings[term] = value
+            elif type(current) is int:
+                postings[term] = array('I', (current, value))
+            else:
+                current.append(value)
+
+        self._doc_phases.append(code)
+        self._doc_positions.append(position)
+        self._doc_severities.append(severity_code)
+        self._doc_lengths.append(length)
+        self._phase_docs[code].append(doc)
+        self._total_length += length
+        self._count = doc + 1
+
+    def _postings_of(self, term):
+        postings = self._postings.get(term)
+        if postings is None:
+            return ()
+        return (postings,) if type(postings) is int else postings
+
+    def search(self, query, phase=None, severity=None, limit=20, cursor=None):
+        """
+        Cerca i log che contengono tutti i termini della query
+
+        Args:
+            query (str): Parole chiave, IP, hash, percorsi o URL (anche disinnescati)
+            phase (str): Solo i log di questa fase (opzionale)
+            severity (str): Solo i log con questa gravità (opzionale)
+            limit (int): Risultati per pagina
+            cursor (str): Cursore della pagina precedente (opzionale)
+
+        Returns:
+            dict: total (log trovati), hits (documento, fase, posizione, punteggio)
+                e next_cursor (None all'ultima pagina)
+
+        Raises:
+            ValueError: Se la query non contiene termini o il cursore non è valido
+        """
+        self.sync()
+        terms = query_terms(query)
+        if not terms:
+            raise ValueError("Query has no searchable terms")
+
+        # Prima le posizioni per fase, poi i documenti: le fasi contate sono già pubblicate
+        sizes = list(self._indexed)
+        count = self._count
+        after = None
+        if cursor:
+            sizes, score, last_phase, last_position = decode_cursor(cursor, len(self.phases))
+            after = (-score, last_phase, last_position)
+        empty = {'total': 0, 'hits': [], 'next_cursor': None}
+        # Log aggiunti dopo la prima pagina: esclusi dai risultati e dalle statistiche
+        # di BM25, così i punteggi (e il cursore) restano quelli della prima pagina
+        snapshot = None
+        excluded = ()
+        if any(size < done for size, done in zip(sizes, self._indexed)):
+            snapshot = sizes
+            excluded = [
+                doc for code, size in enumerate(sizes)
+                for doc in self._phase_docs[code][max(size, 0):] if doc < count
+            ]
+        documents = count - len(excluded)
+        if not documents:
+            return empty
+
+        phase_code = severity_code = None
+        if phase is not None:
+            phase_code = self._phase_codes.get(phase)
+            if phase_code is None:
+                return empty
+        if severity is not None:
+            severity_code = self._severity_codes.get(severity)
+            if severity_code is None:
+                return empty
+
+        # Liste dei termini, dalla più corta: si scorre la prima e si cerca nelle altre
+        # (ordine stabile tra le pagine: i punteggi si sommano sempre nello stesso ordine)
+        lists = []
+        for term in terms:
+            postings = self._postings_of(term)
+            end = bisect_left(postings, count << TF_BITS)
+            frequency = end - sum(_contains(postings, doc, end) for doc in excluded)
+            if not frequency:
+                return empty
+            idf = math.log(1.0 + (documents - frequency + 0.5) / (frequency + 0.5))
+            lists.append((frequency, term, end, postings, idf))
+        lists.sort(key=lambda entry: entry[:2])
+        (_, _, end, first, first_idf), others = lists[0], [entry[2:] for entry in lists[1:]]
+
+        doc_phases, doc_positions = self._doc_phases, self._doc_positions
+        doc_severities, doc_lengths = self._doc_severities, self._doc_lengths
+        total_length = self._total_length_before(count) - sum(doc_lengths[doc] for doc in excluded)
+        scale = K1 / (total_length / documents)
+        bias = K1 * (1.0 - B)
+        starts = [0] * len(others)
+        hits = []
+        for value in first[:end]:
+            doc = value >> TF_BITS
+            code = doc_phases[doc]
+            if phase_code is not None and code != phase_code:
+                continue
+            if severity_code is not None and doc_severities[doc] != severity_code:
+                continue
+            if snapshot is not None and doc_positions[doc] >= snapshot[code]:
+                continue
+            norm = bias + B * scale * doc_lengths[doc]
+            tf = value & TF_MAX
+            score = first_idf * tf * (K1 + 1.0) / (tf + norm)
+            key = doc << TF_BITS
+            for n, (other_end, postings, idf) in enumerate(others):
+                i = bisect_left(postings, key, starts[n], other_end)
+                starts[n] = i
+                if i == other_end or postings[i] >> TF_BITS != doc:
+                    break
+                tf = postings[i] & TF_MAX
+                score += idf * tf * (K1 + 1.0) / (tf + norm)
+            else:
+                hits.append((-score, code, doc_positions[doc], doc))
+
+        total = len(hits)
+        if after is not None:
+            hits = [hit for hit in hits if hit[:3] > after]
+        page = heapq.nsmallest(limit + 1, hits)
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            score, code, position, _ = page[-1]
+            next_cursor = encode_cursor(sizes, -score, code, position)
+        return {
+            'total': total,
+            'hits': [
+                {'doc': doc, 'phase': self.phases[code], 'position': position, 'score': -score}
+                for score, code, position, doc in page
+            ],
+            'next_cursor': next_cursor
+        }
+
+    def _total_length_before(self, count):
+        """Lunghezza totale dei primi count documenti (quelli pubblicati all'inizio della ricerca)"""
+        if count == self._count:
+            return self._total_length
+        return self._total_length - sum(self._doc_lengths[count:self._count])
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Log e termini indicizzati, log aggiunti e tempo speso a indicizzare
+        """
+        return {
+            'documents': self._count,
+            'terms': len(self._postings),
+            'added_total': self.added_total,
+            'build_seconds': round(self.build_seconds, 3)
+        }
+
+# ============================================================================
+# INDICE GLOBALE
+# ============================================================================
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def create_log_search_index(corpus):
+    """
+    Costruisce l'indice del corpus indicato
+
+    Returns:
+        LogSearchIndex: Indice con tutti i log già presenti
+    """
+    index = LogSearchIndex(corpus, refresh_seconds=float(os.getenv('LOG_SEARCH_REFRESH_SECONDS', 10)))
+    index.sync()
+    metrics = index.metrics()
+    logger.info(f"Search index built: {metrics['documents']} logs, "
+                f"{metrics['terms']} terms in {metrics['build_seconds']:.2f}s")
+    return index
+
+def get_log_search_index():
+    """
+    Restituisce l'indice globale, costruendolo al primo utilizzo
+    (con preload_app avviene nel master di gunicorn, prima del fork)
+
+    Returns:
+        LogSearchIndex: Indice dei log del corpus di gioco
+    """
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = create_log_search_index(get_log_corpus())
+    return _search_index
@@ -0,0 +1,638 @@
+"""
+CYBER KILL CHAIN ANALYZER - GENERATORE PROCEDURALE DI LOG
+
+Con uno o due log per fase i giocatori imparano le risposte a memoria in pochi
+minuti. Il generatore produce varianti illimitate dai template di
+models/log_templates.py: IP, hostname, porte, hash, orari, processi e volumi
+cambiano a ogni log, mentre metadata, indicators ed explanation restano
+coerenti con la fase del template.
+
+Ogni log è determinato dal template e da un seme a 64 bit, entrambi scritti
+nell'ID (syn-<template>-<seme esadecimale>): la sessione salva solo l'ID e
+qualsiasi worker rigenera lo stesso log senza doverlo memorizzare.
+
+SyntheticCorpus tiene per ogni fase un pool di log già generati (con vista
+client e JSON pronti), rabboccato a lotti da un thread in background:
+generate_log preleva dal pool senza generare nulla durante la richiesta. Se il
+pool di una fase si svuota si ripiega sul corpus di base.
+
+Il mazzo senza ripetizioni della sessione (deal) vale solo per i log del corpus
+di base: con la quota predefinita DEFAULT_SHARE un round su cinque usa un log
+curato del corpus di base, gli altri un log sintetico. Con LOG_SYNTHESIS_SHARE=1.0
+il mazzo interviene solo quando un pool è vuoto; con LOG_SYNTHESIS=off vale per
+tutti i round.
+
+Configurazione (variabili d'ambiente):
+- LOG_SYNTHESIS: 'on' (default) o 'off' per usare solo il corpus di base
+- LOG_SYNTHESIS_SHARE: frazione dei log presi dal pool sintetico, il resto
+  dal corpus di base tramite il mazzo della sessione (default 0.8)
+- LOG_SYNTHESIS_POOL_SIZE: log pronti per fase (default 256)
+- LOG_SYNTHESIS_BATCH: log generati per fase a ogni lotto (default 64)
+- LOG_SYNTHESIS_CACHE_SIZE: log distribuiti di recente tenuti in memoria (default 4096)
+"""
+
+import logging
+import os
+import random
+import re
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from types import MappingProxyType
+
+from models.log_index import LogCorpus, encode_json
+from models.log_templates import LOG_TEMPLATES
+from utils.compression import PrecompressedPayload
+from utils.helpers import sanitize_log_data
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_ID_PREFIX = 'syn-'
+_SYNTHETIC_ID = re.compile(r'^syn-([a-z0-9-]+)-([0-9a-f]{16})$')
+
+# Quota predefinita dei round con log sintetici: gli altri usano il mazzo del corpus di base
+DEFAULT_SHARE = 0.8
+
+# ============================================================================
+# TIPI DI SLOT
+# Ogni tipo è una funzione che riceve il generatore casuale del log
+# ============================================================================
+
+# Primi ottetti di reti pubbliche (niente reti private, loopback o multicast)
+_PUBLIC_OCTETS = (5, 23, 31, 37, 45, 46, 62, 77, 80, 89, 91, 94, 103, 109, 141,
+                  176, 178, 185, 188, 193, 194, 195, 203, 212, 213, 217)
+_COMMON_PORTS = (21, 22, 23, 25, 53, 80, 110, 135, 139, 143, 443, 445, 993, 1433,
+                 3306, 3389, 5432, 5900, 5985, 8080, 8443)
+_SERVER_ROLES = ('dc', 'mail', 'vpn', 'web', 'fs', 'sql', 'app', 'backup', 'print', 'erp')
+_DEPARTMENTS = ('FIN', 'HR', 'IT', 'MKT', 'OPS', 'LEG', 'RND', 'SAL')
+_FIRST_NAMES = ('marco', 'giulia', 'luca', 'sara', 'andrea', 'chiara', 'paolo', 'elena',
+                'davide', 'francesca', 'matteo', 'anna', 'simone', 'laura', 'stefano')
+_LAST_NAMES = ('rossi', 'bianchi', 'ferrari', 'esposito', 'romano', 'colombo', 'ricci',
+               'marino', 'greco', 'bruno', 'gallo', 'conti', 'costa', 'fontana', 'moretti')
+_DOMAIN_WORDS = ('secure', 'login', 'update', 'account', 'verify', 'support', 'portal',
+                 'cloud', 'office', 'auth', 'sync', 'cdn', 'mail', 'drive', 'service')
+_BAD_TLDS = ('tk', 'xyz', 'top', 'ru', 'cn', 'info', 'online', 'site', 'click', 'buzz')
+_DOCUMENT_WORDS = ('Invoice', 'Payment', 'Contract', 'Order', 'Statement', 'Payroll',
+                   'Report', 'Quote', 'Receipt', 'Shipping')
+_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+           'September', 'October', 'November', 'December')
+_SUBJECTS = ('Urgente: Aggiorna la Tua Password', 'Fattura in sospeso', 'Documento condiviso con te',
+             'Verifica il tuo account', 'Avviso di consegna', 'Busta paga disponibile',
+             'Casella di posta quasi piena', 'Accesso insolito rilevato')
+_SCANNER_AGENTS = ('Nikto/2.5.0', 'sqlmap/1.7', 'gobuster/3.6', 'WPScan v3.8', 'Nuclei - Open-source project',
+                   'python-requests/2.31', 'Mozilla/5.0 zgrab/0.x')
+_DOCUMENT_CVES = ('CVE-2017-11882', 'CVE-2021-40444', 'CVE-2022-30190', 'CVE-2023-36884', 'CVE-2018-0802')
+_WEB_CVES = ('CVE-2021-44228', 'CVE-2023-34362', 'CVE-2019-19781', 'CVE-2022-22965',
+             'CVE-2021-26084', 'CVE-2023-46604')
+_SERVICE_CVES = ('CVE-2017-0144', 'CVE-2019-0708', 'CVE-2020-1472', 'CVE-2021-26855',
+                 'CVE-2020-14882', 'CVE-2022-41040')
+_OFFICE_PROCESSES = ('winword.exe', 'excel.exe', 'powerpnt.exe', 'outlook.exe', 'AcroRd32.exe')
+_SCRIPT_HOSTS = ('powershell.exe', 'cmd.exe', 'wscript.exe', 'mshta.exe', 'rundll32.exe', 'regsvr32.exe')
+_SERVICE_NAMES = ('WindowsUpdateHelper', 'MicrosoftEdgeSvc', 'AdobeSyncService', 'SystemHealthMonitor',
+                  'IntelGraphicsAgent', 'OneDriveUpdater', 'DefenderCoreSvc', 'NvTelemetryHost')
+_DROP_DIRS = ('C:\\ProgramData', 'C:\\Users\\Public', 'C:\\Windows\\Temp',
+              'C:\\Users\\Public\\Libraries', 'C:\\ProgramData\\Microsoft\\Crypto')
+_DROP_NAMES = ('update', 'svchost32', 'msupdate', 'taskhostw', 'dllhost64', 'winlogin', 'runtimebroker')
+_C2_FRAMEWORKS = ('Cobalt Strike', 'Sliver', 'Brute Ratel', 'Mythic', 'Havoc', 'Metasploit Meterpreter')
+_SENSITIVE_FILES = ('Q1_Financial_Report.xlsx', 'Customer_Database.csv', 'Payroll_2025.xlsx',
+                    'Board_Minutes.docx', 'Merger_Plan.pptx', 'Employee_Records.csv',
+                    'Source_Code.zip', 'Contracts_Archive.zip')
+_RANSOM_EXTENSIONS = ('lockbit', 'blackcat', 'akira', 'royal', 'crypt', 'enc', 'locked')
+_SITES = ('news', 'blog', 'forum', 'recipes', 'travel', 'sport', 'weather', 'events')
+
+# Intervallo dei timestamp generati: tutto il 2025
+_TIMESTAMP_START = datetime(2025, 1, 1)
+_TIMESTAMP_RANGE = 365 * 24 * 3600
+
+def _external_ip(rng):
+    return (f'{rng.choice(_PUBLIC_OCTETS)}.{rng.randrange(256)}.'
+            f'{rng.randrange(256)}.{rng.randrange(1, 255)}')
+
+def _internal_ip(rng):
+    if rng.random() < 0.5:
+        return f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+    return f'192.168.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+
+def _server(rng):
+    return f'{rng.choice(_SERVER_ROLES)}{rng.randrange(1, 20):02d}.company.local'
+
+def _servers(rng):
+    return sorted({_server(rng) for _ in range(rng.randrange(1, 5))})
+
+def _workstation(rng):
+    return f'WS-{rng.choice(_DEPARTMENTS)}-{rng.randrange(1, 999):03d}'
+
+def _user(rng):
+    return f'{rng.choice(_FIRST_NAMES)}.{rng.choice(_LAST_NAMES)}'
+
+def _web_host(rng):
+    return f"{rng.choice(('www', 'portal', 'shop', 'api', 'intranet', 'hr'))}.company.com"
+
+def _ports(rng):
+    return sorted(rng.sample(_COMMON_PORTS, rng.randrange(3, 9)))
+
+def _malicious_domain(rng):
+    first, second = rng.sample(_DOMAIN_WORDS, 2)
+    return f'{first}-{second}{rng.randrange(10, 99)}.{rng.choice(_BAD_TLDS)}'
+
+def _malicious_url(rng):
+    # URL "defanged" come nei log originali
+    domain = _malicious_domain(rng).replace('.', '[.]')
+    return f"hxxps://{domain}/{rng.choice(('login', 'auth', 'verify', 'download', 'invoice'))}"
+
+def _sender(rng):
+    return f"{rng.choice(('noreply', 'support', 'it-helpdesk', 'billing', 'hr'))}@{_malicious_domain(rng)}"
+
+def _document_name(rng, extension):
+    return f'{rng.choice(_DOCUMENT_WORDS)}_{rng.choice(_MONTHS)}2025.{extension}'
+
+def _dropped_path(rng):
+    return f'{rng.choice(_DROP_DIRS)}\\{rng.choice(_DROP_NAMES)}.exe'
+
+def _volume(rng):
+    if rng.random() < 0.5:
+        return f'{rng.randrange(200, 1000)}MB'
+    return f'{rng.randrange(1, 80)}GB'
+
+def _timestamp(rng):
+    return (_TIMESTAMP_START + timedelta(seconds=rng.randrange(_TIMESTAMP_RANGE))).strftime('%Y-%m-%d %H:%M:%S')
+
+SLOT_TYPES = {
+    'external_ip': _external_ip,
+    'public_ip': _external_ip,
+    'internal_ip': _internal_ip,
+    'server': _server,
+    'servers': _servers,
+    'workstation': _workstation,
+    'user': _user,
+    'web_host': _web_host,
+    'ports': _ports,
+    'sha256': lambda rng: f'{rng.getrandbits(256):064x}',
+    'md5': lambda rng: f'{rng.getrandbits(128):032x}',
+    'malicious_domain': _malicious_domain,
+    'malicious_url': _malicious_url,
+    'compromised_site': lambda rng: f'{rng.choice(_SITES)}-{rng.choice(_DOMAIN_WORDS)}.com',
+    'sender': _sender,
+    'phishing_subject': lambda rng: rng.choice(_SUBJECTS),
+    'scanner_agent': lambda rng: rng.choice(_SCANNER_AGENTS),
+    'macro_document': lambda rng: _document_name(rng, rng.choice(('docm', 'xlsm', 'xls', 'doc'))),
+    'lure_document': lambda rng: _document_name(rng, rng.choice(('docm', 'xlsm', 'pdf.exe', 'rtf', 'one'))),
+    'archive_name': lambda rng: _document_name(rng, rng.choice(('iso', 'img', 'zip'))),
+    'usb_serial': lambda rng: f'{rng.getrandbits(48):012X}',
+    'document_cve': lambda rng: rng.choice(_DOCUMENT_CVES),
+    'web_cve': lambda rng: rng.choice(_WEB_CVES),
+    'service_cve': lambda rng: rng.choice(_SERVICE_CVES),
+    'office_process': lambda rng: rng.choice(_OFFICE_PROCESSES),
+    'script_host': lambda rng: rng.choice(_SCRIPT_HOSTS),
+    'service_name': lambda rng: rng.choice(_SERVICE_NAMES),
+    'dropped_path': _dropped_path,
+    'dropped_process': lambda rng: f'{rng.choice(_DROP_NAMES)}.exe',
+    'webshell_path': lambda rng: (f"/var/www/html/{rng.choice(('uploads', 'images', 'assets', 'tmp'))}/"
+                                  f"{rng.choice(('help', 'error', 'cache', 'config'))}.{rng.choice(('php', 'aspx', 'jsp'))}"),
+    'c2_framework': lambda rng: rng.choice(_C2_FRAMEWORKS),
+    'volume': _volume,
+    'sensitive_files': lambda rng: sorted(rng.sample(_SENSITIVE_FILES, rng.randrange(2, 4))),
+    'ransom_extension': lambda rng: rng.choice(_RANSOM_EXTENSIONS),
+}
+
+def compile_slot(spec):
+    """
+    Converte la definizione di uno slot in una funzione rng -> valore
+
+    Args:
+        spec: Nome di un tipo di SLOT_TYPES, ('int', min, max),
+            ('choice', opzioni) o ('sample', opzioni, min, max)
+
+    Returns:
+        callable: Generatore del valore
+    """
+    if isinstance(spec, str):
+        return SLOT_TYPES[spec]
+    kind = spec[0]
+    if kind == 'int':
+        low, high = spec[1], spec[2]
+        return lambda rng: rng.randint(low, high)
+    if kind == 'choice':
+        options = tuple(spec[1])
+        return lambda rng: options[rng.randrange(len(options))]
+    if kind == 'sample':
+        options, low, high = tuple(spec[1]), spec[2], spec[3]
+        return lambda rng: sorted(rng.sample(options, rng.randint(low, high)))
+    raise ValueError(f'Unknown slot type: {spec!r}')
+
+def _as_text(value):
+    """Valore di uno slot come testo (le liste diventano elenchi separati da virgole)"""
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return value
+
+# ============================================================================
+# TEMPLATE E GENERATORE
+# ============================================================================
+
+def synthetic_log_id(template_key, seed):
+    """
+    Returns:
+        str: ID del log generato dal template con il seme indicato
+    """
+    return f'{SYNTHETIC_ID_PREFIX}{template_key}-{seed:016x}'
+
+class LogTemplate:
+    """
+    Template compilato: slot pronti e campi già classificati
+    """
+
+    # Tipi di campo dei metadata
+    SLOT, FORMAT, CONSTANT = range(3)
+
+    def __init__(self, spec):
+        """
+        Args:
+            spec (dict): Template nel formato di LOG_TEMPLATES
+
+        Raises:
+            ValueError: Se un segnaposto non corrisponde a nessuno slot
+        """
+        self.key = spec['key']
+        self.phase = spec['phase']
+        self.source = spec['source']
+        self.severity = tuple(spec['severity'])
+        self.raw = spec['raw']
+        self.explanation = spec['explanation']
+        self.indicators = tuple(spec['indicators'])
+        self.slots = tuple((name, compile_slot(slot)) for name, slot in spec['slots'].items())
+
+        names = set(spec['slots'])
+        metadata = []
+        for key, value in spec['metadata'].items():
+            if isinstance(value, str) and value[1:-1] in names and value == '{' + value[1:-1] + '}':
+                metadata.append((key, self.SLOT, value[1:-1]))
+            elif isinstance(value, str) and '{' in value:
+                metadata.append((key, self.FORMAT, value))
+            else:
+                metadata.append((key, self.CONSTANT, value))
+        self.metadata = tuple(metadata)
+
+        # Un segnaposto senza slot farebbe fallire la generazione: errore già all'import
+        texts = [self.raw, self.explanation, *self.indicators]
+        texts += [value for _, kind, value in self.metadata if kind == self.FORMAT]
+        for text in texts:
+            for _, field, _, _ in string.Formatter().parse(text):
+                if field is not None and field not in names:
+                    raise ValueError(f"Template '{self.key}': unknown slot '{field}'")
+
+    def render(self, seed):
+        """
+        Genera il log corrispondente al seme (stesso seme, stesso log)
+
+        Args:
+            seed (int): Seme a 64 bit
+
+        Returns:
+            dict: Log completo nel formato di LOGS_DATABASE
+        """
+        rng = random.Random(seed)
+        timestamp = _timestamp(rng)
+        severity = self.severity[rng.randrange(len(self.severity))]
+        values = {name: generate(rng) for name, generate in self.slots}
+        text = {name: _as_text(value) for name, value in values.items()}
+
+        metadata = {}
+        for key, kind, value in self.metadata:
+            if kind == self.SLOT:
+                metadata[key] = values[value]
+            elif kind == self.FORMAT:
+                metadata[key] = value.format_map(text)
+            else:
+                metadata[key] = value
+
+        return {
+            'id': synthetic_log_id(self.key, seed),
+            'raw': f'{timestamp} {self.raw.format_map(text)}',
+            'source': self.source,
+            'severity': severity,
+            'timestamp': timestamp,
+            'metadata': metadata,
+            'explanation': self.explanation.format_map(text),
+            'phase': self.phase,
+            'indicators': [indicator.format_map(text) for indicator in self.indicators]
+        }
+
+class LogSynthesizer:
+    """
+    Genera log sintetici per fase a partire dai template
+    """
+
+    def __init__(self, templates=LOG_TEMPLATES, seed=None):
+        """
+        Args:
+            templates (list): Template nel formato di LOG_TEMPLATES
+            seed (int): Seme del generatore dei semi (None: casuale)
+        """
+        compiled = [LogTemplate(spec) for spec in templates]
+        self._by_key = {template.key: template for template in compiled}
+        by_phase = {}
+        for template in compiled:
+            by_phase.setdefault(template.phase, []).append(template)
+        self._by_phase = {phase: tuple(group) for phase, group in by_phase.items()}
+        self._rng = random.Random(seed)
+
+    def reseed(self, seed=None):
+        """Reinizializza il generatore dei semi (es. nel worker dopo un fork)"""
+        self._rng.seed(seed)
+
+    def phases(self):
+        """
+        Returns:
+            tuple: Fasi con almeno un template
+        """
+        return tuple(self._by_phase)
+
+    def generate(self, phase, count):
+        """
+        Genera count log nuovi della fase indicata
+
+        Returns:
+            list: Log completi (vuota se la fase non ha template)
+        """
+        templates = self._by_phase.get(phase)
+        if not templates:
+            return []
+        rng = self._rng
+        return [
+            templates[rng.randrange(len(templates))].render(rng.getrandbits(64))
+            for _ in range(count)
+        ]
+
+    def rebuild(self, log_id):
+        """
+        Rigenera un log sintetico dal suo ID
+
+        Returns:
+            dict: Log completo, o None se l'ID non è di un log sintetico valido
+        """
+        match = _SYNTHETIC_ID.match(log_id)
+        if match is None:
+            return None
+        template = self._by_key.get(match.group(1))
+        if template is None:
+            return None
+        return template.render(int(match.group(2), 16))
+
+# ============================================================================
+# CORPUS CON POOL PRE-GENERATI
+# ============================================================================
+
+def _is_synthetic(log_id):
+    return isinstance(log_id, str) and log_id.startswith(SYNTHETIC_ID_PREFIX)
+
+def _make_entry(log):
+    """
+    Returns:
+        tuple: (log in sola lettura, vista client, vista client in JSON e compressa)
+    """
+    client_view = sanitize_log_data(log)
+    return MappingProxyType(log), MappingProxyType(client_view), PrecompressedPayload(encode_json(client_view))
+
+class SyntheticCorpus(LogCorpus):
+    """
+    Corpus che distribuisce log sintetici da pool per fase rabboccati in background
+    Le posizioni (phase_size, log_at, ...) restano quelle del corpus di base:
+    i log sintetici non hanno una posizione, solo un ID
+    """
+
+    def __init__(self, base, difficulty_config, synthesizer=None, share=DEFAULT_SHARE,
+                 pool_size=256, batch_size=64, cache_size=4096, interval=0.5):
+        """
+        Args:
+            base (LogCorpus): Corpus dei log statici o su disco (ripiego a pool vuoto)
+            difficulty_config (dict): Configurazione dei livelli (come DIFFICULTY_CONFIG)
+            synthesizer (LogSynthesizer): Generatore (default: tutti i template)
+            share (float): Frazione dei log presi dal pool sintetico; il resto
+                viene dal corpus di base senza ripetizioni (deal)
+            pool_size (int): Log pronti per fase
+            batch_size (int): Log generati per fase a ogni lotto
+            cache_size (int): Log distribuiti di recente tenuti in memoria
+            interval (float): Secondi tra due controlli dei pool se nessuno li svuota
+        """
+        super().__init__(difficulty_config)
+        self.base = base
+        self.synthesizer = synthesizer or LogSynthesizer()
+        self.share = share
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.interval = interval
+
+        self._pools = {phase: deque() for phase in self.synthesizer.phases()}
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        # Metriche
+        self.generated_total = 0
+        self.pool_misses = 0
+        self.last_batch_rate = 0.0
+
+    # Thread di rabbocco ------------------------------------------------------
+
+    def start(self):
+        """Avvia il thread di rabbocco (idempotente, sicuro dopo un fork)"""
+        # Percorso veloce senza lock: chiamato a ogni log distribuito
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Dopo un fork pool e generatore sono copie di quelli del padre:
+                # i worker distribuirebbero gli stessi log nello stesso ordine
+                for pool in self._pools.values():
+                    pool.clear()
+                self.synthesizer.reseed()
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='log-synthesis', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ferma il thread di rabbocco"""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                generated = self.refill()
+            except Exception as e:
+                logger.error(f"Error generating synthetic logs: {e}")
+                generated = 0
+            # Pool pieni: attende che un prelievo li porti sotto metà
+            if not generated:
+                self._wake.wait(self.interval)
+
+    def refill(self):
+        """
+        Genera al massimo un lotto di log per ogni fase sotto la dimensione del pool
+
+        Returns:
+            int: Numero di log generati
+        """
+        generated = 0
+        started = time.perf_counter()
+        for phase, pool in self._pools.items():
+            missing = min(self.pool_size - len(pool), self.batch_size)
+            if missing > 0:
+                pool.extend(_make_entry(log) for log in self.synthesizer.generate(phase, missing))
+                generated += missing
+        if generated:
+            self.generated_total += generated
+            self.last_batch_rate = generated / (time.perf_counter() - started)
+        return generated
+
+    # Distribuzione dei log ---------------------------------------------------
+
+    def pick(self, difficulty, rng=random):
+        phases = self._difficulty_phases.get(difficulty)
+        if not phases:
+            return None
+        return self.pick_phase(phases[rng.randrange(len(phases))], rng)
+
+    def pick_phase(self, phase, rng=random):
+        log = self._take(phase, rng)
+        return log if log is not None else self.base.pick_phase(phase, rng)
+
+    def deal(self, difficulty, deck, rng=random):
+        # I log sintetici sono tutti diversi: il mazzo serve solo per i round del
+        # corpus di base (quota 1 - share, o pool vuoto)
+        phases = self._difficulty_phases.get(difficulty)
+        if not phases:
+            return None
+        log = self._take(phases[rng.randrange(len(phases))], rng)
+        return log if log is not None else self.base.deal(difficulty, deck, rng)
+
+    def _take(self, phase, rng):
+        """
+        Preleva un log sintetico dal pool della fase
+
+        Returns:
+            Mapping: Log sintetico, o None se va usato il corpus di base
+        """
+        pool = self._pools.get(phase)
+        if pool is None or (self.share < 1.0 and rng.random() >= self.share):
+            return None
+
+        self.start()
+        try:
+            entry = pool.popleft()
+        except IndexError:
+            # Pool vuoto: nessuna generazione nel percorso della richiesta
+            self.pool_misses += 1
+            self._wake.set()
+            return None
+
+        if len(pool) < self.pool_size // 2:
+            self._wake.set()
+        self._remember(entry[0]['id'], entry)
+        return entry[0]
+
+    def _remember(self, log_id, entry):
+        """Tiene in cache un log appena distribuito (limite cache_size, LRU)"""
+        with self._cache_lock:
+            self._cache[log_id] = entry
+            self._cache.move_to_end(log_id)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _entry(self, log_id):
+        """Log sintetico dalla cache o rigenerato dal suo ID"""
+        with self._cache_lock:
+            entry = self._cache.get(log_id)
+            if entry is not None:
+                self._cache.move_to_end(log_id)
+                return entry
+        log = self.synthesizer.rebuild(log_id)
+        if log is None:
+            return None
+        entry = _make_entry(log)
+        self._remember(log_id, entry)
+        return entry
+
+    # Interfaccia LogCorpus ---------------------------------------------------
+
+    def phase_size(self, phase):
+        return self.base.phase_size(phase)
+
+    def phase_log_at(self, phase, position):
+        return self.base.phase_log_at(phase, position)
+
+    def iter_phase_logs(self, phase, start=0):
+        return self.base.iter_phase_logs(phase, start)
+
+    def refresh(self):
+        self.base.refresh()
+
+    def get(self, log_id):
+        if log_id is None:
+            return None
+        if _is_synthetic(log_id):
+            entry = self._entry(log_id)
+            return entry[0] if entry else None
+        return self.base.get(log_id)
+
+    def client_view(self, log_id):
+        if _is_synthetic(log_id):
+            entry = self._entry(log_id)
+            return entry[1] if entry else None
+        return self.base.client_view(log_id)
+
+    def client_payload(self, log_id):
+        if _is_synthetic(log_id):
+            entry = self._entry(log_id)
+            return entry[2] if entry else None
+        return self.base.client_payload(log_id)
+
+    def __len__(self):
+        return len(self.base)
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Log pronti per fase, log generati, prelievi a pool vuoto e velocità di generazione
+        """
+        return {
+            'pool_target': self.pool_size,
+            'pool_sizes': {phase: len(pool) for phase, pool in self._pools.items()},
+            'generated_total': self.generated_total,
+            'pool_misses': self.pool_misses,
+            'last_batch_logs_per_second': round(self.last_batch_rate),
+            'running': self._thread is not None and self._thread.is_alive()
+        }
+
+def create_synthetic_corpus(base, difficulty_config):
+    """
+    Crea il corpus sintetico con i parametri delle variabili d'ambiente
+
+    Args:
+        base (LogCorpus): Corpus di base
+        difficulty_config (dict): Configurazione dei livelli
+
+    Returns:
+        SyntheticCorpus: Corpus configurato (thread avviato al primo log distribuito)
+    """
+    return SyntheticCorpus(
+        base,
+        difficulty_config,
+        share=float(os.getenv('LOG_SYNTHESIS_SHARE', DEFAULT_SHARE)),
+        pool_size=int(os.getenv('LOG_SYNTHESIS_POOL_SIZE', 256)),
+        batch_size=int(os.getenv('LOG_SYNTHESIS_BATCH', 64)),
+        cache_size=int(os.getenv('LOG_SYNTHESIS_CACHE_SIZE', 4096))
+    )
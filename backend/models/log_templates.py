@@ -0,0 +1,532 @@
+"""
+CYBER KILL CHAIN ANALYZER - TEMPLATE DEI LOG SINTETICI
+
+Template da cui models/log_synthesis.py genera varianti illimitate dei log
+di sicurezza. Ogni template appartiene a una fase della Kill Chain e contiene:
+- key: identificatore stabile (finisce nell'ID dei log generati, non va rinominato)
+- raw: testo del log con segnaposto {slot}; il timestamp viene anteposto
+- slots: valore di ogni segnaposto, come tipo di slot (vedi SLOT_TYPES in
+  log_synthesis.py) o come tupla ('int', min, max), ('choice', opzioni),
+  ('sample', opzioni, min, max)
+- metadata: '{slot}' da solo mantiene il tipo del valore (int, lista),
+  altre stringhe vengono formattate, gli altri valori sono costanti
+- explanation e indicators: come nei log di LOGS_DATABASE (anche con segnaposto)
+"""
+
+LOG_TEMPLATES = [
+    # --- FASE 1: RECONNAISSANCE ---
+    {
+        'key': 'recon-dns',
+        'phase': 'reconnaissance',
+        'source': 'IDS di Rete',
+        'severity': ('Bassa', 'Media'),
+        'raw': '[IDS] Multiple DNS queries detected from external IP {source_ip} for {targets}. '
+               '{queries} queries in {minutes} minutes suggest automated reconnaissance tool usage.',
+        'slots': {
+            'source_ip': 'external_ip',
+            'targets': 'servers',
+            'queries': ('int', 20, 600),
+            'minutes': ('int', 2, 45),
+            'tool': ('choice', ('nmap/dnsrecon', 'dnsenum', 'fierce', 'amass')),
+        },
+        'metadata': {
+            'source_ip': '{source_ip}',
+            'queries': '{queries}',
+            'targets': '{targets}',
+            'tool_signature': '{tool}',
+        },
+        'explanation': 'Query DNS multiple da {source_ip} verso componenti dell\'infrastruttura indicano '
+                       'la fase di ricognizione, in cui gli attaccanti mappano la rete.',
+        'indicators': ['Enumerazione DNS', 'Scansione esterna', 'Mappatura dell\'infrastruttura'],
+    },
+    {
+        'key': 'recon-portscan',
+        'phase': 'reconnaissance',
+        'source': 'Log Firewall',
+        'severity': ('Bassa', 'Media'),
+        'raw': '[Firewall] Port scan detected from {source_ip} targeting TCP ports {target_ports} on {target}. '
+               'Scan pattern indicates systematic enumeration.',
+        'slots': {
+            'source_ip': 'external_ip',
+            'target_ports': 'ports',
+            'target': 'public_ip',
+            'scan_type': ('choice', ('TCP SYN Scan', 'TCP Connect Scan', 'FIN Scan', 'XMAS Scan')),
+            'minutes': ('int', 1, 60),
+        },
+        'metadata': {
+            'source_ip': '{source_ip}',
+            'target_ports': '{target_ports}',
+            'scan_type': '{scan_type}',
+            'duration': '{minutes} minutes',
+        },
+        'explanation': 'Scansione sistematica delle porte comuni indica attività di ricognizione '
+                       'per identificare servizi esposti.',
+        'indicators': ['Scansione porte', 'Enumerazione servizi', 'Mappatura superficie d\'attacco'],
+    },
+    {
+        'key': 'recon-crawl',
+        'phase': 'reconnaissance',
+        'source': 'Web Application Firewall',
+        'severity': ('Bassa',),
+        'raw': '[WAF] Automated crawler from {source_ip} requested {requests} URLs on {site} in {minutes} minutes, '
+               'including /robots.txt, /.git/HEAD and /admin. User-Agent: "{user_agent}".',
+        'slots': {
+            'source_ip': 'external_ip',
+            'requests': ('int', 300, 20000),
+            'site': 'web_host',
+            'minutes': ('int', 3, 90),
+            'user_agent': 'scanner_agent',
+        },
+        'metadata': {
+            'source_ip': '{source_ip}',
+            'requests': '{requests}',
+            'target_site': '{site}',
+            'user_agent': '{user_agent}',
+        },
+        'explanation': 'L\'esplorazione automatica di percorsi nascosti del sito serve a raccogliere '
+                       'informazioni su tecnologie e pagine esposte: è ricognizione.',
+        'indicators': ['Crawling automatizzato', 'Enumerazione di percorsi', 'User-Agent di uno scanner'],
+    },
+
+    # --- FASE 2: WEAPONIZATION ---
+    {
+        'key': 'weapon-macro',
+        'phase': 'weaponization',
+        'source': 'Gateway di Sicurezza Email',
+        'severity': ('Alta',),
+        'raw': '[Email Security] Suspicious attachment detected: "{filename}" contains obfuscated VBA macro '
+               'with {payload_type} download cradle. Hash {file_hash} matches known malware builder output.',
+        'slots': {
+            'filename': 'macro_document',
+            'file_hash': 'sha256',
+            'payload_type': ('choice', ('PowerShell', 'mshta', 'certutil', 'bitsadmin')),
+        },
+        'metadata': {
+            'filename': '{filename}',
+            'file_hash': '{file_hash}',
+            'macro_detected': True,
+            'payload_type': '{payload_type} downloader',
+        },
+        'explanation': 'Documento dannoso con macro incorporata rappresenta la fase di armamento, in cui '
+                       'l\'exploit viene confezionato insieme al carico dannoso.',
+        'indicators': ['Documento con macro abilitate', 'Codice offuscato', 'Script di download'],
+    },
+    {
+        'key': 'weapon-sandbox',
+        'phase': 'weaponization',
+        'source': 'Sandbox di Analisi Malware',
+        'severity': ('Media', 'Alta'),
+        'raw': '[Sandbox] Sample {file_hash} ("{filename}") built with {builder}: {packer}-packed payload '
+               'embedding an exploit for {cve}, compiled {hours} hours before first sighting.',
+        'slots': {
+            'file_hash': 'sha256',
+            'filename': 'lure_document',
+            'builder': ('choice', ('MacroPack', 'EvilClippy', 'Metasploit msfvenom', 'ThreadKit')),
+            'packer': ('choice', ('UPX', 'Themida', 'ConfuserEx', 'custom XOR')),
+            'cve': 'document_cve',
+            'hours': ('int', 1, 72),
+        },
+        'metadata': {
+            'file_hash': '{file_hash}',
+            'builder': '{builder}',
+            'packer': '{packer}',
+            'exploit': '{cve}',
+            'compile_age_hours': '{hours}',
+        },
+        'explanation': 'Un file appena compilato con un builder di malware, impacchettato e con un exploit '
+                       'incorporato mostra la preparazione dell\'arma: fase di armamento.',
+        'indicators': ['Builder di malware', 'Payload impacchettato', 'Exploit incorporato'],
+    },
+    {
+        'key': 'weapon-iso',
+        'phase': 'weaponization',
+        'source': 'Threat Intelligence',
+        'severity': ('Media',),
+        'raw': '[Threat Intel] Newly registered domain {domain} (registered {days} days ago) hosts archive '
+               '"{archive}" bundling a malicious LNK shortcut and DLL loader {file_hash}.',
+        'slots': {
+            'domain': 'malicious_domain',
+            'days': ('int', 1, 14),
+            'archive': 'archive_name',
+            'file_hash': 'sha256',
+        },
+        'metadata': {
+            'domain': '{domain}',
+            'domain_age_days': '{days}',
+            'archive': '{archive}',
+            'loader_hash': '{file_hash}',
+        },
+        'explanation': 'Un archivio che combina collegamento LNK e loader DLL, pronto su un dominio appena '
+                       'registrato, è un\'arma confezionata ma non ancora consegnata: fase di armamento.',
+        'indicators': ['Archivio ISO/ZIP con LNK', 'Loader DLL', 'Dominio registrato di recente'],
+    },
+
+    # --- FASE 3: DELIVERY ---
+    {
+        'key': 'delivery-phish',
+        'phase': 'delivery',
+        'source': 'Sicurezza Email',
+        'severity': ('Alta',),
+        'raw': '[Email Gateway] Phishing campaign detected: {recipients} emails sent to employees from '
+               '"{sender}" with subject "{subject}". Contains link to credential harvesting site {url}.',
+        'slots': {
+            'recipients': ('int', 5, 400),
+            'sender': 'sender',
+            'subject': 'phishing_subject',
+            'url': 'malicious_url',
+        },
+        'metadata': {
+            'sender': '{sender}',
+            'recipients': '{recipients}',
+            'subject': '{subject}',
+            'malicious_url': '{url}',
+        },
+        'explanation': 'Una campagna di phishing di massa rappresenta la fase di consegna, in cui il carico '
+                       'dannoso raggiunge i bersagli.',
+        'indicators': ['Email di phishing', 'Mittente contraffatto', 'Raccolta di credenziali'],
+    },
+    {
+        'key': 'delivery-download',
+        'phase': 'delivery',
+        'source': 'Proxy Web',
+        'severity': ('Media', 'Alta'),
+        'raw': '[Proxy] User {user} on {host} downloaded "{filename}" ({size_kb} KB) from {url} '
+               'after a redirect from compromised site {site}.',
+        'slots': {
+            'user': 'user',
+            'host': 'workstation',
+            'filename': 'lure_document',
+            'size_kb': ('int', 40, 4000),
+            'url': 'malicious_url',
+            'site': 'compromised_site',
+        },
+        'metadata': {
+            'user': '{user}',
+            'host': '{host}',
+            'filename': '{filename}',
+            'download_url': '{url}',
+            'referrer': '{site}',
+        },
+        'explanation': 'Il download del file dannoso tramite un sito compromesso (drive-by) è il momento in '
+                       'cui l\'arma raggiunge la vittima: fase di consegna.',
+        'indicators': ['Download drive-by', 'Redirect da sito compromesso', 'File sospetto scaricato'],
+    },
+    {
+        'key': 'delivery-usb',
+        'phase': 'delivery',
+        'source': 'Controllo Dispositivi Endpoint',
+        'severity': ('Media',),
+        'raw': '[Device Control] Unknown USB mass storage device (serial {serial}) connected to {host} by {user}; '
+               'file "{filename}" copied to the Desktop.',
+        'slots': {
+            'serial': 'usb_serial',
+            'host': 'workstation',
+            'user': 'user',
+            'filename': 'lure_document',
+        },
+        'metadata': {
+            'device_serial': '{serial}',
+            'host': '{host}',
+            'user': '{user}',
+            'copied_file': '{filename}',
+        },
+        'explanation': 'Una chiavetta sconosciuta che porta un file sul computer della vittima è un vettore '
+                       'di consegna fisico.',
+        'indicators': ['Supporto rimovibile sconosciuto', 'Copia di file', 'Vettore fisico'],
+    },
+
+    # --- FASE 4: EXPLOITATION ---
+    {
+        'key': 'exploit-office',
+        'phase': 'exploitation',
+        'source': 'Rilevamento Endpoint',
+        'severity': ('Critica',),
+        'raw': '[EDR] Process injection detected on {host}: {parent_process} spawned {child_process} with '
+               'encoded command attempting to bypass AMSI. Memory analysis shows shellcode execution.',
+        'slots': {
+            'host': 'workstation',
+            'parent_process': 'office_process',
+            'child_process': 'script_host',
+        },
+        'metadata': {
+            'host': '{host}',
+            'parent_process': '{parent_process}',
+            'child_process': '{child_process}',
+            'technique': 'Process Injection',
+            'amsi_bypass': True,
+        },
+        'explanation': 'L\'esecuzione di codice dannoso da un documento Office indica l\'avvenuto sfruttamento '
+                       'di una vulnerabilità.',
+        'indicators': ['Iniezione di processo', 'Bypass di AMSI', 'Esecuzione di shellcode'],
+    },
+    {
+        'key': 'exploit-web',
+        'phase': 'exploitation',
+        'source': 'Web Application Firewall',
+        'severity': ('Alta', 'Critica'),
+        'raw': '[WAF] Exploit attempt from {source_ip} against {site} triggered {cve}; '
+               'web server process {process} spawned /bin/sh and ran "{command}".',
+        'slots': {
+            'source_ip': 'external_ip',
+            'site': 'web_host',
+            'cve': 'web_cve',
+            'process': ('choice', ('java', 'w3wp.exe', 'httpd', 'php-fpm', 'tomcat9')),
+            'command': ('choice', ('id', 'whoami', 'uname -a', 'cat /etc/passwd')),
+        },
+        'metadata': {
+            'source_ip': '{source_ip}',
+            'target_site': '{site}',
+            'vulnerability': '{cve}',
+            'spawned_shell': True,
+        },
+        'explanation': 'Un processo web che avvia una shell subito dopo una richiesta malevola mostra che la '
+                       'vulnerabilità {cve} è stata sfruttata.',
+        'indicators': ['Exploit di un\'applicazione web', 'Shell avviata dal server web', 'Esecuzione di comandi'],
+    },
+    {
+        'key': 'exploit-service',
+        'phase': 'exploitation',
+        'source': 'IDS di Rete',
+        'severity': ('Critica',),
+        'raw': '[IDS] Remote code execution on {server} ({internal_ip}): {cve} exploited over TCP {port} '
+               'from {source_ip}, followed by an outbound reverse shell.',
+        'slots': {
+            'server': 'server',
+            'internal_ip': 'internal_ip',
+            'cve': 'service_cve',
+            'port': ('choice', (445, 3389, 8443, 443, 7001, 8080)),
+            'source_ip': 'external_ip',
+        },
+        'metadata': {
+            'target_host': '{server}',
+            'target_ip': '{internal_ip}',
+            'vulnerability': '{cve}',
+            'port': '{port}',
+            'source_ip': '{source_ip}',
+        },
+        'explanation': 'L\'esecuzione di codice remoto tramite una vulnerabilità di un servizio esposto è '
+                       'la fase di sfruttamento.',
+        'indicators': ['Exploit di servizio remoto', 'Reverse shell', 'Vulnerabilità nota'],
+    },
+
+    # --- FASE 5: INSTALLATION ---
+    {
+        'key': 'install-service',
+        'phase': 'installation',
+        'source': 'Sysmon',
+        'severity': ('Alta',),
+        'raw': '[Sysmon] Registry persistence detected: New service "{service_name}" created pointing to '
+               '{file_path}. File signed with invalid certificate, scheduled task created for {schedule} execution.',
+        'slots': {
+            'service_name': 'service_name',
+            'file_path': 'dropped_path',
+            'schedule': ('choice', ('hourly', 'daily', 'at-logon', 'every 15 minutes')),
+        },
+        'metadata': {
+            'service_name': '{service_name}',
+            'file_path': '{file_path}',
+            'persistence_type': 'Servizio + Attività Pianificata',
+            'certificate': 'Non valido',
+        },
+        'explanation': 'Il malware che stabilisce persistenza tramite servizi e attività pianificate indica '
+                       'la fase di installazione.',
+        'indicators': ['Creazione di servizio', 'Attività pianificata', 'Meccanismo di persistenza'],
+    },
+    {
+        'key': 'install-runkey',
+        'phase': 'installation',
+        'source': 'Sysmon',
+        'severity': ('Media', 'Alta'),
+        'raw': '[Sysmon] Registry value set by {process} on {host}: '
+               'HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\{value_name} = "{file_path}".',
+        'slots': {
+            'process': 'script_host',
+            'host': 'workstation',
+            'value_name': 'service_name',
+            'file_path': 'dropped_path',
+        },
+        'metadata': {
+            'host': '{host}',
+            'registry_key': 'HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Run',
+            'value_name': '{value_name}',
+            'file_path': '{file_path}',
+        },
+        'explanation': 'Una chiave Run che avvia un eseguibile a ogni accesso garantisce la persistenza del '
+                       'malware: fase di installazione.',
+        'indicators': ['Chiave di registro Run', 'Avvio automatico', 'Eseguibile in percorso anomalo'],
+    },
+    {
+        'key': 'install-webshell',
+        'phase': 'installation',
+        'source': 'Monitoraggio Integrità File',
+        'severity': ('Alta', 'Critica'),
+        'raw': '[File Integrity] New file {webshell} written to the web root of {site} by {process}; '
+               'content matches the {family} web shell family.',
+        'slots': {
+            'webshell': 'webshell_path',
+            'site': 'web_host',
+            'process': ('choice', ('w3wp.exe', 'httpd', 'php-fpm', 'nginx')),
+            'family': ('choice', ('China Chopper', 'ASPXSpy', 'WSO', 'b374k')),
+        },
+        'metadata': {
+            'file_path': '{webshell}',
+            'site': '{site}',
+            'writer_process': '{process}',
+            'family': '{family}',
+        },
+        'explanation': 'Una web shell scritta nella root del sito dà all\'attaccante un accesso persistente '
+                       'al server: fase di installazione.',
+        'indicators': ['Web shell', 'File nuovo nella web root', 'Accesso persistente'],
+    },
+
+    # --- FASE 6: COMMAND & CONTROL ---
+    {
+        'key': 'c2-beacon',
+        'phase': 'command_control',
+        'source': 'Monitor di Sicurezza di Rete',
+        'severity': ('Critica',),
+        'raw': '[Network Monitor] Suspicious beaconing detected: Host {internal_host} communicating with '
+               '{c2_ip}:{c2_port} every {interval} seconds with jitter of {jitter}%. '
+               'Traffic pattern matches {framework} beacon.',
+        'slots': {
+            'internal_host': 'internal_ip',
+            'c2_ip': 'external_ip',
+            'c2_port': ('choice', (443, 8443, 80, 8080, 53)),
+            'interval': ('choice', (30, 60, 120, 300, 600)),
+            'jitter': ('int', 0, 35),
+            'framework': 'c2_framework',
+        },
+        'metadata': {
+            'internal_host': '{internal_host}',
+            'c2_server': '{c2_ip}:{c2_port}',
+            'beacon_interval': '{interval} secondi',
+            'protocol': 'HTTPS',
+        },
+        'explanation': 'Un pattern regolare di beaconing verso un server esterno indica l\'avvenuta creazione '
+                       'di un canale di comando e controllo.',
+        'indicators': ['Comportamento di beaconing', 'Intervalli regolari', 'Comunicazione esterna'],
+    },
+    {
+        'key': 'c2-dns',
+        'phase': 'command_control',
+        'source': 'Sicurezza DNS',
+        'severity': ('Alta',),
+        'raw': '[DNS Security] DNS tunneling suspected: {internal_host} issued {queries} TXT queries to random '
+               'subdomains of {domain} in the last hour, average label length {label_length} characters.',
+        'slots': {
+            'internal_host': 'internal_ip',
+            'queries': ('int', 800, 40000),
+            'domain': 'malicious_domain',
+            'label_length': ('int', 32, 63),
+        },
+        'metadata': {
+            'internal_host': '{internal_host}',
+            'domain': '{domain}',
+            'queries_per_hour': '{queries}',
+            'record_type': 'TXT',
+        },
+        'explanation': 'Molte query DNS con sottodomini lunghi e casuali verso lo stesso dominio sono un canale '
+                       'nascosto di comando e controllo.',
+        'indicators': ['Tunneling DNS', 'Sottodomini ad alta entropia', 'Volume anomalo di query'],
+    },
+    {
+        'key': 'c2-https',
+        'phase': 'command_control',
+        'source': 'Proxy Web',
+        'severity': ('Alta', 'Critica'),
+        'raw': '[Proxy] {host} ({internal_host}) keeps a long-lived HTTPS session to {domain} ({c2_ip}) '
+               'with a self-signed certificate; TLS fingerprint JA3 {ja3} is associated with {framework}.',
+        'slots': {
+            'host': 'workstation',
+            'internal_host': 'internal_ip',
+            'domain': 'malicious_domain',
+            'c2_ip': 'external_ip',
+            'ja3': 'md5',
+            'framework': 'c2_framework',
+        },
+        'metadata': {
+            'host': '{host}',
+            'c2_server': '{domain}',
+            'ja3': '{ja3}',
+            'certificate': 'Autofirmato',
+        },
+        'explanation': 'Una sessione cifrata persistente verso un server con impronta TLS nota di un framework '
+                       'C2 indica il canale di comando e controllo.',
+        'indicators': ['Impronta TLS nota', 'Certificato autofirmato', 'Sessione persistente'],
+    },
+
+    # --- FASE 7: ACTIONS ON OBJECTIVES ---
+    {
+        'key': 'action-exfil',
+        'phase': 'actions_objectives',
+        'source': 'Prevenzione Perdita Dati',
+        'severity': ('Critica',),
+        'raw': '[DLP] Mass data exfiltration detected: {data_volume} of sensitive files from {share} share '
+               'compressed and uploaded to {destination}. Files include {files}.',
+        'slots': {
+            'data_volume': 'volume',
+            'share': ('choice', ('Finance', 'HR', 'Legal', 'R&D', 'Sales')),
+            'destination': ('choice', ('cloud storage', 'a file-sharing service', 'an external SFTP server')),
+            'files': 'sensitive_files',
+        },
+        'metadata': {
+            'data_volume': '{data_volume}',
+            'source_share': '{share}',
+            'destination': '{destination}',
+            'compression': True,
+        },
+        'explanation': 'Il furto su larga scala di dati indica che l\'attaccante ha raggiunto l\'obiettivo di '
+                       'sottrarre informazioni sensibili.',
+        'indicators': ['Esfiltrazione di dati', 'File sensibili', 'Grande volume di dati'],
+    },
+    {
+        'key': 'action-ransom',
+        'phase': 'actions_objectives',
+        'source': 'Rilevamento Endpoint',
+        'severity': ('Critica',),
+        'raw': '[EDR] Ransomware activity on {server}: {files} files encrypted in {minutes} minutes with '
+               'extension .{extension} by {process}; ransom note README_RESTORE.txt dropped in every folder.',
+        'slots': {
+            'server': 'server',
+            'files': ('int', 2000, 900000),
+            'minutes': ('int', 2, 40),
+            'extension': 'ransom_extension',
+            'process': 'dropped_process',
+        },
+        'metadata': {
+            'host': '{server}',
+            'encrypted_files': '{files}',
+            'extension': '.{extension}',
+            'shadow_copies_deleted': True,
+        },
+        'explanation': 'La cifratura massiva dei file con richiesta di riscatto è l\'obiettivo finale '
+                       'dell\'attacco: azioni sugli obiettivi.',
+        'indicators': ['Cifratura massiva', 'Nota di riscatto', 'Impatto sui dati'],
+    },
+    {
+        'key': 'action-dbdump',
+        'phase': 'actions_objectives',
+        'source': 'Audit Database',
+        'severity': ('Alta', 'Critica'),
+        'raw': '[Database Audit] Account {user} exported {rows} rows from table {table} on {server} '
+               'and transferred {data_volume} to {destination_ip}.',
+        'slots': {
+            'user': 'user',
+            'rows': ('int', 50000, 9000000),
+            'table': ('choice', ('customers', 'payments', 'employees', 'patients', 'credentials')),
+            'server': 'server',
+            'data_volume': 'volume',
+            'destination_ip': 'external_ip',
+        },
+        'metadata': {
+            'user': '{user}',
+            'table': '{table}',
+            'rows': '{rows}',
+            'data_volume': '{data_volume}',
+            'destination': '{destination_ip}',
+        },
+        'explanation': 'L\'estrazione di un\'intera tabella di dati sensibili e il trasferimento all\'esterno '
+                       'sono il furto di dati che l\'attaccante cercava.',
+        'indicators': ['Dump del database', 'Trasferimento verso l\'esterno', 'Dati sensibili'],
+    },
+]
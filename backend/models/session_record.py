@@ -0,0 +1,182 @@
+"""
+CYBER KILL CHAIN ANALYZER - RECORD DI SESSIONE
+
+Rappresentazione compatta di una sessione utente nel session store in memoria.
+Un dizionario con dieci chiavi, un timestamp ISO e una lista occupa diverse
+centinaia di byte per sessione; SessionRecord usa __slots__ con:
+- contatori interi (gli interi piccoli sono condivisi dall'interprete)
+- identificatori di log, fase e mitigazione internati (una copia per valore)
+- fasi padroneggiate come bitmask sull'ordine di CYBER_KILL_CHAIN_PHASES
+- data di creazione come timestamp epoch (float)
+- mazzo dei log già visti come stringa base64 di 152 byte (vedi models/log_deck.py)
+- per gli studenti di una classe (cohort): tentativi ed errori per fase e tempo
+  di risposta, letti dagli aggregati della classe (vedi services/cohorts.py);
+  per chi gioca da solo restano None / 0
+
+Il record è anche una MutableMapping con le stesse chiavi del dizionario
+originale: session['score'], session.get('created_at'), dict(session), ...
+funzionano come prima. I backend che serializzano le sessioni (sqlite, redis)
+salvano dict(session) e al caricamento si ricostruisce il record con from_dict().
+"""
+
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from models.game_data import CYBER_KILL_CHAIN_PHASES
+
+# Posizione di ogni fase nella bitmask delle fasi padroneggiate
+PHASE_ORDER = tuple(CYBER_KILL_CHAIN_PHASES)
+_PHASE_BITS = {phase: 1 << position for position, phase in enumerate(PHASE_ORDER)}
+
+# Chiavi della vista a dizionario, nello stesso ordine del dizionario originale
+SESSION_KEYS = (
+    'score', 'streak', 'total_attempts', 'correct_attempts',
+    'current_log', 'correct_phase', 'correct_mitigation',
+    'mastered_phases', 'created_at', 'version', 'log_deck',
+    'cohort', 'round_started_ts', 'phase_stats', 'answer_seconds'
+)
+_INTERNED_KEYS = frozenset(('current_log', 'correct_phase', 'correct_mitigation', 'cohort'))
+
+def _intern(value):
+    """Interna gli identificatori stringa (None resta None)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class SessionRecord(MutableMapping):
+    """
+    Sessione utente con attributi a slot fissi e vista a dizionario
+    """
+
+    __slots__ = (
+        'score', 'streak', 'total_attempts', 'correct_attempts',
+        'current_log', 'correct_phase', 'correct_mitigation',
+        'mastered_mask', 'created_ts', 'version', 'log_deck',
+        'cohort', 'round_started_ts', 'phase_stats', 'answer_seconds'
+    )
+
+    def __init__(self, created_ts=None):
+        """
+        Args:
+            created_ts (float): Timestamp epoch di creazione (default: adesso)
+        """
+        self.score = 0                  # Punteggio totale accumulato
+        self.streak = 0                 # Serie di risposte corrette consecutive
+        self.total_attempts = 0         # Numero totale di tentativi
+        self.correct_attempts = 0       # Numero di risposte corrette
+        self.current_log = None         # ID del log attualmente in gioco
+        self.correct_phase = None       # Fase corretta per il log corrente
+        self.correct_mitigation = None  # Mitigazione ottimale per la fase
+        self.mastered_mask = 0          # Fasi con almeno un round corretto (bitmask)
+        self.created_ts = datetime.now().timestamp() if created_ts is None else created_ts
+        self.version = 0                # Versione per i salvataggi condizionati
+        self.log_deck = None            # Mazzo dei log già visti (base64, vedi LogDeck)
+        self.cohort = None              # Classe dello studente (None se gioca da solo)
+        self.round_started_ts = None    # Quando è stato servito il log non ancora valutato
+        self.phase_stats = None         # Tentativi ed errori per fase, alternati (solo in una classe)
+        self.answer_seconds = 0.0       # Secondi spesi a rispondere (solo in una classe)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Ricostruisce il record da un dizionario (es. sessione letta da sqlite o redis)
+        Le chiavi mancanti restano ai valori di default, quelle sconosciute vengono ignorate
+
+        Args:
+            data (dict): Sessione nel formato a dizionario
+
+        Returns:
+            SessionRecord: Record equivalente
+        """
+        record = cls()
+        for key in SESSION_KEYS:
+            if key in data:
+                record[key] = data[key]
+        return record
+
+    # Attributi con una rappresentazione diversa nella vista a dizionario ----
+
+    @property
+    def mastered_phases(self):
+        """Fasi padroneggiate, nell'ordine della Kill Chain"""
+        mask = self.mastered_mask
+        return [phase for phase in PHASE_ORDER if mask & _PHASE_BITS[phase]]
+
+    @mastered_phases.setter
+    def mastered_phases(self, phases):
+        mask = 0
+        for phase in phases:
+            mask |= _PHASE_BITS.get(phase, 0)
+        self.mastered_mask = mask
+
+    def add_mastered_phase(self, phase):
+        """
+        Registra una fase tra quelle padroneggiate
+
+        Returns:
+            bool: True se la fase non era ancora padroneggiata
+        """
+        bit = _PHASE_BITS.get(phase, 0)
+        if not bit or self.mastered_mask & bit:
+            return False
+        self.mastered_mask |= bit
+        return True
+
+    def copy(self):
+        """Copia superficiale del record, come dict.copy()"""
+        clone = SessionRecord.__new__(SessionRecord)
+        for name in SessionRecord.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    @property
+    def created_at(self):
+        """Data di creazione in formato ISO, come get_current_timestamp()"""
+        return datetime.fromtimestamp(self.created_ts).isoformat()
+
+    @created_at.setter
+    def created_at(self, value):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value).timestamp() if value else 0.0
+        self.created_ts = float(value)
+
+    # Vista a dizionario ------------------------------------------------------
+
+    def __getitem__(self, key):
+        if key not in SESSION_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in SESSION_KEYS:
+            raise KeyError(key)
+        setattr(self, key, _intern(value) if key in _INTERNED_KEYS else value)
+
+    def __delitem__(self, key):
+        # I campi sono fissi: una chiave non può essere rimossa
+        raise TypeError('session fields cannot be deleted')
+
+    def __iter__(self):
+        return iter(SESSION_KEYS)
+
+    def __len__(self):
+        return len(SESSION_KEYS)
+
+    def __contains__(self, key):
+        return key in SESSION_KEYS
+
+    def __repr__(self):
+        return f'SessionRecord({dict(self)!r})'
+
+def as_session_record(session):
+    """
+    Restituisce la sessione come SessionRecord, convertendo i dizionari
+
+    Args:
+        session: SessionRecord, dizionario o None
+
+    Returns:
+        SessionRecord: Record della sessione (None se session è None)
+    """
+    if session is None or isinstance(session, SessionRecord):
+        return session
+    return SessionRecord.from_dict(session)
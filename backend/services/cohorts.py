@@ -0,0 +1,410 @@
+"""
+CYBER KILL CHAIN ANALYZER - AGGREGATI PER CLASSE
+Statistiche di ogni classe (cohort) aggiornate a ogni round, con backend intercambiabili
+
+- MemoryCohortStats: dizionari in-process (backend memory)
+- SQLiteCohortStats: tabelle con i totali per classe (backend sqlite)
+- RedisCohortStats:  hash e sorted set Redis (backend redis)
+
+Ogni studente contribuisce con un vettore di contatori assoluti (vedi
+student_vector): l'aggiornamento sottrae dai totali della classe il vettore
+precedente dello studente e aggiunge quello nuovo. Ripetere lo stesso
+aggiornamento (es. un salvataggio condizionato ritentato) non conta due volte.
+
+Leggere le statistiche di una classe costa O(1) (più k per gli studenti più
+lenti), indipendentemente dal numero di studenti e di sessioni.
+"""
+
+import bisect
+import json
+import threading
+
+from models.session_record import PHASE_ORDER
+from services.session_store import SQLiteSessionStore, RedisSessionStore
+
+# Posizioni nel vettore di uno studente (e nei totali della classe)
+ROUNDS, CORRECT, ACCURACY_SUM, ACTIVE, ANSWERS, ANSWER_SECONDS = range(6)
+PHASE_OFFSET = 6
+VECTOR_SIZE = PHASE_OFFSET + 2 * len(PHASE_ORDER)
+
+# Chiavi Redis degli aggregati
+REDIS_TOTALS_KEY = 'ckc:cohort:{}:totals'
+REDIS_SLOWEST_KEY = 'ckc:cohort:{}:slowest'
+REDIS_STUDENT_KEY = 'ckc:cohort:student:{}'
+
+def student_vector(session):
+    """
+    Contatori di uno studente nel formato dei totali della classe
+
+    Args:
+        session: Sessione dello studente (SessionRecord o dizionario)
+
+    Returns:
+        tuple: rounds, corretti, accuratezza (0-1), attivo (0/1), risposte,
+            secondi di risposta, poi tentativi ed errori di ogni fase
+    """
+    rounds = session.get('total_attempts', 0)
+    correct = session.get('correct_attempts', 0)
+    phase_stats = tuple(session.get('phase_stats') or (0,) * (2 * len(PHASE_ORDER)))
+    return (
+        rounds,
+        correct,
+        correct / rounds if rounds else 0.0,
+        1 if rounds else 0,
+        sum(phase_stats[0::2]),
+        session.get('answer_seconds', 0.0),
+    ) + phase_stats
+
+def average_seconds(vector):
+    """Returns: float: Tempo medio di risposta dello studente (None se non ha risposto)"""
+    return vector[ANSWER_SECONDS] / vector[ANSWERS] if vector[ANSWERS] else None
+
+# ============================================================================
+# INTERFACCIA COMUNE
+# ============================================================================
+
+class CohortStats:
+    """
+    Interfaccia comune degli aggregati per classe
+    Uno studente appartiene a una sola classe: aggiornarlo con un'altra classe lo sposta
+    """
+
+    def update(self, cohort_id, session_id, vector):
+        """
+        Inserisce o aggiorna uno studente - O(1) (O(log n) per l'ordine dei più lenti)
+
+        Args:
+            cohort_id (str): ID della classe
+            session_id (str): ID della sessione dello studente
+            vector (tuple): Contatori assoluti dello studente (vedi student_vector)
+        """
+        raise NotImplementedError
+
+    def remove(self, session_id):
+        """
+        Rimuove uno studente dalla sua classe - O(1)
+
+        Returns:
+            str: ID della classe lasciata, o None se lo studente non era in una classe
+        """
+        raise NotImplementedError
+
+    def totals(self, cohort_id):
+        """
+        Returns:
+            tuple: (studenti, totali della classe) oppure None se la classe non esiste
+        """
+        raise NotImplementedError
+
+    def slowest(self, cohort_id, k):
+        """
+        Returns:
+            list: Fino a k tuple (session_id, vettore), dal tempo medio di risposta più alto
+        """
+        raise NotImplementedError
+
+# Vettore di chi non c'era (prima dell'iscrizione) o non c'è più (dopo la rimozione)
+_EMPTY = (0,) * VECTOR_SIZE
+
+def _apply(totals, old, new):
+    """Totali aggiornati: meno il vettore precedente, più quello nuovo"""
+    return [total - before + after for total, before, after in zip(totals, old, new)]
+
+# ============================================================================
+# BACKEND IN MEMORIA
+# ============================================================================
+
+class MemoryCohortStats(CohortStats):
+    """
+    Aggregati in memoria: totali per classe e, per ogni classe, una lista
+    ordinata (bisect) degli studenti per tempo medio di risposta decrescente
+    """
+
+    def __init__(self):
+        self._students = {}   # session_id -> (cohort_id, vettore)
+        self._totals = {}     # cohort_id -> [studenti, totali]
+        self._slowest = {}    # cohort_id -> lista ordinata di (-secondi medi, session_id)
+        self._lock = threading.Lock()
+
+    def _rerank(self, cohort_id, session_id, old, new):
+        """Sposta lo studente nell'ordine dei più lenti, solo se il tempo medio è cambiato"""
+        before, after = average_seconds(old), average_seconds(new)
+        if before == after:
+            return
+        ranking = self._slowest[cohort_id]
+        if before is not None:
+            del ranking[bisect.bisect_left(ranking, (-before, session_id))]
+        if after is not None:
+            bisect.insort(ranking, (-after, session_id))
+
+    def _detach(self, session_id, cohort_id, vector):
+        entry = self._totals[cohort_id]
+        entry[0] -= 1
+        entry[1] = _apply(entry[1], vector, _EMPTY)
+        self._rerank(cohort_id, session_id, vector, _EMPTY)
+        if entry[0] == 0:
+            del self._totals[cohort_id]
+            del self._slowest[cohort_id]
+
+    def update(self, cohort_id, session_id, vector):
+        vector = tuple(vector)
+        with self._lock:
+            previous = self._students.get(session_id)
+            if previous is not None and previous[0] == cohort_id:
+                # Stessa classe: si applica solo la differenza
+                old = previous[1]
+                if old == vector:
+                    return
+                entry = self._totals[cohort_id]
+            else:
+                if previous is not None:
+                    self._detach(session_id, *previous)
+                old = _EMPTY
+                entry = self._totals.setdefault(cohort_id, [0, list(_EMPTY)])
+                self._slowest.setdefault(cohort_id, [])
+                entry[0] += 1
+            entry[1] = _apply(entry[1], old, vector)
+            self._rerank(cohort_id, session_id, old, vector)
+            self._students[session_id] = (cohort_id, vector)
+
+    def remove(self, session_id):
+        with self._lock:
+            previous = self._students.pop(session_id, None)
+            if previous is None:
+                return None
+            self._detach(session_id, *previous)
+            return previous[0]
+
+    def totals(self, cohort_id):
+        with self._lock:
+            entry = self._totals.get(cohort_id)
+            return (entry[0], tuple(entry[1])) if entry else None
+
+    def slowest(self, cohort_id, k):
+        with self._lock:
+            ranking = self._slowest.get(cohort_id, ())
+            return [(session_id, self._students[session_id][1]) for _, session_id in ranking[:k]]
+
+# ============================================================================
+# BACKEND SQLITE
+# ============================================================================
+
+class SQLiteCohortStats(CohortStats):
+    """
+    Aggregati su tabelle SQLite, nello stesso file del session store
+    I totali di ogni classe sono una riga; gli studenti più lenti si leggono
+    dall'indice su (classe, tempo medio)
+    """
+
+    def __init__(self, store):
+        self._store = store
+        conn = store.connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cohort_totals ('
+            ' cohort TEXT PRIMARY KEY,'
+            ' students INTEGER NOT NULL,'
+            ' totals TEXT NOT NULL'
+            ')'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cohort_students ('
+            ' session_id TEXT PRIMARY KEY,'
+            ' cohort TEXT NOT NULL,'
+            ' vector TEXT NOT NULL,'
+            ' average_seconds REAL'
+            ')'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_cohort_students_slowest'
+            ' ON cohort_students (cohort, average_seconds DESC)'
+        )
+
+    def _add_to_totals(self, conn, cohort_id, students, old, new):
+        row = conn.execute(
+            'SELECT students, totals FROM cohort_totals WHERE cohort = ?', (cohort_id,)
+        ).fetchone()
+        count = (row[0] if row else 0) + students
+        if count <= 0:
+            conn.execute('DELETE FROM cohort_totals WHERE cohort = ?', (cohort_id,))
+            return
+        totals = _apply(json.loads(row[1]) if row else _EMPTY, old, new)
+        conn.execute(
+            'INSERT OR REPLACE INTO cohort_totals (cohort, students, totals) VALUES (?, ?, ?)',
+            (cohort_id, count, json.dumps(totals))
+        )
+
+    def _previous(self, conn, session_id):
+        row = conn.execute(
+            'SELECT cohort, vector FROM cohort_students WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return (row[0], tuple(json.loads(row[1]))) if row else None
+
+    def update(self, cohort_id, session_id, vector):
+        vector = tuple(vector)
+        conn = self._store.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            previous = self._previous(conn, session_id)
+            if previous == (cohort_id, vector):
+                return
+            if previous is None:
+                self._add_to_totals(conn, cohort_id, 1, _EMPTY, vector)
+            elif previous[0] != cohort_id:
+                self._add_to_totals(conn, previous[0], -1, previous[1], _EMPTY)
+                self._add_to_totals(conn, cohort_id, 1, _EMPTY, vector)
+            else:
+                self._add_to_totals(conn, cohort_id, 0, previous[1], vector)
+            conn.execute(
+                'INSERT OR REPLACE INTO cohort_students (session_id, cohort, vector, average_seconds)'
+                ' VALUES (?, ?, ?, ?)',
+                (session_id, cohort_id, json.dumps(vector), average_seconds(vector))
+            )
+
+    def remove(self, session_id):
+        conn = self._store.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            previous = self._previous(conn, session_id)
+            if previous is None:
+                return None
+            self._add_to_totals(conn, previous[0], -1, previous[1], _EMPTY)
+            conn.execute('DELETE FROM cohort_students WHERE session_id = ?', (session_id,))
+            return previous[0]
+
+    def totals(self, cohort_id):
+        row = self._store.connection().execute(
+            'SELECT students, totals FROM cohort_totals WHERE cohort = ?', (cohort_id,)
+        ).fetchone()
+        return (row[0], tuple(json.loads(row[1]))) if row else None
+
+    def slowest(self, cohort_id, k):
+        rows = self._store.connection().execute(
+            'SELECT session_id, vector FROM cohort_students'
+            ' WHERE cohort = ? AND average_seconds IS NOT NULL'
+            ' ORDER BY average_seconds DESC LIMIT ?', (cohort_id, k)
+        ).fetchall()
+        return [(session_id, tuple(json.loads(vector))) for session_id, vector in rows]
+
+# ============================================================================
+# BACKEND REDIS
+# ============================================================================
+
+class RedisCohortStats(CohortStats):
+    """
+    Aggregati su Redis: un hash di totali per classe (HINCRBYFLOAT), un sorted
+    set per il tempo medio di risposta e il vettore di ogni studente in una chiave
+    L'aggiornamento osserva (WATCH) solo la chiave dello studente, quindi gli
+    studenti della stessa classe non si bloccano a vicenda
+    """
+
+    def __init__(self, store):
+        self._client = store.client
+
+    def _change(self, session_id, change):
+        """
+        Esegue change(pipe, precedente) in una transazione ottimistica sullo studente
+        Se change restituisce False non viene scritto nulla
+
+        Returns:
+            tuple: (classe, vettore) dello studente prima della modifica, o None
+        """
+        from redis.exceptions import WatchError
+        student_key = REDIS_STUDENT_KEY.format(session_id)
+        while True:
+            with self._client.pipeline() as pipe:
+                try:
+                    # WATCH: EXEC fallisce se un altro worker aggiorna lo studente nel frattempo
+                    pipe.watch(student_key)
+                    raw = pipe.get(student_key)
+                    previous = json.loads(raw) if raw else None
+                    if previous is not None:
+                        previous = (previous[0], tuple(previous[1]))
+                    pipe.multi()
+                    if change(pipe, previous) is not False:
+                        pipe.execute()
+                    return previous
+                except WatchError:
+                    continue
+
+    @staticmethod
+    def _add_to_totals(pipe, cohort_id, students, old, new):
+        totals_key = REDIS_TOTALS_KEY.format(cohort_id)
+        if students:
+            pipe.hincrby(totals_key, 'students', students)
+        for position, (before, after) in enumerate(zip(old, new)):
+            if after != before:
+                pipe.hincrbyfloat(totals_key, position, after - before)
+
+    def update(self, cohort_id, session_id, vector):
+        vector = tuple(vector)
+
+        def change(pipe, previous):
+            if previous == (cohort_id, vector):
+                return False
+            if previous is not None and previous[0] != cohort_id:
+                self._detach(pipe, session_id, *previous)
+                previous = None
+            self._add_to_totals(pipe, cohort_id, 0 if previous else 1,
+                                previous[1] if previous else _EMPTY, vector)
+            seconds = average_seconds(vector)
+            if seconds is not None:
+                pipe.zadd(REDIS_SLOWEST_KEY.format(cohort_id), {session_id: seconds})
+            pipe.set(REDIS_STUDENT_KEY.format(session_id), json.dumps([cohort_id, vector]))
+
+        self._change(session_id, change)
+
+    def _detach(self, pipe, session_id, cohort_id, vector):
+        self._add_to_totals(pipe, cohort_id, -1, vector, _EMPTY)
+        pipe.zrem(REDIS_SLOWEST_KEY.format(cohort_id), session_id)
+        pipe.delete(REDIS_STUDENT_KEY.format(session_id))
+
+    def remove(self, session_id):
+        def change(pipe, previous):
+            if previous is None:
+                return False
+            self._detach(pipe, session_id, *previous)
+
+        previous = self._change(session_id, change)
+        return previous[0] if previous else None
+
+    def totals(self, cohort_id):
+        raw = self._client.hgetall(REDIS_TOTALS_KEY.format(cohort_id))
+        values = {(key.decode() if isinstance(key, bytes) else key): float(value) for key, value in raw.items()}
+        students = int(values.pop('students', 0))
+        if students <= 0:
+            return None
+        return students, tuple(values.get(str(position), 0.0) for position in range(VECTOR_SIZE))
+
+    def slowest(self, cohort_id, k):
+        ids = [
+            raw.decode() if isinstance(raw, bytes) else raw
+            for raw in self._client.zrevrange(REDIS_SLOWEST_KEY.format(cohort_id), 0, k - 1)
+        ]
+        if not ids:
+            return []
+        vectors = self._client.mget([REDIS_STUDENT_KEY.format(session_id) for session_id in ids])
+        return [
+            (session_id, tuple(json.loads(raw)[1]))
+            for session_id, raw in zip(ids, vectors) if raw
+        ]
+
+def create_cohort_stats(store):
+    """
+    Crea gli aggregati per classe sullo stesso backend del session store
+
+    Args:
+        store (SessionStore): Backend delle sessioni in uso
+
+    Returns:
+        CohortStats: Aggregati condivisi tra i worker che usano lo stesso store
+    """
+    if isinstance(store, RedisSessionStore):
+        return RedisCohortStats(store)
+    if isinstance(store, SQLiteSessionStore):
+        return SQLiteCohortStats(store)
+    stats = MemoryCohortStats()
+    # Sessioni già presenti (es. ripristinate dal journal): ogni studente torna nella sua classe
+    for session_id, session in store.items():
+        if session.get('cohort'):
+            stats.update(session['cohort'], session_id, student_vector(session))
+    return stats
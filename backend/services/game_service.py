@@ -3,14 +3,21 @@ CYBER KILL CHAIN ANALYZER - GAME SERVICE
 Contiene tutta la logica di business del gioco educativo
 """
 
-import random
+import hashlib
 import logging
+import os
+import time
 from models.game_data import (
-    LOGS_DATABASE, 
     MITIGATION_STRATEGIES, 
     CYBER_KILL_CHAIN_PHASES,
     DIFFICULTY_CONFIG
 )
+from models.corpus import get_log_corpus
+from models.log_index import encode_json
+from models.log_synthesis import SyntheticCorpus
+from models.log_deck import LogDeck
+from models.log_search import get_log_search_index
+from models.session_record import SessionRecord, as_session_record
 from utils.helpers import (
     validate_session_data,
     format_api_response,
@@ -22,10 +29,21 @@ from utils.helpers import (
     calculate_difficulty_level,
     calculate_points,
     calculate_time_limit,
-    sanitize_log_data,
+    validate_cohort_id,
     log_user_action,
     get_effectiveness_score
 )
+from services.session_store import create_session_store
+from services.session_sweeper import create_session_sweeper
+from services.leaderboard import create_leaderboard, VISIBLE_RANKS
+from services.cohorts import (
+    create_cohort_stats, student_vector, average_seconds,
+    ROUNDS, CORRECT, ACCURACY_SUM, ACTIVE, ANSWERS, ANSWER_SECONDS, PHASE_OFFSET
+)
+from services.session_locks import create_session_locks
+from services.live_updates import create_broadcaster
+from services.phase_classifier import get_phase_classifier
+from utils.compression import PrecompressedPayload
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +51,192 @@ logger = logging.getLogger(__name__)
 # GESTIONE DELLE SESSIONI UTENTE
 # ============================================================================
 
-# Dizionario che mantiene i dati di tutte le sessioni utente in memoria
-# TODO: verrà sostituito da un database
-user_sessions = {}
+# Backend che mantiene i dati di tutte le sessioni utente (vedi services/session_store.py)
+# Creato alla prima richiesta, dopo il caricamento del file .env
+_session_store = None
+# Thread che rimuove in background le sessioni scadute
+_session_sweeper = None
+# Classifica globale, sullo stesso backend del session store
+_leaderboard = None
+# Aggregati per classe, sullo stesso backend del session store
+_cohort_stats = None
+# Aggiornamenti in tempo reale per gli stream SSE, condivisi tra i worker dal bridge
+_broadcaster = None
+# Lock per sessione: serializzano le modifiche alla stessa sessione nel worker
+_session_locks = create_session_locks()
+# Strategie di mitigazione di ogni fase, già codificate e compresse: non cambiano mai
+_mitigation_payloads = {
+    phase: PrecompressedPayload(encode_json(strategies))
+    for phase, strategies in MITIGATION_STRATEGIES.items()
+}
+# Tempo massimo conteggiato per una risposta: oltre il limite del round lo studente è andato via
+_MAX_ANSWER_SECONDS = max(calculate_time_limit(difficulty) for difficulty in DIFFICULTY_CONFIG)
+# Posizione di ogni fase nei contatori per fase della sessione
+_PHASE_POSITIONS = {phase: position for position, phase in enumerate(CYBER_KILL_CHAIN_PHASES)}
+
+class SessionConflictError(RuntimeError):
+    """La sessione è stata modificata da un altro processo per troppi tentativi di seguito"""
+
+def _cas_retries():
+    """Tentativi di salvataggio condizionato prima di rinunciare (SESSION_CAS_RETRIES)"""
+    return max(1, int(os.getenv('SESSION_CAS_RETRIES', 5)))
+
+def get_session_store():
+    """
+    Restituisce il backend delle sessioni, creandolo al primo utilizzo
+    e avviando il sweeper delle sessioni scadute
+
+    Returns:
+        SessionStore: Backend selezionato dalla variabile SESSION_STORE
+    """
+    global _session_store, _session_sweeper, _leaderboard, _cohort_stats, _broadcaster
+    if _session_store is None:
+        _session_store = create_session_store()
+        _leaderboard = create_leaderboard(_session_store)
+        _cohort_stats = create_cohort_stats(_session_store)
+        _broadcaster = create_broadcaster(_session_store, renderers={
+            'leaderboard': _render_leaderboard_changes,
+            'cohort': _render_cohort
+        })
+        _session_sweeper = create_session_sweeper(_session_store)
+        # Le sessioni scadute escono anche dalla classifica e dalla loro classe
+        _session_sweeper.add_listener(
+            lambda session_ids: [_remove_player(sid) for sid in session_ids]
+        )
+        _session_sweeper.add_listener(
+            lambda session_ids: [_remove_student(sid) for sid in session_ids]
+        )
+    # start() è idempotente e riavvia il thread nei worker creati con fork
+    _session_sweeper.start()
+    return _session_store
+
+def get_leaderboard():
+    """
+    Restituisce la classifica globale (creata insieme al session store)
+
+    Returns:
+        Leaderboard: Classifica condivisa tra i worker
+    """
+    get_session_store()
+    return _leaderboard
+
+def get_cohort_stats():
+    """
+    Restituisce gli aggregati per classe (creati insieme al session store)
+
+    Returns:
+        CohortStats: Aggregati condivisi tra i worker
+    """
+    get_session_store()
+    return _cohort_stats
+
+def get_broadcaster():
+    """
+    Restituisce il broadcaster degli aggiornamenti in tempo reale (creato insieme al session store)
+
+    Returns:
+        Broadcaster: Broadcaster del worker
+    """
+    get_session_store()
+    return _broadcaster
+
+def _player_name(session_id):
+    """Nome pubblico del giocatore: non espone il session_id in classifica"""
+    return 'Analyst-' + hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:6].upper()
+
+def _record_answer(session, phase, is_correct):
+    """
+    Conta la prima valutazione della fase del log corrente per uno studente
+    di una classe: tentativo ed eventuale errore della fase, tempo di risposta
+    """
+    started = session.get('round_started_ts')
+    if not session.get('cohort') or started is None or phase not in _PHASE_POSITIONS:
+        return
+    # Nuova lista a ogni aggiornamento: le copie della sessione (journal) non cambiano
+    phase_stats = list(session.get('phase_stats') or [0] * (2 * len(_PHASE_POSITIONS)))
+    position = 2 * _PHASE_POSITIONS[phase]
+    phase_stats[position] += 1
+    if not is_correct:
+        phase_stats[position + 1] += 1
+    session['phase_stats'] = phase_stats
+    session['answer_seconds'] = session.get('answer_seconds', 0.0) + min(
+        max(0.0, time.time() - started), _MAX_ANSWER_SECONDS
+    )
+    session['round_started_ts'] = None
+
+def _phase_accepted(session, selected_phase):
+    """
+    Se la fase selezionata è già stata accettata per il log corrente: mitigazione
+    ottimale assegnata e tempo di risposta già registrato
+    """
+    return (
+        bool(session.get('correct_mitigation'))
+        and session.get('round_started_ts') is None
+        and selected_phase == session.get('correct_phase')
+    )
+
+def _accepted_phase_result(session, log_data=None):
+    """Risultato di una fase corretta per il log corrente, con le mitigazioni disponibili"""
+    if log_data is None:
+        log_data = get_log_corpus().get(session.get('current_log')) or {}
+    return {
+        'is_correct': True,
+        'mitigation_strategies': MITIGATION_STRATEGIES.get(session.get('correct_phase'), []),
+        'explanation': log_data.get('explanation', ''),
+        'indicators': log_data.get('indicators', [])
+    }
+
+def _update_cohort(session_id, session):
+    """Aggiorna il contributo dello studente agli aggregati della sua classe - O(1)"""
+    cohort_id = session.get('cohort')
+    if cohort_id:
+        get_cohort_stats().update(cohort_id, session_id, student_vector(session))
+        get_broadcaster().publish('cohort:' + cohort_id, cohort_id)
+
+def _remove_student(session_id):
+    """Toglie lo studente dalla sua classe (sessione eliminata o scaduta)"""
+    cohort_id = get_cohort_stats().remove(session_id)
+    if cohort_id:
+        get_broadcaster().publish('cohort:' + cohort_id, cohort_id)
+
+def _remove_player(session_id):
+    """Toglie il giocatore dalla classifica, avvisando gli stream se era tra le posizioni visibili"""
+    if get_leaderboard().remove(session_id):
+        get_broadcaster().publish('leaderboard', session_id)
+
+def _render_leaderboard_changes(_, changes):
+    """
+    Evento della classifica per gli stream SSE, costruito una volta per intervallo
+
+    Contiene posizione e punteggio attuali dei giocatori modificati nell'intervallo,
+    letti ora: le posizioni pubblicate durante l'intervallo possono essere già
+    cambiate per gli spostamenti degli altri. Il client toglie i giocatori
+    modificati e li reinserisce in ordine di posizione; gli altri mantengono
+    l'ordine relativo, perché il loro punteggio non è cambiato. Se un giocatore
+    è uscito dalla classifica si invia invece la classifica completa.
+
+    Args:
+        changes (dict): ID delle sessioni modificate (le chiavi)
+    """
+    leaderboard = get_leaderboard()
+    total_phases = len(CYBER_KILL_CHAIN_PHASES)
+    players = []
+    for session_id in changes:
+        entry = leaderboard.rank(session_id)
+        if entry is None:
+            return {'leaderboard': GameService.get_global_leaderboard(VISIBLE_RANKS)}
+        rank, score, mastery = entry
+        players.append({
+            'rank': rank,
+            'name': _player_name(session_id),
+            'score': score,
+            'mastery': f'{mastery}/{total_phases} phases'
+        })
+    return {'changes': sorted(players, key=lambda player: player['rank'])}
+
+def _render_cohort(cohort_id, _):
+    """Evento di una classe: statistiche complete, lette una volta per intervallo"""
+    return {'stats': GameService.get_cohort_statistics(cohort_id)}
 
 class GameService:
     """
@@ -51,27 +252,60 @@ class GameService:
             session_id (str): Identificatore univoco della sessione
             
         Returns:
-            dict: Dati della sessione con statistiche e stato del gioco
+            SessionRecord: Dati della sessione con statistiche e stato del gioco
+                (con la stessa vista a dizionario delle sessioni salvate come dict)
         """
+        store = get_session_store()
+        session = as_session_record(store.get(session_id))
+        
         # Se la sessione non esiste, viene creata con i valori di default
-        if session_id not in user_sessions:
-            user_sessions[session_id] = {
-                'score': 0,                             # Punteggio totale accumulato
-                'streak': 0,                            # Serie di risposte corrette consecutive
-                'total_attempts': 0,                    # Numero totale di tentativi
-                'correct_attempts': 0,                  # Numero di risposte corrette
-                'current_log': None,                    # ID del log attualmente in gioco
-                'correct_phase': None,                  # Fase corretta per il log corrente
-                'correct_mitigation': None,             # Mitigazione ottimale per la fase
-                'log_data': {},                         # Dati completi del log corrente
-                'created_at': get_current_timestamp()   # Quando è stata creata la sessione
-            }
-            logger.info(f"Created new session: {session_id}")
+        while session is None:
+            session = SessionRecord()
+            # Creata solo se nessun altro processo l'ha creata nel frattempo
+            if store.compare_and_save(session_id, session, None):
+                logger.info(f"Created new session: {session_id}")
+            else:
+                session = as_session_record(store.get(session_id))
         
-        return user_sessions[session_id]
+        return session
     
     @staticmethod
-    def generate_log(session_id, difficulty='beginner', stats=None):
+    def _run_locked(session_id, operation, save=True):
+        """
+        Esegue un'operazione read-modify-write sulla sessione in modo atomico
+        
+        Nel worker l'operazione tiene il lock della sessione; tra processi il
+        salvataggio è condizionato alla versione letta e, se un altro processo
+        ha modificato la sessione nel frattempo, l'operazione viene ripetuta
+        sui dati aggiornati. La sessione viene salvata anche se l'operazione
+        fallisce (es. sessione ripulita da uno stato inconsistente).
+        
+        Args:
+            session_id (str): ID della sessione
+            operation (callable): Riceve la sessione caricata e ne restituisce il risultato
+            save (bool): False per le operazioni di sola lettura
+            
+        Returns:
+            Il risultato di operation
+        """
+        store = get_session_store()
+        with _session_locks.hold(session_id):
+            for _ in range(_cas_retries()):
+                session = GameService.get_or_create_session(session_id)
+                version = session.get('version', 0)
+                try:
+                    result = operation(session)
+                except Exception:
+                    if save:
+                        store.compare_and_save(session_id, session, version)
+                    raise
+                if not save or store.compare_and_save(session_id, session, version):
+                    return result
+                logger.warning(f"Concurrent update of session {session_id}, retrying")
+        raise SessionConflictError(f"Session {session_id} modified concurrently")
+    
+    @staticmethod
+    def generate_log(session_id, difficulty='beginner', stats=None, cohort_id=None, session=None):
         """
         Genera un nuovo log di sicurezza per l'analisi da parte del giocatore
         
@@ -79,18 +313,24 @@ class GameService:
             session_id (str): ID della sessione
             difficulty (str): Livello di difficoltà richiesto
             stats (dict): Statistiche attuali del giocatore per calcolo difficoltà dinamica
+            cohort_id (str): Classe dello studente (opzionale); la sessione entra
+                o si sposta negli aggregati della classe
+            session (dict): Sessione già caricata dal chiamante (opzionale);
+                in questo caso il salvataggio spetta al chiamante
             
         Returns:
             dict: Contiene il log da analizzare, tempo limite e difficoltà effettiva
         """
+        if session is None:
+            return GameService._run_locked(session_id, lambda session: GameService.generate_log(
+                session_id, difficulty, stats, cohort_id, session=session
+            ))
+        
         try:
-            # Valida e pulisce i parametri di input PRIMA di creare la sessione
+            # Valida e pulisce i parametri di input
             difficulty = validate_difficulty(difficulty)
             stats = validate_stats(stats or {})
             
-            # Ottieni o crea la sessione DOPO la validazione
-            session = GameService.get_or_create_session(session_id)
-            
             # Calcola la difficoltà dinamica basata sulle performance
             if stats:
                 dynamic_difficulty = calculate_difficulty_level(
@@ -100,33 +340,38 @@ class GameService:
                 if dynamic_difficulty == 'expert' or (dynamic_difficulty == 'intermediate' and difficulty == 'beginner'):
                     difficulty = dynamic_difficulty
             
-            # Ottieni le fasi disponibili per questo livello di difficoltà
-            available_phases = DIFFICULTY_CONFIG[difficulty]['phases']
-            
-            # Filtra i log disponibili basandosi sulle fasi permesse
-            available_logs = []
-            for phase in available_phases:
-                if phase in LOGS_DATABASE:
-                    available_logs.extend(LOGS_DATABASE[phase])
+            # Seleziona un log della difficoltà non ancora visto in questa sessione
+            # (il mazzo si rimescola solo quando la fase è esaurita)
+            deck = LogDeck(session.get('log_deck'))
+            selected_log = get_log_corpus().deal(difficulty, deck)
             
             # Verifica che ci siano log disponibili
-            if not available_logs:
+            if selected_log is None:
                 raise ValueError("No logs available for difficulty level")
             
-            # Seleziona casualmente un log dalla lista disponibile
-            selected_log = random.choice(available_logs)
             selected_phase = selected_log['phase']
             
-            # Salva i dati nella sessione per la validazione futura
+            # Salva solo l'ID nella sessione: i dati completi sono nel corpus dei log
             session['current_log'] = selected_log['id']
             session['correct_phase'] = selected_phase
-            session['log_data'] = selected_log
+            session['correct_mitigation'] = None  # Fase del nuovo log non ancora accettata
+            session['log_deck'] = deck.encode()
+            
+            # Studenti di una classe: iscrizione e inizio del tempo di risposta
+            if cohort_id and validate_cohort_id(cohort_id) and session.get('cohort') != cohort_id:
+                previous_cohort = session.get('cohort')
+                session['cohort'] = cohort_id
+                _update_cohort(session_id, session)
+                if previous_cohort:
+                    get_broadcaster().publish('cohort:' + previous_cohort, previous_cohort)
+            if session.get('cohort'):
+                session['round_started_ts'] = time.time()
             
             # Calcola il tempo limite basato sulla difficoltà
             time_limit = calculate_time_limit(difficulty)
             
-            # Rimuove informazioni sensibili dal log prima di inviarlo al client
-            client_log = sanitize_log_data(selected_log)
+            # Vista (in cache) del log senza le informazioni sensibili
+            client_log = get_log_corpus().client_view(selected_log['id'])
             
             # Registra l'azione per debugging e analytics
             log_user_action(session_id, 'log_generated', {
@@ -146,32 +391,63 @@ class GameService:
             raise
     
     @staticmethod
-    def validate_phase_selection(session_id, selected_phase):
+    def get_client_log_payload(log_id):
+        """
+        Restituisce la vista client di un log già codificata in JSON
+        
+        Args:
+            log_id (str): ID del log
+            
+        Returns:
+            PrecompressedPayload: JSON della vista sanitizzata del log
+                (anche già compresso), o None se non esiste
+        """
+        return get_log_corpus().client_payload(log_id)
+    
+    @staticmethod
+    def get_mitigation_payload(phase):
+        """
+        Restituisce le strategie di mitigazione di una fase già codificate in JSON
+        
+        Args:
+            phase (str): Fase della Kill Chain
+            
+        Returns:
+            PrecompressedPayload: Elenco delle strategie, o None se la fase non ne ha
+        """
+        return _mitigation_payloads.get(phase)
+    
+    @staticmethod
+    def validate_phase_selection(session_id, selected_phase, session=None):
         """
         Valida la selezione della fase Kill Chain
         
         Args:
             session_id (str): ID della sessione
             selected_phase (str): Fase selezionata dall'utente
+            session (dict): Sessione già caricata dal chiamante (opzionale);
+                in questo caso il salvataggio spetta al chiamante
             
         Returns:
             dict: Risultato della validazione
         """
+        if session is None:
+            return GameService._run_locked(session_id, lambda session: GameService.validate_phase_selection(
+                session_id, selected_phase, session=session
+            ))
+        
         try:
             # Valida che la fase selezionata sia valida
             if not validate_phase(selected_phase):
                 raise ValueError(f"Invalid phase: {selected_phase}")
             
-            # Ottieni i dati della sessione
-            session = GameService.get_or_create_session(session_id)
             correct_phase = session.get('correct_phase')
-            log_data = session.get('log_data', {})
+            log_data = get_log_corpus().get(session.get('current_log')) or {}
             
             # Verifica che ci sia un log attivo da validare
             if not correct_phase:
                 # Pulisci la sessione se è in stato inconsistente
                 session['current_log'] = None
-                session['log_data'] = {}
                 session['correct_phase'] = None
                 session['correct_mitigation'] = None
                 raise ValueError("No active log to validate - session cleaned")
@@ -179,6 +455,10 @@ class GameService:
             # Controlla se la risposta è corretta
             is_correct = selected_phase == correct_phase
             
+            # Errori per fase e tempi di risposta della classe - O(1)
+            _record_answer(session, correct_phase, is_correct)
+            _update_cohort(session_id, session)
+            
             if is_correct:
                 # RISPOSTA CORRETTA - Prepara le strategie di mitigazione
                 mitigation_options = MITIGATION_STRATEGIES.get(correct_phase, [])
@@ -197,12 +477,7 @@ class GameService:
                     'log_id': session.get('current_log')
                 })
                 
-                return {
-                    'is_correct': True,
-                    'mitigation_strategies': mitigation_options,
-                    'explanation': log_data.get('explanation', ''),
-                    'indicators': log_data.get('indicators', [])
-                }
+                return _accepted_phase_result(session, log_data)
             else:
                 # RISPOSTA SBAGLIATA - Fornisci feedback educativo
                 phase_info = CYBER_KILL_CHAIN_PHASES.get(correct_phase, {})
@@ -227,7 +502,8 @@ class GameService:
             raise
     
     @staticmethod
-    def validate_mitigation_selection(session_id, selected_mitigation, time_remaining, difficulty):
+    def validate_mitigation_selection(session_id, selected_mitigation, time_remaining, difficulty,
+                                      session=None):
         """
         Valida la strategia di mitigazione scelta dall'utente e calcola i punti
         
@@ -236,17 +512,22 @@ class GameService:
             selected_mitigation (str): ID della mitigazione selezionata
             time_remaining (int): Secondi rimanenti quando ha risposto
             difficulty (str): Livello di difficoltà del round
+            session (dict): Sessione già caricata dal chiamante (opzionale);
+                in questo caso il salvataggio spetta al chiamante
             
         Returns:
             dict: Risultato con punti guadagnati e feedback sulla scelta
         """
+        if session is None:
+            return GameService._run_locked(session_id, lambda session: GameService.validate_mitigation_selection(
+                session_id, selected_mitigation, time_remaining, difficulty, session=session
+            ), save=False)
+        
         try:
             # Valida e pulisce i parametri
             difficulty = validate_difficulty(difficulty)
             time_remaining = max(0, int(time_remaining))
             
-            # Ottieni i dati della sessione
-            session = GameService.get_or_create_session(session_id)
             correct_phase = session.get('correct_phase')
             
             # Verifica che ci sia una fase attiva
@@ -300,7 +581,79 @@ class GameService:
             raise
     
     @staticmethod
-    def get_session_statistics(session_id):
+    def play_round(session_id, selected_phase, selected_mitigation=None, time_remaining=0,
+                   difficulty='beginner'):
+        """
+        Gioca un round completo con un solo caricamento e un solo salvataggio della sessione:
+        valida la fase, poi la mitigazione, aggiorna le statistiche e prepara il log successivo
+        
+        Se la fase è corretta ma la mitigazione non è indicata, il round resta aperto
+        e viene restituito solo il risultato della fase (con le mitigazioni disponibili).
+        Una fase sbagliata chiude il round con 0 punti.
+        La fase già accettata in questo round non viene valutata di nuovo.
+        La difficoltà del log successivo dipende solo dalle statistiche
+        della sessione dopo il round, quindi può anche scendere.
+        
+        Args:
+            session_id (str): ID della sessione
+            selected_phase (str): Fase selezionata dall'utente
+            selected_mitigation (str): ID della mitigazione selezionata (opzionale)
+            time_remaining (int): Secondi rimanenti quando ha risposto
+            difficulty (str): Livello di difficoltà del round (solo per il punteggio)
+            
+        Returns:
+            dict: phase_result, mitigation_result, stats e, se il round è chiuso,
+                  il log successivo (log, time_limit, difficulty)
+        """
+        def play(session):
+            if _phase_accepted(session, selected_phase):
+                # Seconda richiesta del round (mitigazione): la fase è già stata
+                # valutata e registrata con la prima
+                phase_result = _accepted_phase_result(session)
+            else:
+                phase_result = GameService.validate_phase_selection(
+                    session_id, selected_phase, session=session
+                )
+            
+            result = {'phase_result': phase_result, 'mitigation_result': None}
+            
+            if phase_result['is_correct']:
+                if not selected_mitigation:
+                    # Round ancora aperto: il client deve scegliere la mitigazione
+                    return result
+                
+                mitigation_result = GameService.validate_mitigation_selection(
+                    session_id, selected_mitigation, time_remaining, difficulty, session=session
+                )
+                result['mitigation_result'] = mitigation_result
+                points = mitigation_result.get('points', 0)
+                is_correct = mitigation_result.get('is_correct', False)
+            else:
+                points, is_correct = 0, False
+            
+            stats = result['stats'] = GameService.update_session_stats(
+                session_id, points, is_correct, session=session
+            )
+            
+            # Il log successivo viene già assegnato alla sessione, con la difficoltà
+            # calcolata dalle statistiche aggiornate (non da quella di questo round)
+            result.update(GameService.generate_log(session_id, 'beginner', {
+                'score': stats['current_score'],
+                'streak': stats['current_streak'],
+                'accuracy': stats['accuracy']
+            }, session=session))
+            return result
+        
+        try:
+            # Un solo caricamento e un solo salvataggio per tutto il round
+            return GameService._run_locked(session_id, play)
+            
+        except Exception as e:
+            logger.error(f"Error playing round for session {session_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_session_statistics(session_id, session=None):
         """
         Calcola e restituisce le statistiche attuali della sessione
         
@@ -310,9 +663,12 @@ class GameService:
         Returns:
             dict: Statistiche complete della sessione utente
         """
+        if session is None:
+            return GameService._run_locked(session_id, lambda session: GameService.get_session_statistics(
+                session_id, session=session
+            ), save=False)
+        
         try:
-            session = GameService.get_or_create_session(session_id)
-            
             # Ottieni i dati grezzi dalla sessione
             total_attempts = session.get('total_attempts', 0)
             correct_attempts = session.get('correct_attempts', 0)
@@ -336,7 +692,36 @@ class GameService:
             raise
     
     @staticmethod
-    def update_session_stats(session_id, points, is_correct):
+    def apply_round_stats(session, points, is_correct):
+        """
+        Applica il risultato di un round ai contatori della sessione
+        Non salva la sessione e non tocca classifica e classi: usato anche
+        dalla rivalutazione offline dei round registrati (tools/replay_rounds.py)
+        
+        Args:
+            session (SessionRecord): Sessione da aggiornare
+            points (int): Punti da aggiungere al punteggio
+            is_correct (bool): Se la risposta del round era corretta
+        """
+        # Aggiorna il punteggio totale
+        session['score'] = session.get('score', 0) + points
+        
+        # Incrementa il contatore dei tentativi totali
+        session['total_attempts'] = session.get('total_attempts', 0) + 1
+        
+        # Gestisci streak e risposte corrette
+        if is_correct:
+            session['correct_attempts'] = session.get('correct_attempts', 0) + 1 
+            session['streak'] = session.get('streak', 0) + 1 # Incrementa la serie
+            
+            # Registra la fase tra quelle padroneggiate
+            if session.get('correct_phase'):
+                session.add_mastered_phase(session['correct_phase'])
+        else:
+            session['streak'] = 0 # Reset della serie se sbagliato
+    
+    @staticmethod
+    def update_session_stats(session_id, points, is_correct, session=None):
         """
         Aggiorna le statistiche della sessione dopo ogni round
         
@@ -344,25 +729,31 @@ class GameService:
             session_id (str): ID della sessione
             points (int): Punti da aggiungere al punteggio
             is_correct (bool): Se l'ultima risposta era corretta
+            session (dict): Sessione già caricata dal chiamante (opzionale);
+                in questo caso il salvataggio spetta al chiamante
             
         Returns:
             dict: Statistiche aggiornate della sessione
         """
+        if session is None:
+            return GameService._run_locked(session_id, lambda session: GameService.update_session_stats(
+                session_id, points, is_correct, session=session
+            ))
+        
         try:
-            session = GameService.get_or_create_session(session_id)
+            GameService.apply_round_stats(session, points, is_correct)
             
-            # Aggiorna il punteggio totale
-            session['score'] = session.get('score', 0) + points
+            # Aggiorna la posizione in classifica - O(log n)
+            rank = get_leaderboard().update(
+                session_id, session['score'], len(session.get('mastered_phases', []))
+            )
             
-            # Incrementa il contatore dei tentativi totali
-            session['total_attempts'] = session.get('total_attempts', 0) + 1
+            # Posizioni visibili cambiate: delta per gli stream SSE (costruito dal broadcaster)
+            if rank is not None:
+                get_broadcaster().publish('leaderboard', session_id)
             
-            # Gestisci streak e risposte corrette
-            if is_correct:
-                session['correct_attempts'] = session.get('correct_attempts', 0) + 1 
-                session['streak'] = session.get('streak', 0) + 1 # Incrementa la serie
-            else:
-                session['streak'] = 0 # Reset della serie se sbagliato
+            # Aggiorna l'accuratezza della classe dello studente - O(1)
+            _update_cohort(session_id, session)
             
             # Registra l'aggiornamento per debugging
             log_user_action(session_id, 'stats_updated', {
@@ -373,7 +764,7 @@ class GameService:
             })
             
             # Restituisce le statistiche aggiornate
-            return GameService.get_session_statistics(session_id)
+            return GameService.get_session_statistics(session_id, session)
             
         except Exception as e:
             logger.error(f"Error updating stats for session {session_id}: {e}")
@@ -391,31 +782,126 @@ class GameService:
             list: Lista dei migliori giocatori con rank, nome, score e livello di competenza
             
         Note:
-            Attualmente usa dati mock per demo. In produzione dovrebbe
-            interrogare un database reale con i punteggi degli utenti.
+            Legge le prime posizioni dalla classifica ordinata - O(log n + limit)
         """
         try:
-            # Mock data per demo - in produzione userebbe un database reale
-            mock_leaderboard = [
-                {'rank': 1, 'name': 'CyberHunter', 'score': 2150, 'mastery': '7/7 phases'},
-                {'rank': 2, 'name': 'SecurityPro', 'score': 1890, 'mastery': '6/7 phases'},
-                {'rank': 3, 'name': 'KillChainMaster', 'score': 1750, 'mastery': '7/7 phases'},
-                {'rank': 4, 'name': 'ThreatAnalyst', 'score': 1620, 'mastery': '5/7 phases'},
-                {'rank': 5, 'name': 'BlueTeamer', 'score': 1500, 'mastery': '4/7 phases'},
-                {'rank': 6, 'name': 'SOCAnalyst', 'score': 1350, 'mastery': '5/7 phases'},
-                {'rank': 7, 'name': 'InfoSecPro', 'score': 1200, 'mastery': '4/7 phases'},
-                {'rank': 8, 'name': 'CyberDefender', 'score': 1100, 'mastery': '3/7 phases'},
-                {'rank': 9, 'name': 'SecurityNinja', 'score': 950, 'mastery': '4/7 phases'},
-                {'rank': 10, 'name': 'ThreatHunter', 'score': 850, 'mastery': '3/7 phases'}
+            total_phases = len(CYBER_KILL_CHAIN_PHASES)
+            return [
+                {
+                    'rank': rank,
+                    'name': _player_name(session_id),
+                    'score': score,
+                    'mastery': f'{mastery}/{total_phases} phases'
+                }
+                for rank, session_id, score, mastery in get_leaderboard().top(limit)
             ]
             
-            # Restituisce solo il numero richiesto di risultati
-            return mock_leaderboard[:limit]
-            
         except Exception as e:
             logger.error(f"Error getting leaderboard: {e}")
             raise
     
+    @staticmethod
+    def get_leaderboard_version():
+        """
+        Restituisce la versione corrente dei dati della classifica
+        Usata dalla cache delle risposte per sapere quando ricodificarla
+        
+        Returns:
+            int: Versione della classifica (cambia solo con le posizioni visibili)
+        """
+        return get_leaderboard().version()
+    
+    @staticmethod
+    def get_player_rank(session_id):
+        """
+        Restituisce la posizione in classifica di un giocatore - O(log n)
+        
+        Args:
+            session_id (str): ID della sessione
+            
+        Returns:
+            dict: Posizione, punteggio e padronanza, o None se non in classifica
+        """
+        try:
+            leaderboard = get_leaderboard()
+            entry = leaderboard.rank(session_id)
+            if entry is None:
+                return None
+            
+            rank, score, mastery = entry
+            return {
+                'rank': rank,
+                'name': _player_name(session_id),
+                'score': score,
+                'mastery': f'{mastery}/{len(CYBER_KILL_CHAIN_PHASES)} phases',
+                'total_players': leaderboard.count()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting rank for session {session_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_cohort_statistics(cohort_id, slowest=5):
+        """
+        Restituisce le statistiche di una classe per la dashboard dell'insegnante
+        
+        Args:
+            cohort_id (str): ID della classe
+            slowest (int): Numero di studenti più lenti da includere
+            
+        Returns:
+            dict: Accuratezza, errori per fase e studenti più lenti, o None se la classe non esiste
+            
+        Note:
+            Legge gli aggregati già calcolati - O(1) più O(slowest), senza scandire le sessioni
+        """
+        try:
+            stats = get_cohort_stats()
+            entry = stats.totals(cohort_id)
+            if entry is None:
+                return None
+            
+            students, totals = entry
+            rounds = int(totals[ROUNDS])
+            active = int(totals[ACTIVE])
+            answers = int(totals[ANSWERS])
+            
+            phase_errors = {}
+            for phase, position in _PHASE_POSITIONS.items():
+                attempts = int(totals[PHASE_OFFSET + 2 * position])
+                errors = int(totals[PHASE_OFFSET + 2 * position + 1])
+                phase_errors[phase] = {
+                    'attempts': attempts,
+                    'errors': errors,
+                    'error_rate': round(errors / attempts * 100, 2) if attempts else 0.0
+                }
+            
+            return {
+                'cohort': cohort_id,
+                'students': students,
+                'active_students': active,
+                'rounds': rounds,
+                # Accuratezza su tutti i round della classe e media delle accuratezze degli studenti
+                'accuracy': round(totals[CORRECT] / rounds * 100, 2) if rounds else 0.0,
+                'average_accuracy': round(totals[ACCURACY_SUM] / active * 100, 2) if active else 0.0,
+                'average_answer_seconds': round(totals[ANSWER_SECONDS] / answers, 2) if answers else 0.0,
+                'phase_errors': phase_errors,
+                'slowest_students': [
+                    {
+                        'name': _player_name(session_id),
+                        'average_answer_seconds': round(average_seconds(vector), 2),
+                        'answers': int(vector[ANSWERS]),
+                        'accuracy': round(vector[ACCURACY_SUM] * 100, 2)
+                    }
+                    for session_id, vector in stats.slowest(cohort_id, slowest)
+                ]
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting statistics for cohort {cohort_id}: {e}")
+            raise
+    
     @staticmethod
     def get_all_phases():
         """
@@ -440,6 +926,86 @@ class GameService:
             logger.error(f"Error getting phases: {e}")
             raise
     
+    @staticmethod
+    def analyze_logs(lines, top=3):
+        """
+        Stima la fase della Kill Chain di un batch di righe di log
+        
+        Args:
+            lines (list): Righe di log
+            top (int): Fasi da restituire per riga, dalla più probabile
+            
+        Returns:
+            list: Per ogni riga fase stimata, confidenza e classifica delle fasi,
+                o None se il classificatore non è disponibile
+        """
+        classifier = get_phase_classifier()
+        if classifier is None:
+            return None
+        return [
+            {
+                'phase': ranking[0][0],
+                'confidence': ranking[0][1],
+                'ranking': [{'phase': phase, 'probability': probability} for phase, probability in ranking]
+            }
+            for ranking in classifier.rank(lines, top)
+        ]
+    
+    @staticmethod
+    def search_logs(query, phase=None, severity=None, limit=20, cursor=None):
+        """
+        Cerca gli scenari del corpus per parola chiave (vedi models/log_search.py)
+        
+        Args:
+            query (str): Parole chiave, IP, hash, percorsi o URL
+            phase (str): Solo gli scenari di questa fase (opzionale)
+            severity (str): Solo gli scenari con questa gravità (opzionale)
+            limit (int): Risultati per pagina
+            cursor (str): Cursore della pagina precedente (opzionale)
+            
+        Returns:
+            dict: Scenari trovati, una pagina di risultati dal più rilevante e cursore della pagina successiva
+            
+        Raises:
+            ValueError: Se la query non contiene termini o il cursore non è valido
+        """
+        index = get_log_search_index()
+        found = index.search(query, phase, severity, limit, cursor)
+        results = []
+        for hit in found['hits']:
+            log = index.corpus.phase_log_at(hit['phase'], hit['position'])
+            results.append({
+                'id': log['id'],
+                'phase': log['phase'],
+                'severity': log.get('severity'),
+                'source': log.get('source'),
+                'raw': log.get('raw'),
+                'indicators': list(log.get('indicators', ())),
+                'score': round(hit['score'], 4)
+            })
+        return {'total': found['total'], 'results': results, 'next_cursor': found['next_cursor']}
+    
+    @staticmethod
+    def get_log_search_metrics():
+        """
+        Restituisce lo stato dell'indice di ricerca degli scenari
+        
+        Returns:
+            dict: Log e termini indicizzati, log aggiunti e tempo speso a indicizzare
+        """
+        return get_log_search_index().metrics()
+    
+    @staticmethod
+    def get_log_analyzer_info():
+        """
+        Restituisce lo stato del classificatore di /api/analyze
+        
+        Returns:
+            dict: Modello, documenti e termini di addestramento, o None se non disponibile
+        """
+        classifier = get_phase_classifier()
+        return classifier.info() if classifier is not None else None
+    
     @staticmethod
     def reset_session(session_id):
         """
@@ -452,9 +1018,12 @@ class GameService:
             bool: True se la sessione è stata eliminata con successo
         """
         try:
-            # Verifica se la sessione esiste e la elimina
-            if session_id in user_sessions:
-                del user_sessions[session_id]
+            # Verifica se la sessione esiste e la elimina (non durante un round in corso)
+            with _session_locks.hold(session_id):
+                deleted = get_session_store().delete(session_id)
+            if deleted:
+                _remove_player(session_id)
+                _remove_student(session_id)
                 log_user_action(session_id, 'session_reset', {})
                 logger.info(f"Session {session_id} reset successfully")
                 return True
@@ -467,54 +1036,79 @@ class GameService:
     @staticmethod
     def get_session_count():
         """
-        Conta il numero di sessioni attualmente attive in memoria
+        Conta il numero di sessioni attualmente attive nel session store
         
         Returns:
             int: Numero totale di sessioni attive
         """
-        return len(user_sessions)
+        return get_session_store().count()
+    
+    @staticmethod
+    def get_expiry_metrics():
+        """
+        Restituisce le metriche della scadenza automatica delle sessioni
+        
+        Returns:
+            dict: Sessioni rimosse, velocità di rimozione e ritardi del sweeper
+        """
+        get_session_store()
+        return _session_sweeper.metrics()
+    
+    @staticmethod
+    def get_persistence_metrics():
+        """
+        Restituisce lo stato del journal delle sessioni in memoria
+        
+        Returns:
+            dict: Metriche del journal, o None se la persistenza non è attiva
+        """
+        journal = getattr(get_session_store(), 'journal', None)
+        return journal.metrics() if journal is not None else None
+    
+    @staticmethod
+    def get_live_update_metrics():
+        """
+        Restituisce lo stato degli aggiornamenti in tempo reale del worker
+        
+        Returns:
+            dict: Stream aperti, modifiche pubblicate, eventi inviati e client disconnessi
+        """
+        return get_broadcaster().metrics()
+    
+    @staticmethod
+    def get_log_synthesis_metrics():
+        """
+        Restituisce lo stato dei pool di log sintetici
+        
+        Returns:
+            dict: Log pronti per fase e velocità di generazione, o None se il generatore non è attivo
+        """
+        corpus = get_log_corpus()
+        return corpus.metrics() if isinstance(corpus, SyntheticCorpus) else None
     
     @staticmethod
     def cleanup_old_sessions(max_age_hours=24):
         """
-        Rimuove le sessioni più vecchie di un certo tempo per liberare memoria
+        Rimuove subito le sessioni inattive da più di un certo tempo
+        La pulizia ordinaria avviene comunque in background (vedi SessionSweeper)
         
         Args:
-            max_age_hours (int): Età massima delle sessioni in ore (default: 24)
+            max_age_hours (int): Inattività massima delle sessioni in ore (default: 24)
             
         Returns:
             int: Numero di sessioni rimosse durante la pulizia
         """
         try:
-            from datetime import datetime, timedelta
-            
-            # Calcola il timestamp di cutoff
-            cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
-            sessions_to_remove = []
-            
-            # Trova tutte le sessioni troppo vecchie
-            for session_id, session_data in user_sessions.items():
-                created_at_str = session_data.get('created_at', '')
-                if created_at_str:
-                    try:
-                        # Prova a parsare la data di creazione
-                        created_at = datetime.fromisoformat(created_at_str)
-                        if created_at < cutoff_time:
-                            sessions_to_remove.append(session_id)
-                    except ValueError:
-                        # Se non riesce a parsare la data, è probabilmente corrotta
-                        # quindi rimuovi la sessione per sicurezza
-                        sessions_to_remove.append(session_id)
-            
-            # Rimuovi tutte le sessioni identificate
-            for session_id in sessions_to_remove:
-                del user_sessions[session_id]
+            get_session_store()
+            
+            # Usa l'indice delle scadenze: nessuna scansione di tutte le sessioni
+            removed_count = _session_sweeper.expire_inactive(max_age_hours * 3600)
 
             # Log del risultato se sono state rimosse sessioni    
-            if sessions_to_remove:
-                logger.info(f"Cleaned up {len(sessions_to_remove)} old sessions")
+            if removed_count:
+                logger.info(f"Cleaned up {removed_count} old sessions")
             
-            return len(sessions_to_remove)
+            return removed_count
             
         except Exception as e:
             logger.error(f"Error cleaning up sessions: {e}")
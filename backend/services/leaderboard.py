@@ -0,0 +1,519 @@
+"""
+CYBER KILL CHAIN ANALYZER - LEADERBOARD
+Classifica globale aggiornata a ogni round, con backend intercambiabili
+
+- SkipListLeaderboard: skiplist indicizzata in-process (backend memory)
+- SQLiteLeaderboard:   tabella con indice sul punteggio e conteggi in alberi di Fenwick (backend sqlite)
+- RedisLeaderboard:    sorted set Redis con punteggio negato (backend redis)
+
+Il backend segue quello del session store, così tutti i worker vedono
+la stessa classifica. La versione della classifica cambia solo quando
+cambiano le prime VISIBLE_RANKS posizioni, le uniche mostrate dall'API.
+"""
+
+import random
+import threading
+
+from services.session_store import SQLiteSessionStore, RedisSessionStore
+
+# Numero massimo di posizioni restituite da /api/leaderboard
+VISIBLE_RANKS = 50
+
+# Chiavi Redis della classifica (punteggi negati: vedi RedisLeaderboard)
+REDIS_SCORES_KEY = 'ckc:leaderboard:ranked'
+REDIS_MASTERY_KEY = 'ckc:leaderboard:mastery'
+REDIS_VERSION_KEY = 'ckc:leaderboard:version'
+
+# ============================================================================
+# INTERFACCIA COMUNE
+# ============================================================================
+
+class Leaderboard:
+    """
+    Interfaccia comune della classifica
+    Ordine: punteggio decrescente, a parità di punteggio session_id crescente
+    """
+
+    def update(self, session_id, score, mastery):
+        """
+        Inserisce o aggiorna un giocatore - O(log n)
+
+        Args:
+            session_id (str): ID della sessione
+            score (int): Punteggio totale
+            mastery (int): Numero di fasi padroneggiate
+
+        Returns:
+            int: Nuova posizione del giocatore se sono cambiate le posizioni
+                visibili (e quindi la versione), altrimenti None
+        """
+        raise NotImplementedError
+
+    def remove(self, session_id):
+        """
+        Rimuove un giocatore dalla classifica - O(log n)
+
+        Returns:
+            bool: True se il giocatore era tra le posizioni visibili
+        """
+        raise NotImplementedError
+
+    def top(self, k):
+        """
+        Restituisce i primi k giocatori - O(log n + k)
+
+        Returns:
+            list: Tuple (rank, session_id, score, mastery)
+        """
+        raise NotImplementedError
+
+    def rank(self, session_id):
+        """
+        Restituisce la posizione di un giocatore - O(log n)
+
+        Returns:
+            tuple: (rank, score, mastery) oppure None se non in classifica
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """Returns: int: Numero di giocatori in classifica"""
+        raise NotImplementedError
+
+    def version(self):
+        """Returns: int: Versione delle posizioni visibili della classifica"""
+        raise NotImplementedError
+
+# ============================================================================
+# SKIPLIST INDICIZZATA (IN-PROCESS)
+# ============================================================================
+
+MAX_LEVEL = 32
+LEVEL_PROBABILITY = 0.25
+
+class _Node:
+    """Nodo della skiplist: span[i] = posizioni saltate dal puntatore next[i]"""
+
+    __slots__ = ('key', 'next', 'span')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.span = [0] * level
+
+class SkipListLeaderboard(Leaderboard):
+    """
+    Classifica in memoria basata su una skiplist indicizzata
+    Ogni puntatore conosce quante posizioni salta, quindi il rank di un nodo
+    si calcola sommando gli span lungo il percorso di ricerca
+    """
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+        self._entries = {}   # session_id -> (score, mastery)
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id, score):
+        return (-score, session_id)
+
+    @staticmethod
+    def _random_level():
+        level = 1
+        while level < MAX_LEVEL and random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def _insert(self, key):
+        update = [None] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.span[i]
+                node = node.next[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+
+        new_node = _Node(key, level)
+        for i in range(level):
+            new_node.next[i] = update[i].next[i]
+            update[i].next[i] = new_node
+            new_node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def _delete(self, key):
+        update = [None] * MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            return
+        for i in range(self._level):
+            if update[i].next[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+
+    def _rank_of(self, key):
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key <= key:
+                rank += node.span[i]
+                node = node.next[i]
+            if node.key == key:
+                return rank
+        return None
+
+    def update(self, session_id, score, mastery):
+        with self._lock:
+            previous = self._entries.get(session_id)
+            old_rank = None
+            if previous is not None:
+                old_key = self._key(session_id, previous[0])
+                old_rank = self._rank_of(old_key)
+                if previous[0] != score:
+                    self._delete(old_key)
+            key = self._key(session_id, score)
+            if previous is None or previous[0] != score:
+                self._insert(key)
+            self._entries[session_id] = (score, mastery)
+
+            new_rank = self._rank_of(key)
+            if previous != (score, mastery) and min(new_rank, old_rank or new_rank) <= VISIBLE_RANKS:
+                self._version += 1
+                return new_rank
+            return None
+
+    def remove(self, session_id):
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if previous is None:
+                return False
+            key = self._key(session_id, previous[0])
+            visible = self._rank_of(key) <= VISIBLE_RANKS
+            if visible:
+                self._version += 1
+            self._delete(key)
+            return visible
+
+    def top(self, k):
+        with self._lock:
+            result = []
+            node = self._head.next[0]
+            while node is not None and len(result) < k:
+                session_id = node.key[1]
+                score, mastery = self._entries[session_id]
+                result.append((len(result) + 1, session_id, score, mastery))
+                node = node.next[0]
+            return result
+
+    def rank(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            return (self._rank_of(self._key(session_id, entry[0])), entry[0], entry[1])
+
+    def count(self):
+        return self._length
+
+    def version(self):
+        return self._version
+
+# ============================================================================
+# BACKEND SQLITE
+# ============================================================================
+
+# Albero dei punteggi: nodi per i punteggi da 0 a SCORE_NODES - 1 (oltre: ultimo nodo)
+SCORE_NODES = 1 << 31
+SCORE_TREE = -1
+# Alberi dei pari merito: un nodo per i primi TIE_PREFIX caratteri ASCII del session_id
+TIE_PREFIX = 3
+TIE_BASE = 129
+TIE_NODES = TIE_BASE ** TIE_PREFIX
+
+def _prefix_nodes(position):
+    """Nodi di Fenwick la cui somma conta le posizioni 1..position"""
+    nodes = []
+    while position > 0:
+        nodes.append(position)
+        position &= position - 1
+    return nodes
+
+def _update_nodes(position, size):
+    """Nodi di Fenwick da aggiornare quando cambia la posizione"""
+    nodes = []
+    while position <= size:
+        nodes.append(position)
+        position += position & -position
+    return nodes
+
+def _score_position(score):
+    """Posizione nell'albero dei punteggi: 1 per il punteggio più alto"""
+    return SCORE_NODES - min(max(score, 0), SCORE_NODES - 1)
+
+def _tie_bucket(session_id):
+    """
+    Gruppo del session_id tra i pari merito: cresce con l'ordine dei session_id
+    (ASCII, validati dallo schema); i session_id più corti dopo il prefisso
+    valgono come carattere 0, che precede tutti gli altri
+    """
+    bucket = 0
+    for i in range(TIE_PREFIX):
+        bucket = bucket * TIE_BASE + (min(ord(session_id[i]), TIE_BASE - 2) + 1 if i < len(session_id) else 0)
+    return bucket
+
+class SQLiteLeaderboard(Leaderboard):
+    """
+    Classifica su tabella SQLite, nello stesso file del session store
+    top(k) legge l'indice sul punteggio. Per rank() la tabella leaderboard_counts
+    conserva conteggi in alberi di Fenwick aggiornati a ogni modifica:
+    - un albero dei punteggi (giocatori con punteggio più alto)
+    - per ogni punteggio, un albero dei gruppi di session_id (pari merito davanti)
+    Restano da contare con l'indice solo i pari merito con gli stessi primi
+    TIE_PREFIX caratteri: rank(), update() e remove() leggono o scrivono
+    O(log SCORE_NODES + log TIE_NODES) righe, qualunque sia la posizione
+    """
+
+    def __init__(self, store):
+        self._store = store
+        conn = store.connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS leaderboard ('
+            ' session_id TEXT PRIMARY KEY,'
+            ' score INTEGER NOT NULL,'
+            ' mastery INTEGER NOT NULL'
+            ')'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_leaderboard_score ON leaderboard (score DESC, session_id)'
+        )
+        conn.execute('CREATE TABLE IF NOT EXISTS leaderboard_version (id INTEGER PRIMARY KEY, version INTEGER)')
+        conn.execute('INSERT OR IGNORE INTO leaderboard_version (id, version) VALUES (1, 0)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS leaderboard_counts ('
+            ' tree INTEGER NOT NULL,'
+            ' node INTEGER NOT NULL,'
+            ' players INTEGER NOT NULL,'
+            ' PRIMARY KEY (tree, node)'
+            ') WITHOUT ROWID'
+        )
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Classifica creata prima dei conteggi: si ricostruiscono una volta
+            if conn.execute('SELECT 1 FROM leaderboard_counts LIMIT 1').fetchone() is None:
+                for session_id, score in conn.execute('SELECT session_id, score FROM leaderboard').fetchall():
+                    self._count(conn, session_id, score, 1)
+
+    def _count(self, conn, session_id, score, delta):
+        """Aggiunge (delta=1) o toglie (delta=-1) il giocatore dai conteggi"""
+        rows = [(SCORE_TREE, node, delta) for node in _update_nodes(_score_position(score), SCORE_NODES)]
+        rows += [(score, node, delta) for node in _update_nodes(_tie_bucket(session_id) + 1, TIE_NODES)]
+        conn.executemany(
+            'INSERT INTO leaderboard_counts (tree, node, players) VALUES (?, ?, ?)'
+            ' ON CONFLICT (tree, node) DO UPDATE SET players = players + excluded.players',
+            rows
+        )
+
+    def _sum(self, conn, tree, nodes):
+        if not nodes:
+            return 0
+        return conn.execute(
+            'SELECT COALESCE(SUM(players), 0) FROM leaderboard_counts'
+            f' WHERE tree = ? AND node IN ({",".join("?" * len(nodes))})',
+            (tree, *nodes)
+        ).fetchone()[0]
+
+    def _rank_in(self, conn, session_id, score):
+        higher = self._sum(conn, SCORE_TREE, _prefix_nodes(_score_position(score) - 1))
+        tied = self._sum(conn, score, _prefix_nodes(_tie_bucket(session_id)))
+        if len(session_id) > TIE_PREFIX:
+            # Stesso gruppo: stessi primi caratteri, quindi session_id in [prefisso, session_id)
+            tied += conn.execute(
+                'SELECT COUNT(*) FROM leaderboard WHERE score = ? AND session_id >= ? AND session_id < ?',
+                (score, session_id[:TIE_PREFIX], session_id)
+            ).fetchone()[0]
+        return higher + tied + 1
+
+    def _bump_version(self, conn):
+        conn.execute('UPDATE leaderboard_version SET version = version + 1 WHERE id = 1')
+
+    def update(self, session_id, score, mastery):
+        conn = self._store.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT score, mastery FROM leaderboard WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            if row == (score, mastery):
+                return None
+            old_rank = None
+            if row is not None:
+                old_rank = self._rank_in(conn, session_id, row[0])
+                if row[0] != score:
+                    self._count(conn, session_id, row[0], -1)
+            if row is None or row[0] != score:
+                self._count(conn, session_id, score, 1)
+            conn.execute(
+                'INSERT OR REPLACE INTO leaderboard (session_id, score, mastery) VALUES (?, ?, ?)',
+                (session_id, score, mastery)
+            )
+            new_rank = self._rank_in(conn, session_id, score)
+            if min(new_rank, old_rank or new_rank) <= VISIBLE_RANKS:
+                self._bump_version(conn)
+                return new_rank
+            return None
+
+    def remove(self, session_id):
+        conn = self._store.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT score FROM leaderboard WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            visible = self._rank_in(conn, session_id, row[0]) <= VISIBLE_RANKS
+            if visible:
+                self._bump_version(conn)
+            self._count(conn, session_id, row[0], -1)
+            conn.execute('DELETE FROM leaderboard WHERE session_id = ?', (session_id,))
+            return visible
+
+    def top(self, k):
+        rows = self._store.connection().execute(
+            'SELECT session_id, score, mastery FROM leaderboard'
+            ' ORDER BY score DESC, session_id LIMIT ?', (k,)
+        ).fetchall()
+        return [(i + 1, session_id, score, mastery) for i, (session_id, score, mastery) in enumerate(rows)]
+
+    def rank(self, session_id):
+        conn = self._store.connection()
+        row = conn.execute(
+            'SELECT score, mastery FROM leaderboard WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return (self._rank_in(conn, session_id, row[0]), row[0], row[1])
+
+    def count(self):
+        return self._store.connection().execute('SELECT COUNT(*) FROM leaderboard').fetchone()[0]
+
+    def version(self):
+        return self._store.connection().execute(
+            'SELECT version FROM leaderboard_version WHERE id = 1'
+        ).fetchone()[0]
+
+# ============================================================================
+# BACKEND REDIS
+# ============================================================================
+
+class RedisLeaderboard(Leaderboard):
+    """
+    Classifica su sorted set Redis (ZADD / ZRANK / ZRANGE)
+    Il sorted set contiene il punteggio negato: in ordine crescente vengono
+    prima i punteggi più alti e, a parità, i session_id crescenti (ordine
+    lessicografico di Redis), come negli altri backend. ZREVRANK ordinerebbe
+    invece i pari merito per session_id decrescente.
+    La padronanza delle fasi è in un hash separato
+    """
+
+    def __init__(self, store):
+        self._client = store.client
+
+    def update(self, session_id, score, mastery):
+        pipe = self._client.pipeline()
+        pipe.zrank(REDIS_SCORES_KEY, session_id)
+        pipe.zadd(REDIS_SCORES_KEY, {session_id: -score})
+        pipe.hset(REDIS_MASTERY_KEY, session_id, mastery)
+        pipe.zrank(REDIS_SCORES_KEY, session_id)
+        old_rank, _, _, new_rank = pipe.execute()
+        # ZRANK parte da 0
+        if min(new_rank, new_rank if old_rank is None else old_rank) < VISIBLE_RANKS:
+            self._client.incr(REDIS_VERSION_KEY)
+            return new_rank + 1
+        return None
+
+    def remove(self, session_id):
+        old_rank = self._client.zrank(REDIS_SCORES_KEY, session_id)
+        if old_rank is None:
+            return False
+        pipe = self._client.pipeline()
+        pipe.zrem(REDIS_SCORES_KEY, session_id)
+        pipe.hdel(REDIS_MASTERY_KEY, session_id)
+        if old_rank < VISIBLE_RANKS:
+            pipe.incr(REDIS_VERSION_KEY)
+        pipe.execute()
+        return old_rank < VISIBLE_RANKS
+
+    def top(self, k):
+        rows = self._client.zrange(REDIS_SCORES_KEY, 0, k - 1, withscores=True)
+        if not rows:
+            return []
+        ids = [raw.decode() if isinstance(raw, bytes) else raw for raw, _ in rows]
+        masteries = self._client.hmget(REDIS_MASTERY_KEY, ids)
+        return [
+            (i + 1, session_id, -int(score), int(mastery or 0))
+            for i, (session_id, (_, score), mastery) in enumerate(zip(ids, rows, masteries))
+        ]
+
+    def rank(self, session_id):
+        pipe = self._client.pipeline()
+        pipe.zrank(REDIS_SCORES_KEY, session_id)
+        pipe.zscore(REDIS_SCORES_KEY, session_id)
+        pipe.hget(REDIS_MASTERY_KEY, session_id)
+        rank, score, mastery = pipe.execute()
+        if rank is None:
+            return None
+        return (rank + 1, -int(score), int(mastery or 0))
+
+    def count(self):
+        return self._client.zcard(REDIS_SCORES_KEY)
+
+    def version(self):
+        return int(self._client.get(REDIS_VERSION_KEY) or 0)
+
+def create_leaderboard(store):
+    """
+    Crea la classifica sullo stesso backend del session store
+
+    Args:
+        store (SessionStore): Backend delle sessioni in uso
+
+    Returns:
+        Leaderboard: Classifica condivisa tra i worker che usano lo stesso store
+    """
+    if isinstance(store, RedisSessionStore):
+        return RedisLeaderboard(store)
+    if isinstance(store, SQLiteSessionStore):
+        return SQLiteLeaderboard(store)
+    leaderboard = SkipListLeaderboard()
+    # Sessioni già presenti (es. ripristinate dal journal): in classifica chi ha giocato
+    for session_id, session in store.items():
+        if session.get('total_attempts'):
+            leaderboard.update(session_id, session['score'], len(session.get('mastered_phases', [])))
+    return leaderboard
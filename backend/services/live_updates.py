@@ -0,0 +1,500 @@
+"""
+CYBER KILL CHAIN ANALYZER - AGGIORNAMENTI IN TEMPO REALE
+Publish/subscribe in-process per gli stream Server-Sent Events (/api/live)
+
+Le modifiche pubblicate (delta della classifica, classi aggiornate) si
+accumulano per topic e vengono inviate a intervalli fissi: a ogni intervallo
+ogni topic produce al massimo un evento, codificato una sola volta e accodato
+a tutti gli iscritti. Più modifiche della stessa chiave (stesso giocatore,
+stessa classe) nello stesso intervallo si fondono nell'ultima.
+
+Topic: 'leaderboard' e 'cohort:<id>'. Il nome dell'evento SSE è la parte
+prima dei due punti.
+
+Tra più worker le modifiche passano da un bridge sullo stesso backend del
+session store. Le richieste accodano soltanto: il thread di invio scrive sul
+bridge le modifiche dell'intervallo in un'unica operazione e legge quelle
+degli altri worker.
+- memory: nessun bridge (un solo worker)
+- sqlite: tabella live_events nello stesso file delle sessioni, scritta solo
+          se un altro worker ha stream aperti (tabella live_listeners)
+- redis:  canale pub/sub ckc:live
+
+Configurazione:
+- LIVE_MAX_RATE: Eventi al secondo inviati a ogni client per topic (default 2)
+- LIVE_QUEUE_SIZE: Eventi in attesa per client; chi resta indietro viene disconnesso (default 64)
+- LIVE_MAX_SUBSCRIBERS: Stream aperti contemporaneamente per worker (default 1000)
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from models.log_index import encode_json
+from services.session_store import SQLiteSessionStore, RedisSessionStore
+
+logger = logging.getLogger(__name__)
+
+# Canale Redis degli aggiornamenti
+REDIS_CHANNEL = 'ckc:live'
+# Secondi per cui gli eventi restano nella tabella SQLite
+SQLITE_RETENTION_SECONDS = 60
+# Validità della registrazione di un worker con stream aperti (rinnovata dal thread di invio)
+SQLITE_LISTENER_TTL_SECONDS = 10
+# Eventi remoti letti al massimo per intervallo
+MAX_REMOTE_EVENTS = 10_000
+
+# Commento SSE inviato quando non ci sono eventi: tiene aperta la connessione
+KEEPALIVE = b': keepalive\n\n'
+
+def encode_event(event, data):
+    """
+    Codifica un evento Server-Sent Events
+
+    Args:
+        event (str): Nome dell'evento
+        data: Dati serializzabili in JSON (su una riga sola)
+
+    Returns:
+        bytes: Evento pronto da scrivere sullo stream
+    """
+    return b'event: ' + event.encode('ascii') + b'\ndata: ' + encode_json(data) + b'\n\n'
+
+def encode_retry(milliseconds):
+    """Returns: bytes: Attesa prima della riconnessione automatica di EventSource"""
+    return b'retry: %d\n\n' % milliseconds
+
+# ============================================================================
+# ISCRITTI
+# ============================================================================
+
+class Subscription:
+    """Stream di un client: coda limitata di eventi già codificati"""
+
+    __slots__ = ('topics', 'closed', '_queue')
+
+    def __init__(self, topics, size):
+        self.topics = topics
+        self.closed = False
+        self._queue = queue.Queue(size)
+
+    def push(self, frame):
+        """
+        Returns:
+            bool: False se la coda è piena (client troppo lento)
+        """
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def next(self, timeout):
+        """
+        Attende il prossimo evento
+
+        Returns:
+            bytes: Evento codificato, o None se non ne arrivano entro timeout
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+# ============================================================================
+# BROADCASTER
+# ============================================================================
+
+class Broadcaster:
+    """
+    Distribuisce le modifiche pubblicate agli stream aperti nel worker
+    Il thread di invio raccoglie le modifiche (locali e dal bridge) e
+    per ogni topic con iscritti costruisce e codifica un solo evento;
+    inoltra inoltre al bridge, in blocco, le modifiche pubblicate nel worker
+    """
+
+    def __init__(self, bridge=None, rate=2.0, queue_size=64, max_subscribers=1000, renderers=None):
+        """
+        Args:
+            bridge: Bridge tra i worker (None con un solo worker)
+            rate (float): Eventi al secondo per topic inviati a ogni client
+            queue_size (int): Eventi in attesa per client
+            max_subscribers (int): Stream aperti contemporaneamente
+            renderers (dict): Nome evento -> funzione (chiave del topic, {chiave: modifica})
+                che restituisce i dati dell'evento (default: {'changes': modifiche})
+        """
+        self.bridge = bridge
+        self.interval = 1.0 / rate
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._renderers = dict(renderers or {})
+
+        self._lock = threading.Lock()
+        self._subscribers = {}   # topic -> set di Subscription
+        self._subscriber_count = 0
+        self._pending = {}       # topic -> {chiave: ultima modifica}
+        self._outgoing = {}      # come _pending, da inoltrare agli altri worker
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        # Metriche
+        self.published_total = 0
+        self.events_total = 0
+        self.dropped_total = 0
+        self.bridged_total = 0
+
+    def start(self):
+        """Avvia il thread di invio (idempotente, sicuro dopo un fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self.bridge is not None:
+                self.bridge.open()
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='live-updates', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ferma il thread di invio"""
+        self._stop.set()
+
+    def subscribe(self, topics):
+        """
+        Apre lo stream di un client
+
+        Args:
+            topics (list): Topic da seguire
+
+        Returns:
+            Subscription: Stream del client, o None se il worker ha già troppi stream aperti
+        """
+        self.start()
+        subscription = Subscription(tuple(topics), self.queue_size)
+        with self._lock:
+            if self._subscriber_count >= self.max_subscribers:
+                return None
+            self._subscriber_count += 1
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Chiude lo stream di un client (idempotente)"""
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._subscriber_count -= 1
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topic, key, change=None):
+        """
+        Pubblica una modifica - O(1), senza codifica né I/O
+        Nello stesso intervallo una modifica sostituisce la precedente con la stessa chiave;
+        verso gli altri worker la inoltra il thread di invio
+
+        Args:
+            topic (str): Topic della modifica (es. 'leaderboard', 'cohort:3A')
+            key (str): Chiave di fusione (es. ID della sessione del giocatore)
+            change: Dati della modifica, serializzabili in JSON
+        """
+        self.published_total += 1
+        self._enqueue(topic, key, change)
+        if self.bridge is not None:
+            self.start()
+            with self._lock:
+                outgoing = self._outgoing.setdefault(topic, {})
+                outgoing.pop(key, None)
+                outgoing[key] = change
+
+    def _enqueue(self, topic, key, change):
+        # Nessuno stream aperto sul topic in questo worker: niente da inviare
+        if topic not in self._subscribers:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(topic, {})
+            # L'ultima modifica di una chiave va in fondo, nell'ordine di pubblicazione
+            pending.pop(key, None)
+            pending[key] = change
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error sending live updates: {e}")
+
+    def flush(self):
+        """
+        Invia le modifiche accumulate: al massimo un evento per topic
+
+        Returns:
+            int: Eventi codificati
+        """
+        if self.bridge is not None:
+            self._exchange()
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            targets = {topic: tuple(self._subscribers.get(topic, ())) for topic in pending}
+
+        encoded = 0
+        for topic, changes in pending.items():
+            subscribers = targets[topic]
+            if not subscribers:
+                continue
+            event, _, name = topic.partition(':')
+            try:
+                render = self._renderers.get(event)
+                data = render(name, changes) if render else {'changes': list(changes.values())}
+            except Exception as e:
+                logger.error(f"Error building live update for {topic}: {e}")
+                continue
+            frame = encode_event(event, data)
+            encoded += 1
+            for subscription in subscribers:
+                if not subscription.push(frame):
+                    # Client che non legge: disconnesso, alla riconnessione riceve lo stato completo
+                    self.dropped_total += 1
+                    self.unsubscribe(subscription)
+        self.events_total += encoded
+        return encoded
+
+    def _exchange(self):
+        """Scambia le modifiche con gli altri worker: una scrittura e una lettura del bridge"""
+        with self._lock:
+            outgoing, self._outgoing = self._outgoing, {}
+        try:
+            self.bridge.heartbeat(self._subscriber_count > 0)
+            if outgoing:
+                self.bridged_total += self.bridge.publish([
+                    (topic, key, change) for topic, changes in outgoing.items() for key, change in changes.items()
+                ])
+        except Exception as e:
+            logger.warning(f"Error publishing live updates to other workers: {e}")
+        for topic, key, change in self.bridge.poll():
+            self._enqueue(topic, key, change)
+
+    def subscriber_count(self):
+        """Returns: int: Stream aperti nel worker"""
+        return self._subscriber_count
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Stream aperti, modifiche pubblicate, eventi codificati e client disconnessi
+        """
+        return {
+            'subscribers': self._subscriber_count,
+            'topics': len(self._subscribers),
+            'published_total': self.published_total,
+            'events_total': self.events_total,
+            'dropped_total': self.dropped_total,
+            'bridged_total': self.bridged_total,
+            'max_rate': round(1.0 / self.interval, 3),
+            'bridge': type(self.bridge).__name__ if self.bridge is not None else None,
+            'running': self._thread is not None and self._thread.is_alive()
+        }
+
+# ============================================================================
+# BRIDGE TRA I WORKER
+# ============================================================================
+
+class SQLiteLiveBridge:
+    """
+    Modifiche condivise tramite una tabella nello stesso file del session store
+    Ogni worker legge a ogni intervallo le righe nuove scritte dagli altri.
+    I worker con stream aperti si registrano in live_listeners: senza altri
+    worker in ascolto le modifiche non vengono scritte, quindi la tabella
+    resta vuota finché nessuno apre /api/live
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._token = uuid.uuid4().hex[:12]
+        self._last_id = 0
+        self._pruned_at = 0.0
+        self._listening_at = 0.0
+        conn = self._store.connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS live_events ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' origin TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' topic TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' change TEXT'
+            ')'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS live_listeners ('
+            ' origin TEXT PRIMARY KEY,'
+            ' expires_at REAL NOT NULL'
+            ')'
+        )
+
+    def _origin(self):
+        # Il token è ereditato dai worker creati con fork: il pid li distingue
+        return f'{self._token}:{os.getpid()}'
+
+    def open(self):
+        """Legge solo le modifiche successive all'apertura"""
+        self._last_id = self._store.connection().execute(
+            'SELECT COALESCE(MAX(id), 0) FROM live_events'
+        ).fetchone()[0]
+
+    def heartbeat(self, listening):
+        """
+        Registra il worker finché ha stream aperti (rinnovo ogni terzo della validità)
+
+        Args:
+            listening (bool): True se il worker ha almeno uno stream aperto
+        """
+        now = time.time()
+        if listening:
+            if now - self._listening_at > SQLITE_LISTENER_TTL_SECONDS / 3:
+                self._store.connection().execute(
+                    'INSERT OR REPLACE INTO live_listeners (origin, expires_at) VALUES (?, ?)',
+                    (self._origin(), now + SQLITE_LISTENER_TTL_SECONDS)
+                )
+                self._listening_at = now
+        elif self._listening_at:
+            self._store.connection().execute('DELETE FROM live_listeners WHERE origin = ?', (self._origin(),))
+            self._listening_at = 0.0
+
+    def publish(self, changes):
+        """
+        Scrive le modifiche di un intervallo in una sola transazione
+        Elimina anche gli eventi più vecchi di SQLITE_RETENTION_SECONDS
+
+        Args:
+            changes (list): Modifiche (topic, chiave, dati)
+
+        Returns:
+            int: Modifiche scritte (0 se nessun altro worker è in ascolto)
+        """
+        conn = self._store.connection()
+        now = time.time()
+        origin = self._origin()
+        listener = conn.execute(
+            'SELECT 1 FROM live_listeners WHERE expires_at > ? AND origin != ? LIMIT 1', (now, origin)
+        ).fetchone()
+        if listener is None:
+            return 0
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT INTO live_events (origin, created_at, topic, key, change) VALUES (?, ?, ?, ?, ?)',
+                [(origin, now, topic, key, json.dumps(change, separators=(',', ':')))
+                 for topic, key, change in changes]
+            )
+            if now - self._pruned_at > SQLITE_RETENTION_SECONDS:
+                self._pruned_at = now
+                conn.execute('DELETE FROM live_events WHERE created_at < ?', (now - SQLITE_RETENTION_SECONDS,))
+                conn.execute('DELETE FROM live_listeners WHERE expires_at < ?', (now,))
+        return len(changes)
+
+    def poll(self):
+        """
+        Returns:
+            list: Modifiche (topic, chiave, dati) pubblicate dagli altri worker
+        """
+        rows = self._store.connection().execute(
+            'SELECT id, origin, topic, key, change FROM live_events WHERE id > ? ORDER BY id LIMIT ?',
+            (self._last_id, MAX_REMOTE_EVENTS)
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        origin = self._origin()
+        return [(topic, key, json.loads(change)) for _, source, topic, key, change in rows if source != origin]
+
+class RedisLiveBridge:
+    """
+    Modifiche condivise tramite pub/sub Redis, un messaggio per intervallo
+    Il canale viene letto senza bloccare dal thread di invio di ogni worker;
+    Redis scarta i messaggi senza iscritti, quindi non serve registrarsi
+    """
+
+    def __init__(self, store):
+        self._client = store.client
+        self._token = uuid.uuid4().hex[:12]
+        self._pubsub = None
+
+    def _origin(self):
+        return f'{self._token}:{os.getpid()}'
+
+    def open(self):
+        """Si iscrive al canale (nel worker: la connessione non passa attraverso il fork)"""
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(REDIS_CHANNEL)
+
+    def heartbeat(self, listening):
+        pass
+
+    def publish(self, changes):
+        """
+        Args:
+            changes (list): Modifiche (topic, chiave, dati) di un intervallo
+
+        Returns:
+            int: Modifiche inviate
+        """
+        self._client.publish(REDIS_CHANNEL, json.dumps(
+            [self._origin(), changes], separators=(',', ':')
+        ))
+        return len(changes)
+
+    def poll(self):
+        """
+        Returns:
+            list: Modifiche (topic, chiave, dati) pubblicate dagli altri worker
+        """
+        origin = self._origin()
+        changes = []
+        for _ in range(MAX_REMOTE_EVENTS):
+            message = self._pubsub.get_message(timeout=0)
+            if message is None:
+                break
+            if message.get('type') != 'message':
+                continue
+            source, batch = json.loads(message['data'])
+            if source != origin:
+                changes.extend(batch)
+        return changes
+
+def create_broadcaster(store, renderers=None):
+    """
+    Crea il broadcaster con il bridge adatto al session store
+
+    Args:
+        store (SessionStore): Backend delle sessioni in uso
+        renderers (dict): Funzioni che costruiscono i dati di ogni evento (vedi Broadcaster)
+
+    Returns:
+        Broadcaster: Broadcaster del worker (il thread di invio parte col primo iscritto)
+    """
+    bridge = None
+    if isinstance(store, RedisSessionStore):
+        bridge = RedisLiveBridge(store)
+    elif isinstance(store, SQLiteSessionStore):
+        bridge = SQLiteLiveBridge(store)
+    return Broadcaster(
+        bridge,
+        rate=float(os.getenv('LIVE_MAX_RATE', 2.0)),
+        queue_size=int(os.getenv('LIVE_QUEUE_SIZE', 64)),
+        max_subscribers=int(os.getenv('LIVE_MAX_SUBSCRIBERS', 1000)),
+        renderers=renderers
+    )
@@ -0,0 +1,320 @@
+"""
+CYBER KILL CHAIN ANALYZER - CLASSIFICATORE DELLE FASI
+
+Stima la fase della Kill Chain di righe di log qualsiasi (/api/analyze):
+serve agli insegnanti per controllare uno scenario nuovo prima di aggiungerlo
+al corpus e a chi vuole analizzare log reali.
+
+Modello (Naive Bayes multinomiale su pesi TF-IDF), addestrato all'avvio:
+- documenti: raw, indicators ed explanation dei log del corpus di base
+  (al massimo ANALYZER_CORPUS_LOGS_PER_PHASE per fase, presi a intervalli
+  regolari) e ANALYZER_SYNTHETIC_LOGS_PER_PHASE log per fase generati dai
+  template di models/log_templates.py (stesso seme a ogni avvio)
+- termini: parole e coppie di parole consecutive in minuscolo presenti in
+  almeno 2 documenti (IP, hash e altri valori casuali restano fuori)
+- pesi: log P(termine | fase) dalla somma dei TF-IDF dei documenti della
+  fase, con smoothing additivo; le fasi hanno probabilità a priori uguali,
+  qualunque sia la composizione del corpus
+- una riga senza termini noti riceve la distribuzione uniforme
+
+La classificazione di un batch è vettorizzata con NumPy: le righe diventano
+una matrice sparsa in coordinate (riga, termine, peso) e i punteggi di tutte
+le fasi si sommano per riga con np.add.reduceat, senza cicli Python sui termini.
+
+NumPy è una dipendenza opzionale: senza, get_phase_classifier() restituisce
+None e /api/analyze risponde 503.
+
+Configurazione (variabili d'ambiente):
+- ANALYZER_CORPUS_LOGS_PER_PHASE: log del corpus di base per fase (default 2000)
+- ANALYZER_SYNTHETIC_LOGS_PER_PHASE: log sintetici per fase (default 300, 0 li esclude)
+"""
+
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Dipendenza opzionale: senza numpy il classificatore non è disponibile
+    np = None
+
+from models.corpus import get_log_corpus
+from models.game_data import CYBER_KILL_CHAIN_PHASES
+from models.log_synthesis import LogSynthesizer
+
+logger = logging.getLogger(__name__)
+
+# Parole: lettere, cifre e underscore, iniziano con una lettera
+_WORD = re.compile(r'[a-z][a-z0-9_]+')
+
+# Parole considerate per ogni testo (le righe molto lunghe non rallentano il batch)
+MAX_WORDS = 512
+
+def log_texts(log):
+    """
+    Returns:
+        tuple: (raw, contesto) di un log: il contesto sono indicatori e spiegazione
+    """
+    return log.get('raw', ''), ' '.join((' '.join(log.get('indicators', ())), log.get('explanation', '')))
+
+def terms(text):
+    """
+    Args:
+        text (str): Testo da analizzare
+
+    Returns:
+        list: Parole in minuscolo seguite dalle coppie di parole consecutive
+    """
+    words = _WORD.findall(text.lower())[:MAX_WORDS]
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+def _tfidf(rows, cols, idf, size):
+    """
+    Pesi TF-IDF (tf sublineare, righe normalizzate L2) di una matrice in coordinate
+
+    Args:
+        rows, cols (ndarray): Riga e termine di ogni occorrenza (anche ripetuti)
+        idf (ndarray): IDF di ogni termine
+        size (int): Numero di termini
+
+    Returns:
+        tuple: (righe, termini, pesi) senza ripetizioni, ordinati per riga
+    """
+    keys, counts = np.unique(rows * size + cols, return_counts=True)
+    rows, cols = keys // size, keys % size
+    values = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values))
+    return rows, cols, values / norms[rows]
+
+def _scores(weights, rows, cols, values, count):
+    """
+    Punteggi di ogni fase per count righe: prodotto della matrice sparsa per i pesi
+
+    Returns:
+        ndarray: Una riga per testo, una colonna per fase
+    """
+    scores = np.zeros((count, weights.shape[1]))
+    if len(rows):
+        # Somma per riga dei contributi dei termini: un segmento contiguo per riga
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        scores[rows[starts]] = np.add.reduceat(weights[cols] * values[:, None], starts, axis=0)
+    return scores
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+def _log_weights(totals, alpha):
+    """
+    Returns:
+        ndarray: log P(termine | fase) con smoothing additivo, una riga per termine
+    """
+    size = totals.shape[1]
+    return np.log((totals + alpha) / (totals.sum(axis=1, keepdims=True) + alpha * size)).T
+
+def _phase_totals(labels, cols, values, phases, size):
+    """
+    Returns:
+        ndarray: Somma dei pesi di ogni termine nei documenti di ogni fase
+    """
+    return np.bincount(labels * size + cols, weights=values, minlength=phases * size).reshape(phases, size)
+
+class PhaseClassifier:
+    """
+    Classificatore delle fasi della Kill Chain addestrato sui testi dei log
+    """
+
+    def __init__(self, phases, vocabulary, idf, weights, documents=0, training_seconds=0.0):
+        """
+        Args:
+            phases (list): Fasi del modello (nell'ordine delle colonne dei pesi)
+            vocabulary (dict): Termine -> indice
+            idf (ndarray): IDF di ogni termine
+            weights (ndarray): log P(termine | fase), una riga per termine e una colonna per fase
+            documents (int): Documenti di addestramento
+            training_seconds (float): Durata dell'addestramento
+        """
+        self.phases = list(phases)
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.documents = documents
+        self.training_seconds = training_seconds
+
+    @classmethod
+    def train(cls, documents, alpha=0.1, min_documents=2):
+        """
+        Addestra il modello
+
+        Args:
+            documents (iterable): Terne (fase, raw, contesto)
+            alpha (float): Smoothing additivo dei pesi
+            min_documents (int): Documenti in cui un termine deve comparire
+
+        Returns:
+            PhaseClassifier: Modello addestrato
+
+        Raises:
+            ValueError: Se non ci sono documenti
+        """
+        started = time.perf_counter()
+        phase_index = {}
+        labels = array('q')
+        rows, cols = array('q'), array('q')
+        candidates = {}
+        for row, (phase, raw, context) in enumerate(documents):
+            labels.append(phase_index.setdefault(phase, len(phase_index)))
+            ids = [candidates.setdefault(term, len(candidates)) for term in terms(f'{raw} {context}')]
+            rows.extend(itertools.repeat(row, len(ids)))
+            cols.extend(ids)
+        if not labels:
+            raise ValueError("No training documents")
+
+        # Termini presenti in almeno min_documents documenti
+        rows, cols = np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)
+        pairs = np.unique(rows * len(candidates) + cols)
+        frequency = np.bincount(pairs % len(candidates), minlength=len(candidates))
+        kept = frequency >= min_documents
+        renumber = np.cumsum(kept) - 1
+        size = int(kept.sum())
+
+        count, phases = len(labels), len(phase_index)
+        labels = np.frombuffer(labels, dtype=np.int64)
+        idf = np.log((1.0 + count) / (1.0 + frequency[kept])) + 1.0
+        occurrences = kept[cols]
+        rows, cols, values = _tfidf(rows[occurrences], renumber[cols[occurrences]], idf, size)
+        totals = _phase_totals(labels[rows], cols, values, phases, size)
+
+        vocabulary = {term: int(renumber[index]) for term, index in candidates.items() if kept[index]}
+        return cls(list(phase_index), vocabulary, idf, np.ascontiguousarray(_log_weights(totals, alpha)),
+                   documents=count, training_seconds=time.perf_counter() - started)
+
+    def vectorize(self, texts):
+        """
+        Returns:
+            tuple: (righe, termini, pesi TF-IDF) dei testi, ordinati per riga
+        """
+        vocabulary = self.vocabulary
+        rows, cols = array('q'), array('q')
+        for row, text in enumerate(texts):
+            ids = [vocabulary[term] for term in terms(text) if term in vocabulary]
+            rows.extend(itertools.repeat(row, len(ids)))
+            cols.extend(ids)
+        rows, cols = np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)
+        return _tfidf(rows, cols, self.idf, len(self.vocabulary))
+
+    def predict_proba(self, texts):
+        """
+        Args:
+            texts (list): Righe di log
+
+        Returns:
+            ndarray: Probabilità di ogni fase (colonne nell'ordine di self.phases), una riga per testo
+        """
+        return _softmax(_scores(self.weights, *self.vectorize(texts), len(texts)))
+
+    def rank(self, texts, top=None):
+        """
+        Args:
+            texts (list): Righe di log
+            top (int): Fasi da restituire per riga (default tutte)
+
+        Returns:
+            list: Per ogni riga, coppie (fase, probabilità) dalla più probabile
+        """
+        probabilities = self.predict_proba(texts)
+        order = np.argsort(-probabilities, axis=1, kind='stable')[:, :top]
+        ranked = np.take_along_axis(probabilities, order, axis=1).round(4).tolist()
+        phases = self.phases
+        return [
+            [(phases[column], probability) for column, probability in zip(columns, values)]
+            for columns, values in zip(order.tolist(), ranked)
+        ]
+
+    def info(self):
+        """
+        Returns:
+            dict: Fasi, documenti e termini del modello, durata dell'addestramento
+        """
+        return {
+            'model': 'tfidf_naive_bayes',
+            'phases': len(self.phases),
+            'documents': self.documents,
+            'vocabulary': len(self.vocabulary),
+            'training_seconds': round(self.training_seconds, 3)
+        }
+
+# ============================================================================
+# ADDESTRAMENTO SUL CORPUS
+# ============================================================================
+
+def training_documents(corpus, corpus_logs_per_phase=2000, synthetic_logs_per_phase=300, seed=0):
+    """
+    Documenti di addestramento: log del corpus di base e log sintetici
+
+    Args:
+        corpus (LogCorpus): Corpus di gioco (i log sintetici del gioco non vengono letti)
+        corpus_logs_per_phase (int): Massimo di log del corpus per fase, a intervalli regolari
+        synthetic_logs_per_phase (int): Log generati dai template per fase
+        seed (int): Seme dei log sintetici
+
+    Yields:
+        tuple: (fase, raw, contesto)
+    """
+    for phase in CYBER_KILL_CHAIN_PHASES if corpus_logs_per_phase else ():
+        size = corpus.phase_size(phase)
+        step = max(1.0, size / corpus_logs_per_phase)
+        position = 0.0
+        while position < size:
+            yield (phase, *log_texts(corpus.phase_log_at(phase, int(position))))
+            position += step
+    if synthetic_logs_per_phase:
+        synthesizer = LogSynthesizer(seed=seed)
+        for phase in synthesizer.phases():
+            for log in synthesizer.generate(phase, synthetic_logs_per_phase):
+                yield (phase, *log_texts(log))
+
+def create_phase_classifier(corpus):
+    """
+    Addestra il classificatore sul corpus indicato dalle variabili d'ambiente
+
+    Returns:
+        PhaseClassifier: Modello addestrato, o None se NumPy non è installato
+    """
+    if np is None:
+        logger.warning("numpy not installed: log analysis (/api/analyze) disabled")
+        return None
+    classifier = PhaseClassifier.train(training_documents(
+        corpus,
+        corpus_logs_per_phase=int(os.getenv('ANALYZER_CORPUS_LOGS_PER_PHASE', 2000)),
+        synthetic_logs_per_phase=int(os.getenv('ANALYZER_SYNTHETIC_LOGS_PER_PHASE', 300))
+    ))
+    info = classifier.info()
+    logger.info(f"Phase classifier trained on {info['documents']} logs "
+                f"({info['vocabulary']} terms) in {info['training_seconds']:.2f}s")
+    return classifier
+
+_classifier = None
+_classifier_ready = False
+_classifier_lock = threading.Lock()
+
+def get_phase_classifier():
+    """
+    Restituisce il classificatore globale, addestrandolo al primo utilizzo
+    (con preload_app avviene nel master di gunicorn, prima del fork)
+
+    Returns:
+        PhaseClassifier: Modello condiviso, o None se NumPy non è installato
+    """
+    global _classifier, _classifier_ready
+    if not _classifier_ready:
+        with _classifier_lock:
+            if not _classifier_ready:
+                _classifier = create_phase_classifier(get_log_corpus())
+                _classifier_ready = True
+    return _classifier
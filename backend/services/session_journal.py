@@ -0,0 +1,419 @@
+"""
+CYBER KILL CHAIN ANALYZER - PERSISTENZA DELLE SESSIONI IN MEMORIA
+Journal append-only con snapshot compattati per il backend memory
+
+Ogni salvataggio o eliminazione di una sessione (generate_log, update_session_stats,
+reset_session, scadenze) viene registrato nel journal. La richiesta si limita a
+mettere una copia superficiale della sessione in una tabella in attesa: un thread
+in background scrive i lotti e fa un solo fsync ogni fsync_interval secondi
+(group commit). In caso di crash si perde al massimo l'ultimo intervallo.
+
+Il journal è diviso in segmenti numerati (journal.<generazione>.log). Una
+compattazione passa a un nuovo segmento, scrive lo snapshot di tutte le
+sessioni (snapshot.jsonl, rinominato atomicamente) ed elimina i segmenti
+precedenti. All'avvio si ricaricano lo snapshot e i segmenti successivi.
+
+Ogni riga contiene lo stato completo della sessione, quindi riapplicarla è
+idempotente: nessun problema se una modifica compare sia nello snapshot sia
+nel segmento successivo.
+
+Un file LOCK nella directory garantisce un solo processo scrittore: durante
+un deploy il nuovo processo attende che il precedente abbia chiuso il journal,
+poi riparte dallo stato completo.
+
+Configurazione (variabili d'ambiente):
+- SESSION_JOURNAL_DIR: directory del journal (se assente: nessuna persistenza)
+- SESSION_JOURNAL_FSYNC_MS: intervallo del group commit in millisecondi (default 50)
+- SESSION_SNAPSHOT_INTERVAL: secondi tra due compattazioni (default 300)
+- SESSION_JOURNAL_MAX_MB: dimensione del segmento che forza una compattazione (default 64)
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: nessun lock tra processi
+    fcntl = None
+
+from models.session_record import SessionRecord
+from services.session_store import MemorySessionStore, DEFAULT_SESSION_TTL
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'snapshot.jsonl'
+LOCK_FILE = 'LOCK'
+_SEGMENT_PATTERN = re.compile(r'^journal\.(\d{8})\.log$')
+
+def _segment_name(generation):
+    return f'journal.{generation:08d}.log'
+
+def _fsync_directory(directory):
+    """Rende persistenti creazioni e rinomine di file nella directory"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _read_lines(path):
+    """
+    Righe JSON di un file del journal
+    Una riga finale incompleta (crash durante la scrittura) viene ignorata
+    """
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Ignoring truncated journal record {path}:{number}")
+                return
+
+# ============================================================================
+# JOURNAL
+# ============================================================================
+
+class SessionJournal:
+    """
+    Journal append-only delle sessioni con group commit e snapshot
+    """
+
+    def __init__(self, directory, fsync_interval=0.05, snapshot_interval=300,
+                 max_segment_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Directory di journal, snapshot e lock
+            fsync_interval (float): Secondi tra due scritture con fsync
+            snapshot_interval (float): Secondi tra due compattazioni
+            max_segment_bytes (int): Dimensione del segmento che forza una compattazione
+        """
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.max_segment_bytes = max_segment_bytes
+
+        self._pending = {}                  # session_id -> (istante, sessione) o None se eliminata
+        self._lock = threading.Lock()       # Protegge solo _pending
+        self._io_lock = threading.Lock()    # Segmento corrente; preso prima di _lock
+        self._stop = threading.Event()
+        self._thread = None
+        self._compacting = None
+        self._source = None
+        self._segment = None
+        self._generation = 0
+        self._segment_bytes = 0
+        self._last_snapshot = time.monotonic()
+
+        # Metriche
+        self.records_written = 0
+        self.fsyncs = 0
+        self.last_fsync_ms = 0.0
+        self.snapshots = 0
+        self.last_snapshot_ms = 0.0
+        self.replayed = 0
+        self.replay_ms = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info(f"Waiting for the previous process to release {directory}")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _segments(self):
+        """Generazioni dei segmenti presenti, in ordine"""
+        generations = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def _open_segment(self, generation):
+        """Passa a un nuovo segmento (da chiamare con _io_lock)"""
+        if self._segment is not None:
+            self._segment.close()
+        self._generation = generation
+        self._segment = open(os.path.join(self.directory, _segment_name(generation)), 'ab')
+        self._segment_bytes = 0
+        _fsync_directory(self.directory)
+
+    # Registrazione (percorso delle richieste) --------------------------------
+
+    def record_save(self, session_id, session):
+        """
+        Registra lo stato della sessione appena salvata
+
+        Args:
+            session_id (str): ID della sessione
+            session: Sessione (viene copiata: le modifiche successive non la alterano)
+        """
+        # Copia superficiale: la conversione a dizionario avviene nel writer
+        entry = (time.time(), session.copy())
+        with self._lock:
+            self._pending[session_id] = entry
+
+    def record_delete(self, session_id):
+        """Registra l'eliminazione della sessione"""
+        with self._lock:
+            self._pending[session_id] = None
+
+    # Ripristino --------------------------------------------------------------
+
+    def replay(self):
+        """
+        Ricostruisce lo stato dallo snapshot e dai segmenti successivi
+
+        Returns:
+            dict: session_id -> (istante dell'ultimo salvataggio, dati della sessione)
+        """
+        started = time.perf_counter()
+        state = {}
+        first_generation = 0
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            records = _read_lines(snapshot_path)
+            header = next(records, None)
+            if header is not None:
+                first_generation = header['generation']
+                for session_id, saved_at, data in records:
+                    state[session_id] = (saved_at, data)
+
+        generations = self._segments()
+        for generation in generations:
+            if generation < first_generation:
+                continue  # Già compreso nello snapshot (compattazione interrotta)
+            for record in _read_lines(os.path.join(self.directory, _segment_name(generation))):
+                if record[0] == 's':
+                    state[record[1]] = (record[2], record[3])
+                else:
+                    state.pop(record[1], None)
+
+        # Si scrive sempre su un segmento nuovo: l'ultimo può terminare con una riga incompleta
+        with self._io_lock:
+            self._open_segment(max(generations + [first_generation]) + 1)
+
+        self.replayed = len(state)
+        self.replay_ms = (time.perf_counter() - started) * 1000
+        return state
+
+    # Scrittura in background -------------------------------------------------
+
+    def start(self, source):
+        """
+        Avvia il thread di scrittura
+
+        Args:
+            source (callable): Restituisce le coppie (session_id, (istante, sessione))
+                di tutte le sessioni, usata per gli snapshot
+        """
+        self._source = source
+        self._thread = threading.Thread(target=self._run, name='session-journal', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.flush()
+                if self._should_compact():
+                    self._compacting = threading.Thread(
+                        target=self.compact, name='session-snapshot', daemon=True
+                    )
+                    self._compacting.start()
+            except Exception as e:
+                # Il journal non deve mai fermare il gioco: si riprova al giro successivo
+                logger.error(f"Session journal error: {e}")
+
+    def _should_compact(self):
+        if self._compacting is not None and self._compacting.is_alive():
+            return False
+        if self._segment_bytes == 0:
+            return False
+        return (self._segment_bytes >= self.max_segment_bytes or
+                time.monotonic() - self._last_snapshot >= self.snapshot_interval)
+
+    def flush(self):
+        """
+        Scrive le modifiche in attesa sul segmento corrente con un solo fsync
+        Il writer e la compattazione possono chiamarla insieme: _io_lock resta
+        preso dal prelievo del lotto alla scrittura, così i lotti arrivano sul
+        segmento nell'ordine in cui sono stati prelevati
+        """
+        with self._io_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+
+            lines = []
+            for session_id, entry in pending.items():
+                if entry is None:
+                    record = ['d', session_id]
+                else:
+                    record = ['s', session_id, entry[0], dict(entry[1])]
+                lines.append(json.dumps(record, separators=(',', ':')))
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+
+            started = time.perf_counter()
+            self._segment.write(data)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self.last_fsync_ms = (time.perf_counter() - started) * 1000
+            self._segment_bytes += len(data)
+            self.records_written += len(lines)
+            self.fsyncs += 1
+
+    def compact(self):
+        """
+        Scrive lo snapshot di tutte le sessioni ed elimina i segmenti che contiene
+        Le modifiche successive al cambio di segmento restano nel segmento nuovo
+        """
+        started = time.perf_counter()
+        self.flush()
+        with self._io_lock:
+            generation = self._generation + 1
+            self._open_segment(generation)
+        self._last_snapshot = time.monotonic()
+
+        temporary = os.path.join(self.directory, SNAPSHOT_FILE + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'generation': generation, 'created_at': time.time()}) + '\n')
+            for session_id, (saved_at, session) in self._source():
+                f.write(json.dumps([session_id, saved_at, session], separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.directory, SNAPSHOT_FILE))
+        _fsync_directory(self.directory)
+
+        for old in self._segments():
+            if old < generation:
+                os.remove(os.path.join(self.directory, _segment_name(old)))
+
+        self.snapshots += 1
+        self.last_snapshot_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Session snapshot written in {self.last_snapshot_ms:.0f} ms")
+
+    def close(self):
+        """Ferma il thread e scrive le ultime modifiche (chiamato anche all'uscita)"""
+        if self._lock_file.closed:
+            return
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._compacting is not None:
+            self._compacting.join()
+        self.flush()
+        with self._io_lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+        self._lock_file.close()  # Rilascia il lock per il processo successivo
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Stato del journal (record in attesa, fsync, snapshot, ripristino)
+        """
+        return {
+            'directory': self.directory,
+            'generation': self._generation,
+            'pending': len(self._pending),
+            'records_written': self.records_written,
+            'segment_bytes': self._segment_bytes,
+            'fsyncs': self.fsyncs,
+            'last_fsync_ms': round(self.last_fsync_ms, 3),
+            'snapshots': self.snapshots,
+            'last_snapshot_ms': round(self.last_snapshot_ms, 1),
+            'replayed_sessions': self.replayed,
+            'replay_ms': round(self.replay_ms, 1)
+        }
+
+# ============================================================================
+# BACKEND IN MEMORIA CON JOURNAL
+# ============================================================================
+
+class JournaledSessionStore(MemorySessionStore):
+    """
+    Backend in memoria le cui modifiche sopravvivono ai riavvii
+    Alla creazione ricarica le sessioni non ancora scadute dal journal
+    """
+
+    def __init__(self, journal, ttl=DEFAULT_SESSION_TTL):
+        """
+        Args:
+            journal (SessionJournal): Journal su cui registrare le modifiche
+            ttl (float): Durata di una sessione inattiva in secondi
+        """
+        super().__init__(ttl)
+        self.journal = journal
+        self._restore(journal.replay())
+        journal.start(self._snapshot_entries)
+        logger.info(f"Restored {self.count()} sessions from the journal "
+                    f"in {journal.replay_ms:.0f} ms")
+
+    def _restore(self, state):
+        """Inserisce le sessioni ripristinate con la scadenza residua"""
+        now, wall = self.clock(), time.time()
+        with self._lock:
+            for session_id, (saved_at, data) in state.items():
+                deadline = now + self.ttl - (wall - saved_at)
+                if deadline > now:
+                    self._store(session_id, SessionRecord.from_dict(data), deadline)
+
+    def _snapshot_entries(self):
+        """Tutte le sessioni con l'istante (epoch) dell'ultimo salvataggio"""
+        offset = time.time() - self.clock() - self.ttl
+        for session_id, session in self.items():
+            deadline = self._deadlines.get(session_id)
+            if deadline is not None:
+                yield session_id, (deadline + offset, dict(session))
+
+    def save(self, session_id, session):
+        super().save(session_id, session)
+        self.journal.record_save(session_id, session)
+
+    def compare_and_save(self, session_id, session, expected_version):
+        if not super().compare_and_save(session_id, session, expected_version):
+            return False
+        self.journal.record_save(session_id, session)
+        return True
+
+    def delete(self, session_id):
+        deleted = super().delete(session_id)
+        if deleted:
+            self.journal.record_delete(session_id)
+        return deleted
+
+    def expire_due(self, now=None, limit=None):
+        expired = super().expire_due(now, limit)
+        for session_id, _ in expired:
+            self.journal.record_delete(session_id)
+        return expired
+
+def create_session_journal(directory):
+    """
+    Crea il journal con la configurazione delle variabili d'ambiente
+
+    Args:
+        directory (str): Directory del journal
+
+    Returns:
+        SessionJournal: Journal pronto per il ripristino
+    """
+    return SessionJournal(
+        directory,
+        fsync_interval=float(os.getenv('SESSION_JOURNAL_FSYNC_MS', 50)) / 1000,
+        snapshot_interval=float(os.getenv('SESSION_SNAPSHOT_INTERVAL', 300)),
+        max_segment_bytes=int(float(os.getenv('SESSION_JOURNAL_MAX_MB', 64)) * 1024 * 1024)
+    )
@@ -0,0 +1,67 @@
+"""
+CYBER KILL CHAIN ANALYZER - LOCK PER SESSIONE
+Serializza le operazioni read-modify-write sulla stessa sessione tra i thread
+(o greenlet, con gevent che sostituisce il modulo threading) di un worker
+
+Ogni sessione in uso ha il proprio lock, creato alla prima richiesta e
+rimosso quando nessuno lo usa più. La tabella dei lock è divisa in stripe
+scelte dall'hash del session_id: il lock di una stripe protegge solo la
+tabella (pochi microsecondi), mai l'operazione sulla sessione. Sessioni
+diverse quindi non si aspettano mai a vicenda.
+
+Tra processi diversi (session store sqlite o redis) la protezione è data
+dal campo version della sessione (vedi SessionStore.compare_and_save).
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+class SessionLocks:
+    """
+    Tabella a stripe di lock rientranti, uno per sessione in uso
+    """
+
+    def __init__(self, stripes=64):
+        """
+        Args:
+            stripes (int): Numero di stripe della tabella dei lock
+        """
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+
+    @contextmanager
+    def hold(self, session_id):
+        """
+        Mantiene il lock della sessione per la durata del blocco with
+        Il lock è rientrante: un metodo che ne chiama un altro sulla stessa
+        sessione nello stesso thread non si blocca
+        """
+        guard, table = self._stripes[hash(session_id) % len(self._stripes)]
+        with guard:
+            entry = table.get(session_id)
+            if entry is None:
+                entry = table[session_id] = [threading.RLock(), 0]
+            entry[1] += 1  # Thread che usano o attendono il lock
+
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            entry[0].release()
+            with guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del table[session_id]
+
+    def __len__(self):
+        """Numero di sessioni con un lock attivo"""
+        return sum(len(table) for _, table in self._stripes)
+
+def create_session_locks():
+    """
+    Crea la tabella dei lock con il numero di stripe di SESSION_LOCK_STRIPES
+
+    Returns:
+        SessionLocks: Tabella dei lock per sessione
+    """
+    return SessionLocks(int(os.getenv('SESSION_LOCK_STRIPES', 64)))
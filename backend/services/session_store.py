@@ -0,0 +1,519 @@
+"""
+CYBER KILL CHAIN ANALYZER - SESSION STORE
+Archiviazione condivisa delle sessioni utente con backend intercambiabili
+
+Backend disponibili (variabile d'ambiente SESSION_STORE):
+- memory: dizionario in-process, adatto a un singolo worker (default); con
+  SESSION_JOURNAL_DIR le modifiche vengono registrate su disco e ricaricate
+  al riavvio (vedi services/session_journal.py)
+- sqlite: file SQLite in modalità WAL, condiviso tra i worker della stessa macchina
+- redis:  server Redis, condiviso tra più nodi senza sticky sessions
+
+Ogni salvataggio rinnova la scadenza della sessione (SESSION_TTL_SECONDS
+dall'ultima attività). Il campo version della sessione permette salvataggi
+condizionati (compare_and_save) quando più processi la modificano. Le scadenze sono indicizzate per essere rimosse a
+piccoli lotti da services/session_sweeper.py, senza scansioni complete.
+"""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Prefisso delle chiavi Redis usate per le sessioni
+REDIS_KEY_PREFIX = 'ckc:session:'
+# Sorted set Redis con gli ID delle sessioni ordinati per scadenza
+REDIS_EXPIRY_KEY = 'ckc:session_expiry'
+
+# Durata di default di una sessione inattiva (24 ore)
+DEFAULT_SESSION_TTL = 24 * 3600
+
+def encode_session(session):
+    """
+    Serializza una sessione in JSON
+
+    Args:
+        session: Dizionario o mapping con vista a dizionario (es. SessionRecord)
+
+    Returns:
+        str: JSON della sessione
+    """
+    return json.dumps(session if isinstance(session, dict) else dict(session))
+
+# ============================================================================
+# INTERFACCIA COMUNE
+# ============================================================================
+
+class SessionStore:
+    """
+    Interfaccia comune a tutti i backend di archiviazione delle sessioni
+
+    Le sessioni sono dizionari serializzabili in JSON. Chi modifica una
+    sessione ottenuta con get() deve chiamare save() per renderla visibile
+    agli altri worker.
+
+    Le scadenze sono numeri restituiti da clock(): secondi monotonici per il
+    backend in memoria, epoch per i backend condivisi tra processi.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL):
+        self.ttl = ttl
+
+    def clock(self):
+        """Orologio usato per le scadenze di questo backend"""
+        return time.time()
+
+    def get(self, session_id):
+        """
+        Restituisce i dati della sessione
+
+        Args:
+            session_id (str): ID della sessione
+
+        Returns:
+            dict: Dati della sessione o None se non esiste
+        """
+        raise NotImplementedError
+
+    def save(self, session_id, session):
+        """
+        Salva (crea o sovrascrive) i dati della sessione e ne rinnova la scadenza
+
+        Args:
+            session_id (str): ID della sessione
+            session (dict): Dati completi della sessione
+        """
+        raise NotImplementedError
+
+    def compare_and_save(self, session_id, session, expected_version):
+        """
+        Salva la sessione solo se nel backend ha ancora la versione letta
+        In caso di successo il campo version della sessione viene incrementato
+
+        Args:
+            session_id (str): ID della sessione
+            session (dict): Dati completi della sessione
+            expected_version (int): Versione letta prima delle modifiche, oppure
+                None per creare la sessione solo se non esiste ancora
+
+        Returns:
+            bool: False se la sessione è stata modificata o eliminata nel frattempo
+                (o, con expected_version None, se esiste già)
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        """
+        Elimina una sessione
+
+        Args:
+            session_id (str): ID della sessione
+
+        Returns:
+            bool: True se la sessione esisteva ed è stata eliminata
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """
+        Returns:
+            int: Numero di sessioni archiviate
+        """
+        raise NotImplementedError
+
+    def items(self):
+        """
+        Itera su tutte le sessioni archiviate
+
+        Returns:
+            iterator: Coppie (session_id, dati della sessione)
+        """
+        raise NotImplementedError
+
+    def expire_due(self, now=None, limit=None):
+        """
+        Elimina le sessioni con scadenza <= now, dalla più vecchia
+
+        Args:
+            now (float): Istante di riferimento su clock() (default: adesso)
+            limit (int): Numero massimo di sessioni da eliminare (None = tutte)
+
+        Returns:
+            list: Coppie (session_id, scadenza) delle sessioni eliminate
+        """
+        raise NotImplementedError
+
+    def oldest_deadline(self):
+        """
+        Returns:
+            float: Scadenza più vicina tra le sessioni archiviate, o None
+        """
+        raise NotImplementedError
+
+    def expire_inactive(self, max_age_seconds):
+        """
+        Elimina le sessioni inattive da più di max_age_seconds
+
+        Args:
+            max_age_seconds (float): Inattività massima consentita
+
+        Returns:
+            list: Coppie (session_id, scadenza) delle sessioni eliminate
+        """
+        # scadenza = ultima attività + ttl, quindi basta spostare il cutoff
+        return self.expire_due(now=self.clock() - max_age_seconds + self.ttl)
+
+# ============================================================================
+# BACKEND IN MEMORIA
+# ============================================================================
+
+class MemorySessionStore(SessionStore):
+    """
+    Backend in memoria: le sessioni vivono nel processo corrente
+    Restituisce i dizionari originali, quindi save() è solo un'assegnazione
+
+    Le scadenze sono in un min-heap con una sola voce per sessione: save()
+    aggiorna solo la scadenza effettiva, e una voce estratta in anticipo
+    viene reinserita con la scadenza aggiornata.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL):
+        super().__init__(ttl)
+        self._sessions = {}
+        self._deadlines = {}      # session_id -> scadenza effettiva
+        self._queued = {}         # session_id -> scadenza della sua voce nell'heap
+        self._expiry_heap = []    # (scadenza registrata, session_id)
+        self._lock = threading.Lock()
+
+    def clock(self):
+        return time.monotonic()
+
+    def get(self, session_id):
+        return self._sessions.get(session_id)
+
+    def save(self, session_id, session):
+        deadline = self.clock() + self.ttl
+        with self._lock:
+            self._store(session_id, session, deadline)
+
+    def compare_and_save(self, session_id, session, expected_version):
+        deadline = self.clock() + self.ttl
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if expected_version is None:
+                if current is not None:
+                    return False
+            elif current is None or current.get('version', 0) != expected_version:
+                return False
+            else:
+                session['version'] = expected_version + 1
+            self._store(session_id, session, deadline)
+            return True
+
+    def _store(self, session_id, session, deadline):
+        """Salva la sessione e ne rinnova la scadenza (da chiamare con il lock)"""
+        if session_id not in self._queued:
+            self._push(session_id, deadline)
+        self._deadlines[session_id] = deadline
+        self._sessions[session_id] = session
+
+    def delete(self, session_id):
+        with self._lock:
+            # La voce nell'heap resta e viene scartata quando estratta
+            self._deadlines.pop(session_id, None)
+            return self._sessions.pop(session_id, None) is not None
+
+    def count(self):
+        return len(self._sessions)
+
+    def _push(self, session_id, deadline):
+        """Inserisce la voce della sessione nell'heap (da chiamare con il lock)"""
+        heapq.heappush(self._expiry_heap, (deadline, session_id))
+        self._queued[session_id] = deadline
+
+    def _pop(self):
+        """Estrae la voce più vecchia dall'heap (da chiamare con il lock)"""
+        registered, session_id = heapq.heappop(self._expiry_heap)
+        del self._queued[session_id]
+        return registered, session_id
+
+    def items(self):
+        # Copia della lista per permettere eliminazioni durante l'iterazione
+        return iter(list(self._sessions.items()))
+
+    def expire_due(self, now=None, limit=None):
+        now = self.clock() if now is None else now
+        expired = []
+        heap = self._expiry_heap
+        with self._lock:
+            while heap and heap[0][0] <= now and (limit is None or len(expired) < limit):
+                _, session_id = self._pop()
+                deadline = self._deadlines.get(session_id)
+                if deadline is None:
+                    continue  # Sessione già eliminata
+                if deadline > now:
+                    # Attività recente: reinserisce con la scadenza aggiornata
+                    self._push(session_id, deadline)
+                    continue
+                del self._deadlines[session_id]
+                del self._sessions[session_id]
+                expired.append((session_id, deadline))
+        return expired
+
+    def oldest_deadline(self):
+        with self._lock:
+            # Scarta le voci di sessioni eliminate e corregge quelle anticipate
+            heap = self._expiry_heap
+            while heap:
+                registered, session_id = heap[0]
+                deadline = self._deadlines.get(session_id)
+                if deadline == registered:
+                    return deadline
+                self._pop()
+                if deadline is not None:
+                    self._push(session_id, deadline)
+            return None
+
+# ============================================================================
+# BACKEND SQLITE (WAL)
+# ============================================================================
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Backend SQLite in modalità WAL: più processi possono leggere mentre uno scrive
+    Ogni thread (e ogni processo dopo un fork) usa la propria connessione
+    """
+
+    def __init__(self, path, ttl=DEFAULT_SESSION_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        conn = self.connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            ' session_id TEXT PRIMARY KEY,'
+            ' data TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL DEFAULT 0,'
+            ' version INTEGER NOT NULL DEFAULT 0'
+            ')'
+        )
+        # Migrazione dei database creati prima dell'introduzione di scadenze e versioni
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(sessions)')]
+        if 'expires_at' not in columns:
+            conn.execute('ALTER TABLE sessions ADD COLUMN expires_at REAL NOT NULL DEFAULT 0')
+        if 'version' not in columns:
+            conn.execute('ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+
+    def connection(self):
+        """Restituisce la connessione del thread corrente, aprendola se necessario"""
+        conn = getattr(self._local, 'conn', None)
+        # Le connessioni SQLite non vanno condivise tra processi dopo un fork
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id):
+        row = self.connection().execute(
+            'SELECT data FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, session):
+        self.connection().execute(
+            'INSERT OR REPLACE INTO sessions (session_id, data, expires_at, version)'
+            ' VALUES (?, ?, ?, ?)',
+            (session_id, encode_session(session), self.clock() + self.ttl, session.get('version', 0))
+        )
+
+    def compare_and_save(self, session_id, session, expected_version):
+        if expected_version is None:
+            cursor = self.connection().execute(
+                'INSERT OR IGNORE INTO sessions (session_id, data, expires_at, version)'
+                ' VALUES (?, ?, ?, ?)',
+                (session_id, encode_session(session), self.clock() + self.ttl, session.get('version', 0))
+            )
+            return cursor.rowcount > 0
+        session['version'] = expected_version + 1
+        cursor = self.connection().execute(
+            'UPDATE sessions SET data = ?, expires_at = ?, version = ?'
+            ' WHERE session_id = ? AND version = ?',
+            (encode_session(session), self.clock() + self.ttl, session['version'],
+             session_id, expected_version)
+        )
+        if cursor.rowcount:
+            return True
+        session['version'] = expected_version
+        return False
+
+    def delete(self, session_id):
+        cursor = self.connection().execute(
+            'DELETE FROM sessions WHERE session_id = ?', (session_id,)
+        )
+        return cursor.rowcount > 0
+
+    def count(self):
+        return self.connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def items(self):
+        rows = self.connection().execute('SELECT session_id, data FROM sessions').fetchall()
+        return ((session_id, json.loads(data)) for session_id, data in rows)
+
+    def expire_due(self, now=None, limit=None):
+        now = self.clock() if now is None else now
+        conn = self.connection()
+        rows = conn.execute(
+            'SELECT session_id, expires_at FROM sessions WHERE expires_at <= ?'
+            ' ORDER BY expires_at LIMIT ?',
+            (now, -1 if limit is None else limit)
+        ).fetchall()
+        expired = []
+        for session_id, deadline in rows:
+            # Il controllo sulla scadenza evita di eliminare sessioni rinnovate
+            # da un altro worker tra la SELECT e la DELETE
+            cursor = conn.execute(
+                'DELETE FROM sessions WHERE session_id = ? AND expires_at <= ?',
+                (session_id, now)
+            )
+            if cursor.rowcount:
+                expired.append((session_id, deadline))
+        return expired
+
+    def oldest_deadline(self):
+        return self.connection().execute('SELECT MIN(expires_at) FROM sessions').fetchone()[0]
+
+# ============================================================================
+# BACKEND REDIS
+# ============================================================================
+
+class RedisSessionStore(SessionStore):
+    """
+    Backend Redis: ogni sessione è una stringa JSON sotto ckc:session:<id>
+    Un sorted set Redis indicizza gli ID per scadenza; le chiavi hanno anche
+    un EXPIRE nativo, quindi Redis non trattiene sessioni abbandonate
+    """
+
+    def __init__(self, redis_url, ttl=DEFAULT_SESSION_TTL):
+        super().__init__(ttl)
+        import redis
+        # La connessione viene aperta alla prima richiesta, non alla creazione
+        self.client = redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, session_id):
+        raw = self.client.get(REDIS_KEY_PREFIX + session_id)
+        return json.loads(raw) if raw else None
+
+    def save(self, session_id, session):
+        pipe = self.client.pipeline()
+        pipe.set(REDIS_KEY_PREFIX + session_id, encode_session(session), ex=int(self.ttl))
+        pipe.zadd(REDIS_EXPIRY_KEY, {session_id: self.clock() + self.ttl})
+        pipe.execute()
+
+    def compare_and_save(self, session_id, session, expected_version):
+        from redis.exceptions import WatchError
+        key = REDIS_KEY_PREFIX + session_id
+        if expected_version is None:
+            if not self.client.set(key, encode_session(session), ex=int(self.ttl), nx=True):
+                return False
+            self.client.zadd(REDIS_EXPIRY_KEY, {session_id: self.clock() + self.ttl})
+            return True
+        with self.client.pipeline() as pipe:
+            try:
+                # WATCH: EXEC fallisce se un altro client modifica la chiave nel frattempo
+                pipe.watch(key)
+                raw = pipe.get(key)
+                if raw is None or json.loads(raw).get('version', 0) != expected_version:
+                    return False
+                session['version'] = expected_version + 1
+                pipe.multi()
+                pipe.set(key, encode_session(session), ex=int(self.ttl))
+                pipe.zadd(REDIS_EXPIRY_KEY, {session_id: self.clock() + self.ttl})
+                pipe.execute()
+                return True
+            except WatchError:
+                session['version'] = expected_version
+                return False
+
+    def delete(self, session_id):
+        pipe = self.client.pipeline()
+        pipe.delete(REDIS_KEY_PREFIX + session_id)
+        pipe.zrem(REDIS_EXPIRY_KEY, session_id)
+        deleted, _ = pipe.execute()
+        return deleted > 0
+
+    def count(self):
+        return self.client.zcard(REDIS_EXPIRY_KEY)
+
+    def items(self):
+        for raw_id, _ in self.client.zscan_iter(REDIS_EXPIRY_KEY):
+            session_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            session = self.get(session_id)
+            if session is not None:
+                yield session_id, session
+
+    def expire_due(self, now=None, limit=None):
+        now = self.clock() if now is None else now
+        if limit is None:
+            rows = self.client.zrangebyscore(REDIS_EXPIRY_KEY, '-inf', now, withscores=True)
+        else:
+            rows = self.client.zrangebyscore(
+                REDIS_EXPIRY_KEY, '-inf', now, start=0, num=limit, withscores=True
+            )
+        expired = []
+        for raw_id, deadline in rows:
+            session_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            # ZREM decide chi elimina la sessione quando più worker fanno sweep
+            if self.client.zrem(REDIS_EXPIRY_KEY, session_id):
+                self.client.delete(REDIS_KEY_PREFIX + session_id)
+                expired.append((session_id, deadline))
+        return expired
+
+    def oldest_deadline(self):
+        rows = self.client.zrange(REDIS_EXPIRY_KEY, 0, 0, withscores=True)
+        return rows[0][1] if rows else None
+
+# ============================================================================
+# SELEZIONE DEL BACKEND DA CONFIGURAZIONE
+# ============================================================================
+
+def create_session_store():
+    """
+    Crea il backend di archiviazione indicato dalla variabile SESSION_STORE
+
+    Returns:
+        SessionStore: Backend configurato (memory come fallback)
+    """
+    backend = os.getenv('SESSION_STORE', 'memory').lower()
+    ttl = float(os.getenv('SESSION_TTL_SECONDS', DEFAULT_SESSION_TTL))
+
+    if backend == 'sqlite':
+        path = os.getenv('SESSION_DB_PATH', 'sessions.db')
+        logger.info(f"Session store using SQLite (WAL) at {path}")
+        return SQLiteSessionStore(path, ttl)
+
+    if backend == 'redis':
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+        logger.info("Session store using Redis")
+        return RedisSessionStore(redis_url, ttl)
+
+    if backend != 'memory':
+        logger.warning(f"Unknown SESSION_STORE '{backend}', falling back to memory")
+
+    journal_dir = os.getenv('SESSION_JOURNAL_DIR')
+    if journal_dir:
+        # Import locale: il journal dipende da questo modulo
+        from services.session_journal import JournaledSessionStore, create_session_journal
+        logger.info(f"Session store using memory with journal in {journal_dir} (single worker only)")
+        return JournaledSessionStore(create_session_journal(journal_dir), ttl)
+
+    logger.info("Session store using memory (single worker only)")
+    return MemorySessionStore(ttl)
@@ -0,0 +1,181 @@
+"""
+CYBER KILL CHAIN ANALYZER - SESSION SWEEPER
+Thread in background che rimuove le sessioni scadute a piccoli lotti
+
+Invece di una scansione completa di tutte le sessioni, il sweeper chiede al
+session store solo le sessioni già scadute, dalla più vecchia, al massimo
+batch_size alla volta. Le richieste degli utenti non vengono mai bloccate
+per più del tempo necessario a eliminare un lotto.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Finestra (secondi) su cui viene calcolata la velocità di rimozione
+RATE_WINDOW_SECONDS = 60
+
+class SessionSweeper:
+    """
+    Rimuove periodicamente le sessioni scadute dal session store
+    ed espone metriche su velocità di rimozione e ritardo accumulato
+    """
+
+    def __init__(self, store, interval=1.0, batch_size=1000):
+        """
+        Args:
+            store (SessionStore): Backend delle sessioni da ripulire
+            interval (float): Secondi di attesa quando non ci sono sessioni scadute
+            batch_size (int): Numero massimo di sessioni rimosse per lotto
+        """
+        self.store = store
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._listeners = []
+
+        # Metriche
+        self.expired_total = 0
+        self.sweeps_total = 0
+        self.last_sweep_duration = 0.0
+        self.last_lag = 0.0
+        self._recent = deque()  # (istante, sessioni rimosse) nell'ultima finestra
+
+    def start(self):
+        """Avvia il thread in background (idempotente, sicuro dopo un fork)"""
+        # Percorso veloce senza lock: chiamato a ogni accesso al session store
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            # Dopo un fork il thread del processo padre non esiste nel figlio
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='session-sweeper', daemon=True
+            )
+            self._thread.start()
+
+    def add_listener(self, callback):
+        """
+        Registra una funzione chiamata con la lista degli ID delle sessioni rimosse
+        Usata per togliere le sessioni scadute dalle strutture derivate (es. classifica)
+        """
+        self._listeners.append(callback)
+
+    def stop(self):
+        """Ferma il thread in background"""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                removed = self.sweep_once()
+            except Exception as e:
+                logger.error(f"Error sweeping expired sessions: {e}")
+                removed = 0
+            # Se il lotto era pieno ci sono altre sessioni scadute: continua subito
+            if removed < self.batch_size:
+                self._stop.wait(self.interval)
+
+    def sweep_once(self):
+        """
+        Rimuove un lotto di sessioni scadute
+
+        Returns:
+            int: Numero di sessioni rimosse
+        """
+        started = time.perf_counter()
+        now = self.store.clock()
+        expired = self.store.expire_due(now=now, limit=self.batch_size)
+        self._record(expired, now, time.perf_counter() - started)
+        self._notify(expired)
+        return len(expired)
+
+    def expire_inactive(self, max_age_seconds):
+        """
+        Rimuove subito tutte le sessioni inattive da più di max_age_seconds
+
+        Returns:
+            int: Numero di sessioni rimosse
+        """
+        started = time.perf_counter()
+        expired = self.store.expire_inactive(max_age_seconds)
+        self._record(expired, None, time.perf_counter() - started)
+        self._notify(expired)
+        return len(expired)
+
+    def _notify(self, expired):
+        """Avvisa i listener delle sessioni rimosse"""
+        if not expired:
+            return
+        session_ids = [session_id for session_id, _ in expired]
+        for callback in self._listeners:
+            try:
+                callback(session_ids)
+            except Exception as e:
+                logger.error(f"Error in session expiry listener: {e}")
+
+    def _record(self, expired, now, duration):
+        """Aggiorna le metriche dopo un lotto"""
+        with self._lock:
+            self.sweeps_total += 1
+            self.expired_total += len(expired)
+            self.last_sweep_duration = duration
+            if expired and now is not None:
+                # Ritardo della sessione rimossa con la scadenza più vecchia
+                self.last_lag = max(0.0, now - min(deadline for _, deadline in expired))
+            if expired:
+                self._recent.append((time.monotonic(), len(expired)))
+
+    def metrics(self):
+        """
+        Restituisce le metriche del sweeper
+
+        Returns:
+            dict: Contatori, velocità di rimozione (sessioni/s) e ritardi (s)
+        """
+        with self._lock:
+            cutoff = time.monotonic() - RATE_WINDOW_SECONDS
+            while self._recent and self._recent[0][0] < cutoff:
+                self._recent.popleft()
+            recent_expired = sum(count for _, count in self._recent)
+            metrics = {
+                'expired_total': self.expired_total,
+                'sweeps_total': self.sweeps_total,
+                'sweep_rate_per_second': round(recent_expired / RATE_WINDOW_SECONDS, 3),
+                'last_sweep_duration_ms': round(self.last_sweep_duration * 1000, 3),
+                'last_sweep_lag_seconds': round(self.last_lag, 3),
+                'running': self._thread is not None and self._thread.is_alive()
+            }
+
+        # Ritardo attuale: da quanto è scaduta la sessione più vecchia ancora presente
+        oldest = self.store.oldest_deadline()
+        backlog = self.store.clock() - oldest if oldest is not None else 0.0
+        metrics['backlog_lag_seconds'] = round(max(0.0, backlog), 3)
+        return metrics
+
+def create_session_sweeper(store):
+    """
+    Crea il sweeper con i parametri delle variabili d'ambiente
+
+    Args:
+        store (SessionStore): Backend delle sessioni
+
+    Returns:
+        SessionSweeper: Sweeper configurato (non ancora avviato)
+    """
+    return SessionSweeper(
+        store,
+        interval=float(os.getenv('SESSION_SWEEP_INTERVAL', 1.0)),
+        batch_size=int(os.getenv('SESSION_SWEEP_BATCH', 1000))
+    )
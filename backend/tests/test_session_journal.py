@@ -0,0 +1,119 @@
+"""
+CYBER KILL CHAIN ANALYZER - TEST DEL JOURNAL DELLE SESSIONI
+
+Ripristino dal journal e dallo snapshot, anche con un salvataggio che arriva
+mentre il writer scrive un lotto e parte una compattazione.
+
+Uso (dalla directory backend):
+    python -m unittest tests.test_session_journal
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault('ANALYTICS_SINK', 'off')
+
+from models.session_record import SessionRecord
+from services.session_journal import JournaledSessionStore, SessionJournal
+
+def make_session(score):
+    session = SessionRecord()
+    session['current_log'] = 'delivery_1'
+    session['correct_phase'] = 'delivery'
+    session['score'] = score
+    return session
+
+class BlockingSession:
+    """Sessione la cui conversione a dizionario (nel writer) attende il segnale release"""
+
+    def __init__(self, data, serializing, release):
+        self.data = data
+        self.serializing = serializing
+        self.release = release
+
+    def copy(self):
+        return self
+
+    def keys(self):
+        self.serializing.set()
+        self.release.wait(5)
+        return self.data.keys()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+class SessionJournalReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='ckc-journal-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def reopen(self):
+        """Store ripristinato da un nuovo journal sulla stessa directory"""
+        journal = SessionJournal(self.directory)
+        self.addCleanup(journal.close)
+        return JournaledSessionStore(journal)
+
+    def test_replay_saves_and_deletes(self):
+        journal = SessionJournal(self.directory)
+        store = JournaledSessionStore(journal)
+        store.save('kept', make_session(10))
+        store.save('deleted', make_session(20))
+        store.save('kept', make_session(30))
+        store.delete('deleted')
+        journal.close()
+
+        restored = self.reopen()
+        self.assertEqual(restored.get('kept')['score'], 30)
+        self.assertIsNone(restored.get('deleted'))
+
+    def test_replay_after_compaction(self):
+        journal = SessionJournal(self.directory)
+        store = JournaledSessionStore(journal)
+        store.save('before', make_session(1))
+        journal.compact()
+        store.save('after', make_session(2))
+        store.save('before', make_session(3))
+        journal.close()
+
+        restored = self.reopen()
+        self.assertEqual(restored.get('before')['score'], 3)
+        self.assertEqual(restored.get('after')['score'], 2)
+
+    def test_save_during_writer_flush_and_compaction(self):
+        # Il writer ha preso il lotto con v1 e lo sta ancora serializzando quando
+        # arriva v2 e parte una compattazione: v1 non deve finire dopo v2
+        journal = SessionJournal(self.directory, fsync_interval=3600)
+        state = {}
+        journal.replay()
+        journal.start(lambda: iter(list(state.items())))
+        self.addCleanup(journal.close)
+
+        serializing, release = threading.Event(), threading.Event()
+        state['player'] = (time.time(), {'score': 1})
+        journal.record_save('player', BlockingSession({'score': 1}, serializing, release))
+        writer = threading.Thread(target=journal.flush)
+        writer.start()
+        self.assertTrue(serializing.wait(5))
+
+        state['player'] = (time.time(), {'score': 2})
+        journal.record_save('player', make_session(2))
+        compaction = threading.Thread(target=journal.compact)
+        compaction.start()
+        compaction.join(0.2)
+        release.set()
+        writer.join()
+        compaction.join()
+        journal.close()
+
+        restored = self.reopen()
+        self.assertEqual(restored.get('player')['score'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
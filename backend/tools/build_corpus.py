@@ -0,0 +1,181 @@
+"""
+CYBER KILL CHAIN ANALYZER - COSTRUZIONE DEL CORPUS DEI LOG
+
+Importa log da file JSONL (un log per riga, stesso formato di LOGS_DATABASE)
+o da telemetria reale (syslog, Sysmon XML, Zeek TSV, vedi models/log_parsers.py)
+in un corpus SQLite da usare con LOG_CORPUS_PATH.
+
+Esempi (dalla directory backend):
+    python -m tools.build_corpus corpus.db --jsonl logs.jsonl
+    python -m tools.build_corpus corpus.db --sysmon sysmon.xml --zeek conn.log dns.log http.log --workers 8
+    python -m tools.build_corpus corpus.db --builtin
+    python -m tools.build_corpus corpus.db --synthetic 100000 --seed 1
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from models.game_data import LOGS_DATABASE, CYBER_KILL_CHAIN_PHASES, DIFFICULTY_CONFIG
+from models.corpus import SQLiteCorpus
+from models.log_synthesis import LogSynthesizer
+from models.log_parsers import FORMATS, DEFAULT_CHUNK_BYTES, parse_files
+
+logger = logging.getLogger(__name__)
+
+# Campi obbligatori di ogni log del corpus
+REQUIRED_FIELDS = ('id', 'phase', 'raw', 'source', 'severity', 'timestamp')
+
+def validate_corpus_log(log):
+    """
+    Verifica che un log abbia i campi necessari al gioco
+
+    Args:
+        log (dict): Log da importare
+
+    Returns:
+        str: Descrizione dell'errore, o None se il log è valido
+    """
+    if not isinstance(log, dict):
+        return 'not a JSON object'
+    missing = [field for field in REQUIRED_FIELDS if field not in log]
+    if missing:
+        return f"missing fields: {', '.join(missing)}"
+    if log['phase'] not in CYBER_KILL_CHAIN_PHASES:
+        return f"unknown phase: {log['phase']}"
+    return None
+
+def iter_jsonl(paths):
+    """
+    Legge i log da uno o più file JSONL, scartando (con un warning) quelli non validi
+
+    Args:
+        paths (list): Percorsi dei file
+
+    Yields:
+        dict: Log validi
+    """
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    log = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"{path}:{line_number}: invalid JSON ({e})")
+                    continue
+                error = validate_corpus_log(log)
+                if error:
+                    logger.warning(f"{path}:{line_number}: {error}")
+                    continue
+                yield log
+
+def builtin_logs():
+    """
+    Yields:
+        dict: I log statici di models/game_data.py
+    """
+    for logs in LOGS_DATABASE.values():
+        yield from logs
+
+def synthetic_logs(count, seed=0, batch_size=1000):
+    """
+    Genera log sintetici dai template di models/log_templates.py,
+    a turno su tutte le fasi (per benchmark e test di carico)
+
+    Args:
+        count (int): Numero di log da generare
+        seed (int): Seme del generatore (stesso seme, stessi log)
+        batch_size (int): Log generati per fase a ogni giro
+
+    Yields:
+        dict: Log con ID univoci (il seme di ogni log è nell'ID)
+    """
+    synthesizer = LogSynthesizer(seed=seed)
+    phases = synthesizer.phases()
+    remaining = count
+    while remaining > 0:
+        for phase in phases:
+            logs = synthesizer.generate(phase, min(batch_size, remaining))
+            remaining -= len(logs)
+            yield from logs
+            if remaining <= 0:
+                break
+
+def build_corpus(path, logs, batch_size=10000):
+    """
+    Aggiunge i log al corpus in lotti (una transazione per lotto)
+
+    Args:
+        path (str): Percorso del database del corpus
+        logs (iterable): Log da importare
+        batch_size (int): Log per transazione
+
+    Returns:
+        int: Numero di log aggiunti
+    """
+    corpus = SQLiteCorpus(path, DIFFICULTY_CONFIG)
+    added = 0
+    batch = []
+    for log in logs:
+        batch.append(log)
+        if len(batch) >= batch_size:
+            added += corpus.add_logs(batch)
+            batch = []
+    if batch:
+        added += corpus.add_logs(batch)
+    return added
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a SQLite log corpus for LOG_CORPUS_PATH')
+    parser.add_argument('output', help='corpus database path (created if missing, appended otherwise)')
+    parser.add_argument('--jsonl', nargs='+', default=[], help='JSONL files to import')
+    parser.add_argument('--builtin', action='store_true', help='include the built-in logs')
+    parser.add_argument('--synthetic', type=int, default=0, help='number of synthetic logs to generate')
+    parser.add_argument('--seed', type=int, default=0, help='seed for synthetic logs')
+    parser.add_argument('--syslog', nargs='+', default=[], help='syslog files (RFC 3164/5424) to import')
+    parser.add_argument('--sysmon', nargs='+', default=[], help='Sysmon events exported from EVTX as XML')
+    parser.add_argument('--zeek', nargs='+', default=[], help='Zeek TSV logs (conn, dns, http, files, ssl, notice)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processes parsing syslog/Sysmon/Zeek chunks')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024),
+                        help='size of the chunks parsed by each process')
+    parser.add_argument('--year', type=int, help='year of RFC 3164 syslog timestamps (default: current year)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+
+    sources = []
+    if args.builtin:
+        sources.append(builtin_logs())
+    if args.jsonl:
+        sources.append(iter_jsonl(args.jsonl))
+    if args.synthetic:
+        sources.append(synthetic_logs(args.synthetic, args.seed))
+    stats = {}
+    for record_format in FORMATS:
+        paths = getattr(args, record_format)
+        if paths:
+            sources.append(parse_files(record_format, paths, workers=max(1, args.workers),
+                                       chunk_bytes=int(args.chunk_mb * 1024 * 1024), year=args.year,
+                                       stats=stats))
+    if not sources:
+        parser.error('nothing to import: use --jsonl, --builtin, --synthetic, --syslog, --sysmon or --zeek')
+
+    started = time.perf_counter()
+    added = sum(build_corpus(args.output, source) for source in sources)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Added {added} logs to {args.output} in {elapsed:.1f}s")
+    if stats:
+        megabytes = stats['bytes'] / (1024 * 1024)
+        logger.info(f"Parsed {megabytes:.0f} MB of real logs ({megabytes / elapsed:.1f} MB/s): "
+                    f"{stats['records']} records, {stats['logs']} matched a rule")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
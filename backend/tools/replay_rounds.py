@@ -0,0 +1,244 @@
+"""
+CYBER KILL CHAIN ANALYZER - RIVALUTAZIONE OFFLINE DEI ROUND REGISTRATI
+
+Rigioca un file NDJSON di round registrati con la logica del gioco
+(validate_phase_selection, validate_mitigation_selection, calculate_points)
+e scrive i totali di ogni sessione in NDJSON. Serve a ricalcolare i voti di
+un esame dopo una modifica al gioco, per esempio all'efficacia di una
+mitigazione in models/game_data.py.
+
+Formato di ogni riga:
+    {"session_id": "...", "log_id": "...", "selected_phase": "delivery",
+     "selected_mitigation": "email_filtering", "time_remaining": 23, "difficulty": "expert"}
+difficulty è facoltativa (default --difficulty), selected_mitigation serve
+solo se la fase è corretta. I round non validi (log sconosciuto, fase o
+mitigazione inesistente) vengono contati e saltati.
+
+Memoria limitata anche con milioni di round:
+1. il file viene letto in streaming e ogni riga finisce in una di --partitions
+   partizioni temporanee, scelta dall'hash del session_id
+2. un pool di processi rigioca una partizione alla volta: i round di una
+   sessione sono tutti nella stessa partizione, nell'ordine del file, e in
+   memoria restano solo le sessioni della partizione in corso
+3. i totali di una partizione vengono scritti appena è finita (le sessioni
+   non escono quindi nell'ordine del file)
+
+Esempi (dalla directory backend):
+    python -m tools.replay_rounds rounds.ndjson --output totals.ndjson
+    python -m tools.replay_rounds rounds.ndjson --workers 8 --partitions 256 > totals.ndjson
+"""
+
+import os
+
+# Le rivalutazioni non sono azioni dei giocatori: niente eventi di analytics
+os.environ['ANALYTICS_SINK'] = 'off'
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import tempfile
+import time
+import zlib
+
+from models.corpus import get_log_corpus
+from models.session_record import SessionRecord
+from services.game_service import GameService
+from utils.helpers import validate_difficulty
+
+logger = logging.getLogger(__name__)
+
+def partition_of(session_id, partitions):
+    """Partizione di una sessione: stabile tra processi ed esecuzioni"""
+    return zlib.crc32(session_id.encode('utf-8')) % partitions
+
+def split_rounds(path, directory, partitions):
+    """
+    Distribuisce le righe del file tra le partizioni, in streaming
+
+    Args:
+        path (str): File NDJSON dei round ('-' per lo standard input)
+        directory (str): Directory delle partizioni temporanee
+        partitions (int): Numero di partizioni
+
+    Returns:
+        tuple: (percorsi delle partizioni non vuote, righe scartate)
+    """
+    paths = [os.path.join(directory, f'partition-{n:04d}.ndjson') for n in range(partitions)]
+    files = [None] * partitions
+    skipped = 0
+    source = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line_number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                session_id = json.loads(line)['session_id']
+                if not isinstance(session_id, str) or not session_id:
+                    raise ValueError('invalid session_id')
+            except (ValueError, KeyError, TypeError) as e:
+                skipped += 1
+                logger.warning(f"{path}:{line_number}: skipped ({e})")
+                continue
+            n = partition_of(session_id, partitions)
+            if files[n] is None:
+                files[n] = open(paths[n], 'w', encoding='utf-8')
+            files[n].write(line + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        for f in files:
+            if f is not None:
+                f.close()
+    return [paths[n] for n in range(partitions) if files[n] is not None], skipped
+
+def replay_round(session_id, session, record, difficulty):
+    """
+    Rigioca un round registrato sulla sessione, come /api/round
+
+    Args:
+        session_id (str): ID della sessione
+        session (SessionRecord): Stato rigiocato della sessione
+        record (dict): Round registrato
+        difficulty (str): Difficoltà se il round non la indica
+
+    Returns:
+        tuple: (punti, round corretto, fase corretta)
+
+    Raises:
+        ValueError: Se il round non è valido
+    """
+    log = get_log_corpus().get(record.get('log_id'))
+    if log is None:
+        raise ValueError(f"Unknown log: {record.get('log_id')}")
+    # Stato della sessione dopo generate_log per questo log
+    session['current_log'] = log['id']
+    session['correct_phase'] = log['phase']
+    session['correct_mitigation'] = None
+
+    phase_result = GameService.validate_phase_selection(
+        session_id, record.get('selected_phase'), session=session
+    )
+    if not phase_result['is_correct']:
+        return 0, False, False
+
+    mitigation_result = GameService.validate_mitigation_selection(
+        session_id, record.get('selected_mitigation'), record.get('time_remaining', 0),
+        record.get('difficulty', difficulty), session=session
+    )
+    return mitigation_result['points'], mitigation_result['is_correct'], True
+
+def session_totals(session_id, session, phases_correct, invalid):
+    """
+    Returns:
+        dict: Totali della sessione, con le stesse statistiche di /api/statistics
+    """
+    stats = GameService.get_session_statistics(session_id, session)
+    del stats['session_created']
+    return {
+        'session_id': session_id,
+        **stats,
+        'phases_correct': phases_correct,
+        'mastered_phases': len(session.get('mastered_phases', [])),
+        'invalid_rounds': invalid
+    }
+
+def replay_partition(path, difficulty):
+    """
+    Rigioca tutti i round di una partizione (eseguita nei processi del pool)
+
+    Returns:
+        tuple: (righe NDJSON dei totali, round rigiocati, round non validi)
+    """
+    # Gli errori dei round non validi sono già contati nei totali
+    logging.getLogger('services.game_service').setLevel(logging.CRITICAL)
+    sessions = {}   # session_id -> [SessionRecord, fasi corrette, round non validi]
+    rounds = invalid = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            session_id = record['session_id']
+            entry = sessions.get(session_id)
+            if entry is None:
+                entry = sessions[session_id] = [SessionRecord(), 0, 0]
+            try:
+                points, is_correct, phase_correct = replay_round(session_id, entry[0], record, difficulty)
+            except (ValueError, TypeError):
+                entry[2] += 1
+                invalid += 1
+                continue
+            GameService.apply_round_stats(entry[0], points, is_correct)
+            entry[1] += phase_correct
+            rounds += 1
+    os.remove(path)
+    lines = [
+        json.dumps(session_totals(session_id, *entry), separators=(',', ':'))
+        for session_id, entry in sessions.items()
+    ]
+    return lines, rounds, invalid
+
+def _replay_partition(args):
+    return replay_partition(*args)
+
+def replay(path, output, workers, partitions, difficulty, tmpdir=None):
+    """
+    Rivaluta tutti i round del file e scrive i totali per sessione
+
+    Args:
+        path (str): File NDJSON dei round ('-' per lo standard input)
+        output: File di testo su cui scrivere i totali
+        workers (int): Processi del pool
+        partitions (int): Partizioni temporanee (più partizioni, meno memoria per processo)
+        difficulty (str): Difficoltà dei round che non la indicano
+        tmpdir (str): Directory delle partizioni (default: quella di sistema)
+
+    Returns:
+        dict: Sessioni, round rigiocati, round non validi e righe scartate
+    """
+    # Corpus aperto prima del fork: i processi del pool lo condividono
+    get_log_corpus()
+    summary = {'sessions': 0, 'rounds': 0, 'invalid_rounds': 0}
+    with tempfile.TemporaryDirectory(prefix='ckc-replay-', dir=tmpdir) as directory:
+        paths, summary['skipped_lines'] = split_rounds(path, directory, partitions)
+        jobs = [(partition, difficulty) for partition in paths]
+        with multiprocessing.Pool(workers) as pool:
+            for lines, rounds, invalid in pool.imap_unordered(_replay_partition, jobs):
+                for line in lines:
+                    output.write(line + '\n')
+                summary['sessions'] += len(lines)
+                summary['rounds'] += rounds
+                summary['invalid_rounds'] += invalid
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-score recorded rounds with the current game logic')
+    parser.add_argument('input', help="NDJSON file of recorded rounds ('-' for stdin)")
+    parser.add_argument('--output', help='write per-session totals to this NDJSON file (default: stdout)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='replay processes')
+    parser.add_argument('--partitions', type=int, default=64,
+                        help='temporary partitions by session (more partitions, less memory per process)')
+    parser.add_argument('--difficulty', default='beginner', help='difficulty of rounds that do not record one')
+    parser.add_argument('--tmpdir', help='directory for the temporary partitions')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    started = time.time()
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = replay(args.input, output, max(1, args.workers), max(1, args.partitions),
+                         validate_difficulty(args.difficulty), args.tmpdir)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.time() - started
+    logger.info(
+        f"{summary['rounds']} rounds of {summary['sessions']} sessions replayed in {elapsed:.1f}s "
+        f"({summary['rounds'] / max(elapsed, 1e-9):.0f} rounds/s), "
+        f"{summary['invalid_rounds']} invalid rounds, {summary['skipped_lines']} skipped lines"
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+CYBER KILL CHAIN ANALYZER - PIPELINE DEGLI EVENTI DI ANALYTICS
+
+Le azioni degli utenti diventano eventi tipizzati inseriti in una coda
+limitata in memoria. Un thread in background li scrive a lotti sul sink
+configurato, così i thread delle richieste non pagano mai formattazione
+o I/O su disco.
+
+Configurazione (variabili d'ambiente):
+- ANALYTICS_SINK: log (default), jsonl, sqlite oppure off
+- ANALYTICS_PATH: directory dei file JSONL (uno per processo) o percorso del database SQLite
+- ANALYTICS_QUEUE_SIZE: capacità della coda (default 10000)
+- ANALYTICS_POLICY: drop_newest (default), drop_oldest oppure block
+- ANALYTICS_BATCH_SIZE: eventi massimi per scrittura (default 500)
+- ANALYTICS_FLUSH_INTERVAL: secondi massimi prima di scrivere un lotto parziale
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Evento di analytics: timestamp epoch, sessione, tipo di azione, dettagli
+AnalyticsEvent = namedtuple('AnalyticsEvent', ['ts', 'session_id', 'action', 'details'])
+
+# Politiche applicate quando la coda è piena
+POLICY_DROP_NEWEST = 'drop_newest'   # Scarta l'evento appena arrivato
+POLICY_DROP_OLDEST = 'drop_oldest'   # Scarta l'evento più vecchio in coda
+POLICY_BLOCK = 'block'               # Attende spazio per al massimo block_timeout
+VALID_POLICIES = (POLICY_DROP_NEWEST, POLICY_DROP_OLDEST, POLICY_BLOCK)
+
+def event_to_dict(event):
+    """
+    Converte un evento nel formato registrato dai sink
+
+    Args:
+        event (AnalyticsEvent): Evento da convertire
+
+    Returns:
+        dict: Evento con timestamp ISO
+    """
+    entry = {
+        'timestamp': datetime.fromtimestamp(event.ts).isoformat(),
+        'session_id': event.session_id,
+        'action': event.action
+    }
+    if event.details:
+        entry['details'] = event.details
+    return entry
+
+# ============================================================================
+# SINK (DESTINAZIONI DEGLI EVENTI)
+# ============================================================================
+
+class LogSink:
+    """Scrive gli eventi nel sistema di logging, come faceva log_user_action"""
+
+    def write(self, events):
+        for event in events:
+            logger.info(f"User action: {event_to_dict(event)}")
+
+    def close(self):
+        pass
+
+class JSONLSink:
+    """
+    Scrive gli eventi in file JSONL con rotazione per dimensione
+    Ogni processo (worker di gunicorn) scrive e ruota il proprio file, aperto
+    alla prima scrittura dopo il fork: i worker non si contendono la rotazione
+    analytics.<pid>.jsonl -> analytics.<pid>.jsonl.1 -> ... -> analytics.<pid>.jsonl.<backup_count>
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, backup_count=10):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._pid = None
+
+    def _open(self):
+        # Il file ereditato dal processo padre non va chiuso né usato: è suo
+        self._pid = os.getpid()
+        self.path = os.path.join(self.directory, f'analytics.{self._pid}.jsonl')
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, events):
+        lines = ''.join(
+            json.dumps(event_to_dict(event), ensure_ascii=False) + '\n' for event in events
+        )
+        if self._pid != os.getpid():
+            self._open()
+        self._file.write(lines)
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+
+class SQLiteSink:
+    """Scrive gli eventi in una tabella SQLite, un INSERT multiplo per lotto"""
+
+    def __init__(self, path):
+        # La connessione è usata solo dal thread di scrittura
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS analytics_events ('
+            ' ts REAL NOT NULL,'
+            ' session_id TEXT,'
+            ' action TEXT NOT NULL,'
+            ' details TEXT'
+            ')'
+        )
+
+    def write(self, events):
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO analytics_events (ts, session_id, action, details) VALUES (?, ?, ?, ?)',
+                [
+                    (e.ts, e.session_id, e.action, json.dumps(e.details) if e.details else None)
+                    for e in events
+                ]
+            )
+
+    def close(self):
+        self._conn.close()
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class EventPipeline:
+    """
+    Coda limitata di eventi svuotata a lotti da un thread in background
+    """
+
+    def __init__(self, sink, queue_size=10000, policy=POLICY_DROP_NEWEST,
+                 batch_size=500, flush_interval=1.0, block_timeout=0.05):
+        """
+        Args:
+            sink: Destinazione con metodi write(events) e close(); None = disabilitato
+            queue_size (int): Capacità massima della coda
+            policy (str): Politica quando la coda è piena (vedi VALID_POLICIES)
+            batch_size (int): Numero massimo di eventi per scrittura
+            flush_interval (float): Attesa massima prima di scrivere un lotto parziale
+            block_timeout (float): Attesa massima di emit() con la politica block
+        """
+        self.sink = sink
+        self.policy = policy if policy in VALID_POLICIES else POLICY_DROP_NEWEST
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # flush() e thread non scrivono insieme
+        self._counter_lock = threading.Lock()  # += non è atomico tra i thread delle richieste
+        self._thread = None
+        self._pid = None
+
+        # Contatori: emitted e dropped sotto _counter_lock, gli altri sotto _write_lock
+        self.emitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def start(self):
+        """Avvia il thread di scrittura (idempotente, sicuro dopo un fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='analytics-writer', daemon=True
+            )
+            self._thread.start()
+
+    def emit(self, session_id, action, details=None):
+        """
+        Accoda un evento senza formattarlo né scriverlo
+
+        Args:
+            session_id (str): ID della sessione
+            action (str): Tipo di azione
+            details (dict): Dettagli dell'azione (opzionale)
+
+        Returns:
+            bool: True se l'evento è stato accodato
+        """
+        if self.sink is None:
+            return False
+        self.start()
+        with self._counter_lock:
+            self.emitted += 1
+        event = AnalyticsEvent(time.time(), session_id, action, details)
+
+        try:
+            if self.policy == POLICY_BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == POLICY_DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self._queue.put_nowait(event)
+                with self._counter_lock:
+                    self.dropped += 1
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+
+        with self._counter_lock:
+            self.dropped += 1
+        return False
+
+    def _run(self):
+        while True:
+            # Attende il primo evento, poi prende quelli già in coda fino a batch_size
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._write_lock:
+            try:
+                self.sink.write(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Error writing {len(batch)} analytics events: {e}")
+
+    def flush(self):
+        """Scrive subito gli eventi in coda nel thread chiamante (es. allo spegnimento)"""
+        if self.sink is None:
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Profondità della coda e contatori degli eventi
+        """
+        return {
+            'sink': type(self.sink).__name__ if self.sink else 'off',
+            'policy': self.policy,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'emitted': self.emitted,
+            'dropped': self.dropped,
+            'written': self.written,
+            'batches': self.batches,
+            'write_errors': self.write_errors
+        }
+
+# ============================================================================
+# PIPELINE GLOBALE
+# ============================================================================
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def create_event_pipeline():
+    """
+    Crea la pipeline con il sink indicato dalle variabili d'ambiente
+
+    Returns:
+        EventPipeline: Pipeline configurata
+    """
+    sink_name = os.getenv('ANALYTICS_SINK', 'log').lower()
+    path = os.getenv('ANALYTICS_PATH')
+
+    if sink_name == 'off':
+        sink = None
+    elif sink_name == 'jsonl':
+        sink = JSONLSink(path or 'analytics')
+    elif sink_name == 'sqlite':
+        sink = SQLiteSink(path or 'analytics.db')
+    else:
+        if sink_name != 'log':
+            logger.warning(f"Unknown ANALYTICS_SINK '{sink_name}', falling back to log")
+        sink = LogSink()
+
+    return EventPipeline(
+        sink,
+        queue_size=int(os.getenv('ANALYTICS_QUEUE_SIZE', 10000)),
+        policy=os.getenv('ANALYTICS_POLICY', POLICY_DROP_NEWEST).lower(),
+        batch_size=int(os.getenv('ANALYTICS_BATCH_SIZE', 500)),
+        flush_interval=float(os.getenv('ANALYTICS_FLUSH_INTERVAL', 1.0))
+    )
+
+def get_event_pipeline():
+    """
+    Restituisce la pipeline globale, creandola al primo evento
+
+    Returns:
+        EventPipeline: Pipeline degli eventi di analytics
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = create_event_pipeline()
+                # Gli eventi ancora in coda vengono scritti all'uscita del processo
+                atexit.register(_pipeline.flush)
+    return _pipeline
@@ -0,0 +1,266 @@
+"""
+CYBER KILL CHAIN ANALYZER - COMPRESSIONE DELLE RISPOSTE
+
+Compressione gzip/brotli negoziata con Accept-Encoding, sopra una soglia
+minima di dimensione. Su reti congestionate (Wi-Fi scolastico) i byte
+trasmessi pesano sulla latenza più del tempo di CPU speso a comprimere.
+
+Tre livelli, dal più economico:
+- Risposte interamente statiche (catalogo delle fasi, classifica in cache):
+  le varianti gzip e brotli vengono calcolate una volta per versione dei dati
+  (vedi utils/response_cache.py) e servite così come sono
+- Frammenti statici dentro risposte dinamiche (vista client dei log, elenchi
+  di mitigazioni per fase): PrecompressedPayload conserva il frammento già
+  compresso come segmento deflate, che viene inserito nello stream gzip
+  della risposta senza ricomprimerlo (vedi gzip_parts)
+- Tutte le altre risposte JSON: compresse al volo dall'hook after_request
+
+Il brotli è opzionale: senza il modulo brotli si negozia solo gzip.
+
+Configurazione:
+- COMPRESSION_MIN_BYTES: Risposte più piccole vengono inviate in chiaro (default 512)
+- COMPRESSION_GZIP_LEVEL: Livello gzip delle parti dinamiche (default 6)
+- COMPRESSION_BROTLI_QUALITY: Qualità brotli delle parti dinamiche (default 5)
+"""
+
+import os
+import struct
+import zlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Dipendenza opzionale: senza brotli si usa solo gzip
+    brotli = None
+
+MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '512'))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Dati che non cambiano: compressi una volta sola, al massimo livello utile
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_MIMETYPES = frozenset({'application/json', 'text/plain', 'text/html'})
+
+# Header gzip senza nome file né data (RFC 1952), sistema operativo sconosciuto
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+# Blocco deflate finale vuoto (Huffman fisso): chiude uno stream terminato con Z_SYNC_FLUSH
+_FINAL_BLOCK = b'\x03\x00'
+_GZIP_TRAILER = struct.Struct('<II')
+
+def available_encodings():
+    """
+    Returns:
+        tuple: Codifiche supportate, in ordine di preferenza del server
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def _compressor(level):
+    """Compressore deflate grezzo, senza header: l'header gzip si aggiunge a parte"""
+    return zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+def _deflate(data, level):
+    """Stream deflate grezzo, allineato al byte e non terminato"""
+    compressor = _compressor(level)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+def _gzip_wrap(deflate, crc, size):
+    return _GZIP_HEADER + deflate + _GZIP_TRAILER.pack(crc, size & 0xFFFFFFFF)
+
+def gzip_compress(data, level=GZIP_LEVEL):
+    """
+    Args:
+        data (bytes): Dati da comprimere
+        level (int): Livello di compressione
+
+    Returns:
+        bytes: Dati in formato gzip
+    """
+    return _gzip_wrap(_deflate(data, level) + _FINAL_BLOCK, zlib.crc32(data), len(data))
+
+def brotli_compress(data, quality=BROTLI_QUALITY):
+    """
+    Returns:
+        bytes: Dati in formato brotli (richiede il modulo brotli)
+    """
+    return brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality)
+
+def compress(data, encoding, static=False):
+    """
+    Comprime i dati con la codifica indicata
+
+    Args:
+        data (bytes): Dati da comprimere
+        encoding (str): 'gzip' o 'br'
+        static (bool): Dati che non cambiano, compressi al livello massimo
+
+    Returns:
+        bytes: Dati compressi
+    """
+    if encoding == 'br':
+        return brotli_compress(data, STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip_compress(data, STATIC_GZIP_LEVEL if static else GZIP_LEVEL)
+
+class PrecompressedPayload:
+    """
+    Frammento JSON che non cambia mai, conservato anche già compresso
+    Il segmento deflate è allineato al byte e non chiude lo stream: può essere
+    inserito in mezzo allo stream gzip di una risposta più grande
+    """
+
+    __slots__ = ('body', 'deflate', 'crc')
+
+    def __init__(self, body):
+        """
+        Args:
+            body (bytes): Frammento JSON codificato
+        """
+        self.body = body
+        self.deflate = _deflate(body, STATIC_GZIP_LEVEL)
+        self.crc = zlib.crc32(body)
+
+    def __len__(self):
+        return len(self.body)
+
+    def gzip(self):
+        """
+        Returns:
+            bytes: Il frammento da solo in formato gzip, senza ricomprimerlo
+        """
+        return _gzip_wrap(self.deflate + _FINAL_BLOCK, self.crc, len(self.body))
+
+def join_parts(parts):
+    """
+    Args:
+        parts (list): Parti della risposta (bytes o PrecompressedPayload)
+
+    Returns:
+        bytes: Corpo della risposta non compresso
+    """
+    return b''.join(part.body if isinstance(part, PrecompressedPayload) else part for part in parts)
+
+def gzip_parts(parts, level=GZIP_LEVEL):
+    """
+    Comprime in gzip una risposta composta da parti dinamiche e frammenti
+    precompressi: solo le parti dinamiche passano dal compressore
+
+    Prima di ogni frammento il compressore viene svuotato con Z_FULL_FLUSH,
+    che allinea lo stream al byte e azzera la finestra: il testo successivo
+    non fa riferimento a dati che il compressore non ha visto. Il CRC del
+    trailer è calcolato su tutto il corpo.
+
+    Args:
+        parts (list): Parti della risposta (bytes o PrecompressedPayload)
+        level (int): Livello di compressione delle parti dinamiche
+
+    Returns:
+        bytes: Corpo della risposta in formato gzip
+    """
+    compressor = _compressor(level)
+    chunks = [_GZIP_HEADER]
+    crc = 0
+    size = 0
+    for part in parts:
+        if isinstance(part, PrecompressedPayload):
+            chunks.append(compressor.flush(zlib.Z_FULL_FLUSH))
+            chunks.append(part.deflate)
+            data = part.body
+        else:
+            chunks.append(compressor.compress(part))
+            data = part
+        crc = zlib.crc32(data, crc)
+        size += len(data)
+    chunks.append(compressor.flush(zlib.Z_FINISH))
+    chunks.append(_GZIP_TRAILER.pack(crc, size & 0xFFFFFFFF))
+    return b''.join(chunks)
+
+# ============================================================================
+# NEGOZIAZIONE
+# ============================================================================
+
+def negotiate(size, preferred=None):
+    """
+    Sceglie la codifica della risposta in base ad Accept-Encoding
+
+    Args:
+        size (int): Dimensione del corpo non compresso
+        preferred (tuple): Codifiche in ordine di preferenza del server
+            (a parità di qualità indicata dal client vince la prima)
+
+    Returns:
+        str: 'br', 'gzip' o None (risposta in chiaro)
+    """
+    if size < MIN_BYTES:
+        return None
+    encodings = [encoding for encoding in preferred or available_encodings()
+                 if encoding != 'br' or brotli is not None]
+    return request.accept_encodings.best_match(encodings)
+
+def _mark_encoded(response, encoding):
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+def make_parts_response(parts, status=200):
+    """
+    Crea la risposta JSON per un corpo composto da parti
+
+    Con gzip i frammenti precompressi non vengono ricompressi; con brotli,
+    che non permette di concatenare stream, si comprime l'intero corpo.
+    A parità di preferenza del client si sceglie quindi gzip.
+
+    Args:
+        parts (list): Parti della risposta (bytes o PrecompressedPayload)
+        status (int): Codice di stato HTTP
+
+    Returns:
+        Response: Risposta compressa o in chiaro
+    """
+    size = sum(len(part) for part in parts)
+    encoding = negotiate(size, preferred=('gzip', 'br'))
+    if encoding == 'gzip':
+        body = gzip_parts(parts)
+    elif encoding == 'br':
+        body = brotli_compress(join_parts(parts))
+    else:
+        body = join_parts(parts)
+
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        _mark_encoded(response, encoding)
+    return response
+
+def compress_response(response):
+    """
+    Hook after_request: comprime le risposte non ancora compresse
+    (errori, endpoint dinamici) se il client lo accetta e il corpo supera la soglia
+
+    Args:
+        response (Response): Risposta generata dalla view
+
+    Returns:
+        Response: La stessa risposta, eventualmente compressa
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if request.method == 'HEAD' or response.status_code in (204, 304):
+        return response
+
+    data = response.get_data()
+    encoding = negotiate(len(data))
+    if encoding is None:
+        return response
+
+    compressed = compress(data, encoding)
+    # Dati già compressi o poco ridondanti: meglio inviarli in chiaro
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    _mark_encoded(response, encoding)
+    return response
@@ -3,12 +3,20 @@ CYBER KILL CHAIN ANALYZER - HELPER UTILITIES
 Funzioni di supporto per validazione, calcoli e utilità varie
 """
 
+import json
 import logging
+import re
 from datetime import datetime
 
+from utils.analytics import get_event_pipeline
+from utils.compression import join_parts
+
 # Configurazione del logging per questo modulo
 logger = logging.getLogger(__name__)
 
+# Formato degli ID delle classi (scelti dall'insegnante, es. "3B-2025")
+COHORT_ID_PATTERN = r'^[a-zA-Z0-9_-]{1,32}$'
+
 # ============================================================================
 # FUNZIONI DI VALIDAZIONE INPUT
 # ============================================================================
@@ -65,6 +73,18 @@ def validate_phase(phase):
     ]
     return phase in valid_phases
 
+def validate_cohort_id(cohort_id):
+    """
+    Verifica il formato dell'ID di una classe
+    
+    Args:
+        cohort_id (str): ID della classe da validare
+        
+    Returns:
+        bool: True se l'ID è valido, False altrimenti
+    """
+    return isinstance(cohort_id, str) and re.match(COHORT_ID_PATTERN, cohort_id) is not None
+
 def validate_stats(stats):
     """
     Pulisce e valida le statistiche del giocatore, fornendo valori di default sicuri
@@ -252,29 +272,58 @@ def format_api_response(success=True, data=None, error=None):
         
     return response
 
+def encode_api_parts(data=None, raw_fields=None):
+    """
+    Codifica una risposta API di successo in JSON, inserendo frammenti già codificati
+    Evita di ricodificare (e ricomprimere) a ogni richiesta dati che non cambiano mai
+    
+    Args:
+        data (dict): Dati da includere nella risposta
+        raw_fields (dict): Campi il cui valore è già JSON codificato
+            (bytes o PrecompressedPayload)
+        
+    Returns:
+        list: Parti del corpo JSON in UTF-8, da concatenare nell'ordine
+    """
+    raw_fields = raw_fields or {}
+    data = {k: v for k, v in (data or {}).items() if k not in raw_fields}
+    
+    body = json.dumps(
+        format_api_response(True, data), ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    
+    # La risposta contiene sempre success e timestamp: si aggiungono i campi
+    # già codificati prima della parentesi graffa di chiusura
+    parts = [body[:-1]]
+    for key, value in raw_fields.items():
+        parts.append(b',' + json.dumps(key).encode('utf-8') + b':')
+        parts.append(value)
+    parts.append(b'}')
+    return parts
+
+def encode_api_response(data=None, raw_fields=None):
+    """
+    Come encode_api_parts, con le parti già concatenate
+    
+    Returns:
+        bytes: Corpo della risposta JSON in UTF-8
+    """
+    return join_parts(encode_api_parts(data, raw_fields))
+
 def log_user_action(session_id, action, details=None):
     """
     Registra un'azione dell'utente per debugging e analytics
     Utile per capire come i giocatori interagiscono con il gioco
     
+    L'evento viene solo accodato: formattazione e scrittura avvengono
+    in background nella pipeline di utils/analytics.py
+    
     Args:
         session_id (str): ID della sessione che ha eseguito l'azione
         action (str): Tipo di azione eseguita
         details (dict): Dettagli aggiuntivi sull'azione (opzionale)
     """
-    # Crea la struttura del log
-    log_entry = {
-        'timestamp': get_current_timestamp(),
-        'session_id': session_id,
-        'action': action
-    }
-    
-    # Aggiungi dettagli se forniti
-    if details:
-        log_entry['details'] = details
-        
-    # Registra nel sistema di logging
-    logger.info(f"User action: {log_entry}")
+    get_event_pipeline().emit(session_id, action, details)
 
 def get_effectiveness_score(effectiveness):
     """
@@ -0,0 +1,185 @@
+"""
+Metriche delle richieste HTTP in formato Prometheus
+Per ogni route registra numero di richieste, codici di stato e un istogramma
+della latenza a bucket fissi; i gauge (sessioni, memoria, ...) vengono letti
+solo quando le metriche sono richieste
+
+Le metriche sono per processo: con più worker ognuno espone le proprie
+"""
+import bisect
+import os
+import threading
+import time
+
+from flask import g, request
+
+# Limiti superiori dei bucket di latenza (secondi), come i default Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Route usata per le richieste che non corrispondono a nessun endpoint
+UNMATCHED_ROUTE = 'unmatched'
+
+class RouteStats:
+    """Contatori e istogramma di una coppia (route, metodo)"""
+
+    __slots__ = ('buckets', 'total', 'sum', 'statuses')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)  # Ultimo bucket: +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.statuses = {}
+
+def _escape(value):
+    """Escape dei valori delle label nel formato testuale Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(int(value))
+
+class MetricsRegistry:
+    """
+    Registro delle metriche del processo
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, prefix='ckc'):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._routes = {}
+        self._gauges = []
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, seconds):
+        """
+        Registra una richiesta completata
+
+        Args:
+            route (str): Regola della route (es. /api/get-log), non il path effettivo
+            method (str): Metodo HTTP
+            status (int): Codice di stato della risposta
+            seconds (float): Durata della richiesta
+        """
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (route, method)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats(len(self.buckets))
+            stats.buckets[index] += 1
+            stats.total += 1
+            stats.sum += seconds
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def gauge(self, name, help_text, func, metric_type='gauge'):
+        """
+        Registra un valore letto al momento dell'esposizione
+
+        Args:
+            name (str): Nome della metrica (senza prefisso)
+            help_text (str): Descrizione
+            func (callable): Restituisce un numero, oppure una lista di (labels, valore)
+            metric_type (str): gauge oppure counter
+        """
+        self._gauges.append((name, help_text, func, metric_type))
+
+    def uptime(self):
+        """
+        Returns:
+            float: Secondi trascorsi dalla creazione del registro (avvio del processo)
+        """
+        return time.time() - self.started_at
+
+    def render(self):
+        """
+        Esporta tutte le metriche nel formato testuale Prometheus (0.0.4)
+
+        Returns:
+            str: Corpo della risposta
+        """
+        with self._lock:
+            routes = [
+                (route, method, list(stats.buckets), stats.total, stats.sum, dict(stats.statuses))
+                for (route, method), stats in sorted(self._routes.items())
+            ]
+
+        name = f'{self.prefix}_http_requests_total'
+        lines = [f'# HELP {name} HTTP requests by route, method and status code',
+                 f'# TYPE {name} counter']
+        for route, method, _, _, _, statuses in routes:
+            for status, count in sorted(statuses.items()):
+                labels = _labels({'route': route, 'method': method, 'status': status})
+                lines.append(f'{name}{labels} {count}')
+
+        name = f'{self.prefix}_http_request_duration_seconds'
+        lines += [f'# HELP {name} HTTP request latency by route and method',
+                  f'# TYPE {name} histogram']
+        for route, method, buckets, total, seconds, _ in routes:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += count
+                labels = _labels({'route': route, 'method': method, 'le': _format_value(float(bound))})
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = _labels({'route': route, 'method': method})
+            lines.append(f'{name}_sum{labels} {_format_value(float(seconds))}')
+            lines.append(f'{name}_count{labels} {total}')
+
+        for gauge_name, help_text, func, metric_type in self._gauges:
+            name = gauge_name if gauge_name.startswith('process_') else f'{self.prefix}_{gauge_name}'
+            try:
+                value = func()
+            except Exception:
+                # Un gauge non disponibile non deve impedire l'esposizione delle altre metriche
+                continue
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+            samples = value if isinstance(value, list) else [({}, value)]
+            for labels, sample in samples:
+                lines.append(f'{name}{_labels(labels)} {_format_value(sample)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        """
+        Registra gli hook di misura sull'app Flask
+        Va chiamato prima di creare il rate limiter, così anche le richieste
+        rifiutate con 429 vengono misurate dall'inizio
+        """
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                rule = request.url_rule
+                self.observe(
+                    rule.rule if rule is not None else UNMATCHED_ROUTE,
+                    request.method,
+                    response.status_code,
+                    time.perf_counter() - started
+                )
+            return response
+
+def resident_memory_bytes():
+    """
+    Returns:
+        int: Memoria residente del processo in byte
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Fuori da Linux: picco di memoria (KB su Linux, byte su macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
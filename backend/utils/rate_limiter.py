@@ -1,54 +1,317 @@
 """
 Rate Limiting Configuration
+
+Tre livelli, dal più economico al più preciso:
+1. Token bucket locale per IP (in processo, senza I/O): respinge subito i flood evidenti.
+   È solo una soglia anti-flood: una classe intera dietro lo stesso NAT condivide l'IP
+   (30 studenti fanno circa 15 richieste/s), i limiti per utente restano a Flask-Limiter
+2. Flask-Limiter con strategia sliding-window-counter (niente burst a cavallo delle finestre)
+3. Storage dei contatori: Redis se configurato, altrimenti memoria con tabella LRU limitata
+
+Il limiter è creato all'import (i decorator delle route lo usano) ma configurato
+da create_limiter() per ogni app: nessuna connessione a Redis viene aperta
+all'avvio, ogni worker apre la propria alla prima richiesta (anche dopo un fork).
+Se Redis non risponde, Flask-Limiter usa temporaneamente uno storage in memoria:
+la stessa tabella LRU limitata usata senza Redis.
+
+Configurazione (variabili d'ambiente):
+- REDIS_URL: storage condiviso dei contatori (se assente: memoria del processo)
+- RATELIMIT_REDIS_TIMEOUT: timeout in secondi di connessione e comandi Redis (default 0.5)
+- RATELIMIT_STRATEGY: strategia di Flask-Limiter (default sliding-window-counter)
+- RATELIMIT_LOCAL_RATE: richieste al secondo per IP del token bucket locale (default 200, 0 = disattivato)
+- RATELIMIT_LOCAL_BURST: capacità del token bucket locale (default 400)
+- RATELIMIT_MEMORY_MAX_KEYS: chiavi massime dello storage in memoria, anche di ripiego (default 100000)
 """
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-import redis
+from collections import OrderedDict
+from math import floor
+import threading
+import time
 import os
 import logging
 
+from flask import g, request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from limits.strategies import STRATEGIES
+from werkzeug.exceptions import TooManyRequests
+
 logger = logging.getLogger(__name__)
 
+# Attributi privati di Flask-Limiter (3.5) usati per il ripiego limitato in memoria
+_FALLBACK_ATTRIBUTES = ('_fallback_storage', '_fallback_limiter', '_strategy', '_storage_dead')
+
+# ============================================================================
+# STORAGE IN MEMORIA CON TABELLA LIMITATA (LRU)
+# ============================================================================
+
+class BoundedMemoryStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Storage dei contatori in memoria con un numero massimo di chiavi
+
+    A differenza di memory:// non avvia thread di pulizia: le chiavi scadute
+    vengono rimosse quando vengono lette o quando raggiungono la testa della
+    coda LRU; oltre max_keys viene eliminata la chiave usata meno di recente
+    (il suo contatore riparte da zero)
+    """
+
+    STORAGE_SCHEME = ['lru-memory']
+
+    def __init__(self, uri=None, wrap_exceptions=False, max_keys=100000, **options):
+        """
+        Args:
+            uri (str): URI dello storage (lru-memory://)
+            max_keys (int): Numero massimo di chiavi mantenute
+        """
+        self.max_keys = int(max_keys)
+        self.evictions = 0
+        self._entries = OrderedDict()  # chiave -> [contatore, scadenza]
+        self._lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _current(self, key, now):
+        """Voce non scaduta della chiave (da chiamare con il lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _incr(self, key, expiry, amount, now):
+        """Incremento senza lock, con evizione LRU (da chiamare con il lock)"""
+        entry = self._current(key, now)
+        if entry is None:
+            entry = self._entries[key] = [0, now + expiry]
+            self._evict(now)
+        entry[0] += amount
+        return entry[0]
+
+    def _evict(self, now):
+        entries = self._entries
+        # Pulizia a costo costante: le chiavi meno usate di recente sono spesso già scadute
+        for _ in range(2):
+            oldest = next(iter(entries))
+            if entries[oldest][1] > now:
+                break
+            del entries[oldest]
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def incr(self, key, expiry, amount=1):
+        with self._lock:
+            return self._incr(key, expiry, amount, time.time())
+
+    def decr(self, key, amount=1):
+        with self._lock:
+            entry = self._current(key, time.time())
+            if entry is None:
+                return 0
+            entry[0] = max(entry[0] - amount, 0)
+            return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._current(key, time.time())
+            return entry[0] if entry else 0
+
+    def get_expiry(self, key):
+        with self._lock:
+            now = time.time()
+            entry = self._current(key, now)
+            return entry[1] if entry else now
+
+    def clear(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def check(self):
+        return True
+
+    def reset(self):
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def _sliding_window(self, key, expiry, now):
+        """Contatori e TTL della finestra precedente e corrente (da chiamare con il lock)"""
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous = self._current(previous_key, now)
+        current = self._current(current_key, now)
+        previous_count = previous[0] if previous else 0
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, previous_count, previous_ttl, current[0] if current else 0, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        with self._lock:
+            now = time.time()
+            current_key, previous_count, previous_ttl, current_count, _ = \
+                self._sliding_window(key, expiry, now)
+            # Sotto lock lettura e incremento sono atomici: nessuna correzione a posteriori
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            self._incr(current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        with self._lock:
+            _, previous_count, previous_ttl, current_count, current_ttl = \
+                self._sliding_window(key, expiry, time.time())
+            return previous_count, previous_ttl, current_count, current_ttl
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self._lock:
+            self._entries.pop(previous_key, None)
+            self._entries.pop(current_key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+# ============================================================================
+# TOKEN BUCKET LOCALE (PRE-CONTROLLO PER IP)
+# ============================================================================
+
+class LocalTokenBucket:
+    """
+    Token bucket per chiave mantenuto nel processo, con tabella LRU limitata
+    Costa un accesso a dizionario: nessuna chiamata allo storage condiviso
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        """
+        Args:
+            rate (float): Token aggiunti al secondo
+            burst (int): Capacità massima del bucket
+            max_keys (int): Numero massimo di chiavi mantenute
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = OrderedDict()  # chiave -> [token, ultimo aggiornamento]
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """
+        Consuma un token per la chiave
+
+        Returns:
+            bool: False se il bucket è vuoto (richiesta da respingere)
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                self.rejected += 1
+                return False
+            bucket[0] -= 1
+            return True
+
+# ============================================================================
+# CREAZIONE DEL LIMITER
+# ============================================================================
+
+# Istanza condivisa: i decorator delle route del blueprint la usano già all'import
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["1000 per hour", "100 per minute"],
+    headers_enabled=True  # Mostra limiti negli headers
+)
+
 def create_limiter(app):
     """
-    Crea e configura il rate limiter
+    Configura il rate limiter per l'app
+    Non apre connessioni: lo storage Redis si connette alla prima richiesta
     """
-    try:
-        # Prova a connettersi a Redis (produzione)
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-        redis_client = redis.from_url(redis_url)
-        redis_client.ping()  # Test connessione
-        
+    redis_url = os.getenv('REDIS_URL')
+    max_keys = int(os.getenv('RATELIMIT_MEMORY_MAX_KEYS', 100000))
+    if redis_url:
+        # Produzione: contatori condivisi, con ripiego in memoria se Redis non risponde
         storage_uri = redis_url
+        timeout = float(os.getenv('RATELIMIT_REDIS_TIMEOUT', 0.5))
+        storage_options = {'socket_connect_timeout': timeout, 'socket_timeout': timeout}
+        app.config['RATELIMIT_IN_MEMORY_FALLBACK_ENABLED'] = True
         logger.info("Rate limiter using Redis storage")
-        
-    except (redis.ConnectionError, redis.TimeoutError):
-        # Fallback a memoria (sviluppo)
-        storage_uri = "memory://"
+    else:
+        # Sviluppo: memoria limitata del processo
+        storage_uri = "lru-memory://"
+        storage_options = {'max_keys': max_keys}
         logger.warning("Rate limiter using memory storage (development only)")
-    # Except generale per altri errori Redis
-    except Exception as e:
-        logger.error(f"Redis error: {e}, falling back to memory")
-        storage_uri = "memory://"
-    
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        storage_uri=storage_uri,
-        default_limits=["1000 per hour", "100 per minute"],
-        headers_enabled=True,  # Mostra limiti negli headers
-        strategy="fixed-window"
-    )
-    
+
+    # Backend configurato, letto anche dalle metriche
+    app.config['RATELIMIT_STORAGE_URI'] = storage_uri
+    app.config['RATELIMIT_STORAGE_OPTIONS'] = storage_options
+    app.config['RATELIMIT_STRATEGY'] = os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')
+
+    # Pre-controllo locale: registrato prima di Flask-Limiter, quindi eseguito prima
+    # Soglia per IP ben sopra il traffico di una classe dietro un NAT
+    local_rate = float(os.getenv('RATELIMIT_LOCAL_RATE', 200))
+    if local_rate > 0:
+        local_bucket = LocalTokenBucket(local_rate, int(os.getenv('RATELIMIT_LOCAL_BURST', 400)))
+        app.extensions['local_rate_limit'] = local_bucket
+
+        @app.before_request
+        def local_rate_limit():
+            if not local_bucket.allow(get_remote_address()):
+                raise TooManyRequests()
+
+    limiter.init_app(app)
+    if redis_url:
+        # Il ripiego di Flask-Limiter è un MemoryStorage senza limite di chiavi:
+        # lo sostituisce la tabella LRU, con la stessa strategia dello storage principale
+        missing = [name for name in _FALLBACK_ATTRIBUTES if not hasattr(limiter, name)]
+        if missing:
+            logger.warning(f"Flask-Limiter without {', '.join(missing)}: "
+                           "keeping its unbounded in-memory fallback")
+        else:
+            limiter._fallback_storage = BoundedMemoryStorage(max_keys=max_keys)
+            limiter._fallback_limiter = STRATEGIES[limiter._strategy](limiter._fallback_storage)
     return limiter
 
+def storage_backend(app):
+    """
+    Schema dello storage dei contatori in uso nel worker
+
+    Returns:
+        str: lru-memory mentre Flask-Limiter ripiega sulla memoria, altrimenti
+            lo schema dello storage configurato (redis, lru-memory)
+    """
+    if getattr(limiter, '_storage_dead', False):
+        return BoundedMemoryStorage.STORAGE_SCHEME[0]
+    return app.config['RATELIMIT_STORAGE_URI'].split(':')[0]
+
 def get_user_key():
     """
     Genera chiave per rate limiting basata su IP + session_id
+    La chiave è calcolata una volta per richiesta e riusata da tutti i limiti
     """
-    from flask import request
-    
-    ip = get_remote_address()
-    session_id = request.json.get('session_id', '') if request.json else ''
-    
-    return f"{ip}:{session_id[:10]}"  # IP + primi 10 char di session_id
\ No newline at end of file
+    key = g.get('rate_limit_user_key')
+    if key is None:
+        # get_json è già in cache per la richiesta: il body non viene riletto
+        data = request.get_json(silent=True)
+        session_id = data.get('session_id', '') if isinstance(data, dict) else ''
+        if not isinstance(session_id, str):
+            session_id = ''
+        key = g.rate_limit_user_key = f"{get_remote_address()}:{session_id[:10]}"  # IP + primi 10 char di session_id
+    return key
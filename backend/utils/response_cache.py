@@ -0,0 +1,116 @@
+"""
+Response Cache per gli endpoint di sola lettura
+Mantiene il corpo JSON già codificato con il suo ETag e risponde 304
+ai client che hanno già la versione corrente
+Anche le varianti compresse (gzip, brotli) vengono calcolate una sola volta
+per versione dei dati
+"""
+import hashlib
+import threading
+
+from flask import Response, request
+
+from utils.compression import available_encodings, compress, negotiate
+
+class CachedResponse:
+    """Corpo di una risposta già codificato, con versione dei dati ed ETag"""
+
+    __slots__ = ('body', 'etag', 'version', 'static', '_encoded')
+
+    def __init__(self, body, version, static=False):
+        self.body = body
+        self.version = version
+        self.static = static
+        self._encoded = {}
+        # L'ETag dipende solo dal contenuto: corpi uguali hanno lo stesso ETag
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    def encoded(self, encoding):
+        """
+        Corpo compresso, calcolato alla prima richiesta che lo accetta
+
+        Args:
+            encoding (str): 'gzip' o 'br'
+
+        Returns:
+            bytes: Corpo compresso con la codifica indicata
+        """
+        body = self._encoded.get(encoding)
+        if body is None:
+            # I dati statici si comprimono al livello massimo: il costo si paga una volta
+            body = self._encoded[encoding] = compress(self.body, encoding, static=self.static)
+        return body
+
+    def precompress(self):
+        """Calcola subito tutte le varianti compresse (es. prima del fork dei worker)"""
+        for encoding in available_encodings():
+            self.encoded(encoding)
+
+class ResponseCache:
+    """
+    Cache delle risposte indicizzata per chiave
+    Una voce viene ricostruita solo quando cambia la versione dei dati sottostanti
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, builder, static=False):
+        """
+        Restituisce la risposta in cache, ricostruendola se i dati sono cambiati
+
+        Args:
+            key: Chiave della risposta (es. nome endpoint + parametri)
+            version: Versione corrente dei dati sottostanti
+            builder (callable): Funzione che restituisce il corpo codificato (bytes)
+            static (bool): Dati che non cambiano mai (compressione al livello massimo)
+
+        Returns:
+            CachedResponse: Risposta aggiornata alla versione richiesta
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+
+        # Costruzione fuori dal lock: nel caso peggiore due thread costruiscono
+        # la stessa voce e l'ultima sovrascrive la prima
+        entry = CachedResponse(builder(), version, static)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, key=None):
+        """
+        Elimina una voce (o tutta la cache se key è None)
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+def make_cached_response(entry):
+    """
+    Crea la risposta HTTP per una voce in cache, compressa se il client lo accetta
+    Se il client invia If-None-Match con l'ETag corrente risponde 304 senza corpo
+
+    Args:
+        entry (CachedResponse): Voce della cache
+
+    Returns:
+        Response: Risposta 200 con ETag, oppure 304
+    """
+    encoding = negotiate(len(entry.body))
+    if encoding is None:
+        response = Response(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+    else:
+        response = Response(entry.encoded(encoding), mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        # Ogni codifica è una rappresentazione diversa: ETag distinto
+        response.set_etag(f'{entry.etag}-{encoding}')
+    response.vary.add('Accept-Encoding')
+    # Il browser può riusare la copia locale, ma deve sempre rivalidarla
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
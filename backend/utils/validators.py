@@ -1,8 +1,12 @@
 """
 Input Validation Schemas
 """
+import math
+from functools import wraps
+
 from marshmallow import Schema, fields, validate, ValidationError, pre_load
 from models.game_data import CYBER_KILL_CHAIN_PHASES, DIFFICULTY_CONFIG
+from utils.helpers import COHORT_ID_PATTERN
 
 class BaseSchema(Schema):
     """Schema base con utilities comuni"""
@@ -28,6 +32,22 @@ class SessionDataSchema(BaseSchema):
         validate=validate.OneOf(list(DIFFICULTY_CONFIG.keys()))
     )
     stats = fields.Dict(missing=dict)
+    # Classe dello studente (opzionale): la sessione entra negli aggregati della classe
+    cohort_id = fields.Str(
+        missing=None,
+        allow_none=True,
+        validate=validate.Regexp(COHORT_ID_PATTERN, error="Invalid cohort ID format")
+    )
+
+class RankLookupSchema(BaseSchema):
+    """Validazione richiesta posizione in classifica"""
+    session_id = fields.Str(
+        required=True,
+        validate=[
+            validate.Length(min=5, max=50),
+            validate.Regexp(r'^[a-zA-Z0-9_-]+$', error="Invalid session ID format")
+        ]
+    )
 
 class PhaseValidationSchema(BaseSchema):
     """Validazione selezione fase"""
@@ -65,17 +85,248 @@ class MitigationValidationSchema(BaseSchema):
         validate=validate.OneOf(list(DIFFICULTY_CONFIG.keys()))
     )
 
+class RoundSchema(BaseSchema):
+    """Validazione round completo (fase, mitigazione e log successivo)"""
+    session_id = fields.Str(
+        required=True,
+        validate=[
+            validate.Length(min=5, max=50),
+            validate.Regexp(r'^[a-zA-Z0-9_-]+$', error="Invalid session ID format")
+        ]
+    )
+    selected_phase = fields.Str(
+        required=True,
+        validate=validate.OneOf(list(CYBER_KILL_CHAIN_PHASES.keys()))
+    )
+    selected_mitigation = fields.Str(
+        missing=None,
+        validate=validate.Length(min=1, max=100)
+    )
+    time_remaining = fields.Int(
+        missing=0,
+        validate=validate.Range(min=0, max=300)  # Max 5 minuti
+    )
+    difficulty = fields.Str(
+        missing='beginner',
+        validate=validate.OneOf(list(DIFFICULTY_CONFIG.keys()))
+    )
+    stats = fields.Dict(missing=dict)  # Accettato per i client precedenti, non usato
+
+# Limiti di /api/analyze: la classificazione costa circa 0.1 s di CPU per milione di caratteri,
+# 10000 righe di log reali (200-300 caratteri) ne hanno 2-3 milioni
+ANALYZE_MAX_LINES = 10000
+ANALYZE_MAX_LINE_LENGTH = 1024
+ANALYZE_MAX_CHARS = 3_000_000
+# Corpo della richiesta: ANALYZE_MAX_CHARS in UTF-8 più la sintassi JSON
+ANALYZE_MAX_BYTES = 8 * 1024 * 1024
+
+class TotalLength(validate.Validator):
+    """Validatore della lunghezza complessiva delle stringhe di una lista"""
+
+    error = 'Total length must be at most {max} characters.'
+
+    def __init__(self, max):
+        self.max = max
+
+    def __call__(self, value):
+        # Gli elementi non validi hanno già un errore del campo interno
+        if sum(len(item) for item in value if isinstance(item, str)) > self.max:
+            raise ValidationError(self.error.format(max=self.max))
+        return value
+
+class AnalyzeSchema(BaseSchema):
+    """Validazione batch di righe di log da classificare"""
+    lines = fields.List(
+        fields.Str(validate=validate.Length(max=ANALYZE_MAX_LINE_LENGTH)),
+        required=True,
+        validate=[
+            validate.Length(min=1, max=ANALYZE_MAX_LINES),
+            TotalLength(max=ANALYZE_MAX_CHARS)
+        ]
+    )
+    top = fields.Int(
+        missing=3,
+        validate=validate.Range(min=1, max=len(CYBER_KILL_CHAIN_PHASES))
+    )
+
 class StatsSchema(BaseSchema):
     """Validazione statistiche giocatore"""
     score = fields.Int(validate=validate.Range(min=0, max=999999), missing=0)
     streak = fields.Int(validate=validate.Range(min=0, max=1000), missing=0)
     accuracy = fields.Float(validate=validate.Range(min=0, max=100), missing=100)
 
-def validate_json_input(schema_class):
+# ============================================================================
+# VALIDAZIONE VELOCE (COMPILATA DALLO SCHEMA)
+# ============================================================================
+
+# Marcatore di "input da far validare a Marshmallow"
+_FALLBACK = object()
+
+def _compile_validators(validators):
+    """
+    Traduce i validatori Marshmallow di un campo in un'unica funzione di controllo
+
+    Returns:
+        callable: Funzione valore -> bool, o None se un validatore non è supportato
+    """
+    checks = []
+    for validator in validators:
+        if isinstance(validator, validate.Length):
+            low, high, equal = validator.min, validator.max, validator.equal
+            if equal is not None:
+                checks.append(lambda v, equal=equal: len(v) == equal)
+            else:
+                checks.append(lambda v, low=low, high=high:
+                              (low is None or len(v) >= low) and (high is None or len(v) <= high))
+        elif isinstance(validator, validate.Regexp):
+            checks.append(lambda v, match=validator.regex.match: match(v) is not None)
+        elif isinstance(validator, validate.OneOf):
+            checks.append(lambda v, choices=frozenset(validator.choices): v in choices)
+        elif isinstance(validator, validate.Range):
+            if not (validator.min_inclusive and validator.max_inclusive):
+                return None
+            low, high = validator.min, validator.max
+            checks.append(lambda v, low=low, high=high:
+                          (low is None or v >= low) and (high is None or v <= high))
+        elif isinstance(validator, TotalLength):
+            # Gli elementi che non sono stringhe fanno poi ripiegare su Marshmallow
+            checks.append(lambda v, high=validator.max:
+                          sum(len(item) for item in v if type(item) is str) <= high)
+        else:
+            return None
+
+    if not checks:
+        return lambda value: True
+    if len(checks) == 1:
+        return checks[0]
+    return lambda value: all(check(value) for check in checks)
+
+def _compile_field(field):
+    """
+    Compila la deserializzazione di un campo per i tipi usati dagli schemi
+
+    Returns:
+        callable: Funzione valore -> valore deserializzato (o _FALLBACK), o None se non supportato
+    """
+    if field.data_key is not None or field.attribute is not None:
+        return None
+    check = _compile_validators(field.validators)
+    if check is None:
+        return None
+
+    if isinstance(field, fields.String):
+        def load(value):
+            if type(value) is not str or not check(value):
+                return _FALLBACK
+            return value
+    elif isinstance(field, fields.Integer):
+        def load(value):
+            # Solo interi JSON: stringhe numeriche e float passano da Marshmallow
+            if type(value) is not int or not check(value):
+                return _FALLBACK
+            return value
+    elif isinstance(field, fields.Float):
+        def load(value):
+            if type(value) not in (int, float):
+                return _FALLBACK
+            value = float(value)
+            if not math.isfinite(value) or not check(value):
+                return _FALLBACK
+            return value
+    elif type(field) is fields.Dict and field.key_field is None and field.value_field is None:
+        def load(value):
+            if type(value) is not dict or not check(value):
+                return _FALLBACK
+            return dict(value)
+    elif type(field) is fields.List and type(field.inner) is fields.String:
+        # Gli elementi non vengono ripuliti dagli spazi, come in Marshmallow
+        item = _compile_field(field.inner)
+        if item is None:
+            return None
+
+        def load(value):
+            if type(value) is not list or not check(value):
+                return _FALLBACK
+            items = [item(v) for v in value]
+            if any(v is _FALLBACK for v in items):
+                return _FALLBACK
+            return items
+    else:
+        return None
+    return load
+
+def compile_schema(schema_class):
+    """
+    Genera una funzione di validazione equivalente a schema_class().load()
+    per gli input validi, senza passare dal motore di Marshmallow
+
+    La funzione restituisce None per qualsiasi input che non sa gestire
+    (valori non validi, tipi da convertire, campi sconosciuti): in quel caso
+    va usato lo schema Marshmallow, che produce gli stessi messaggi di errore
+
+    Args:
+        schema_class (type): Schema derivato da BaseSchema
+
+    Returns:
+        callable: Funzione dict -> dict validato (o None), oppure None se lo
+            schema usa funzionalità non supportate dalla compilazione
+    """
+    # Unico hook ammesso: strip_strings di BaseSchema (riprodotto sotto)
+    hooks = {key: names for key, names in schema_class._hooks.items() if names}
+    if hooks != {('pre_load', False): ['strip_strings']}:
+        return None
+    if schema_class.opts.unknown != 'raise':
+        return None
+
+    compiled = []
+    for name, field in schema_class._declared_fields.items():
+        if field.dump_only:
+            continue
+        load = _compile_field(field)
+        if load is None:
+            return None
+        default = field.load_default
+        has_default = default is not fields.missing_
+        compiled.append((name, load, field.required, has_default, default, callable(default)))
+    known = frozenset(name for name, *_ in compiled)
+
+    def fast_load(data):
+        if type(data) is not dict or not known.issuperset(data):
+            return None
+        result = {}
+        for name, load, required, has_default, default, default_is_callable in compiled:
+            value = data.get(name, fields.missing_)
+            if value is fields.missing_:
+                if required:
+                    return None
+                if has_default:
+                    result[name] = default() if default_is_callable else default
+                continue
+            if type(value) is str:
+                value = value.strip()
+            value = load(value)
+            if value is _FALLBACK:
+                return None
+            result[name] = value
+        return result
+
+    return fast_load
+
+def validate_json_input(schema_class, fast=True, max_bytes=None):
     """
     Decorator per validare input JSON con schema Marshmallow
+
+    Lo schema viene istanziato una sola volta. Con fast=True gli input validi
+    passano da una funzione compilata dallo schema (vedi compile_schema);
+    tutto il resto, errori compresi, passa da Marshmallow come prima.
+    Con max_bytes i corpi più grandi (o senza Content-Length) vengono
+    respinti con 413 prima di leggere e decodificare il JSON
     """
+    schema = schema_class()
+    fast_load = compile_schema(schema_class) if fast else None
+
     def decorator(f):
+        @wraps(f)
         def wrapper(*args, **kwargs):
             from flask import request, jsonify
             from utils.helpers import format_api_response
@@ -87,15 +338,22 @@ def validate_json_input(schema_class):
                         False, error="Content-Type must be application/json"
                     )), 400
                 
+                if max_bytes is not None and (request.content_length is None or
+                                              request.content_length > max_bytes):
+                    return jsonify(format_api_response(
+                        False, error=f"Request body must be at most {max_bytes} bytes"
+                    )), 413
+                
                 data = request.get_json()
                 if not data:
                     return jsonify(format_api_response(
                         False, error="No JSON data provided"
                     )), 400
                 
-                # Valida con schema
-                schema = schema_class()
-                validated_data = schema.load(data)
+                # Valida con la funzione compilata, poi con lo schema
+                validated_data = fast_load(data) if fast_load else None
+                if validated_data is None:
+                    validated_data = schema.load(data)
                 
                 # Passa i dati validati alla funzione
                 return f(validated_data, *args, **kwargs)
@@ -110,6 +368,5 @@ def validate_json_input(schema_class):
                     False, error=f"Invalid request: {str(e)}"
                 )), 400
         
-        wrapper.__name__ = f.__name__
         return wrapper
     return decorator
\ No newline at end of file
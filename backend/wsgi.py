@@ -0,0 +1,22 @@
+"""
+CYBER KILL CHAIN ANALYZER - ENTRY POINT WSGI
+Punto di ingresso per i server di produzione:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Con preload_app (vedi gunicorn.conf.py) questo modulo viene importato una sola
+volta nel master: database dei log, mitigazioni, indici e risposte statiche
+vengono costruiti prima del fork e condivisi copy-on-write dai worker.
+"""
+
+import gc
+
+from app import create_app, preload_static_data
+
+app = create_app()
+preload_static_data()
+
+# Gli oggetti creati finora vivono per tutto il processo: esclusi dalle raccolte
+# del GC, che altrimenti ne scriverebbe le intestazioni copiando le pagine in ogni worker
+gc.collect()
+gc.freeze()
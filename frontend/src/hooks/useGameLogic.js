@@ -63,6 +63,7 @@ export function useGameLogic() {
   // --- CONTROLLO TIMER E RICHIESTE ---
   const [isTimerActive, setIsTimerActive] = useState(false) // Se il timer è attivo
   const abortControllerRef = useRef(null)                  // Per cancellare richieste HTTP
+  const nextRoundRef = useRef(null)                        // Log successivo già ricevuto da /round
 
   // ========================================
   // FUNZIONI DI SUPPORTO E CALCOLI
@@ -156,6 +157,19 @@ export function useGameLogic() {
     setMitigationStrategies([])
     setError(null)
 
+    // Se /round ha già restituito il log successivo non serve un'altra richiesta
+    const nextRound = nextRoundRef.current
+    if (nextRound) {
+      nextRoundRef.current = null
+      setDifficulty(nextRound.difficulty)
+      setCurrentLog(nextRound.log)
+      setTimeRemaining(nextRound.time_limit || 60)
+      setIsTimerActive(true)
+      setGameState(GAME_STATES.PLAYING)
+      setIsLoading(false)
+      return
+    }
+
     // Calcola difficoltà dinamica
     const newDifficulty = calculateDifficulty()
     setDifficulty(newDifficulty)
@@ -227,20 +241,26 @@ export function useGameLogic() {
 
     try {
       if (isBackendAvailable) {
-        // Chiamata al backend per la validazione
-        const response = await axios.post(`${API_URL}/validate-phase`, {
+        // Chiamata al backend per la validazione (se la fase è sbagliata
+        // il round si chiude e la risposta contiene già il log successivo)
+        const response = await axios.post(`${API_URL}/round`, {
           session_id: SESSION_ID,
-          selected_phase: selectedPhase
+          selected_phase: selectedPhase,
+          time_remaining: timeRemaining,
+          difficulty
         }, { timeout: API_TIMEOUT })
 
-        if (validateApiResponse(response.data, ['is_correct'])) {
-          if (response.data.is_correct) {
+        if (validateApiResponse(response.data, ['phase_result.is_correct'])) {
+          storeNextRound(response.data)
+          const phaseResult = response.data.phase_result
+
+          if (phaseResult.is_correct) {
             // RISPOSTA CORRETTA - Procedi alla selezione mitigazione
-            setMitigationStrategies(response.data.mitigation_strategies || FALLBACK_MITIGATIONS)
+            setMitigationStrategies(phaseResult.mitigation_strategies || FALLBACK_MITIGATIONS)
             setFeedback({
               type: FEEDBACK_TYPES.PHASE_CORRECT,
-              explanation: response.data.explanation,
-              indicators: response.data.indicators
+              explanation: phaseResult.explanation,
+              indicators: phaseResult.indicators
             })
             setGameState(GAME_STATES.MITIGATION)
 
@@ -249,7 +269,7 @@ export function useGameLogic() {
             setPhasesCompleted(prev => ({ ...prev, [selectedPhase]: phaseCount + 1 }))
           } else {
             // RISPOSTA SBAGLIATA - Fornisci feedback educativo
-            handleIncorrectPhase(response.data)
+            handleIncorrectPhase(phaseResult)
           }
         } else {
           throw new Error('Formato risposta non valido')
@@ -289,7 +309,7 @@ export function useGameLogic() {
     } finally {
       setIsLoading(false)
     }
-  }, [selectedPhase, isLoading, isBackendAvailable, phasesCompleted])
+  }, [selectedPhase, timeRemaining, difficulty, isLoading, isBackendAvailable, phasesCompleted])
 
   /**
    * Valida la strategia di mitigazione selezionata e calcola il punteggio
@@ -306,16 +326,18 @@ export function useGameLogic() {
 
     try {
       if (isBackendAvailable) {
-        // Chiamata al backend per validare mitigazione
-        const response = await axios.post(`${API_URL}/validate-mitigation`, {
+        // Un'unica chiamata: validazione, punteggio e log successivo
+        const response = await axios.post(`${API_URL}/round`, {
           session_id: SESSION_ID,
+          selected_phase: selectedPhase,
           selected_mitigation: selectedMitigation,
           time_remaining: timeRemaining,
           difficulty
         }, { timeout: API_TIMEOUT })
 
-        if (validateApiResponse(response.data, ['is_correct', 'points'])) {
-          handleMitigationResult(response.data)
+        if (validateApiResponse(response.data, ['mitigation_result.is_correct', 'mitigation_result.points'])) {
+          storeNextRound(response.data)
+          handleMitigationResult(response.data.mitigation_result)
         } else {
           throw new Error('Formato risposta non valido')
         }
@@ -344,12 +366,25 @@ export function useGameLogic() {
     } finally {
       setIsLoading(false)
     }
-  }, [selectedMitigation, timeRemaining, difficulty, isLoading, isBackendAvailable])
+  }, [selectedPhase, selectedMitigation, timeRemaining, difficulty, isLoading, isBackendAvailable])
 
   // ========================================
   // FUNZIONI DI SUPPORTO PER LA VALIDAZIONE
   // ========================================
 
+  /**
+   * Memorizza il log successivo restituito da /round (se il round è chiuso)
+   */
+  const storeNextRound = (data) => {
+    if (validateApiResponse(data, ['log.id', 'log.raw', 'time_limit'])) {
+      nextRoundRef.current = {
+        log: data.log,
+        time_limit: data.time_limit,
+        difficulty: data.difficulty
+      }
+    }
+  }
+
   /**
    * Gestisce il caso di fase identificata incorrettamente
    */